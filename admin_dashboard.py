@@ -5,28 +5,46 @@ Admin Dashboard للتحكم في بيانات البوت
 
 import os
 import json
+import base64
+import binascii
 import sqlite3
 from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import (Flask, Response, render_template, request, redirect, url_for, flash, jsonify, abort,
+                   stream_with_context)
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, select, text, tuple_
+from sqlalchemy.orm import selectinload
 from data import routes_data, neighborhood_data
+from database_helper import DATABASE_PATH
+from bulk_loader import load, location_records
+from db_migrations import (BUSY_TIMEOUT_MS, DATASET_VERSION_SQL, STOP_CATEGORY, UNCLASSIFIED_NEIGHBORHOOD,
+                           configure_connection, migrate)
 
 # إعداد Flask
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///admin_bot.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{DATABASE_PATH}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# اتصالات مُعاد استخدامها (pool) مع مهلة انتظار الأقفال
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': 5,
+    'pool_pre_ping': True,
+    'connect_args': {'timeout': BUSY_TIMEOUT_MS / 1000},
+}
 
 db = SQLAlchemy(app)
 
-# إضافة مرشح JSON للقوالب
-@app.template_filter('from_json')
-def from_json_filter(value):
-    """تحويل JSON string إلى Python object"""
-    try:
-        return json.loads(value)
-    except:
-        return []
+with app.app_context():
+    @event.listens_for(db.engine, 'connect')
+    def _configure_sqlite(dbapi_connection, connection_record):
+        """تفعيل WAL و busy_timeout لكل اتصال جديد في الـ pool"""
+        configure_connection(dbapi_connection)
+
+# حجم الصفحة في القوائم ومنتقي الأماكن
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# عدد الصفوف المقروءة من القاعدة في كل دفعة أثناء التصدير
+EXPORT_BATCH_SIZE = 1000
 
 # Models قاعدة البيانات
 class Location(db.Model):
@@ -38,6 +56,13 @@ class Location(db.Model):
     coordinates = db.Column(db.String(50), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # نفس الفهارس التي يضيفها db_migrations للقواعد القديمة
+    __table_args__ = (
+        db.Index('ix_location_neighborhood_category_name', 'neighborhood', 'category', 'name'),
+        db.Index('ix_location_category', 'category'),
+        db.Index('ix_location_name', 'name'),
+    )
+    
     def __repr__(self):
         return f'<Location {self.name}>'
 
@@ -48,52 +73,147 @@ class Route(db.Model):
     fare = db.Column(db.Float, nullable=False)
     start_area = db.Column(db.String(200), nullable=True)
     end_area = db.Column(db.String(200), nullable=True)
-    key_points = db.Column(db.Text, nullable=False)  # JSON string
     notes = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    stops = db.relationship('RouteStop', order_by='RouteStop.seq', cascade='all, delete-orphan')
+    
+    __table_args__ = (
+        db.Index('ix_route_name', 'name'),
+        db.Index('ix_route_created_at', 'created_at'),
+    )
+    
+    @property
+    def key_points(self):
+        """أسماء محطات الخط بالترتيب"""
+        return [stop.location.name for stop in self.stops]
     
     def __repr__(self):
         return f'<Route {self.name}>'
 
+class RouteStop(db.Model):
+    """محطات كل خط بالترتيب (مكان واحد لكل seq)"""
+    __tablename__ = 'route_stop'
+    route_id = db.Column(db.Integer, db.ForeignKey('route.id', ondelete='CASCADE'), primary_key=True)
+    seq = db.Column(db.Integer, primary_key=True)
+    location_id = db.Column(db.Integer, db.ForeignKey('location.id', ondelete='CASCADE'), nullable=False)
+    location = db.relationship('Location')
+    
+    __table_args__ = (
+        db.Index('ix_route_stop_location', 'location_id'),
+    )
+
+def stops_for(location_ids):
+    """RouteStop لكل معرف مكان بالترتيب (المعرفات غير الموجودة تُتجاهل)"""
+    ids = [int(location_id) for location_id in location_ids if str(location_id).isdigit()]
+    existing = {row[0] for row in db.session.query(Location.id).filter(Location.id.in_(ids))} if ids else set()
+    return [RouteStop(seq=seq, location_id=location_id)
+            for seq, location_id in enumerate(i for i in ids if i in existing)]
+
+def location_ids_for(names):
+    """معرفات الأماكن بالأسماء، مع إضافة الأسماء غير الموجودة كأماكن غير مصنفة"""
+    ids = []
+    for name in names:
+        location = Location.query.filter_by(name=name).order_by(Location.id).first()
+        if location is None:
+            location = Location(name=name, category=STOP_CATEGORY, neighborhood=UNCLASSIFIED_NEIGHBORHOOD)
+            db.session.add(location)
+            db.session.flush()
+        ids.append(location.id)
+    return ids
+
+def upgrade_database():
+    """إنشاء الجداول وتطبيق ترحيلات المخطط (فهارس وسجل التغييرات)"""
+    db.create_all()
+    with db.engine.connect() as connection:
+        applied = migrate(connection.connection.driver_connection)
+    if applied:
+        print(f"🔧 تم تطبيق {applied} ترحيل لقاعدة البيانات")
+
 def init_database():
     """تهيئة قاعدة البيانات بالبيانات الحالية"""
     with app.app_context():
-        db.create_all()
+        upgrade_database()
         
         # تحقق إذا كانت البيانات موجودة بالفعل
         if Location.query.count() == 0:
             print("🔄 جاري تحميل البيانات الحالية...")
             
-            # إضافة الأماكن من neighborhood_data
-            for neighborhood, categories in neighborhood_data.items():
-                for category, locations in categories.items():
-                    for location in locations:
-                        # التعامل مع البيانات المعقدة
-                        location_name = location
-                        if isinstance(location, dict):
-                            location_name = location.get('name', str(location))
-                        
-                        new_location = Location(
-                            name=str(location_name),
-                            category=str(category),
-                            neighborhood=str(neighborhood)
-                        )
-                        db.session.add(new_location)
-            
-            # إضافة الخطوط من routes_data
-            for route in routes_data:
-                new_route = Route(
-                    name=route['routeName'],
-                    fare=float(route['fare'].split()[0]) if 'fare' in route else 4.5,
-                    start_area=route.get('startArea', ''),
-                    end_area=route.get('endArea', ''),
-                    key_points=json.dumps(route['keyPoints'], ensure_ascii=False),
-                    notes=route.get('notes', '')
-                )
-                db.session.add(new_route)
-            
-            db.session.commit()
-            print("✅ تم تحميل البيانات بنجاح!")
+            # إدخال بالجملة (executemany داخل transaction) بدلاً من كائن ORM لكل صف
+            with db.engine.connect() as connection:
+                conn = connection.connection.driver_connection
+                locations = load(conn, 'locations', location_records(neighborhood_data), source='data.py')
+                routes = load(conn, 'routes', enumerate(routes_data, 1), source='data.py')
+            print(f"✅ تم تحميل البيانات بنجاح! ({locations['inserted']} مكان، {routes['inserted']} خط)")
+            for kind, stats in (('مكان', locations), ('خط', routes)):
+                if stats['merged']:
+                    print(f"⚠️ {stats['merged']} {kind} مكرر (نفس المفتاح) دُمج مع سجل آخر")
+                if stats['invalid']:
+                    print(f"⚠️ {stats['invalid']} {kind} غير صالح لم يُحمّل:")
+                    for error in stats['errors']:
+                        print(f"   ✗ {error}")
+
+# ===== ترقيم الصفحات (keyset) =====
+# بدلاً من OFFSET (الذي يمر على كل الصفوف السابقة) تبدأ كل صفحة بعد آخر صف في
+# الصفحة السابقة حسب أعمدة الترتيب، فيبقى زمن الصفحة ثابتاً مهما كبر الجدول.
+
+def encode_cursor(values) -> str:
+    raw = json.dumps(list(values), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token: str, size: int) -> list:
+    """فك المؤشر أو 400 إذا كان غير صالح"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        abort(400, description='cursor غير صالح')
+    if not isinstance(values, list) or len(values) != size:
+        abort(400, description='cursor غير صالح')
+    return values
+
+def page_limit() -> int:
+    try:
+        limit = int(request.args.get('limit', PAGE_SIZE))
+    except ValueError:
+        limit = PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def keyset_page(query, columns, cursor, limit, descending=False):
+    """صفحة من query مرتبة بـ columns (آخرها فريد) تبدأ بعد cursor
+
+    Returns:
+        (الصفوف, مؤشر الصفحة التالية أو None)
+    """
+    if cursor:
+        after = decode_cursor(cursor, len(columns))
+        key = tuple_(*columns)
+        query = query.filter(key < tuple_(*after) if descending else key > tuple_(*after))
+    ordering = [column.desc() for column in columns] if descending else columns
+    rows = query.order_by(*ordering).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(getattr(rows[-1], column.key) for column in columns)
+    return rows, next_cursor
+
+def location_filters():
+    """قيم التصفية من الـ query string"""
+    return {
+        'q': request.args.get('q', '').strip(),
+        'neighborhood': request.args.get('neighborhood', '').strip(),
+        'category': request.args.get('category', '').strip(),
+    }
+
+def filtered_locations(filters):
+    query = Location.query
+    if filters['q']:
+        query = query.filter(Location.name.contains(filters['q'], autoescape=True))
+    if filters['neighborhood']:
+        query = query.filter(Location.neighborhood == filters['neighborhood'])
+    if filters['category']:
+        query = query.filter(Location.category == filters['category'])
+    return query
+
+LOCATION_ORDER = (Location.neighborhood, Location.category, Location.name, Location.id)
 
 # Routes الصفحات
 @app.route('/')
@@ -101,7 +221,7 @@ def index():
     """الصفحة الرئيسية"""
     routes_count = Route.query.count()
     locations_count = Location.query.count()
-    neighborhoods = db.session.query(Location.neighborhood.distinct()).all()
+    neighborhoods = db.session.query(Location.neighborhood).distinct().all()
     
     return render_template('index.html', 
                          routes_count=routes_count,
@@ -110,9 +230,15 @@ def index():
 
 @app.route('/routes')
 def routes_list():
-    """عرض جميع الخطوط"""
-    routes = Route.query.order_by(Route.created_at.desc()).all()
-    return render_template('routes_list.html', routes=routes)
+    """عرض الخطوط (الأحدث أولاً) صفحة بصفحة مع البحث بالاسم"""
+    q = request.args.get('q', '').strip()
+    query = Route.query.options(selectinload(Route.stops).joinedload(RouteStop.location))
+    if q:
+        query = query.filter(Route.name.contains(q, autoescape=True))
+    routes, next_cursor = keyset_page(query, (Route.id,), request.args.get('cursor'), page_limit(),
+                                      descending=True)
+    return render_template('routes_list.html', routes=routes, q=q,
+                           cursor=request.args.get('cursor'), next_cursor=next_cursor)
 
 @app.route('/routes/add', methods=['GET', 'POST'])
 def add_route():
@@ -122,7 +248,7 @@ def add_route():
         fare = float(request.form.get('fare', 4.5))
         start_area = request.form.get('start_area', '')
         end_area = request.form.get('end_area', '')
-        selected_locations = request.form.getlist('locations')
+        location_ids = request.form.getlist('location_ids')
         notes = request.form.get('notes', '')
         
         # إنشاء الخط الجديد
@@ -131,7 +257,7 @@ def add_route():
             fare=fare,
             start_area=start_area,
             end_area=end_area,
-            key_points=json.dumps(selected_locations, ensure_ascii=False),
+            stops=stops_for(location_ids),
             notes=notes
         )
         
@@ -141,24 +267,47 @@ def add_route():
         flash(f'تم إضافة الخط "{name}" بنجاح!', 'success')
         return redirect(url_for('routes_list'))
     
-    # جلب جميع الأماكن مرتبة حسب الحي والتصنيف
-    locations = Location.query.order_by(Location.neighborhood, Location.category, Location.name).all()
-    neighborhoods = {}
-    
-    for location in locations:
-        if location.neighborhood not in neighborhoods:
-            neighborhoods[location.neighborhood] = {}
-        if location.category not in neighborhoods[location.neighborhood]:
-            neighborhoods[location.neighborhood][location.category] = []
-        neighborhoods[location.neighborhood][location.category].append(location)
-    
-    return render_template('add_route.html', neighborhoods=neighborhoods)
+    # الأماكن تُحمّل في الصفحة من /api/locations حسب البحث
+    return render_template('add_route.html', current_locations=[])
 
 @app.route('/locations')
 def locations_list():
-    """عرض جميع الأماكن"""
-    locations = Location.query.order_by(Location.neighborhood, Location.category, Location.name).all()
-    return render_template('locations_list.html', locations=locations)
+    """عرض الأماكن صفحة بصفحة مع البحث والتصفية بالحي والتصنيف"""
+    filters = location_filters()
+    locations, next_cursor = keyset_page(filtered_locations(filters), LOCATION_ORDER,
+                                         request.args.get('cursor'), page_limit())
+    neighborhoods = db.session.query(Location.neighborhood).distinct().order_by(Location.neighborhood).all()
+    categories = db.session.query(Location.category).distinct().order_by(Location.category).all()
+    return render_template('locations_list.html', locations=locations, filters=filters,
+                           filter_args={key: value for key, value in filters.items() if value},
+                           neighborhoods=[n[0] for n in neighborhoods],
+                           categories=[c[0] for c in categories],
+                           cursor=request.args.get('cursor'), next_cursor=next_cursor)
+
+@app.route('/api/locations')
+def api_locations():
+    """الأماكن المطابقة كـ JSON لمنتقي محطات الخط (صفحة بصفحة)"""
+    filters = location_filters()
+    locations, next_cursor = keyset_page(filtered_locations(filters), LOCATION_ORDER,
+                                         request.args.get('cursor'), page_limit())
+    return jsonify({
+        'items': [{'id': location.id, 'name': location.name, 'category': location.category,
+                   'neighborhood': location.neighborhood} for location in locations],
+        'next_cursor': next_cursor,
+    })
+
+@app.route('/api/locations/<int:location_id>/routes')
+def api_location_routes(location_id):
+    """الخطوط التي تمر بمكان مع ترتيبه في كل خط (من فهرس route_stop)"""
+    location = Location.query.get_or_404(location_id)
+    rows = (db.session.query(Route.id, Route.name, RouteStop.seq)
+            .join(RouteStop, RouteStop.route_id == Route.id)
+            .filter(RouteStop.location_id == location_id)
+            .order_by(Route.name, RouteStop.seq))
+    return jsonify({
+        'location': {'id': location.id, 'name': location.name},
+        'routes': [{'id': route_id, 'name': name, 'seq': seq} for route_id, name, seq in rows],
+    })
 
 @app.route('/locations/add', methods=['GET', 'POST'])
 def add_location():
@@ -183,45 +332,159 @@ def add_location():
         return redirect(url_for('locations_list'))
     
     # جلب الأحياء والتصنيفات الموجودة
-    neighborhoods = db.session.query(Location.neighborhood.distinct()).all()
-    categories = db.session.query(Location.category.distinct()).all()
+    neighborhoods = db.session.query(Location.neighborhood).distinct().all()
+    categories = db.session.query(Location.category).distinct().all()
     
     return render_template('add_location.html', 
                          neighborhoods=[n[0] for n in neighborhoods],
                          categories=[c[0] for c in categories])
 
-@app.route('/api/export')
-def export_data():
-    """تصدير البيانات للبوت"""
-    routes = Route.query.all()
-    locations = Location.query.all()
+def route_export(row, key_points) -> dict:
+    """صف خط بصيغة routes_data في البوت"""
+    return {
+        'routeName': row.name,
+        'fare': f"{row.fare} جنيه مصري",
+        'startArea': row.start_area,
+        'endArea': row.end_area,
+        'keyPoints': key_points,
+        'notes': row.notes
+    }
+
+def key_points_for(route_ids) -> dict:
+    """معرف الخط -> أسماء محطاته بالترتيب (استعلام واحد لدفعة من الخطوط)"""
+    key_points = {route_id: [] for route_id in route_ids}
+    if key_points:
+        rows = db.session.execute(select(RouteStop.route_id, Location.name)
+                                  .join(Location, Location.id == RouteStop.location_id)
+                                  .where(RouteStop.route_id.in_(list(key_points)))
+                                  .order_by(RouteStop.route_id, RouteStop.seq))
+        for route_id, name in rows:
+            key_points[route_id].append(name)
+    return key_points
+
+ROUTE_COLUMNS = (Route.id, Route.name, Route.fare, Route.start_area, Route.end_area, Route.notes)
+LOCATION_COLUMNS = (Location.id, Location.name, Location.category, Location.neighborhood, Location.coordinates)
+
+# حجم تقريبي لكل جزء يُرسل من الرد (بدلاً من إرسال كل قيمة صغيرة منفردة)
+EXPORT_CHUNK_CHARS = 64 * 1024
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+def _chunked(parts):
+    buffer, size = [], 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= EXPORT_CHUNK_CHARS:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+def stream_full_export(version: int):
+    """نفس شكل التصدير القديم ({routes_data, neighborhood_data}) لكن على دفعات بدلاً من بناء كل البيانات في الذاكرة"""
+    yield '{"version": %d, "routes_data": [' % version
+    rows = db.session.execute(select(*ROUTE_COLUMNS).order_by(Route.id).execution_options(yield_per=EXPORT_BATCH_SIZE))
+    first = True
+    for batch in rows.partitions():
+        key_points = key_points_for(row.id for row in batch)
+        for row in batch:
+            yield ('' if first else ',') + _dumps(route_export(row, key_points[row.id]))
+            first = False
     
-    # تجهيز بيانات الخطوط
-    routes_export = []
-    for route in routes:
-        routes_export.append({
-            'routeName': route.name,
-            'fare': f"{route.fare} جنيه مصري",
-            'startArea': route.start_area,
-            'endArea': route.end_area,
-            'keyPoints': json.loads(route.key_points),
-            'notes': route.notes
-        })
+    # الأماكن مرتبة بالحي ثم التصنيف (فهرس ix_location_neighborhood_category_name)، فتُكتب المجموعات متتالية
+    yield '], "neighborhood_data": {'
+    rows = db.session.execute(select(Location.neighborhood, Location.category, Location.name)
+                              .order_by(Location.neighborhood, Location.category, Location.name, Location.id)
+                              .execution_options(yield_per=EXPORT_BATCH_SIZE))
+    neighborhood = category = None
+    for row in rows:
+        if row.neighborhood != neighborhood:
+            if neighborhood is not None:
+                yield ']}, '
+            yield f'{_dumps(row.neighborhood)}: {{{_dumps(row.category)}: [{_dumps(row.name)}'
+            neighborhood, category = row.neighborhood, row.category
+        elif row.category != category:
+            yield f'], {_dumps(row.category)}: [{_dumps(row.name)}'
+            category = row.category
+        else:
+            yield f', {_dumps(row.name)}'
+    if neighborhood is not None:
+        yield ']}'
+    yield '}}'
+
+def _change_line(entity: str, row, previous_names, key_points=None) -> str:
+    if entity == 'route':
+        data = route_export(row, key_points)
+    else:
+        data = {'name': row.name, 'neighborhood': row.neighborhood, 'category': row.category,
+                'coordinates': row.coordinates}
+    return _dumps({'type': entity, 'op': 'upsert', 'id': row.id, 'data': data,
+                   'previous_names': [name for name in previous_names if name != row.name]}) + '\n'
+
+def stream_changes(version: int, since: int):
+    """التغييرات بعد نسخة since كسطور NDJSON: إضافة/تعديل (upsert) أو حذف لكل خط ومكان"""
+    yield _dumps({'type': 'meta', 'version': version, 'since': since}) + '\n'
     
-    # تجهيز بيانات الأماكن
-    neighborhoods_export = {}
-    for location in locations:
-        if location.neighborhood not in neighborhoods_export:
-            neighborhoods_export[location.neighborhood] = {}
-        if location.category not in neighborhoods_export[location.neighborhood]:
-            neighborhoods_export[location.neighborhood][location.category] = []
-        
-        neighborhoods_export[location.neighborhood][location.category].append(location.name)
+    if since == 0:
+        # مستهلك جديد: كل الصفوف الحالية كإضافات، ولا حاجة لقراءة سجل التغييرات أو الحذف
+        for entity, model, columns in (('route', Route, ROUTE_COLUMNS), ('location', Location, LOCATION_COLUMNS)):
+            rows = db.session.execute(select(*columns).order_by(model.id)
+                                      .execution_options(yield_per=EXPORT_BATCH_SIZE))
+            for batch in rows.partitions():
+                key_points = key_points_for(row.id for row in batch) if entity == 'route' else {}
+                for row in batch:
+                    yield _change_line(entity, row, [], key_points.get(row.id))
+        return
     
-    return jsonify({
-        'routes_data': routes_export,
-        'neighborhood_data': neighborhoods_export
-    })
+    # (الكيان, المعرف) -> الأسماء السابقة (لحذفها عند المستهلك إذا تغير الاسم)
+    changed = {}
+    rows = db.session.execute(text("SELECT entity, entity_id, old_name FROM change_log "
+                                   "WHERE version > :since AND version <= :version ORDER BY version"),
+                              {'since': since, 'version': version})
+    for entity, entity_id, old_name in rows:
+        names = changed.setdefault((entity, entity_id), [])
+        if old_name is not None and old_name not in names:
+            names.append(old_name)
+    
+    for entity, model, columns in (('route', Route, ROUTE_COLUMNS), ('location', Location, LOCATION_COLUMNS)):
+        ids = sorted(entity_id for kind, entity_id in changed if kind == entity)
+        for start in range(0, len(ids), EXPORT_BATCH_SIZE):
+            batch = ids[start:start + EXPORT_BATCH_SIZE]
+            current = {row.id: row for row in db.session.execute(select(*columns).where(model.id.in_(batch)))}
+            key_points = key_points_for(current) if entity == 'route' else {}
+            for entity_id in batch:
+                previous_names = changed[(entity, entity_id)]
+                row = current.get(entity_id)
+                if row is None:
+                    yield _dumps({'type': entity, 'op': 'delete', 'id': entity_id, 'names': previous_names}) + '\n'
+                else:
+                    yield _change_line(entity, row, previous_names, key_points.get(entity_id))
+
+@app.route('/api/export')
+def export_data():
+    """تصدير البيانات للبوت (كاملة، أو since=<version> للتغييرات فقط كـ NDJSON)
+
+    ETag مشتق من نسخة البيانات، فـ If-None-Match بنفس القيمة يعيد 304 دون قراءة أي صفوف.
+    """
+    since = request.args.get('since', type=int)
+    # النسخة تُقرأ قبل الصفوف: أي تغيير أثناء التصدير يظهر مرة أخرى في since=version،
+    # وتطبيق upsert/delete مرتين لا يغير النتيجة عند المستهلك
+    version = db.session.execute(text(DATASET_VERSION_SQL)).scalar()
+    if since is not None and not 0 <= since <= version:
+        abort(400, description=f'since يجب أن يكون بين 0 و {version}')
+    
+    etag = f'v{version}' if since is None else f'v{version}-since{since}'
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    elif since is None:
+        response = Response(stream_with_context(_chunked(stream_full_export(version))), mimetype='application/json')
+    else:
+        response = Response(stream_with_context(_chunked(stream_changes(version, since))), mimetype='application/x-ndjson')
+    response.set_etag(etag)
+    response.headers['X-Dataset-Version'] = str(version)
+    return response
 
 @app.route('/routes/edit/<int:route_id>', methods=['GET', 'POST'])
 def edit_route(route_id):
@@ -233,8 +496,7 @@ def edit_route(route_id):
         route.fare = float(request.form.get('fare', 4.5))
         route.start_area = request.form.get('start_area', '')
         route.end_area = request.form.get('end_area', '')
-        selected_locations = request.form.getlist('locations')
-        route.key_points = json.dumps(selected_locations, ensure_ascii=False)
+        route.stops = stops_for(request.form.getlist('location_ids'))
         route.notes = request.form.get('notes', '')
         
         db.session.commit()
@@ -242,26 +504,11 @@ def edit_route(route_id):
         flash(f'تم تحديث الخط "{route.name}" بنجاح!', 'success')
         return redirect(url_for('routes_list'))
     
-    # جلب جميع الأماكن مرتبة
-    locations = Location.query.order_by(Location.neighborhood, Location.category, Location.name).all()
-    neighborhoods = {}
-    
-    for location in locations:
-        if location.neighborhood not in neighborhoods:
-            neighborhoods[location.neighborhood] = {}
-        if location.category not in neighborhoods[location.neighborhood]:
-            neighborhoods[location.neighborhood][location.category] = []
-        neighborhoods[location.neighborhood][location.category].append(location)
-    
-    # الأماكن الحالية للخط
-    try:
-        current_locations = json.loads(route.key_points)
-    except:
-        current_locations = []
+    # الأماكن الحالية للخط (باقي الأماكن تُحمّل من /api/locations)
+    current_locations = [{'id': stop.location_id, 'name': stop.location.name} for stop in route.stops]
     
     return render_template('edit_route.html', 
                          route=route, 
-                         neighborhoods=neighborhoods,
                          current_locations=current_locations)
 
 @app.route('/routes/delete/<int:route_id>', methods=['POST'])
@@ -293,8 +540,8 @@ def edit_location(location_id):
         return redirect(url_for('locations_list'))
     
     # جلب الأحياء والتصنيفات الموجودة
-    neighborhoods = db.session.query(Location.neighborhood.distinct()).all()
-    categories = db.session.query(Location.category.distinct()).all()
+    neighborhoods = db.session.query(Location.neighborhood).distinct().all()
+    categories = db.session.query(Location.category).distinct().all()
     
     return render_template('edit_location.html', 
                          location=location,
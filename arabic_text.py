@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+توحيد كتابة النص العربي قبل المقارنة والفهرسة
+
+المستخدم يكتب "مستشفى" أو "مستشفي" و"أبو" أو "ابو"، فتُحذف التشكيلات والتطويل
+وتُوحد أشكال الألف والياء والتاء المربوطة والأرقام الهندية، وتتحول علامات الترقيم
+إلى مسافات. نفس الدالة تُطبق على أسماء المعالم وعلى ما يكتبه المستخدم.
+"""
+
+import re
+from typing import List
+
+# التشكيل وعلامات القرآن والتطويل
+_DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+_PUNCTUATION = re.compile(r'[^\w\s]|_')
+_SPACES = re.compile(r'\s+')
+
+_LETTERS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه',
+    '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
+    '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9',
+})
+
+ARTICLE = 'ال'
+
+
+def normalize(text: str) -> str:
+    """الشكل الموحد للنص (حروف صغيرة، بدون تشكيل أو ترقيم، مسافة واحدة بين الكلمات)"""
+    if not text:
+        return ''
+    text = _DIACRITICS.sub('', text.lower()).translate(_LETTERS)
+    return _SPACES.sub(' ', _PUNCTUATION.sub(' ', text)).strip()
+
+
+def tokenize(text: str) -> List[str]:
+    return normalize(text).split()
+
+
+def strip_article(word: str) -> str:
+    """"المستشفي" -> "مستشفي" (الكلمات القصيرة مثل "الف" تبقى كما هي)"""
+    if word.startswith(ARTICLE) and len(word) > len(ARTICLE) + 2:
+        return word[len(ARTICLE):]
+    return word
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+الفرانكو (العربي بحروف لاتينية): "mn el gam3a lel ma7ata"
+
+- translate_keywords: كلمات الربط والسؤال (mn / lel / ezay ...) إلى العربية، فيفهم
+  extract_locations_from_text الطلب كما هو، وتبقى أسماء الأماكن بالحروف اللاتينية
+- phonetic_key: مفتاح صوتي واحد للكتابتين: الحروف الساكنة بعد دمج المتشابه منها
+  (ت/ط = t و 7/ح/ه = h و 3 = ع ...)، بدون حروف العلة و"ال" وتكرار الحرف والتاء المربوطة.
+  "el gam3a" و "الجامعة" كلاهما "gm3a"
+- PhoneticIndex: مفاتيح كل المعالم تُحسب مرة واحدة، والبحث قراءة من قاموس
+- arabizi_to_arabic / arabic_to_arabizi: تحويل تقريبي حرفاً بحرف للعرض
+"""
+
+import re
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from arabic_text import normalize, strip_article
+
+logger = logging.getLogger(__name__)
+
+# أقل درجة لقبول معلم من الفهرس الصوتي (نصف كلمات النص على الأقل)
+PHONETIC_MIN_SCORE = 0.5
+
+_LATIN = re.compile(r'[a-z]', re.IGNORECASE)
+_ARABIC = re.compile('[\u0600-\u06ff]')
+_LATIN_WORD = re.compile(r"[a-z0-9']+", re.IGNORECASE)
+
+# كلمات الفرانكو الشائعة في طلبات المسارات
+KEYWORDS = {
+    'من': ('mn', 'men', 'min', 'mel', 'mil', 'from'),
+    'إلى': ('le', 'lel', 'li', 'lil', 'ela', 'ila', 'ely', 'l7d', 'la7ad', 'to'),
+    'إزاي': ('ezay', 'ezzay', 'ezai', 'ezzai', 'izay', 'izzay', 'ezaay', 'how'),
+    'أروح': ('aro7', 'aroo7', 'arou7', 'aroh', 'arooh', 'aru7'),
+    'أوصل': ('awsal', 'aw9al', 'awsl'),
+}
+KEYWORD_TRANSLATIONS = {latin: arabic for arabic, words in KEYWORDS.items() for latin in words}
+
+# أداة التعريف كلمة منفصلة أو ملتصقة: el gam3a / elgam3a / es-salam
+ARTICLES = {'el', 'al', 'il', 'l', 'es', 'esh', 'en', 'er', 'et', 'ed', 'ez', 'as', 'an', 'ar', 'at', 'ad', 'az'}
+ATTACHED_ARTICLES = ('el', 'al')
+
+# الأصوات المتقاربة في حرف واحد؛ ك وق والهمزة معاً لأن ق تُكتب k أو 2 كما تُنطق
+# ("sou2" = سوق) والهمزة 2 ("mina2" = ميناء)
+ARABIC_SOUNDS = {
+    'ء': 'k', 'ب': 'b', 'ت': 't', 'ط': 't', 'ث': 't', 'ج': 'g', 'ح': 'h', 'ه': 'h', 'خ': 'x',
+    'د': 'd', 'ض': 'd', 'ذ': 'd', 'ر': 'r', 'ز': 'z', 'ظ': 'z', 'س': 's', 'ص': 's',
+    'ش': 'c', 'ع': '3', 'غ': 'G', 'ف': 'f', 'ق': 'k', 'ك': 'k', 'ل': 'l', 'م': 'm', 'ن': 'n',
+    'پ': 'b', 'ڤ': 'f', 'ڨ': 'f', 'چ': 'g', 'گ': 'g',
+}
+LATIN_VOWELS = 'aeiouy'
+# بعد normalize: ة -> ه و ى -> ي
+ARABIC_VOWELS = 'اويه'
+LATIN_DIGRAPHS = (("3'", 'G'), ("7'", 'x'), ("6'", 'z'), ('sh', 'c'), ('ch', 'c'), ('kh', 'x'),
+                  ('gh', 'G'), ('th', 't'), ('dh', 'd'), ('ph', 'f'))
+LATIN_SOUNDS = {
+    'b': 'b', 'p': 'b', 't': 't', '6': 't', 'g': 'g', 'j': 'g', 'h': 'h', '7': 'h', 'x': 'x', '5': 'x',
+    'd': 'd', 'r': 'r', 'z': 'z', 's': 's', '9': 's', 'c': 's', '3': '3', 'f': 'f', 'v': 'f',
+    'q': 'k', '8': 'k', '2': 'k', 'k': 'k', 'l': 'l', 'm': 'm', 'n': 'n',
+}
+
+# للتحويل التقريبي للعرض
+ARABIZI_LETTERS = {
+    'ا': 'a', 'ب': 'b', 'ت': 't', 'ث': 'th', 'ج': 'g', 'ح': '7', 'خ': 'kh', 'د': 'd', 'ذ': 'z',
+    'ر': 'r', 'ز': 'z', 'س': 's', 'ش': 'sh', 'ص': 's', 'ض': 'd', 'ط': 't', 'ظ': 'z', 'ع': '3',
+    'غ': 'gh', 'ف': 'f', 'ق': 'q', 'ك': 'k', 'ل': 'l', 'م': 'm', 'ن': 'n', 'ه': 'h', 'و': 'o',
+    'ي': 'i', 'ء': '2',
+}
+ARABIC_LETTERS = {
+    'sh': 'ش', 'ch': 'ش', 'kh': 'خ', 'gh': 'غ', 'th': 'ث', 'dh': 'ذ', 'ou': 'و', 'oo': 'و', 'ee': 'ي',
+    "3'": 'غ', "7'": 'خ',
+    'a': 'ا', 'b': 'ب', 'p': 'ب', 't': 'ت', 'g': 'ج', 'j': 'ج', 'h': 'ه', 'd': 'د', 'r': 'ر', 'z': 'ز',
+    's': 'س', 'c': 'ك', 'f': 'ف', 'v': 'ف', 'q': 'ق', 'k': 'ك', 'l': 'ل', 'm': 'م', 'n': 'ن', 'w': 'و',
+    'o': 'و', 'u': 'و', 'y': 'ي', 'i': 'ي', 'e': 'ي', 'x': 'كس',
+    '2': 'ء', '3': 'ع', '5': 'خ', '6': 'ط', '7': 'ح', '8': 'ق', '9': 'ص',
+}
+_ARABIC_LETTERS_PATTERN = re.compile('|'.join(sorted(map(re.escape, ARABIC_LETTERS), key=len, reverse=True)))
+
+
+def is_arabizi(text: str) -> bool:
+    """نص بحروف لاتينية فقط (الأرقام داخل الكلمات جزء من الفرانكو)"""
+    return bool(text) and not _ARABIC.search(text) and len(_LATIN.findall(text)) >= 2
+
+
+def translate_keywords(text: str) -> str:
+    """كلمات الربط والسؤال إلى العربية مع إبقاء بقية الكلمات"""
+    return _LATIN_WORD.sub(lambda m: KEYWORD_TRANSLATIONS.get(m.group(0).lower(), m.group(0)), text)
+
+
+def _collapse(sounds: List[str], vowel_end: bool) -> str:
+    """دمج الحرف المكرر (الشدة)، و"a" في الآخر للكلمة المنتهية بحرف علة:
+    "gam3a" و "الجامعة" = "gm3a" بينما "الجامع" = "gm3"""
+    key = ''.join(sound for i, sound in enumerate(sounds) if i == 0 or sound != sounds[i - 1])
+    return key + 'a' if key and vowel_end else key
+
+
+def _latin_word_key(word: str) -> str:
+    for attached in ATTACHED_ARTICLES:
+        if word.startswith(attached) and len(word) > len(attached) + 2:
+            word = word[len(attached):]
+            break
+    # هاء بعد حرف علة في الآخر تاء مربوطة: gam3ah
+    if len(word) > 2 and word[-1] == 'h' and word[-2] in LATIN_VOWELS:
+        word = word[:-1]
+    sounds = []
+    position = 0
+    while position < len(word):
+        pair = word[position:position + 2]
+        digraph = next((sound for latin, sound in LATIN_DIGRAPHS if pair == latin), None)
+        if digraph:
+            sounds.append(digraph)
+            position += 2
+            continue
+        sound = LATIN_SOUNDS.get(word[position])
+        if sound:
+            sounds.append(sound)
+        position += 1
+    return _collapse(sounds, word[-1] in LATIN_VOWELS)
+
+
+def _arabic_word_key(word: str) -> str:
+    word = strip_article(word)
+    vowel_end = word[-1] in ARABIC_VOWELS
+    if vowel_end:
+        word = word[:-1]  # التاء المربوطة (ه بعد normalize) لا تُنطق هاء
+    return _collapse([ARABIC_SOUNDS[char] for char in word if char in ARABIC_SOUNDS], vowel_end)
+
+
+def phonetic_variants(text: str) -> List[Tuple[str, ...]]:
+    """المفاتيح الممكنة لكل كلمة: الأول هو المفتاح العادي، والثاني (للفرانكو) قراءة
+    "et" في آخر الكلمة تاءً مربوطة في الإضافة: "gam3et" = جامعة"""
+    if not is_arabizi(text):
+        keys = [_arabic_word_key(word) for word in normalize(text).split()]
+        return [(key,) for key in keys if key]
+    variants = []
+    for word in _LATIN_WORD.findall(text.lower()):
+        if word in ARTICLES:
+            continue
+        key = _latin_word_key(word)
+        if not key:
+            continue
+        if len(word) > 4 and word[-2:] in ('et', 'it', 'at'):
+            variants.append((key, _latin_word_key(word[:-1])))
+        else:
+            variants.append((key,))
+    return variants
+
+
+def phonetic_words(text: str) -> List[str]:
+    """مفتاح صوتي لكل كلمة (بدون أدوات التعريف المنفصلة)"""
+    return [options[0] for options in phonetic_variants(text)]
+
+
+def phonetic_key(text: str) -> str:
+    return ' '.join(phonetic_words(text))
+
+
+def arabizi_to_arabic(text: str) -> str:
+    """تحويل تقريبي (حروف العلة القصيرة تُكتب حروفاً): "el gam3a" -> "ال جامعا\""""
+    words = []
+    for word in _LATIN_WORD.findall(text.lower()):
+        if word in KEYWORD_TRANSLATIONS:
+            words.append(KEYWORD_TRANSLATIONS[word])
+        elif word in ('el', 'al'):
+            words.append('ال')
+        else:
+            words.append(_ARABIC_LETTERS_PATTERN.sub(lambda m: ARABIC_LETTERS[m.group(0)], word))
+    return ' '.join(words).replace('ال ', 'ال')
+
+
+def arabic_to_arabizi(text: str) -> str:
+    """"الجامعة" -> "el gam3a": أداة التعريف el، والتاء المربوطة a، والواو والياء في أول الكلمة w و y"""
+    words = []
+    for word in normalize(text).split():
+        prefix = ''
+        if word.startswith('ال') and len(word) > 3:
+            prefix, word = 'el ', word[2:]
+        latin = ''
+        for i, char in enumerate(word):
+            if i == len(word) - 1 and char == 'ه' and len(word) > 2:
+                latin += 'a'
+            elif i == 0 and char in ('و', 'ي'):
+                latin += 'w' if char == 'و' else 'y'
+            else:
+                latin += ARABIZI_LETTERS.get(char, char)
+        words.append(prefix + latin)
+    return ' '.join(words)
+
+
+class PhoneticIndex:
+    """المعالم بمفتاحها الصوتي الكامل ومفاتيح كلماتها"""
+
+    def __init__(self):
+        self.landmarks: Dict[Tuple[str, str], Dict] = {}
+        self.by_key: Dict[str, Set[Tuple[str, str]]] = {}
+        self.by_word: Dict[str, Set[Tuple[str, str]]] = {}
+
+    @classmethod
+    def from_neighborhoods(cls, neighborhood_data: Dict) -> 'PhoneticIndex':
+        index = cls()
+        for neighborhood, categories in neighborhood_data.items():
+            for category, landmarks in categories.items():
+                for landmark in landmarks:
+                    index.add(landmark, neighborhood, category)
+        logger.info("Phonetic index built: %d landmarks, %d word keys", len(index.landmarks), len(index.by_word))
+        return index
+
+    def add(self, landmark, neighborhood: str, category: str) -> bool:
+        name = landmark.get('name', '') if isinstance(landmark, dict) else landmark
+        if not isinstance(name, str) or not normalize(name):
+            return False
+        self.remove(name, neighborhood)
+        words = phonetic_words(name)
+        if not words:
+            return False
+        key = (normalize(name), neighborhood)
+        self.landmarks[key] = {'name': name.strip(), 'neighborhood': neighborhood, 'category': category,
+                               'words': words}
+        self.by_key.setdefault(' '.join(words), set()).add(key)
+        for word in set(words):
+            self.by_word.setdefault(word, set()).add(key)
+        return True
+
+    def remove(self, name: str, neighborhood: str) -> bool:
+        key = (normalize(name), neighborhood)
+        landmark = self.landmarks.pop(key, None)
+        if landmark is None:
+            return False
+        for index, index_key in [(self.by_key, ' '.join(landmark['words']))] + \
+                [(self.by_word, word) for word in set(landmark['words'])]:
+            keys = index.get(index_key)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del index[index_key]
+        return True
+
+    def lookup(self, text: str, limit: int = 3) -> List[Dict]:
+        """تطابق المفتاح كاملاً أولاً، ثم المعالم التي تحتوي أكثر كلمات النص (الأقصر أولاً)"""
+        variants = phonetic_variants(text)
+        if not variants:
+            return []
+        scores: Dict[Tuple[str, str], float] = {}
+        for full_key in {' '.join(options[0] for options in variants), ' '.join(options[-1] for options in variants)}:
+            for key in self.by_key.get(full_key, ()):
+                scores[key] = 1.0
+        if len(scores) < limit:
+            # تطابق جزئي: كل كلمة من النص موجودة في المعلم تضيف 1 / (عدد الكلمات + 1)
+            for options in variants:
+                for key in set().union(*(self.by_word.get(option, ()) for option in options)):
+                    if scores.get(key, 0.0) < 1.0:
+                        scores[key] = scores.get(key, 0.0) + 1 / (len(variants) + 1)
+            # اسم مركب يُكتب كلمتين بالفرانكو وكلمة واحدة بالعربي: "bor sa3id" = بورسعيد
+            for first, second in zip(variants, variants[1:]):
+                for key in self.by_word.get(first[0] + second[0], ()):
+                    if scores.get(key, 0.0) < 1.0:
+                        scores[key] = scores.get(key, 0.0) + 2 / (len(variants) + 1)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], len(self.landmarks[item[0]]['words']),
+                                                          self.landmarks[item[0]]['name']))
+        return [{'name': self.landmarks[key]['name'], 'neighborhood': self.landmarks[key]['neighborhood'],
+                 'category': self.landmarks[key]['category'], 'score': min(score, 1.0)}
+                for key, score in ranked[:limit]]
+
+    def best_match(self, text: str) -> Optional[Dict]:
+        matches = self.lookup(text, limit=1)
+        return matches[0] if matches else None
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+قياس البحث بالفرانكو (arabizi.PhoneticIndex) مقابل تحويل النص إلى حروف عربية
+(arabizi_to_arabic) ثم مقارنة SequenceMatcher بكل المعالم على مدن synthetic_city
+
+الاستعلامات أسماء معالم حقيقية بعد arabic_to_arabizi مع تنويعات الكتابة الشائعة:
+حروف علة قصيرة بين الحروف، وأرقام بدل الحروف (7 و 2)، و sh/ch، و al بدل el أو
+بدون أداة تعريف. الإصابة أن يكون أول معلم له نفس المفتاح الصوتي للمعلم المطلوب
+(المعالم المتطابقة صوتياً لا يمكن التفريق بينها بالفرانكو).
+
+الاستخدام:
+    python benchmarks/bench_arabizi.py --scales 1 10 --queries 1000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from difflib import SequenceMatcher
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from arabizi import PhoneticIndex, arabic_to_arabizi, arabizi_to_arabic, phonetic_key
+from synthetic_city import load_or_generate
+
+CACHE_DIR = os.path.join(REPO_DIR, 'benchmarks', '.cache')
+SPELLINGS = (('7', 'h'), ('q', '2'), ('q', 'k'), ('sh', 'ch'), ('i', 'y'), ('o', 'ou'), ('s', 'ss'))
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def vary(rng, latin):
+    words = []
+    for word in latin.split():
+        if word == 'el':
+            words.append(rng.choice(('el', 'el', 'al', '')))
+            continue
+        old, new = rng.choice(SPELLINGS)
+        word = word.replace(old, new)
+        # حروف العلة القصيرة التي لا تُكتب بالعربية
+        chars = [word[0]]
+        for char in word[1:]:
+            if chars[-1] not in 'aeiou' and char not in 'aeiouh' and rng.random() < 0.4:
+                chars.append(rng.choice('aeo'))
+            chars.append(char)
+        words.append(''.join(chars))
+    return ' '.join(word for word in words if word)
+
+
+def measure(func, queries, expected):
+    timings, hits = [], 0
+    for query, name in zip(queries, expected):
+        start = time.perf_counter()
+        result = func(query)
+        timings.append(time.perf_counter() - start)
+        hits += result is not None and phonetic_key(result) == phonetic_key(name)
+    timings.sort()
+    return percentile(timings, 50) * 1e3, percentile(timings, 99) * 1e3, hits / len(queries), sum(timings)
+
+
+def best_ratio(names, query):
+    query = arabizi_to_arabic(query)
+    return max(names, key=lambda name: SequenceMatcher(None, query, name).ratio())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10])
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for scale in args.scales:
+        city = load_or_generate(scale, args.seed, CACHE_DIR)
+        names = [landmark['name'] if isinstance(landmark, dict) else landmark
+                 for categories in city['neighborhood_data'].values()
+                 for landmarks in categories.values() for landmark in landmarks]
+        expected = rng.choices(names, k=args.queries)
+        queries = [vary(rng, arabic_to_arabizi(name)) for name in expected]
+        print(f"scale={scale:g}x landmarks={len(names)} e.g. {queries[0]!r} -> {expected[0]}")
+
+        start = time.perf_counter()
+        index = PhoneticIndex.from_neighborhoods(city['neighborhood_data'])
+        build_ms = (time.perf_counter() - start) * 1000
+
+        def phonetic(query):
+            match = index.best_match(query)
+            return match['name'] if match else None
+
+        p50, p99, accuracy, total = measure(phonetic, queries, expected)
+        print(f"  phonetic index keys={len(index.by_key)} words={len(index.by_word)} build={build_ms:.0f}ms "
+              f"p50={p50:.3f}ms p99={p99:.3f}ms top1={accuracy:.1%} {len(queries) / total:,.0f} q/s")
+
+        lowered = [name.lower() for name in names]
+        sample = min(len(queries), 200)
+        p50, p99, accuracy, total = measure(lambda query: best_ratio(lowered, query), queries[:sample],
+                                            expected[:sample])
+        print(f"  arabizi_to_arabic + SequenceMatcher p50={p50:.3f}ms p99={p99:.3f}ms top1={accuracy:.1%} "
+              f"{sample / total:,.0f} q/s ({sample} queries)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+قياس إكمال أسماء المعالم (landmark_autocomplete) مقابل المسح الخطي القديم
+(text in name لكل معلم) والمسح الخطي المرتب على مدن synthetic_city بأحجام مختلفة
+
+البادئات مأخوذة من بدايات كلمات أسماء حقيقية بطول 1 إلى 6 حروف، والـ cache معطل
+حتى يُقاس البحث نفسه.
+
+الاستخدام:
+    python benchmarks/bench_autocomplete.py --scales 1 10 100 --queries 2000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from arabic_text import normalize
+from landmark_autocomplete import LandmarkAutocomplete
+from synthetic_city import load_or_generate
+
+CACHE_DIR = os.path.join(REPO_DIR, 'benchmarks', '.cache')
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def linear_scan(names, text, limit=10):
+    text = text.lower().strip()
+    found = []
+    for name in names:
+        if text in name:
+            found.append(name)
+            if len(found) >= limit:
+                break
+    return found
+
+
+def ranked_scan(entries, text, limit=10):
+    """مسح خطي يرتب كل المطابقات مثل الفهرس (التكلفة الحقيقية لاقتراحات مرتبة بدونه)"""
+    query = normalize(text)
+    matched = [entry for entry in entries if query in entry['normalized']]
+    return sorted(matched, key=lambda entry: (not entry['normalized'].startswith(query), -entry['routes'],
+                                              len(entry['normalized'])))[:limit]
+
+
+def measure(func, queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        func(query)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return percentile(timings, 50) * 1e3, percentile(timings, 99) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for scale in args.scales:
+        city = load_or_generate(scale, args.seed, CACHE_DIR)
+        start = time.perf_counter()
+        index = LandmarkAutocomplete.from_neighborhoods(city['neighborhood_data'])
+        index.complete('x')
+        build_ms = (time.perf_counter() - start) * 1000
+        index.cache_size = 0
+
+        names = [entry['name'].lower() for entry in index.entries if entry]
+        words = [word for name in rng.sample(names, min(len(names), 500)) for word in name.split()]
+        queries = [word[:rng.randint(1, min(6, len(word)))] for word in rng.choices(words, k=args.queries)]
+
+        p50, p99 = measure(index.complete, queries)
+        print(f"scale={scale:g}x landmarks={len(index)} keys={len(index._keys)} build={build_ms:.0f}ms")
+        print(f"  autocomplete  p50={p50:.3f}ms p99={p99:.3f}ms")
+        short = [query for query in queries if len(query) == 1] or queries
+        p50, p99 = measure(index.complete, short)
+        print(f"  1-letter      p50={p50:.3f}ms p99={p99:.3f}ms")
+        p50, p99 = measure(lambda query: linear_scan(names, query), queries[:500])
+        print(f"  linear scan   p50={p50:.3f}ms p99={p99:.3f}ms (first matches, unranked)")
+        entries = [entry for entry in index.entries if entry]
+        p50, p99 = measure(lambda query: ranked_scan(entries, query), queries[:200])
+        print(f"  ranked scan   p50={p50:.3f}ms p99={p99:.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
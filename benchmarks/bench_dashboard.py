@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+قياس زمن صفحات لوحة الإدارة واستعلاماتها قبل وبعد ترحيلات الفهارس (db_migrations)
+
+تُكتب مدينة اصطناعية بعدد الأماكن المطلوب في قاعدة SQLite مؤقتة بنفس جداول
+اللوحة، ثم تُقاس الاستعلامات والصفحات بدون فهارس، وتُطبق الترحيلات ويُعاد القياس.
+
+الاستخدام:
+    python benchmarks/bench_dashboard.py --locations 100000 --requests 5
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import statistics
+import tracemalloc
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+CACHE_DIR = os.path.join(REPO_DIR, 'benchmarks', '.cache')
+DB_PATH = os.path.join(CACHE_DIR, 'bench_dashboard.db')
+# يجب تحديده قبل استيراد لوحة الإدارة
+os.environ['ADMIN_DB_PATH'] = DB_PATH
+
+from synthetic_city import load_or_generate, write_sqlite, BASE_LANDMARKS
+from db_migrations import migrate_file, dataset_version
+
+QUERIES = {
+    'locations ordered': "SELECT * FROM location ORDER BY neighborhood, category, name",
+    'distinct neighborhoods': "SELECT DISTINCT neighborhood FROM location",
+    'distinct categories': "SELECT DISTINCT category FROM location",
+    'location by name': "SELECT * FROM location WHERE name = 'not there'",
+    'routes by created_at': "SELECT * FROM route ORDER BY created_at DESC",
+}
+
+PAGES = ['/', '/locations', '/locations?q=%D9%85', '/locations/add', '/locations/edit/1', '/routes',
+         '/routes/add', '/routes/edit/1', '/api/locations', '/api/locations?q=%D9%85']
+
+
+def timed(run, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), max(timings)
+
+
+def measure(label: str, client, conn, pages, repeat: int):
+    print(f"\n--- {label} ---")
+    for name, sql in QUERIES.items():
+        median, worst = timed(lambda: conn.execute(sql).fetchall(), repeat)
+        print(f"  SQL  {name:<40} median={median:9.2f}ms max={worst:9.2f}ms")
+    for page, headers in pages:
+        def run():
+            # التصدير يُقرأ كـ stream دون تجميع الرد في الذاكرة
+            response = client.get(page, headers=headers, buffered=False)
+            assert response.status_code in (200, 304), (page, response.status_code)
+            for _ in response.iter_encoded():
+                pass
+            response.close()
+        median, worst = timed(run, repeat)
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        label = page + (' (If-None-Match)' if headers else '')
+        print(f"  GET  {label[:40]:<40} median={median:9.2f}ms max={worst:9.2f}ms peak={peak / 1024:9.0f}KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--locations', type=int, default=100_000)
+    parser.add_argument('--requests', type=int, default=5, help='عدد مرات قياس كل صفحة/استعلام')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    scale = args.locations / BASE_LANDMARKS
+    city = load_or_generate(scale, args.seed, CACHE_DIR)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(DB_PATH + suffix):
+            os.remove(DB_PATH + suffix)
+    write_sqlite(city, DB_PATH)
+
+    from admin_dashboard import app, encode_cursor
+    client = app.test_client()
+    conn = sqlite3.connect(DB_PATH)
+    count = conn.execute("SELECT COUNT(*) FROM location").fetchone()[0]
+    print(f"Dashboard database: {count} locations, {len(city['routes_data'])} routes")
+
+    # صفحة قرب نهاية الجدول: زمنها يجب أن يساوي زمن الصفحة الأولى
+    last = conn.execute("SELECT neighborhood, category, name, id FROM location "
+                        "ORDER BY neighborhood DESC, category DESC, name DESC, id DESC LIMIT 1 OFFSET 60").fetchone()
+    pages = [(page, None) for page in PAGES + [f"/locations?cursor={encode_cursor(last)}"]]
+
+    measure('before migrations (no indexes)', client, conn, pages, args.requests)
+    print(f"\napplied {migrate_file(DB_PATH)} migration(s)")
+
+    # التصدير يحتاج change_log (الترحيل 2): تعديل 100 مكان ثم قياس التصدير الكامل والتزايدي
+    version = dataset_version(conn)
+    conn.execute("UPDATE location SET coordinates = '31.25, 32.3' WHERE id % 1000 = 0")
+    conn.commit()
+    etag = client.get('/api/export?since=0', buffered=False).headers['ETag']
+    pages += [('/api/export', None), (f'/api/export?since={version}', None), ('/api/export?since=0', None),
+              ('/api/export?since=0', {'If-None-Match': etag})]
+    measure('after migrations', client, conn, pages, args.requests)
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+قياس أداء الفهرس الجغرافي (geo_index.GeoIndex) مقابل البحث الخطي بـ NumPy
+
+الاستخدام:
+    python benchmarks/bench_geo_index.py --points 100000 --queries 5000
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from geo_index import GeoIndex, EARTH_RADIUS_M
+
+CENTER = (31.2565, 32.2842)
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=5000)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--span', type=float, default=0.15, help='نصف عرض المنطقة بالدرجات')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    lat = CENTER[0] + rng.uniform(-args.span, args.span, args.points)
+    lng = CENTER[1] + rng.uniform(-args.span, args.span, args.points)
+    names = [f"place {i}" for i in range(args.points)]
+    queries = np.stack([CENTER[0] + rng.uniform(-args.span, args.span, args.queries),
+                        CENTER[1] + rng.uniform(-args.span, args.span, args.queries)], axis=1)
+
+    start = time.perf_counter()
+    index = GeoIndex(names, np.stack([lat, lng], axis=1))
+    print(f"points={args.points} build={(time.perf_counter() - start) * 1000:.1f}ms")
+
+    timings = []
+    for q_lat, q_lng in queries:
+        start = time.perf_counter()
+        index.nearest(q_lat, q_lng, k=args.k)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f"grid index  k={args.k} p50={percentile(timings, 50) * 1e3:.3f}ms "
+          f"p99={percentile(timings, 99) * 1e3:.3f}ms")
+
+    m_per_deg = np.radians(1) * EARTH_RADIUS_M
+    timings = []
+    for q_lat, q_lng in queries[:min(args.queries, 500)]:
+        start = time.perf_counter()
+        dist = np.hypot((lng - q_lng) * np.cos(np.radians(q_lat)), lat - q_lat) * m_per_deg
+        top = np.argpartition(dist, args.k)[:args.k]
+        top[np.argsort(dist[top])]
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f"linear scan k={args.k} p50={percentile(timings, 50) * 1e3:.3f}ms "
+          f"p99={percentile(timings, 99) * 1e3:.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
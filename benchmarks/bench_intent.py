@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+قياس تصنيف النية (intent_classifier) قبل البحث الذكي
+
+قوالب intent_corpus.jsonl تُملأ بأسماء معالم synthetic_city (لم يرها النموذج في
+التدريب)، ويُقاس لكل رسالة: زمن التصنيف، ودقته لكل نية، وزمن
+nlp_search.NLPSearchSystem.search_route_from_text الذي كانت كل رسالة تمر به. في
+النهاية الزمن الكلي لكل الرسائل بدون التصنيف ومعه (البحث لطلبات المسار فقط).
+
+الاستخدام:
+    python benchmarks/bench_intent.py --scales 1 10 --copies 4
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from intent_classifier import ROUTE, IntentClassifier, expand_corpus, load_templates
+from nlp_search import NLPSearchSystem
+from synthetic_city import load_or_generate
+
+CACHE_DIR = os.path.join(REPO_DIR, 'benchmarks', '.cache')
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10])
+    parser.add_argument('--copies', type=int, default=4, help='عدد مرات ملء كل قالب بأماكن مختلفة')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    classifier = IntentClassifier.load()
+    templates = load_templates()
+    for scale in args.scales:
+        rng = random.Random(args.seed)
+        city = load_or_generate(scale, args.seed, CACHE_DIR)
+        names = [landmark['name'] if isinstance(landmark, dict) else landmark
+                 for categories in city['neighborhood_data'].values()
+                 for landmarks in categories.values() for landmark in landmarks]
+        messages = expand_corpus(templates, names, args.copies, rng)
+        nlp = NLPSearchSystem(city['neighborhood_data'])
+
+        classify_times, search_times, correct = [], [], {}
+        gated_total = 0.0
+        for text, expected in messages:
+            start = time.perf_counter()
+            intent = classifier.classify(text).intent
+            classify_times.append(time.perf_counter() - start)
+            counts = correct.setdefault(expected, [0, 0])
+            counts[0] += intent == expected
+            counts[1] += 1
+
+            start = time.perf_counter()
+            nlp.search_route_from_text(text)
+            search_times.append(time.perf_counter() - start)
+            gated_total += classify_times[-1] + (search_times[-1] if intent == ROUTE else 0.0)
+
+        print(f"scale={scale:g}x landmarks={len(names)} messages={len(messages)}")
+        for intent, (hits, total) in sorted(correct.items()):
+            print(f"  {intent:<9} accuracy={hits / total:.1%} ({total})")
+        print(f"  overall   accuracy={sum(c[0] for c in correct.values()) / len(messages):.1%}")
+        for label, timings in (('classify', classify_times), ('route search', search_times)):
+            ordered = sorted(timings)
+            print(f"  {label:<13} p50={percentile(ordered, 50) * 1e3:.4f}ms p99={percentile(ordered, 99) * 1e3:.4f}ms")
+        print(f"  total: search every message={sum(search_times):.2f}s "
+              f"classify then search routes only={gated_total:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+اختبار حمل لمعالجات المحادثة في final_enhanced_bot.py بدون شبكة
+
+يبني Application حقيقي مع طبقة طلبات وهمية (fake_telegram.FakeTelegramRequest)
+ويعيد تشغيل محادثات مكتوبة مسبقاً عبر الـ ConversationHandler الحقيقي:
+- البحث التقليدي بخطواته الست
+- البحث الذكي بالنص
+- إرسال تقرير مرور
+- إحصائيات لوحة الإدارة
+
+ويطبع الإنتاجية (throughput) وزمن الاستجابة p50/p95/p99 والذاكرة لكل مستخدم.
+مع --telegram-limits ترد الطبقة الوهمية بـ 429 عند تجاوز حدود Telegram (30 رسالة/ث
+عامة، 3 في الثانية لكل محادثة)، ومع --send-queue يمر الإرسال على send_queue.SendQueue.
+
+الاستخدام:
+    python benchmarks/bench_load.py --users 1000 10000
+    python benchmarks/bench_load.py --users 200 --no-memory   # للـ CI
+    python benchmarks/bench_load.py --users 100 --no-memory --telegram-limits --send-queue
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+from collections import defaultdict
+from typing import Dict, List
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from telegram import Update
+from telegram.ext import Application
+
+from data import neighborhood_data
+from fake_telegram import FakeTelegramRequest, UpdateFactory
+from send_queue import SendQueue
+
+SCENARIO_WEIGHTS = {
+    'traditional': 0.4,
+    'nlp': 0.3,
+    'report': 0.2,
+    'admin_stats': 0.1,
+}
+
+TRADITIONAL_STEPS = ['start_neighborhood', 'start_category', 'start_landmark',
+                     'end_neighborhood', 'end_category', 'end_landmark']
+
+# final_enhanced_bot يُستورد عند التشغيل فقط (prepare_environment) لا عند استيراد الملف
+bot_app = None
+
+
+def prepare_environment():
+    """متغيرات البيئة ومجلد العمل المؤقت ثم استيراد final_enhanced_bot (مرة واحدة)"""
+    global bot_app
+    if bot_app is None:
+        os.environ.setdefault('BOT_TOKEN', '123456:LOAD-TEST-TOKEN')
+        os.environ.setdefault('GEOCODER_OFFLINE', '1')
+        os.environ.setdefault('LOG_LEVEL', 'WARNING')
+        # ملفات التقارير والكاش تُكتب في مجلد مؤقت بدلاً من مجلد المشروع
+        os.chdir(tempfile.mkdtemp(prefix='bot-load-test-'))
+        import final_enhanced_bot
+        bot_app = final_enhanced_bot
+    return bot_app
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def landmark_names() -> List[str]:
+    names = []
+    for categories in neighborhood_data.values():
+        for landmarks in categories.values():
+            for landmark in landmarks:
+                name = landmark.get('name') if isinstance(landmark, dict) else landmark
+                if name:
+                    names.append(name)
+    return names
+
+
+class LoadTestHarness:
+    """تشغيل محادثات متزامنة عبر التطبيق الحقيقي"""
+
+    def __init__(self, seed: int = 42, telegram_limits: bool = False, send_queue: bool = False):
+        self.fake = FakeTelegramRequest(global_limit=30, chat_limit=3) if telegram_limits \
+            else FakeTelegramRequest()
+        self.send_queue = send_queue
+        self.fake.record_log = False
+        self.factory = UpdateFactory()
+        self.rng = random.Random(seed)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors = 0
+        self.dead_ends = 0
+        self.names = landmark_names()
+        self.application: Application = None
+
+    async def setup(self):
+        builder = (
+            Application.builder()
+            .token(os.environ['BOT_TOKEN'])
+            .request(self.fake)
+            .get_updates_request(FakeTelegramRequest())
+        )
+        if self.send_queue:
+            builder = builder.rate_limiter(SendQueue())
+        self.application = builder.build()
+        bot_app.register_handlers(self.application)
+        self.application.add_error_handler(self._on_error)
+        await self.application.initialize()
+
+    async def teardown(self):
+        await self.application.shutdown()
+
+    async def _on_error(self, update, context):
+        self.errors += 1
+
+    async def _send(self, scenario: str, data: Dict):
+        update = Update.de_json(data, self.application.bot)
+        start = time.perf_counter()
+        await self.application.process_update(update)
+        self.latencies[scenario].append(time.perf_counter() - start)
+
+    async def _click(self, scenario: str, user_id: int, callback_data: str):
+        message_id = self.fake.last_message_id.get(user_id, 1)
+        await self._send(scenario, self.factory.callback(user_id, callback_data, message_id))
+
+    def _pick(self, user_id: int, prefix: str, rng: random.Random):
+        options = [b for b in self.fake.buttons(user_id) if b.startswith(prefix + ':')]
+        return rng.choice(options) if options else None
+
+    # ===== السيناريوهات =====
+
+    async def traditional(self, user_id: int, rng: random.Random):
+        await self._send('traditional', self.factory.text(user_id, '/start'))
+        await self._click('traditional', user_id, 'traditional_search')
+        for prefix in TRADITIONAL_STEPS:
+            choice = self._pick(user_id, prefix, rng)
+            if choice is None:
+                self.dead_ends += 1
+                return
+            await self._click('traditional', user_id, choice)
+
+    async def nlp(self, user_id: int, rng: random.Random):
+        start_name, end_name = rng.sample(self.names, 2)
+        await self._send('nlp', self.factory.text(user_id, '/start'))
+        await self._click('nlp', user_id, 'nlp_search')
+        await self._send('nlp', self.factory.text(user_id, f"إزاي أروح من {start_name} إلى {end_name}؟"))
+
+    async def report(self, user_id: int, rng: random.Random):
+        await self._send('report', self.factory.text(user_id, '/start'))
+        await self._click('report', user_id, 'submit_report')
+        await self._click('report', user_id, rng.choice(['report_congestion', 'report_delay', 'report_normal']))
+        await self._send('report', self.factory.text(user_id, 'زحمة عند الموقف'))
+
+    async def admin_stats(self, user_id: int, rng: random.Random):
+        if user_id not in bot_app.admin_system.admin_ids:
+            bot_app.admin_system.admin_ids.append(user_id)
+        await self._send('admin_stats', self.factory.text(user_id, '/start'))
+        await self._click('admin_stats', user_id, 'admin_panel')
+        await self._click('admin_stats', user_id, 'admin_stats')
+
+    def assign_scenarios(self, users: int, first_user_id: int):
+        scenarios = list(SCENARIO_WEIGHTS)
+        weights = list(SCENARIO_WEIGHTS.values())
+        return [(first_user_id + i, self.rng.choices(scenarios, weights)[0], random.Random(self.rng.random()))
+                for i in range(users)]
+
+    async def run(self, users: int, first_user_id: int) -> float:
+        plan = self.assign_scenarios(users, first_user_id)
+        start = time.perf_counter()
+        await asyncio.gather(*(getattr(self, scenario)(user_id, rng) for user_id, scenario, rng in plan))
+        return time.perf_counter() - start
+
+
+async def run_level(users: int, first_user_id: int, measure_memory: bool,
+                    telegram_limits: bool = False, send_queue: bool = False) -> Dict:
+    harness = LoadTestHarness(telegram_limits=telegram_limits, send_queue=send_queue)
+    await harness.setup()
+    wall = await harness.run(users, first_user_id)
+    await harness.teardown()
+
+    all_latencies = sorted(v for values in harness.latencies.values() for v in values)
+    result = {
+        'users': users,
+        'updates': len(all_latencies),
+        'wall_seconds': wall,
+        'updates_per_second': len(all_latencies) / wall if wall else 0.0,
+        'p50_ms': percentile(all_latencies, 50) * 1000,
+        'p95_ms': percentile(all_latencies, 95) * 1000,
+        'p99_ms': percentile(all_latencies, 99) * 1000,
+        'handler_errors': harness.errors,
+        'dead_ends': harness.dead_ends,
+        'api_calls': dict(harness.fake.calls),
+        'flood_errors': sum(harness.fake.flood_errors.values()),
+        'scenarios': {},
+    }
+    for scenario, values in harness.latencies.items():
+        values.sort()
+        result['scenarios'][scenario] = {
+            'updates': len(values),
+            'p50_ms': percentile(values, 50) * 1000,
+            'p95_ms': percentile(values, 95) * 1000,
+            'p99_ms': percentile(values, 99) * 1000,
+        }
+
+    if measure_memory:
+        # قياس منفصل حتى لا يؤثر tracemalloc على أزمنة الاستجابة
+        harness = LoadTestHarness(telegram_limits=telegram_limits, send_queue=send_queue)
+        await harness.setup()
+        gc.collect()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        await harness.run(users, first_user_id + users)
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        await harness.teardown()
+        result['retained_bytes_per_user'] = (retained - baseline) / users
+        result['peak_bytes_per_user'] = (peak - baseline) / users
+    return result
+
+
+def print_result(result: Dict):
+    print(f"\n=== {result['users']} simulated users ===")
+    print(f"updates={result['updates']} wall={result['wall_seconds']:.2f}s "
+          f"throughput={result['updates_per_second']:.0f} updates/s")
+    print(f"latency p50={result['p50_ms']:.2f}ms p95={result['p95_ms']:.2f}ms p99={result['p99_ms']:.2f}ms")
+    for scenario, stats in sorted(result['scenarios'].items()):
+        print(f"  {scenario:<12} n={stats['updates']:<7} p50={stats['p50_ms']:.2f}ms "
+              f"p95={stats['p95_ms']:.2f}ms p99={stats['p99_ms']:.2f}ms")
+    if 'retained_bytes_per_user' in result:
+        print(f"memory retained={result['retained_bytes_per_user'] / 1024:.1f}KiB/user "
+              f"peak={result['peak_bytes_per_user'] / 1024:.1f}KiB/user")
+    print(f"api_calls={result['api_calls']} handler_errors={result['handler_errors']} "
+          f"dead_ends={result['dead_ends']} flood_errors={result['flood_errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--no-memory', action='store_true', help='تخطي قياس الذاكرة')
+    parser.add_argument('--json', help='حفظ النتائج في ملف JSON')
+    parser.add_argument('--telegram-limits', action='store_true', help='رد 429 عند تجاوز حدود الإرسال')
+    parser.add_argument('--send-queue', action='store_true', help='الإرسال عبر SendQueue')
+    args = parser.parse_args()
+    prepare_environment()
+
+    results = []
+    first_user_id = 1_000_000
+    for users in args.users:
+        result = asyncio.run(run_level(users, first_user_id, not args.no_memory,
+                                       args.telegram_limits, args.send_queue))
+        first_user_id += 10 * users
+        print_result(result)
+        results.append(result)
+
+    if args.json:
+        with open(os.path.join(REPO_DIR, args.json) if not os.path.isabs(args.json) else args.json,
+                  'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+قياس زمن البحث عن المسار (find_route_with_proximity) مع تفعيل وإيقاف DEBUG
+
+الاستخدام:
+    python benchmarks/bench_logging.py [--iterations 200]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('BOT_TOKEN', 'benchmark-token')
+
+import bot
+from data import neighborhood_data, routes_data
+from logging_setup import setup_logging, shutdown_logging
+
+
+def collect_landmark_pairs(limit: int = 40):
+    """اختيار أزواج معالم تخدمها نفس الخطوط لضمان المرور بكامل حلقات البحث"""
+    by_route = {}
+    for categories in neighborhood_data.values():
+        for landmarks in categories.values():
+            for landmark in landmarks:
+                if not isinstance(landmark, dict):
+                    continue
+                for route_name in landmark.get('served_by', {}):
+                    by_route.setdefault(route_name, []).append(landmark['name'])
+    pairs = []
+    for names in by_route.values():
+        for i in range(0, len(names) - 1, 2):
+            pairs.append((names[i], names[i + 1]))
+    return pairs[:limit]
+
+
+def run_case(label: str, level: str, iterations: int, pairs, sample_rate: int = 1):
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, 'bench.log')
+        setup_logging(log_file=log_path, level=level, console=False, debug_sample_rate=sample_rate)
+        timings = []
+        for _ in range(iterations):
+            for start, end in pairs:
+                t0 = time.perf_counter()
+                bot.find_route_with_proximity(start, end, routes_data, neighborhood_data)
+                timings.append(time.perf_counter() - t0)
+        shutdown_logging()
+        log_size = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<28} mean={statistics.mean(timings) * 1e6:9.1f}µs "
+          f"p50={statistics.median(timings) * 1e6:9.1f}µs p95={p95 * 1e6:9.1f}µs "
+          f"log={log_size / 1024:9.1f}KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    pairs = collect_landmark_pairs()
+    print(f"{len(pairs)} landmark pairs x {args.iterations} iterations")
+    run_case('INFO (DEBUG off)', 'INFO', args.iterations, pairs)
+    run_case('DEBUG on', 'DEBUG', args.iterations, pairs)
+    run_case('DEBUG on, sampled 1/100', 'DEBUG', args.iterations, pairs, sample_rate=100)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+قياس تحويل النص إلى منطقة سكنية (residential_areas.ResidentialAreas) مقابل
+الطريقة السابقة: ثلاث مرات على كل المناطق (تطابق، احتواء، SequenceMatcher)
+
+المناطق من تصنيفات "مناطق سكنية" في مدن synthetic_city. الاستعلامات أسماء مناطق
+(كاملة، أو بدون "منطقة"/"مساكن"، أو بخطأ إملائي) وأسماء معالم أخرى ليست مناطق،
+لأن المسار السريع يُجرب قبل كل بحث.
+
+الاستخدام:
+    python benchmarks/bench_residential.py --scales 1 10 --queries 2000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from difflib import SequenceMatcher
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from residential_areas import ResidentialAreas, is_residential
+from synthetic_city import load_or_generate
+
+CACHE_DIR = os.path.join(REPO_DIR, 'benchmarks', '.cache')
+LETTERS = 'ابتثجحخدذرزسشصضطظعغفقكلمنهوي'
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def legacy_find(areas, area_name):
+    area_name = area_name.lower().strip()
+    for area in areas:
+        if area_name == area.lower():
+            return area
+    for area in areas:
+        if area_name in area.lower() or area.lower() in area_name:
+            return area
+    best_match, best_ratio = None, 0.6
+    for area in areas:
+        ratio = SequenceMatcher(None, area_name, area.lower()).ratio()
+        if ratio > best_ratio:
+            best_ratio, best_match = ratio, area
+    return best_match
+
+
+def make_queries(rng, areas, others, count):
+    queries = []
+    for i in range(count):
+        if i % 4 == 3:
+            queries.append((rng.choice(others), None))
+            continue
+        area = rng.choice(areas)
+        words = area.split()
+        if i % 4 == 1 and len(words) > 1 and words[0] in ('منطقة', 'مساكن', 'عمارات', 'إسكان'):
+            query = ' '.join(words[1:])
+        elif i % 4 == 2:
+            chars = list(area)
+            chars[rng.randrange(len(chars))] = rng.choice(LETTERS)
+            query = ''.join(chars)
+        else:
+            query = area
+        queries.append((query, area))
+    return queries
+
+
+def measure(func, queries):
+    timings, hits = [], 0
+    for query, expected in queries:
+        start = time.perf_counter()
+        result = func(query)
+        timings.append(time.perf_counter() - start)
+        hits += result == expected
+    timings.sort()
+    return percentile(timings, 50) * 1e3, percentile(timings, 99) * 1e3, hits / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10])
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for scale in args.scales:
+        city = load_or_generate(scale, args.seed, CACHE_DIR)
+        # بدون أسماء الأحياء حتى تتطابق القائمتان
+        areas, others = [], []
+        for categories in city['neighborhood_data'].values():
+            for category, landmarks in categories.items():
+                names = [landmark['name'] if isinstance(landmark, dict) else landmark for landmark in landmarks]
+                (areas if is_residential(category) else others).extend(names)
+        areas = list(dict.fromkeys(areas))
+        queries = make_queries(rng, areas, others, args.queries)
+
+        start = time.perf_counter()
+        index = ResidentialAreas()
+        for area in areas:
+            index.add(area, '')
+        index.resolve('')
+        build_ms = (time.perf_counter() - start) * 1000
+        print(f"scale={scale:g}x areas={len(areas)} keys={len(index.keys)} build={build_ms:.1f}ms")
+        p50, p99, accuracy = measure(index.resolve, queries)
+        print(f"  compiled keys + SymSpell  p50={p50:.4f}ms p99={p99:.4f}ms accuracy={accuracy:.1%}")
+        sample = queries[:min(len(queries), 300)]
+        p50, p99, accuracy = measure(lambda query: legacy_find(areas, query), sample)
+        print(f"  three passes per call     p50={p50:.4f}ms p99={p99:.4f}ms accuracy={accuracy:.1%} "
+              f"({len(sample)} queries)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+قياس استعلامات محطات الخطوط: جدول route_stop المفهرس مقابل مسح عمود key_points (JSON)
+
+تُكتب مدينة اصطناعية في SQLite بجداول لوحة الإدارة، ويُبنى منها جدول route_json
+بنفس شكل العمود القديم (قائمة JSON لكل خط) للمقارنة.
+
+الاستخدام:
+    python benchmarks/bench_route_stops.py --scale 100 --queries 200
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import statistics
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from db_migrations import migrate_file
+from synthetic_city import load_or_generate, write_sqlite
+
+CACHE_DIR = os.path.join(REPO_DIR, 'benchmarks', '.cache')
+DB_PATH = os.path.join(CACHE_DIR, 'bench_route_stops.db')
+
+
+def json_routes_through(conn, stop):
+    # الطريقة القديمة: قراءة كل الخطوط وفك JSON لكل خط
+    return [(name, key_points.index(stop))
+            for name, key_points in ((name, json.loads(raw)) for name, raw in conn.execute(
+                "SELECT name, key_points FROM route_json"))
+            if stop in key_points]
+
+
+def json_routes_between(conn, start, end):
+    results = []
+    for name, raw in conn.execute("SELECT name, key_points FROM route_json"):
+        key_points = json.loads(raw)
+        if start in key_points and end in key_points[key_points.index(start) + 1:]:
+            results.append(name)
+    return results
+
+
+def json_each_routes_through(conn, stop):
+    # نفس المسح لكن داخل SQLite (json_each) بدون فهرس
+    return conn.execute("SELECT r.name, j.key FROM route_json r, json_each(r.key_points) j "
+                        "WHERE j.value = ?", (stop,)).fetchall()
+
+
+def index_routes_through(conn, stop):
+    return conn.execute("SELECT r.name, rs.seq FROM location l JOIN route_stop rs ON rs.location_id = l.id "
+                        "JOIN route r ON r.id = rs.route_id WHERE l.name = ?", (stop,)).fetchall()
+
+
+def index_routes_between(conn, start, end):
+    return conn.execute("SELECT r.name FROM location ls JOIN route_stop a ON a.location_id = ls.id "
+                        "JOIN route_stop b ON b.route_id = a.route_id AND b.seq > a.seq "
+                        "JOIN location le ON le.id = b.location_id JOIN route r ON r.id = a.route_id "
+                        "WHERE ls.name = ? AND le.name = ?", (start, end)).fetchall()
+
+
+def json_all_routes(conn):
+    return [(name, json.loads(raw)) for name, raw in conn.execute("SELECT name, key_points FROM route_json")]
+
+
+def index_all_routes(conn):
+    key_points = {}
+    for route_id, name in conn.execute("SELECT rs.route_id, l.name FROM route_stop rs "
+                                       "JOIN location l ON l.id = rs.location_id ORDER BY rs.route_id, rs.seq"):
+        key_points.setdefault(route_id, []).append(name)
+    return [(name, key_points.get(route_id, [])) for route_id, name in conn.execute("SELECT id, name FROM route")]
+
+
+def report(name, run, queries):
+    timings = []
+    for args in queries:
+        start = time.perf_counter()
+        run(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(f"  {name:<36} n={len(timings):<5} median={statistics.median(timings):9.3f}ms "
+          f"p95={timings[int(len(timings) * 0.95) - 1]:9.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=100)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    city = load_or_generate(args.scale, args.seed, CACHE_DIR)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    write_sqlite(city, DB_PATH)
+    migrate_file(DB_PATH)  # فهارس location.name و route_stop.location_id
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("DROP TABLE IF EXISTS route_json")
+    conn.execute("CREATE TABLE route_json (id INTEGER PRIMARY KEY, name TEXT, key_points TEXT)")
+    conn.executemany("INSERT INTO route_json VALUES (?, ?, ?)",
+                     ((i, route['routeName'], json.dumps(route['keyPoints'], ensure_ascii=False))
+                      for i, route in enumerate(city['routes_data'], 1)))
+    conn.commit()
+    stops = conn.execute("SELECT COUNT(*) FROM route_stop").fetchone()[0]
+    print(f"scale {args.scale:g}x: {len(city['routes_data'])} routes, {stops} route stops")
+
+    rng = random.Random(args.seed)
+    through, between = [], []
+    for _ in range(args.queries):
+        route = rng.choice(city['routes_data'])
+        i = rng.randrange(len(route['keyPoints']) - 1)
+        through.append((conn, route['keyPoints'][i]))
+        between.append((conn, route['keyPoints'][i], route['keyPoints'][rng.randrange(i + 1, len(route['keyPoints']))]))
+
+    print("routes through stop:")
+    report('JSON scan (json.loads per route)', json_routes_through, through)
+    report('SQLite json_each scan', json_each_routes_through, through)
+    report('route_stop index', index_routes_through, through)
+    print("routes between two stops (in order):")
+    report('JSON scan (json.loads per route)', json_routes_between, between)
+    report('route_stop index', index_routes_between, between)
+    print("all routes with keyPoints (bot load / export):")
+    report('JSON column', json_all_routes, [(conn,)] * 5)
+    report('route_stop join', index_all_routes, [(conn,)] * 5)
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
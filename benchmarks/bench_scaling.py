@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+قياس أداء البحث عن المسارات والمعالم على مدن اصطناعية بأحجام متزايدة
+
+كل عملية تُقاس على مدينة من synthetic_city.py بأحجام 1× و10× و100× و1000×
+من البيانات الحالية. إذا تجاوزت عملية الميزانية الزمنية عند حجم معين يتم
+تخطيها في الأحجام الأكبر.
+
+الاستخدام:
+    python benchmarks/bench_scaling.py --scales 1 10 100
+    python benchmarks/bench_scaling.py --scales 1 10 100 1000 --budget 60
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+from typing import Callable, Dict, List, Tuple
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from synthetic_city import load_or_generate, city_stats
+import helpers
+from nlp_search import NLPSearchSystem
+from routing_engine import RoutingEngine
+from transfer_graph import build_transfer_graph, coordinate_locator
+
+CACHE_DIR = os.path.join(REPO_DIR, 'benchmarks', '.cache')
+
+
+def _typo(text: str, rng: random.Random) -> str:
+    """إدخال خطأ إملائي بسيط (حذف حرف)"""
+    if len(text) < 4:
+        return text
+    i = rng.randrange(1, len(text) - 1)
+    return text[:i] + text[i + 1:]
+
+
+def _landmark_names(city: Dict) -> List[str]:
+    return [l['name'] for c in city['neighborhood_data'].values() for ls in c.values() for l in ls]
+
+
+# ===== العمليات المقاسة =====
+# كل عملية: setup(city, rng) -> state ثم run(state, rng) لاستعلام واحد
+
+def setup_route_logic(city, rng):
+    return city['routes_data']
+
+
+def run_route_logic_direct(routes, rng):
+    route = rng.choice(routes)
+    points = route['keyPoints']
+    i = rng.randrange(0, len(points) - 1)
+    helpers.find_route_logic(points[i], points[rng.randrange(i + 1, len(points))], routes)
+
+
+def run_route_logic_transfer(routes, rng):
+    # معلمان على خطين مختلفين غالباً لا يجمعهما خط مباشر فيبدأ بحث التبديل
+    first, second = rng.sample(routes, 2)
+    helpers.find_route_logic(first['keyPoints'][0], second['keyPoints'][-1], routes)
+
+
+def setup_routing_engine(city, rng):
+    return {'engine': RoutingEngine(city['routes_data'], city['neighborhood_data']),
+            'names': _landmark_names(city)}
+
+
+def run_routing_engine(state, rng):
+    start, end = rng.sample(state['names'], 2)
+    state['engine'].find_direct(start, end)
+
+
+def run_routing_engine_build(city, rng):
+    RoutingEngine(city['routes_data'], city['neighborhood_data'])
+
+
+def setup_transfers(city, rng):
+    state = setup_routing_engine(city, rng)
+    locate = coordinate_locator(city['neighborhood_data'], city['routes_data'])
+    state['transfers'] = build_transfer_graph(city['routes_data'], locate, cache_dir=CACHE_DIR)
+    return state
+
+
+def run_find_with_transfer(state, rng):
+    start, end = rng.sample(state['names'], 2)
+    state['engine'].find_with_transfer(start, end, state['transfers'])
+
+
+def setup_transfer_build(city, rng):
+    return city, coordinate_locator(city['neighborhood_data'], city['routes_data'])
+
+
+def run_transfer_build(state, rng):
+    city, locate = state
+    build_transfer_graph(city['routes_data'], locate, cache_dir=None)
+
+
+def setup_nlp(city, rng):
+    return {'system': NLPSearchSystem(city['neighborhood_data']), 'names': _landmark_names(city)}
+
+
+def run_find_best_match(state, rng):
+    state['system'].find_best_match(_typo(rng.choice(state['names']), rng))
+
+
+def run_suggestions(state, rng):
+    name = rng.choice(state['names'])
+    state['system'].get_suggestions_for_text(name[:4])
+
+
+def run_nlp_build(city, rng):
+    NLPSearchSystem(city['neighborhood_data'])
+
+
+OPERATIONS: Dict[str, Tuple[Callable, Callable]] = {
+    'helpers.find_route_logic (direct)': (setup_route_logic, run_route_logic_direct),
+    'helpers.find_route_logic (transfer)': (setup_route_logic, run_route_logic_transfer),
+    'routing_engine.find_direct': (setup_routing_engine, run_routing_engine),
+    'routing_engine build': (lambda city, rng: city, run_routing_engine_build),
+    'routing_engine.find_with_transfer': (setup_transfers, run_find_with_transfer),
+    'transfer_graph build (no cache)': (setup_transfer_build, run_transfer_build),
+    'nlp_search.find_best_match': (setup_nlp, run_find_best_match),
+    'nlp_search.get_suggestions_for_text': (setup_nlp, run_suggestions),
+    'nlp_search index build': (lambda city, rng: city, run_nlp_build),
+}
+
+
+def measure(setup: Callable, run: Callable, city: Dict, queries: int, budget: float, seed: int):
+    rng = random.Random(seed)
+    state = setup(city, rng)
+    timings = []
+    deadline = time.perf_counter() + budget
+    for _ in range(queries):
+        start = time.perf_counter()
+        run(state, rng)
+        timings.append(time.perf_counter() - start)
+        if time.perf_counter() > deadline:
+            return timings, True
+    return timings, False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--budget', type=float, default=30.0, help='أقصى زمن بالثواني لكل عملية عند كل حجم')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', help='قياس العمليات التي يحتوي اسمها على هذا النص فقط')
+    args = parser.parse_args()
+
+    exhausted = set()
+    for scale in args.scales:
+        city = load_or_generate(scale, args.seed, CACHE_DIR)
+        print(f"\n=== scale {scale:g}x: {city_stats(city)} ===")
+        for name, (setup, run) in OPERATIONS.items():
+            if args.only and args.only not in name:
+                continue
+            if name in exhausted:
+                print(f"  {name:<42} skipped (over budget at a smaller scale)")
+                continue
+            timings, over_budget = measure(setup, run, city, args.queries, args.budget, args.seed)
+            mean = statistics.mean(timings)
+            print(f"  {name:<42} n={len(timings):<4} mean={mean * 1000:10.3f}ms "
+                  f"max={max(timings) * 1000:10.3f}ms{'  (budget hit)' if over_budget else ''}")
+            if over_budget:
+                exhausted.add(name)
+
+
+if __name__ == '__main__':
+    main()
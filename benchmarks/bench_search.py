@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+قياس فهرس الكلمات (landmark_search.LandmarkSearch، BM25F) مقابل مقارنة
+SequenceMatcher بكل المعالم (طريقة find_best_match السابقة) على مدن synthetic_city
+
+مجموعة الاستعلامات معلّمة (النص والمعلم المطلوب) وتُولد من أسماء المعالم بأنواع:
+- exact: الاسم كما هو
+- partial: جزء من كلمات الاسم ("بنك مصر" لـ "بنك مصر (فرع ...)")
+- reordered: كلمات الاسم بترتيب آخر
+- typo: خطأ إملائي في كلمة واحدة
+- neighborhood: الاسم الجزئي ومعه اسم الحي
+أو تُقرأ من ملف JSONL فيه {"query": ..., "expected": ...} لكل سطر (--labeled).
+الإصابة في recall@k أن يكون المعلم المطلوب بين أول k نتائج.
+
+الاستخدام:
+    python benchmarks/bench_search.py --scales 1 10 --queries 1000
+"""
+
+import os
+import sys
+import json
+import time
+import heapq
+import random
+import argparse
+from difflib import SequenceMatcher
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from arabic_text import normalize
+from landmark_search import LandmarkSearch
+from synthetic_city import load_or_generate
+
+CACHE_DIR = os.path.join(REPO_DIR, 'benchmarks', '.cache')
+LETTERS = 'ابتثجحخدذرزسشصضطظعغفقكلمنهوي'
+KINDS = ('exact', 'partial', 'reordered', 'typo', 'neighborhood')
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def make_query(rng, kind, name, neighborhood):
+    words = name.split()
+    if kind == 'exact':
+        return name
+    if kind in ('partial', 'neighborhood'):
+        if len(words) > 1:
+            words = words[:rng.randint(max(1, len(words) - 2), len(words) - 1)] if rng.random() < 0.5 \
+                else words[-rng.randint(1, len(words) - 1):]
+        return ' '.join(words + ([neighborhood] if kind == 'neighborhood' else []))
+    if kind == 'reordered':
+        rng.shuffle(words)
+        return ' '.join(words)
+    position = max(range(len(words)), key=lambda i: len(words[i]))
+    word = list(words[position])
+    word[rng.randrange(len(word))] = rng.choice(LETTERS)
+    words[position] = ''.join(word)
+    return ' '.join(words)
+
+
+def labeled_queries(rng, neighborhood_data, count):
+    landmarks = [(landmark['name'] if isinstance(landmark, dict) else landmark, neighborhood)
+                 for neighborhood, categories in neighborhood_data.items()
+                 for landmarks in categories.values() for landmark in landmarks]
+    queries = []
+    for i in range(count):
+        name, neighborhood = rng.choice(landmarks)
+        kind = KINDS[i % len(KINDS)]
+        queries.append({'query': make_query(rng, kind, name, neighborhood), 'expected': name, 'kind': kind})
+    return queries
+
+
+def scan_top(names, query, k):
+    query = query.lower()
+    return heapq.nlargest(k, names, key=lambda name: SequenceMatcher(None, query, name).ratio())
+
+
+def measure(func, queries):
+    """recall@1 و recall@5 لكل نوع، وزمن كل استعلام"""
+    timings, hits = [], {}
+    for item in queries:
+        start = time.perf_counter()
+        results = [normalize(name) for name in func(item['query'])]
+        timings.append(time.perf_counter() - start)
+        expected = normalize(item['expected'])
+        kind_hits = hits.setdefault(item.get('kind', 'all'), [0, 0, 0])
+        kind_hits[0] += results[:1] == [expected]
+        kind_hits[1] += expected in results
+        kind_hits[2] += 1
+    timings.sort()
+    return percentile(timings, 50) * 1e3, percentile(timings, 99) * 1e3, hits
+
+
+def report(label, p50, p99, hits):
+    total = [sum(values[i] for values in hits.values()) for i in range(3)]
+    by_kind = ' '.join(f"{kind}={values[0] / values[2]:.0%}/{values[1] / values[2]:.0%}"
+                       for kind, values in sorted(hits.items()))
+    print(f"  {label:<22} p50={p50:.3f}ms p99={p99:.3f}ms recall@1={total[0] / total[2]:.1%} "
+          f"recall@5={total[1] / total[2]:.1%}  [{by_kind}]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10])
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--labeled', help='JSONL: {"query": ..., "expected": ...}')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for scale in args.scales:
+        city = load_or_generate(scale, args.seed, CACHE_DIR)
+        if args.labeled:
+            with open(args.labeled, encoding='utf-8') as f:
+                queries = [json.loads(line) for line in f if line.strip()]
+        else:
+            queries = labeled_queries(rng, city['neighborhood_data'], args.queries)
+
+        start = time.perf_counter()
+        index = LandmarkSearch.from_neighborhoods(city['neighborhood_data'])
+        build_ms = (time.perf_counter() - start) * 1000
+        postings = sum(len(ids) for field in index.postings.values() for ids, _ in field.values())
+        print(f"scale={scale:g}x landmarks={len(index)} words={len(index.df)} postings={postings} "
+              f"build={build_ms:.0f}ms (recall per kind as @1/@5)")
+        report('bm25f', *measure(lambda query: [match['name'] for match in index.search(query, 5)], queries))
+
+        names = list({(landmark['name'] if isinstance(landmark, dict) else landmark).lower()
+                      for categories in city['neighborhood_data'].values()
+                      for landmarks in categories.values() for landmark in landmarks})
+        sample = queries[:min(len(queries), 200)]
+        report(f'SequenceMatcher ({len(sample)})', *measure(lambda query: scan_top(names, query, 5), sample))
+
+
+if __name__ == '__main__':
+    main()
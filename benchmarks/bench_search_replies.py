@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+قياس عدد طلبات Telegram API وزمن الرد لكل بحث ذكي في final_enhanced_bot.py
+
+يستخدم نفس Application وطبقة الطلبات الوهمية في bench_load.py، مع تأخير ثابت لكل
+طلب API (زمن الذهاب والعودة إلى خادم Telegram)، ويقيس رسالة البحث فقط
+(بدون /start والضغط على زر البحث الذكي).
+
+الاستخدام:
+    python benchmarks/bench_search_replies.py --searches 200 --latency-ms 50
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import statistics
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_load import LoadTestHarness, percentile, prepare_environment
+
+
+async def run(searches: int, latency: float, seed: int):
+    harness = LoadTestHarness(seed)
+    await harness.setup()
+    rng = random.Random(seed)
+    calls, timings = Counter(), []
+    for user_id in range(1, searches + 1):
+        await harness._send('nlp', harness.factory.text(user_id, '/start'))
+        await harness._click('nlp', user_id, 'nlp_search')
+        start_name, end_name = rng.sample(harness.names, 2)
+        harness.fake.calls.clear()
+        harness.fake.latency = latency
+        start = time.perf_counter()
+        await harness._send('nlp', harness.factory.text(user_id, f"إزاي أروح من {start_name} إلى {end_name}؟"))
+        timings.append(time.perf_counter() - start)
+        harness.fake.latency = 0.0
+        calls.update(harness.fake.calls)
+    await harness.teardown()
+    return calls, sorted(timings), harness.errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--searches', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    prepare_environment()
+
+    calls, timings, errors = asyncio.run(run(args.searches, args.latency_ms / 1000, args.seed))
+    total = sum(calls.values())
+    print(f"{args.searches} searches, {args.latency_ms:g}ms per API call, handler_errors={errors}")
+    print(f"  API calls per search: {total / args.searches:.2f} "
+          + ' '.join(f"{endpoint}={count / args.searches:.2f}" for endpoint, count in sorted(calls.items())))
+    print(f"  wall per search: mean={statistics.mean(timings) * 1000:.1f}ms "
+          f"p50={percentile(timings, 50) * 1000:.1f}ms p95={percentile(timings, 95) * 1000:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
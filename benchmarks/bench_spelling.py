@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+قياس "هل قصدت؟" (spell_correction.LandmarkSpeller) مقابل مقارنة SequenceMatcher
+بكل المعالم (طريقة find_best_match) على مدن synthetic_city
+
+الاستعلامات أسماء معالم حقيقية بخطأ أو خطأين (حذف أو إضافة أو استبدال أو تبديل
+حرفين متجاورين). يُقاس حجم قاموس الحذوفات وزمن البناء لكل max edit distance،
+ونسبة الاستعلامات التي كان المعلم الصحيح أول اقتراح لها.
+
+الاستخدام:
+    python benchmarks/bench_spelling.py --scales 1 10 --queries 1000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from difflib import SequenceMatcher
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from arabic_text import normalize
+from spell_correction import LandmarkSpeller
+from synthetic_city import load_or_generate
+
+CACHE_DIR = os.path.join(REPO_DIR, 'benchmarks', '.cache')
+LETTERS = 'ابتثجحخدذرزسشصضطظعغفقكلمنهوي'
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def add_typos(rng, name, count):
+    chars = list(name)
+    for _ in range(count):
+        position = rng.randrange(len(chars))
+        kind = rng.choice(('delete', 'insert', 'replace', 'swap'))
+        if kind == 'delete' and len(chars) > 3:
+            del chars[position]
+        elif kind == 'insert':
+            chars.insert(position, rng.choice(LETTERS))
+        elif kind == 'swap' and position + 1 < len(chars):
+            chars[position], chars[position + 1] = chars[position + 1], chars[position]
+        else:
+            chars[position] = rng.choice(LETTERS)
+    return ''.join(chars)
+
+
+def best_ratio(names, query):
+    query = query.lower()
+    return max(names, key=lambda name: SequenceMatcher(None, query, name).ratio())
+
+
+def measure(func, queries, expected):
+    timings, hits = [], 0
+    for query, name in zip(queries, expected):
+        start = time.perf_counter()
+        result = func(query)
+        timings.append(time.perf_counter() - start)
+        hits += normalize(result or '') == normalize(name)
+    timings.sort()
+    return percentile(timings, 50) * 1e3, percentile(timings, 99) * 1e3, hits / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10])
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for scale in args.scales:
+        city = load_or_generate(scale, args.seed, CACHE_DIR)
+        names = [landmark['name'] if isinstance(landmark, dict) else landmark
+                 for categories in city['neighborhood_data'].values()
+                 for landmarks in categories.values() for landmark in landmarks]
+        expected = rng.choices(names, k=args.queries)
+        queries = [add_typos(rng, name, rng.randint(1, 2)) for name in expected]
+        print(f"scale={scale:g}x landmarks={len(names)}")
+
+        for max_distance in (1, 2):
+            start = time.perf_counter()
+            speller = LandmarkSpeller.from_neighborhoods(city['neighborhood_data'], max_edit_distance=max_distance)
+            build_ms = (time.perf_counter() - start) * 1000
+
+            def suggest(query):
+                suggestions = speller.suggest(query, limit=1)
+                return suggestions[0]['name'] if suggestions else None
+
+            p50, p99, accuracy = measure(suggest, queries, expected)
+            print(f"  symspell d={max_distance} words={len(speller.symspell.words)} "
+                  f"deletes={len(speller.symspell.deletes)} build={build_ms:.0f}ms "
+                  f"p50={p50:.3f}ms p99={p99:.3f}ms top1={accuracy:.1%}")
+
+        lowered = [name.lower() for name in names]
+        sample = min(len(queries), 200)
+        p50, p99, accuracy = measure(lambda query: best_ratio(lowered, query), queries[:sample], expected[:sample])
+        print(f"  SequenceMatcher scan p50={p50:.3f}ms p99={p99:.3f}ms top1={accuracy:.1%} ({sample} queries)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+قياس متابعة الخطوط عند 100 ألف مشترك في خط واحد
+
+- إضافة المشتركين (executemany) وقراءتهم على صفحات من الفهرس
+- تجميع دفعة تقارير في تنبيه واحد
+- إرسال التنبيه لكل المشتركين عبر SendQueue وطبقة Bot API الوهمية:
+  مرة بدون حدود (تكلفة المحرك نفسه) ثم الزمن المتوقع بحد Telegram العام
+
+الاستخدام:
+    python benchmarks/bench_subscriptions.py --subscribers 100000
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from telegram.ext import ExtBot
+
+from fake_telegram import FakeTelegramRequest
+from send_queue import GLOBAL_RATE, SendQueue
+from subscriptions import AlertFanout, SubscriptionStore
+
+ROUTE = 'خط السلام (رايح)'
+
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print(f"  {label:<44} {(time.perf_counter() - start) * 1000:10.1f}ms")
+    return result
+
+
+async def fan_out(store, subscribers, reports):
+    # حدود عالية جداً لقياس تكلفة الجدولة والإرسال بدون انتظار التوكنات
+    queue = SendQueue(global_rate=1e9, global_burst=1e9, chat_rate=1e9, chat_burst=1e9)
+    request = FakeTelegramRequest()
+    request.record_log = False
+    bot = ExtBot('123:BENCH', request=request, rate_limiter=queue)
+    await bot.initialize()
+    fanout = AlertFanout(store, debounce_s=0.01)
+    for i in range(reports):
+        fanout.publish(bot, {'user_id': i, 'route_name': ROUTE, 'report_type': 'congestion',
+                             'description': f'تقرير {i}'})
+    start = time.perf_counter()
+    while fanout.tasks or not fanout.stats['alerts']:
+        await asyncio.sleep(0.01)
+    # انتظار آخر صفحة
+    while fanout.stats['sent'] + fanout.stats['failed'] < subscribers - reports:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    await bot.shutdown()
+    return fanout.stats, request.calls['sendMessage'], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--subscribers', type=int, default=100000)
+    parser.add_argument('--reports', type=int, default=20)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix='bench-subscriptions-')
+    store = SubscriptionStore(os.path.join(tmp_dir, 'subscriptions.db'))
+    route_id = store.route_id(ROUTE, create=True)
+    other_id = store.route_id('خط آخر', create=True)
+    print(f"{args.subscribers} subscribers on one route, {args.reports} reports in one burst")
+    timed('subscribe_many (executemany)', store.subscribe_many, route_id, range(1, args.subscribers + 1))
+    timed('subscribe_many other route (same chats)', store.subscribe_many, other_id,
+          range(1, args.subscribers + 1, 2))
+    timed('subscribe one chat', store.subscribe, args.subscribers + 1, route_id)
+    timed('count subscribers', store.count, route_id)
+    timed('is_subscribed', store.is_subscribed, args.subscribers // 2, route_id)
+    timed('subscriptions for one chat', store.subscriptions, 3)
+    timed('read all subscriber pages', lambda: sum(len(page) for page in store.subscriber_pages(route_id)))
+
+    stats, calls, elapsed = asyncio.run(fan_out(store, args.subscribers + 1, args.reports))
+    print(f"  fan-out: alerts={stats['alerts']} sendMessage={calls} sent={stats['sent']} "
+          f"in {elapsed:.2f}s ({stats['sent'] / elapsed:,.0f} msg/s)")
+    print(f"  at Telegram's limit ({GLOBAL_RATE:g} msg/s for broadcasts): "
+          f"{stats['sent'] / GLOBAL_RATE / 60:.1f} minutes per alert")
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,9 @@ from telegram.ext import (
 )
 from telegram.constants import ParseMode
 
+from logging_setup import setup_logging
+from routing_engine import get_engine
+
 # --- استيراد البيانات والتوكن ---
 try:
     from config import BOT_TOKEN
@@ -30,12 +33,10 @@ except Exception as e:
 
 
 # --- إعدادات الـ Logging ---
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
-)
-logging.getLogger("httpx").setLevel(logging.WARNING)
+# الرسائل تُنسق بشكل كسول (%s) ولا تُكتب إلا إذا كان المستوى مفعلاً.
+# لتفعيل DEBUG أثناء التطوير: LOG_LEVEL=DEBUG (ويمكن تقليل الحجم بـ LOG_DEBUG_SAMPLE_RATE)
+setup_logging(log_file=None)
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG) # مستوى DEBUG مفيد أثناء التطوير
 
 # --- تعريف الحالات (States) ---
 (SELECTING_START_NEIGHBORHOOD, SELECTING_START_CATEGORY, SELECTING_START_LANDMARK,
@@ -46,14 +47,14 @@ logger.setLevel(logging.DEBUG) # مستوى DEBUG مفيد أثناء التطو
 def get_landmark_data_from_name(landmark_name: str, neighborhoods_dict: dict) -> dict | None:
     """يبحث عن بيانات معلم معين بالاسم في كل الأحياء والتصنيفات."""
     if not isinstance(landmark_name, str):
-        logger.error(f"Invalid type for landmark_name: {type(landmark_name)}")
+        logger.error("Invalid type for landmark_name: %s", type(landmark_name))
         return None
     search_name = landmark_name.strip().lower()
     if not search_name:
         logger.warning("Empty landmark name received for search.")
         return None
 
-    logger.debug(f"Searching for landmark exact match (case-insensitive): '{search_name}'")
+    logger.debug("Searching for landmark exact match (case-insensitive): '%s'", search_name)
     for neighborhood, categories in neighborhoods_dict.items():
         if not isinstance(categories, dict): continue # Skip if neighborhood data is not a dict
         for category, landmarks in categories.items():
@@ -65,21 +66,21 @@ def get_landmark_data_from_name(landmark_name: str, neighborhoods_dict: dict) ->
                       current_name = landmark_dict.get("name")
                       # Ensure current_name is a string before comparing
                       if isinstance(current_name, str) and current_name.strip().lower() == search_name:
-                           logger.debug(f"Exact match found: {landmark_dict}")
+                           logger.debug("Exact match found: %s", landmark_dict)
                            # Return a copy including neighborhood and category
                            return_data = landmark_dict.copy()
                            return_data['neighborhood'] = neighborhood
                            return_data['category'] = category
                            return return_data
             elif landmarks and isinstance(landmarks[0], str): # Old structure [str, str] (Fallback, should not happen with correct data.py)
-                logger.warning(f"Category '{category}' in neighborhood '{neighborhood}' seems to use old data structure (list of strings).")
+                logger.warning("Category '%s' in neighborhood '%s' seems to use old data structure (list of strings).", category, neighborhood)
                 for item_name in landmarks:
                      if isinstance(item_name, str) and item_name.strip().lower() == search_name:
-                          logger.debug(f"Fallback match found for string: {item_name}")
+                          logger.debug("Fallback match found for string: %s", item_name)
                           # Return basic structure if found in old format list
                           return {"name": landmark_name, "served_by": {}, "neighborhood": neighborhood, "category": category}
 
-    logger.warning(f"Landmark '{landmark_name}' not found in any category/neighborhood.")
+    logger.warning("Landmark '%s' not found in any category/neighborhood.", landmark_name)
     return None
 
 def build_keyboard(items: list, prefix: str) -> InlineKeyboardMarkup:
@@ -89,10 +90,10 @@ def build_keyboard(items: list, prefix: str) -> InlineKeyboardMarkup:
     max_per_row = 2
     processed_identifiers = set() # To avoid duplicate callback_data if truncation happens
 
-    logger.debug(f"Building keyboard with prefix '{prefix}' for {len(items)} items.")
+    logger.debug("Building keyboard with prefix '%s' for %s items.", prefix, len(items))
 
     if not items:
-        logger.warning(f"build_keyboard received empty list for prefix '{prefix}'")
+        logger.warning("build_keyboard received empty list for prefix '%s'", prefix)
         # Return keyboard with only cancel button? Or empty? Let's add cancel.
         keyboard.append([InlineKeyboardButton("إلغاء ❌", callback_data="cancel_action")])
         return InlineKeyboardMarkup(keyboard)
@@ -108,13 +109,13 @@ def build_keyboard(items: list, prefix: str) -> InlineKeyboardMarkup:
             item_text = item_data
             callback_identifier = item_data # Use the string itself as the identifier
         else:
-            logger.warning(f"Skipping unexpected item type in build_keyboard: {type(item_data)}")
+            logger.warning("Skipping unexpected item type in build_keyboard: %s", type(item_data))
             continue
 
         # Ensure text and identifier are valid strings
         if not isinstance(item_text, str) or not isinstance(callback_identifier, str) or \
            not item_text or not callback_identifier:
-            logger.warning(f"Skipping item with invalid text or callback ID: {item_data}")
+            logger.warning("Skipping item with invalid text or callback ID: %s", item_data)
             continue
 
         # Construct callback data: prefix + : + identifier
@@ -123,7 +124,7 @@ def build_keyboard(items: list, prefix: str) -> InlineKeyboardMarkup:
         # Check callback_data length ONLY if necessary (max 64 bytes)
         # Truncation can lead to errors if identifiers become non-unique or don't match data keys
         if len(callback_data_str.encode('utf-8')) > 64:
-            logger.error(f"Callback data for '{item_text}' is too long ({len(callback_data_str.encode('utf-8'))} bytes)! Data: '{callback_data_str}'. THIS WILL LIKELY CAUSE AN ERROR. Consider shortening names in data.py or using IDs.")
+            logger.error("Callback data for '%s' is too long (%s bytes)! Data: '%s'. THIS WILL LIKELY CAUSE AN ERROR. Consider shortening names in data.py or using IDs.", item_text, len(callback_data_str.encode('utf-8')), callback_data_str)
             # Option: skip button, or send truncated (but likely broken) data? Let's skip.
             continue
             # Alternative (Truncation - use with caution):
@@ -154,20 +155,20 @@ async def handle_invalid_callback(update: Update, context: ContextTypes.DEFAULT_
     if query:
         # Always answer callback query to remove loading state
         try: await query.answer("خطأ!", show_alert=True) # show_alert might be better
-        except Exception as e: logger.error(f"Error answering callback query: {e}")
+        except Exception as e: logger.error("Error answering callback query: %s", e)
 
-        logger.warning(f"Received invalid/malformed callback_data: {query.data} from user {user_id}")
+        logger.warning("Received invalid/malformed callback_data: %s from user %s", query.data, user_id)
         try:
             await query.edit_message_text(text=reply_text)
         except Exception as e:
-            logger.warning(f"Could not edit message on invalid callback: {e}. Sending new message.")
+            logger.warning("Could not edit message on invalid callback: %s. Sending new message.", e)
             try: await context.bot.send_message(chat_id=update.effective_chat.id, text=reply_text)
-            except Exception as send_e: logger.error(f"Failed to send fallback message: {send_e}")
+            except Exception as send_e: logger.error("Failed to send fallback message: %s", send_e)
     else:
         logger.error("handle_invalid_callback called but update.callback_query is None!")
         if update.effective_chat:
              try: await context.bot.send_message(chat_id=update.effective_chat.id, text=reply_text)
-             except Exception as send_e: logger.error(f"Failed to send fallback message: {send_e}")
+             except Exception as send_e: logger.error("Failed to send fallback message: %s", send_e)
 
     context.user_data.clear()
     return ConversationHandler.END
@@ -178,7 +179,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user = update.effective_user
     user_id = user.id if user else "Unknown"
     user_name = user.first_name if user else "User"
-    logger.info(f"User {user_name} (ID: {user_id}) started a conversation.")
+    logger.info("User %s (ID: %s) started a conversation.", user_name, user_id)
     context.user_data.clear()
     try:
         neighborhoods = list(neighborhood_data.keys())
@@ -196,7 +197,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         )
         return SELECTING_START_NEIGHBORHOOD
     except Exception as e:
-        logger.exception(f"Error in start handler: {e}")
+        logger.exception("Error in start handler: %s", e)
         await update.message.reply_text("حدث خطأ ما، يرجى المحاولة لاحقاً أو الاتصال بالدعم.")
         return ConversationHandler.END
 
@@ -209,17 +210,17 @@ async def select_start_neighborhood(update: Update, context: ContextTypes.DEFAUL
         chosen_neighborhood = query.data.split(":", 1)[1]
 
         if chosen_neighborhood not in neighborhood_data:
-            logger.error(f"Neighborhood key '{chosen_neighborhood}' from callback NOT FOUND in data.")
+            logger.error("Neighborhood key '%s' from callback NOT FOUND in data.", chosen_neighborhood)
             await query.edit_message_text(text=f"خطأ داخلي: لم يتم العثور على بيانات الحي '{chosen_neighborhood}'.")
             context.user_data.clear()
             return ConversationHandler.END
 
         context.user_data['start_neighborhood'] = chosen_neighborhood
-        logger.info(f"User {update.effective_user.first_name} selected start neighborhood: {chosen_neighborhood}")
+        logger.info("User %s selected start neighborhood: %s", update.effective_user.first_name, chosen_neighborhood)
 
         categories = list(neighborhood_data.get(chosen_neighborhood, {}).keys())
         if not categories:
-            logger.warning(f"No categories found for neighborhood: '{chosen_neighborhood}'. Check data.py.")
+            logger.warning("No categories found for neighborhood: '%s'. Check data.py.", chosen_neighborhood)
             await query.edit_message_text(text=f"عفواً، لا توجد تصنيفات متاحة حالياً لـ '{chosen_neighborhood}'.")
             context.user_data.clear() # End if no categories found
             return ConversationHandler.END
@@ -233,7 +234,7 @@ async def select_start_neighborhood(update: Update, context: ContextTypes.DEFAUL
         )
         return SELECTING_START_CATEGORY
     except Exception as e:
-        logger.exception(f"Error in select_start_neighborhood: {e}")
+        logger.exception("Error in select_start_neighborhood: %s", e)
         await context.bot.send_message(chat_id=update.effective_chat.id, text="حدث خطأ أثناء معالجة اختيارك. يرجى المحاولة بـ /start.")
         context.user_data.clear()
         return ConversationHandler.END
@@ -247,11 +248,11 @@ async def select_start_category(update: Update, context: ContextTypes.DEFAULT_TY
     chosen_category = query.data.split(":", 1)[1]
     context.user_data['start_category'] = chosen_category
     chosen_neighborhood = context.user_data.get('start_neighborhood', 'الحي المختار') # Fallback text
-    logger.info(f"User {update.effective_user.first_name} selected start category: {chosen_category} in {chosen_neighborhood}")
+    logger.info("User %s selected start category: %s in %s", update.effective_user.first_name, chosen_category, chosen_neighborhood)
 
     landmarks_data_list = neighborhood_data.get(chosen_neighborhood, {}).get(chosen_category, [])
     if not landmarks_data_list:
-        logger.warning(f"No landmarks found for {chosen_neighborhood} -> {chosen_category}")
+        logger.warning("No landmarks found for %s -> %s", chosen_neighborhood, chosen_category)
         await query.edit_message_text(
             text=f"عفواً، لا توجد معالم مدرجة تحت تصنيف '{chosen_category}' في '{chosen_neighborhood}' حالياً."
         )
@@ -270,7 +271,7 @@ async def select_start_category(update: Update, context: ContextTypes.DEFAULT_TY
         )
         return SELECTING_START_LANDMARK
     except Exception as e:
-        logger.error(f"Error editing message in select_start_category: {e}")
+        logger.error("Error editing message in select_start_category: %s", e)
         await context.bot.send_message(chat_id=update.effective_chat.id,
                                       text=f"📍 حي البداية: {chosen_neighborhood}\n🏷️ التصنيف: {chosen_category}\n\nالآن اختر **المعلم / المكان المحدد** الذي ستبدأ منه:",
                                       reply_markup=keyboard, parse_mode=ParseMode.MARKDOWN)
@@ -285,7 +286,7 @@ async def select_start_landmark(update: Update, context: ContextTypes.DEFAULT_TY
     chosen_landmark = query.data.split(":", 1)[1]
     context.user_data['start_landmark'] = chosen_landmark
     start_neighborhood = context.user_data.get('start_neighborhood', '')
-    logger.info(f"User {update.effective_user.first_name} selected start landmark: {chosen_landmark} in {start_neighborhood}")
+    logger.info("User %s selected start landmark: %s in %s", update.effective_user.first_name, chosen_landmark, start_neighborhood)
 
     neighborhoods = list(neighborhood_data.keys())
     keyboard = build_keyboard(neighborhoods, "end_neighborhood")
@@ -299,7 +300,7 @@ async def select_start_landmark(update: Update, context: ContextTypes.DEFAULT_TY
         )
         return SELECTING_END_NEIGHBORHOOD
     except Exception as e:
-         logger.error(f"Error editing message in select_start_landmark: {e}")
+         logger.error("Error editing message in select_start_landmark: %s", e)
          await context.bot.send_message(chat_id=update.effective_chat.id,
                                       text=f"✅ نقطة البداية: **{chosen_landmark}** ({start_neighborhood})\n\n--------------------\nالآن، من فضلك اختر **حي الوجهة**:",
                                       reply_markup=keyboard, parse_mode=ParseMode.MARKDOWN)
@@ -315,11 +316,11 @@ async def select_end_neighborhood(update: Update, context: ContextTypes.DEFAULT_
 
     chosen_neighborhood = query.data.split(":", 1)[1]
     if chosen_neighborhood not in neighborhood_data:
-        logger.error(f"End Neighborhood key '{chosen_neighborhood}' from callback NOT FOUND.")
+        logger.error("End Neighborhood key '%s' from callback NOT FOUND.", chosen_neighborhood)
         await query.edit_message_text(text=f"خطأ: لم يتم العثور على بيانات للحي '{chosen_neighborhood}'.")
         return ConversationHandler.END
     context.user_data['end_neighborhood'] = chosen_neighborhood
-    logger.info(f"User {update.effective_user.first_name} selected end neighborhood: {chosen_neighborhood}")
+    logger.info("User %s selected end neighborhood: %s", update.effective_user.first_name, chosen_neighborhood)
 
     categories = list(neighborhood_data.get(chosen_neighborhood, {}).keys())
     if not categories:
@@ -337,7 +338,7 @@ async def select_end_neighborhood(update: Update, context: ContextTypes.DEFAULT_
         )
         return SELECTING_END_CATEGORY
     except Exception as e:
-         logger.error(f"Error editing message in select_end_neighborhood: {e}")
+         logger.error("Error editing message in select_end_neighborhood: %s", e)
          await context.bot.send_message(chat_id=update.effective_chat.id,
                                       text=f"📍 نقطة البداية: {context.user_data.get('start_landmark', '?')} ({context.user_data.get('start_neighborhood', '?')})\n🏁 حي الوجهة: {chosen_neighborhood}\n\nالآن اختر **نوع مكان الوجهة**:",
                                       reply_markup=keyboard, parse_mode=ParseMode.MARKDOWN)
@@ -352,7 +353,7 @@ async def select_end_category(update: Update, context: ContextTypes.DEFAULT_TYPE
     chosen_category = query.data.split(":", 1)[1]
     context.user_data['end_category'] = chosen_category
     chosen_neighborhood = context.user_data.get('end_neighborhood', 'الحي المختار')
-    logger.info(f"User selected end category: {chosen_category} in {chosen_neighborhood}")
+    logger.info("User selected end category: %s in %s", chosen_category, chosen_neighborhood)
 
     landmarks_data_list = neighborhood_data.get(chosen_neighborhood, {}).get(chosen_category, [])
     if not landmarks_data_list:
@@ -371,7 +372,7 @@ async def select_end_category(update: Update, context: ContextTypes.DEFAULT_TYPE
         )
         return SELECTING_END_LANDMARK
     except Exception as e:
-         logger.error(f"Error editing message in select_end_category: {e}")
+         logger.error("Error editing message in select_end_category: %s", e)
          await context.bot.send_message(chat_id=update.effective_chat.id,
                                       text=f"📍 نقطة البداية: {context.user_data.get('start_landmark', '?')} ({context.user_data.get('start_neighborhood', '?')})\n🏁 حي الوجهة: {chosen_neighborhood}\n🏷️ تصنيف الوجهة: {chosen_category}\n\nالآن اختر **المعلم / المكان المحدد** للوجهة:",
                                       reply_markup=keyboard, parse_mode=ParseMode.MARKDOWN)
@@ -390,14 +391,14 @@ async def select_end_landmark_and_find_route(update: Update, context: ContextTyp
 
     chosen_end_landmark = query.data.split(":", 1)[1]
     context.user_data['end_landmark'] = chosen_end_landmark
-    logger.info(f"User {update.effective_user.first_name} selected end landmark: {chosen_end_landmark}")
+    logger.info("User %s selected end landmark: %s", update.effective_user.first_name, chosen_end_landmark)
 
     start_landmark = context.user_data.get('start_landmark')
     end_landmark = context.user_data.get('end_landmark')
 
     if not start_landmark or not end_landmark:
         try: await query.edit_message_text(text="حدث خطأ، لم يتم تحديد نقطة البداية أو النهاية بشكل صحيح.")
-        except Exception as e: logger.warning(f"Failed edit: {e}")
+        except Exception as e: logger.warning("Failed edit: %s", e)
         context.user_data.clear()
         return ConversationHandler.END
 
@@ -410,11 +411,11 @@ async def select_end_landmark_and_find_route(update: Update, context: ContextTyp
             parse_mode='Markdown'
         )
     except Exception as e:
-        logger.warning(f"Failed edit before search message: {e}. Sending new message.")
+        logger.warning("Failed edit before search message: %s. Sending new message.", e)
         try:
             await context.bot.send_message(chat_id=update.effective_chat.id, text="تمام! جاري البحث...")
         except Exception as send_e:
-            logger.error(f"Failed to send fallback searching message: {send_e}")
+            logger.error("Failed to send fallback searching message: %s", send_e)
 
     # --- البحث عن اقتراح الطريق ---
     # Assuming find_route_with_proximity is defined or imported
@@ -424,7 +425,7 @@ async def select_end_landmark_and_find_route(update: Update, context: ContextTyp
     destination_map_url = None
     destination_map_name = end_landmark # الاسم الافتراضي
     try:
-        logger.info(f"Attempting to get map link for destination: '{end_landmark}' using maps_local.Google Maps")
+        logger.info("Attempting to get map link for destination: '%s' using maps_local.Google Maps", end_landmark)
         query_text = f"{end_landmark}, Port Said"
 
         # --------------------------------------------------------------------
@@ -447,23 +448,23 @@ async def select_end_landmark_and_find_route(update: Update, context: ContextTyp
             if place_map_url:
                  destination_map_url = place_map_url
                  destination_map_name = place_name_found
-                 logger.info(f"Map link found: {destination_map_url}")
+                 logger.info("Map link found: %s", destination_map_url)
             else:
-                 logger.warning(f"Tool found place '{place_name_found}' but no map_url.")
+                 logger.warning("Tool found place '%s' but no map_url.", place_name_found)
                  # استخدم رابط البحث العام كبديل (تم تصحيح الرابط)
                  destination_map_url = f"https://maps.google.com/?cid=92316089597044274817{quote(query_text)}" # <<< الرابط المصحح
                  destination_map_name = end_landmark
-                 logger.info(f"Using generic search URL as fallback (map_url missing): {destination_map_url}")
+                 logger.info("Using generic search URL as fallback (map_url missing): %s", destination_map_url)
         else:
-            logger.warning(f"Could not find place or map link for '{end_landmark}' using tool.")
+            logger.warning("Could not find place or map link for '%s' using tool.", end_landmark)
             # استخدم رابط البحث العام كبديل (تم تصحيح الرابط)
             destination_map_url = f"https://maps.google.com/?cid=92316089597044274818{quote(query_text)}" # <<< الرابط المصحح
             destination_map_name = end_landmark
-            logger.info(f"Using generic search URL as fallback (place not found): {destination_map_url}")
+            logger.info("Using generic search URL as fallback (place not found): %s", destination_map_url)
         # --- نهاية كود معالجة النتيجة ---
 
     except Exception as e:
-        logger.error(f"Error during map link retrieval or processing for '{end_landmark}': {e}")
+        logger.error("Error during map link retrieval or processing for '%s': %s", end_landmark, e)
         destination_map_url = None
         destination_map_name = end_landmark
 
@@ -476,14 +477,14 @@ async def select_end_landmark_and_find_route(update: Update, context: ContextTyp
             reply_markup = InlineKeyboardMarkup(keyboard)
             await context.bot.send_message(chat_id=update.effective_chat.id, text="📍 رابط الوجهة:", reply_markup=reply_markup)
         except Exception as e:
-            logger.error(f"Error sending map link button: {e}")
+            logger.error("Error sending map link button: %s", e)
             try:
                 await context.bot.send_message(chat_id=update.effective_chat.id,
                                                text=f"🗺️ رابط موقع '{destination_map_name}' على الخريطة:\n{destination_map_url}",
                                                parse_mode='Markdown',
                                                disable_web_page_preview=True)
             except Exception as send_text_e:
-                 logger.error(f"Failed to send map link as text: {send_text_e}")
+                 logger.error("Failed to send map link as text: %s", send_text_e)
     else:
         pass # لا ترسل شيئاً إذا لم يكن هناك رابط
 
@@ -498,121 +499,30 @@ def find_route_with_proximity(start_landmark_name, end_landmark_name, available_
     """
     Finds direct routes using proximity data.
     """
-    logger.info(f"Smart search started for: '{start_landmark_name}' -> '{end_landmark_name}'")
+    logger.info("Smart search started for: '%s' -> '%s'", start_landmark_name, end_landmark_name)
     possible_routes_details = []
 
     if not isinstance(start_landmark_name, str) or not isinstance(end_landmark_name, str):
-         logger.error(f"Invalid landmark names received: Start={type(start_landmark_name)}, End={type(end_landmark_name)}")
+         logger.error("Invalid landmark names received: Start=%s, End=%s", type(start_landmark_name), type(end_landmark_name))
          return "❌ خطأ في بيانات البحث."
 
     if start_landmark_name.strip().lower() == end_landmark_name.strip().lower():
         return f"✅ أنت بالفعل في وجهتك أو قريب جداً منها: **'{start_landmark_name}'**!"
 
-    logger.debug(f"Looking up START landmark: '{start_landmark_name}'")
-    start_data = get_landmark_data_from_name(start_landmark_name, neighborhoods)
-    logger.debug(f"Looking up END landmark: '{end_landmark_name}'")
-    end_data = get_landmark_data_from_name(end_landmark_name, neighborhoods)
+    # الحواف (معلم -> اتجاه خط، ترتيب محطة، مستوى قرب) مبنية مسبقاً في محرك المسارات
+    engine = get_engine(available_routes, neighborhoods)
 
-    if not start_data:
-        logger.warning(f"Could not find start landmark data for '{start_landmark_name}'.")
+    if not engine.knows(start_landmark_name):
+        logger.warning("Could not find start landmark data for '%s'.", start_landmark_name)
         return f"❌ عذراً، لم أتمكن من العثور على بيانات لنقطة البداية '{start_landmark_name}'."
-    if not end_data:
-        logger.warning(f"Could not find end landmark data for '{end_landmark_name}'.")
+    if not engine.knows(end_landmark_name):
+        logger.warning("Could not find end landmark data for '%s'.", end_landmark_name)
         return f"❌ عذراً، لم أتمكن من العثور على بيانات لنقطة النهاية '{end_landmark_name}'."
 
-    start_served_by = start_data.get("served_by", {}) if isinstance(start_data, dict) else {}
-    end_served_by = end_data.get("served_by", {}) if isinstance(end_data, dict) else {}
-    logger.debug(f"START ('{start_landmark_name}') served_by: {start_served_by}")
-    logger.debug(f"END ('{end_landmark_name}') served_by: {end_served_by}")
-
-    if not start_served_by: logger.warning(f"Start landmark '{start_landmark_name}' has empty/invalid 'served_by' data: {start_served_by}")
-    if not end_served_by: logger.warning(f"End landmark '{end_landmark_name}' has empty/invalid 'served_by' data: {end_served_by}")
-
-
-    acceptable_proximity = ["قريبة جدا", "متوسطة"]
-    common_routes_found = []
-    logger.debug(f"Acceptable proximity levels: {acceptable_proximity}")
-    logger.debug(f"Checking routes listed in START served_by keys: {list(start_served_by.keys())}")
-
-    for route_name_base, start_info in start_served_by.items():
-        # Skip if route_name_base itself is not a valid route (e.g., if served_by wasn't properly structured)
-        if not isinstance(start_info, dict): continue
-        logger.debug(f"Processing potential base route: '{route_name_base}'")
-
-        if route_name_base in end_served_by:
-            end_info = end_served_by[route_name_base]
-            if not isinstance(end_info, dict): continue
-
-            logger.debug(f"... Route '{route_name_base}' found in END served_by.")
-            start_prox = start_info.get("proximity")
-            end_prox = end_info.get("proximity")
-            logger.debug(f"... Route '{route_name_base}': Start prox='{start_prox}', End prox='{end_prox}'")
-
-            is_start_prox_acceptable = start_prox in acceptable_proximity
-            is_end_prox_acceptable = end_prox in acceptable_proximity
-            logger.debug(f"... Proximity check: Start acceptable={is_start_prox_acceptable}, End acceptable={is_end_prox_acceptable}")
-
-            if is_start_prox_acceptable and is_end_prox_acceptable:
-                logger.debug(f"... Proximity ACCEPTABLE for '{route_name_base}'. Checking direction...")
-
-                start_nearest_stop = start_info.get("nearest_stop")
-                end_nearest_stop = end_info.get("nearest_stop")
-                logger.debug(f"... Nearest stops from data: Start='{start_nearest_stop}', End='{end_nearest_stop}'")
-
-                if not start_nearest_stop or not end_nearest_stop:
-                    logger.warning(f"... Missing nearest_stop data for route '{route_name_base}'. Cannot check direction.")
-                    continue
-
-                # Find ALL actual route variants in routes_data that contain the base name
-                matching_variants = [r for r in available_routes if isinstance(r.get("routeName"), str) and route_name_base in r.get("routeName")]
-                if not matching_variants:
-                     logger.warning(f"... No route definitions found in routes_data for base name '{route_name_base}'.")
-                     continue
-
-                variant_found_valid_sequence = False
-                for route_definition in matching_variants:
-                     actual_route_name = route_definition.get("routeName")
-                     key_points = route_definition.get("keyPoints")
-                     if not key_points or not isinstance(key_points, list):
-                         logger.warning(f"   ... Route variant '{actual_route_name}' has invalid keyPoints.")
-                         continue
-
-                     # Find indices of the NEAREST STOPS (case-insensitive, whitespace-insensitive)
-                     start_stop_search = start_nearest_stop.strip().lower()
-                     end_stop_search = end_nearest_stop.strip().lower()
-                     start_indices = [i for i, point in enumerate(key_points) if isinstance(point, str) and start_stop_search in point.strip().lower()]
-                     end_indices = [i for i, point in enumerate(key_points) if isinstance(point, str) and end_stop_search in point.strip().lower()]
-                     logger.debug(f"   ... Checking variant '{actual_route_name}': Start Stop '{start_nearest_stop}' indices={start_indices}, End Stop '{end_nearest_stop}' indices={end_indices}")
-
-                     if not start_indices: logger.warning(f"   ... Nearest start stop '{start_nearest_stop}' NOT found in keyPoints of '{actual_route_name}'.")
-                     if not end_indices: logger.warning(f"   ... Nearest end stop '{end_nearest_stop}' NOT found in keyPoints of '{actual_route_name}'.")
-
-                     if start_indices and end_indices:
-                         if any(s_idx < e_idx for s_idx in start_indices for e_idx in end_indices):
-                             logger.info(f"   ... VALID sequence found for route variant '{actual_route_name}'.")
-                             common_routes_found.append({
-                                 "routeName": actual_route_name,
-                                 "start_landmark_name": start_landmark_name,
-                                 "end_landmark_name": end_landmark_name,
-                                 "start_proximity": start_prox,
-                                 "end_proximity": end_prox,
-                                 "start_nearest_stop": start_nearest_stop,
-                                 "end_nearest_stop": end_nearest_stop,
-                                 "fare": route_definition.get('fare', 'غير محددة'),
-                                 "notes": route_definition.get('notes', '')
-                             })
-                             variant_found_valid_sequence = True
-                             # Don't break, allow finding multiple variants (e.g., inner/outer return)
-                         # else: logger.debug(f"   ... Invalid sequence for route variant '{actual_route_name}'.")
-
-                if not variant_found_valid_sequence:
-                     logger.warning(f"... Base route '{route_name_base}' had acceptable proximity, but NO variant had correct stop sequence.")
-
-            else: logger.debug(f"... Proximity NOT acceptable for '{route_name_base}'. Skipping.")
-        # else: logger.debug(f"... Route '{route_name_base}' (from start) not found in END served_by.")
-
-
-    logger.debug(f"Finished checking direct routes. Found {len(common_routes_found)} options.")
+    # القرب المقبول: "قريبة جدا" أو "متوسطة"، والخيارات مرتبة حسب مسافة المشي وعدد المحطات
+    common_routes_found = engine.find_direct(start_landmark_name, end_landmark_name)
+
+    logger.debug("Finished checking direct routes. Found %s options.", len(common_routes_found))
 
     # --- Format results ---
     if common_routes_found:
@@ -636,7 +546,7 @@ def find_route_with_proximity(start_landmark_name, end_landmark_name, available_
          return final_reply
 
     # --- No direct routes found ---
-    logger.warning(f"FINAL VERDICT: No direct routes found after proximity/sequence checks for '{start_landmark_name}' -> '{end_landmark_name}'.")
+    logger.warning("FINAL VERDICT: No direct routes found after proximity/sequence checks for '%s' -> '%s'.", start_landmark_name, end_landmark_name)
     # (Future: Add transfer logic here)
     reason = "لعدم وجود خط مباشر يخدم المكانين معاً بدرجة قرب مقبولة وبالترتيب الصحيح حسب البيانات الحالية."
     return f"❌ عذراً، لم أجد مساراً مباشراً حالياً.\n{reason}\nقد تحتاج لخط آخر أو تبديل مواصلات (سيتم إضافة هذه الخيارات لاحقاً)."
@@ -644,7 +554,7 @@ def find_route_with_proximity(start_landmark_name, end_landmark_name, available_
 # --- دالة الإلغاء cancel ---
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user_first_name = update.effective_user.first_name if update.effective_user else "المستخدم"
-    logger.info(f"User {user_first_name} canceled the conversation.")
+    logger.info("User %s canceled the conversation.", user_first_name)
     reply_text = "تم إلغاء العملية الحالية. يمكنك البدء من جديد باستخدام /start."
 
     query = update.callback_query
@@ -655,7 +565,7 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
             try:
                 await query.edit_message_text(text=reply_text)
             except Exception as e:
-                logger.warning(f"Could not edit message on cancel callback: {e}. Sending new message instead.")
+                logger.warning("Could not edit message on cancel callback: %s. Sending new message instead.", e)
                 await context.bot.send_message(chat_id=update.effective_chat.id, text=reply_text)
         else:
              # If it's another callback query leading to cancel (e.g., an error state redirecting)
@@ -672,7 +582,7 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 async def handle_unexpected_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
      # Check if user has conversation data, implying they are mid-conversation
      if context.user_data:
-          logger.info(f"Unexpected text from {update.effective_user.first_name} during conversation: {update.message.text}")
+          logger.info("Unexpected text from %s during conversation: %s", update.effective_user.first_name, update.message.text)
           await update.message.reply_text("من فضلك استخدم الأزرار للاختيار، أو استخدم /cancel للإلغاء.")
      # Do nothing if text is outside the conversation flow
 
@@ -0,0 +1,515 @@
+# -*- coding: utf-8 -*-
+"""
+استيراد وتصدير الأماكن والخطوط بالجملة (CSV / JSONL / GeoJSON)
+
+الملفات تُقرأ سجلاً بسجل (GeoJSON أيضاً: مصفوفة features تُفك عنصراً بعنصر)،
+وكل سجل يُتحقق منه ثم يُجمع في دفعات. كل دفعة تُكتب بـ executemany في جدول
+مؤقت ثم تُدمج بأوامر SQL على مستوى المجموعة داخل transaction واحدة:
+    - الأماكن: upsert بـ (الحي, التصنيف, الاسم) كما يميز البوت و change_feed المعالم
+      (تحديث الإحداثيات أو إضافة)
+    - الخطوط: upsert بالاسم، ومحطاتها تُستبدل فقط إذا تغيرت
+      (أسماء المحطات غير الموجودة تُضاف كأماكن غير مصنفة مثل ترحيل route_stop)
+محفزات change_log تسجل التغييرات كالمعتاد، فيصل الاستيراد للبوت عبر change_feed.
+
+الاستخدام:
+    python bulk_loader.py import locations city.geojson
+    python bulk_loader.py import routes routes.csv --batch-size 5000
+    python bulk_loader.py import routes routes.jsonl --dry-run
+    python bulk_loader.py export locations locations.csv
+
+أعمدة الأماكن: name, neighborhood, category, coordinates (أو lat و lng / نقطة GeoJSON)
+أعمدة الخطوط: name (أو routeName), fare, start_area, end_area, notes,
+             stops (أو keyPoints): قائمة JSON أو أسماء مفصولة بـ "|" في CSV
+"""
+
+import os
+import re
+import csv
+import sys
+import json
+import time
+import sqlite3
+import argparse
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from db_migrations import STOP_CATEGORY, UNCLASSIFIED_NEIGHBORHOOD, configure_connection, migrate
+from geo_index import parse_coordinates
+
+DEFAULT_BATCH_SIZE = 10000
+DEFAULT_FARE = 4.5
+STOP_SEPARATOR = '|'
+# أطوال أعمدة النماذج في admin_dashboard
+NAME_MAX = 200
+GROUP_MAX = 100
+# أقصى عدد أخطاء تُحفظ رسائلها في التقرير
+MAX_ERROR_MESSAGES = 20
+
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.geojson': 'geojson', '.json': 'geojson'}
+
+# نفس جداول نماذج لوحة الإدارة، لاستيراد مدينة في ملف قاعدة جديد
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS location (
+    id INTEGER PRIMARY KEY,
+    name VARCHAR(200) NOT NULL,
+    category VARCHAR(100) NOT NULL,
+    neighborhood VARCHAR(100) NOT NULL,
+    coordinates VARCHAR(50),
+    created_at DATETIME
+);
+CREATE TABLE IF NOT EXISTS route (
+    id INTEGER PRIMARY KEY,
+    name VARCHAR(200) NOT NULL,
+    fare FLOAT NOT NULL,
+    start_area VARCHAR(200),
+    end_area VARCHAR(200),
+    notes TEXT,
+    created_at DATETIME
+);
+CREATE TABLE IF NOT EXISTS route_stop (
+    route_id INTEGER NOT NULL REFERENCES route (id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    location_id INTEGER NOT NULL REFERENCES location (id) ON DELETE CASCADE,
+    PRIMARY KEY (route_id, seq)
+);
+"""
+
+
+class RecordError(ValueError):
+    """سجل غير صالح (يُتخطى ويُذكر في التقرير)"""
+
+
+# ===== قراءة الملفات =====
+
+def detect_format(path: str) -> str:
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"لا يمكن تحديد صيغة {path}، استخدم --format")
+    return fmt
+
+
+def iter_json_array(f, key: str, chunk_size: int = 1 << 16) -> Iterator:
+    """عناصر المصفوفة "key": [...] في ملف JSON كبير دون تحميله كاملاً في الذاكرة"""
+    decoder = json.JSONDecoder()
+    pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    buffer = ''
+    while True:
+        match = pattern.search(buffer)
+        if match:
+            buffer = buffer[match.end():]
+            break
+        chunk = f.read(chunk_size)
+        if not chunk:
+            raise ValueError(f'لا توجد مصفوفة "{key}" في الملف')
+        # الاحتفاظ بنهاية الجزء السابق حتى لا ينقسم المفتاح بين جزأين
+        buffer = buffer[-(len(key) + 16):] + chunk
+
+    pos = 0
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+        try:
+            if pos >= len(buffer):
+                raise json.JSONDecodeError('incomplete', buffer, pos)
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                raise ValueError(f'مصفوفة "{key}" غير مكتملة أو غير صالحة')
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield item
+        pos = end
+        if pos > chunk_size:
+            buffer = buffer[pos:]
+            pos = 0
+
+
+def _flatten_feature(feature: Dict) -> Dict:
+    """Feature في GeoJSON -> سجل: الخصائص + الإحداثيات من النقطة ("lat, lng")"""
+    record = dict(feature.get('properties') or {})
+    geometry = feature.get('geometry') or {}
+    if geometry.get('type') == 'Point' and 'coordinates' not in record:
+        coordinates = geometry.get('coordinates')
+        if isinstance(coordinates, list) and len(coordinates) >= 2:
+            # GeoJSON يكتب [lng, lat]
+            record['coordinates'] = [coordinates[1], coordinates[0]]
+    return record
+
+
+def read_records(path: str, fmt: Optional[str] = None) -> Iterator[Tuple[int, object]]:
+    """(رقم السطر أو العنصر, السجل) لكل سجل في الملف، بالترتيب"""
+    fmt = fmt or detect_format(path)
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        if fmt == 'csv':
+            # السطر 1 هو العناوين
+            for number, row in enumerate(csv.DictReader(f), 2):
+                yield number, row
+        elif fmt == 'jsonl':
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield number, RecordError(f"JSON غير صالح: {e}")
+                    continue
+                if isinstance(record, dict) and record.get('type') == 'Feature':
+                    record = _flatten_feature(record)
+                yield number, record
+        elif fmt == 'geojson':
+            for number, feature in enumerate(iter_json_array(f, 'features'), 1):
+                yield number, _flatten_feature(feature) if isinstance(feature, dict) else feature
+        else:
+            raise ValueError(f"صيغة غير مدعومة: {fmt}")
+
+
+# ===== التحقق =====
+
+def _text(record: Dict, keys: Tuple[str, ...], max_length: int, required: bool = True) -> Optional[str]:
+    for key in keys:
+        value = record.get(key)
+        if value is not None and str(value).strip():
+            value = str(value).strip()
+            if len(value) > max_length:
+                raise RecordError(f"{keys[0]} أطول من {max_length} حرفاً")
+            return value
+    if required:
+        raise RecordError(f"{keys[0]} مطلوب")
+    return None
+
+
+def location_row(record) -> Tuple[str, str, str, Optional[str]]:
+    """سجل مكان -> (name, neighborhood, category, coordinates)"""
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise RecordError("السجل يجب أن يكون كائناً")
+    name = _text(record, ('name',), NAME_MAX)
+    neighborhood = _text(record, ('neighborhood',), GROUP_MAX)
+    category = _text(record, ('category',), GROUP_MAX)
+
+    value = record.get('coordinates')
+    if value in (None, '') and record.get('lat') not in (None, ''):
+        value = [record.get('lat'), record.get('lng')]
+    coordinates = None
+    if value not in (None, ''):
+        point = parse_coordinates(value)
+        if point is None:
+            raise RecordError(f"إحداثيات غير صالحة: {value!r}")
+        coordinates = f"{point[0]:.7f}, {point[1]:.7f}"
+    return name, neighborhood, category, coordinates
+
+
+def route_row(record) -> Tuple[str, float, Optional[str], Optional[str], Optional[str], str]:
+    """سجل خط -> (name, fare, start_area, end_area, notes, stops كقائمة JSON)"""
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise RecordError("السجل يجب أن يكون كائناً")
+    name = _text(record, ('name', 'routeName'), NAME_MAX)
+
+    fare = record.get('fare')
+    if fare in (None, ''):
+        fare = DEFAULT_FARE
+    try:
+        # "6 جنيه مصري" كما في data.py
+        fare = float(fare.split()[0]) if isinstance(fare, str) else float(fare)
+    except (ValueError, IndexError, TypeError):
+        raise RecordError(f"أجرة غير صالحة: {record.get('fare')!r}")
+    if not 0 <= fare < 1000:
+        raise RecordError(f"أجرة غير صالحة: {fare}")
+
+    stops = record.get('stops', record.get('keyPoints'))
+    if isinstance(stops, str):
+        stops = stops.strip()
+        stops = json.loads(stops) if stops.startswith('[') else stops.split(STOP_SEPARATOR)
+    if not isinstance(stops, list):
+        raise RecordError("stops مطلوبة (قائمة أسماء المحطات)")
+    stops = [str(stop).strip() for stop in stops if stop is not None and str(stop).strip()]
+    if not stops:
+        raise RecordError("stops مطلوبة (قائمة أسماء المحطات)")
+    if any(len(stop) > NAME_MAX for stop in stops):
+        raise RecordError(f"اسم محطة أطول من {NAME_MAX} حرفاً")
+
+    return (name, fare,
+            _text(record, ('start_area', 'startArea'), NAME_MAX, required=False),
+            _text(record, ('end_area', 'endArea'), NAME_MAX, required=False),
+            _text(record, ('notes',), 10000, required=False),
+            json.dumps(stops, ensure_ascii=False))
+
+
+# ===== الدمج في قاعدة البيانات =====
+
+def ensure_schema(conn: sqlite3.Connection):
+    """جداول لوحة الإدارة وترحيلاتها (لملف قاعدة جديد أو قديم)"""
+    conn.executescript(SCHEMA)
+    migrate(conn)
+    conn.executescript("""
+        CREATE TEMP TABLE IF NOT EXISTS import_location (
+            name TEXT, neighborhood TEXT, category TEXT, coordinates TEXT);
+        CREATE TEMP TABLE IF NOT EXISTS import_route (
+            name TEXT, fare REAL, start_area TEXT, end_area TEXT, notes TEXT, stops TEXT);
+        CREATE TEMP TABLE IF NOT EXISTS import_stop (
+            route_id INTEGER, seq INTEGER, location_id INTEGER);
+        CREATE TEMP TABLE IF NOT EXISTS import_changed (route_id INTEGER PRIMARY KEY);
+    """)
+
+
+def _merge_locations(conn: sqlite3.Connection, rows: List[Tuple], now: str) -> Tuple[int, int, int]:
+    conn.execute("DELETE FROM temp.import_location")
+    conn.executemany("INSERT INTO temp.import_location VALUES (?, ?, ?, ?)", rows)
+    # عند تكرار (الحي, التصنيف, الاسم) في نفس الدفعة يُعتمد آخر سجل
+    latest = ("(SELECT rowid AS n, * FROM temp.import_location WHERE rowid IN "
+              "(SELECT MAX(rowid) FROM temp.import_location GROUP BY neighborhood, category, name))")
+    updated = conn.execute(
+        "UPDATE location SET coordinates = i.coordinates "
+        f"FROM {latest} AS i WHERE location.neighborhood = i.neighborhood AND location.category = i.category "
+        "AND location.name = i.name "
+        "AND i.coordinates IS NOT NULL AND location.coordinates IS NOT i.coordinates").rowcount
+    inserted = conn.execute(
+        "INSERT INTO location (name, category, neighborhood, coordinates, created_at) "
+        f"SELECT i.name, i.category, i.neighborhood, i.coordinates, ? FROM {latest} AS i "
+        "WHERE NOT EXISTS (SELECT 1 FROM location l WHERE l.neighborhood = i.neighborhood "
+        "AND l.category = i.category AND l.name = i.name) "
+        "ORDER BY i.n", (now,)).rowcount
+    merged = len(rows) - len({(neighborhood, category, name) for name, neighborhood, category, _ in rows})
+    return inserted, updated, merged
+
+
+def _merge_routes(conn: sqlite3.Connection, rows: List[Tuple], now: str) -> Tuple[int, int, int]:
+    conn.execute("DELETE FROM temp.import_route")
+    conn.executemany("INSERT INTO temp.import_route VALUES (?, ?, ?, ?, ?, ?)", rows)
+    latest = ("(SELECT rowid AS n, * FROM temp.import_route WHERE rowid IN "
+              "(SELECT MAX(rowid) FROM temp.import_route GROUP BY name))")
+    conn.execute("DELETE FROM temp.import_changed")
+    # النصوص الفارغة في القاعدة ('' من لوحة الإدارة) تساوي NULL بعد التحقق (_text)
+    conn.execute(
+        "INSERT OR IGNORE INTO temp.import_changed "
+        f"SELECT r.id FROM route r JOIN {latest} AS i ON r.name = i.name "
+        "WHERE r.fare IS NOT i.fare OR NULLIF(TRIM(r.start_area), '') IS NOT i.start_area "
+        "OR NULLIF(TRIM(r.end_area), '') IS NOT i.end_area OR NULLIF(TRIM(r.notes), '') IS NOT i.notes")
+    conn.execute(
+        "UPDATE route SET fare = i.fare, start_area = i.start_area, end_area = i.end_area, notes = i.notes "
+        f"FROM {latest} AS i WHERE route.name = i.name AND route.id IN (SELECT route_id FROM temp.import_changed)")
+    last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM route").fetchone()[0]
+    inserted = conn.execute(
+        "INSERT INTO route (name, fare, start_area, end_area, notes, created_at) "
+        f"SELECT i.name, i.fare, i.start_area, i.end_area, i.notes, ? FROM {latest} AS i "
+        "WHERE NOT EXISTS (SELECT 1 FROM route r WHERE r.name = i.name) ORDER BY i.n", (now,)).rowcount
+
+    # المحطات غير الموجودة تُضاف كأماكن غير مصنفة، وعند تكرار الاسم يُستخدم أقدم مكان
+    conn.execute(
+        "INSERT INTO location (name, category, neighborhood, created_at) "
+        f"SELECT j.value, ?, ?, ? FROM {latest} AS i, json_each(i.stops) j "
+        "WHERE NOT EXISTS (SELECT 1 FROM location l WHERE l.name = j.value) "
+        "GROUP BY j.value ORDER BY MIN(i.n), MIN(j.key)", (STOP_CATEGORY, UNCLASSIFIED_NEIGHBORHOOD, now))
+    conn.execute("DELETE FROM temp.import_stop")
+    conn.execute(
+        "INSERT INTO temp.import_stop "
+        "SELECT r.id, j.key, (SELECT MIN(l.id) FROM location l WHERE l.name = j.value) "
+        f"FROM route r JOIN {latest} AS i ON r.name = i.name, json_each(i.stops) j")
+
+    # محطات الخطوط تُستبدل فقط إذا تغيرت (حتى لا يمتلئ change_log بتعديلات لا تغير شيئاً)
+    conn.execute("""
+        INSERT OR IGNORE INTO temp.import_changed
+        SELECT route_id FROM (
+            SELECT route_id, seq, location_id FROM temp.import_stop
+            EXCEPT SELECT route_id, seq, location_id FROM route_stop
+                   WHERE route_id IN (SELECT route_id FROM temp.import_stop)
+        )
+        UNION
+        SELECT route_id FROM (
+            SELECT route_id, seq, location_id FROM route_stop
+            WHERE route_id IN (SELECT route_id FROM temp.import_stop)
+            EXCEPT SELECT route_id, seq, location_id FROM temp.import_stop
+        )""")
+    conn.execute("DELETE FROM route_stop WHERE route_id IN (SELECT route_id FROM temp.import_changed)")
+    conn.execute("INSERT INTO route_stop (route_id, seq, location_id) "
+                 "SELECT route_id, seq, location_id FROM temp.import_stop "
+                 "WHERE route_id IN (SELECT route_id FROM temp.import_changed)")
+    updated = conn.execute("SELECT COUNT(*) FROM temp.import_changed WHERE route_id <= ?", (last_id,)).fetchone()[0]
+    return inserted, updated, len(rows) - len({row[0] for row in rows})
+
+
+LOADERS = {
+    'locations': (location_row, _merge_locations),
+    'routes': (route_row, _merge_routes),
+}
+
+
+def load(conn: sqlite3.Connection, kind: str, records: Iterable[Tuple[int, object]],
+         batch_size: int = DEFAULT_BATCH_SIZE, dry_run: bool = False, source: str = '') -> Dict:
+    """التحقق من السجلات ودمجها على دفعات، كل دفعة في transaction واحدة
+
+    Returns:
+        إحصائيات: rows, inserted, updated, unchanged, merged (مكررة في نفس الدفعة، يُعتمد آخرها),
+        invalid, errors, seconds, rows_per_sec
+    """
+    validate, merge = LOADERS[kind]
+    stats = {'rows': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'merged': 0, 'invalid': 0, 'errors': []}
+    now = datetime.utcnow().isoformat(sep=' ')
+    started = time.perf_counter()
+    if not dry_run:
+        ensure_schema(conn)
+
+    def flush(batch):
+        if dry_run or not batch:
+            return
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            inserted, updated, merged = merge(conn, batch, now)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        stats['inserted'] += inserted
+        stats['updated'] += updated
+        stats['merged'] += merged
+
+    batch = []
+    for number, record in records:
+        stats['rows'] += 1
+        try:
+            batch.append(validate(record))
+        except (RecordError, ValueError) as e:
+            stats['invalid'] += 1
+            if len(stats['errors']) < MAX_ERROR_MESSAGES:
+                stats['errors'].append(f"{source}:{number}: {e}")
+            continue
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    flush(batch)
+
+    stats['seconds'] = time.perf_counter() - started
+    valid = stats['rows'] - stats['invalid']
+    if not dry_run:
+        # السجلات المكررة داخل الملف تُحسب مرة كإضافة/تعديل والباقي دون تغيير
+        stats['unchanged'] = max(0, valid - stats['inserted'] - stats['updated'])
+    stats['rows_per_sec'] = stats['rows'] / stats['seconds'] if stats['seconds'] else 0.0
+    return stats
+
+
+def location_records(neighborhoods: Dict) -> Iterator[Tuple[int, Dict]]:
+    """سجلات الأماكن من neighborhood_data (نفس شكل data.py)"""
+    number = 0
+    for neighborhood, categories in neighborhoods.items():
+        for category, landmarks in categories.items():
+            for landmark in landmarks:
+                number += 1
+                record = dict(landmark) if isinstance(landmark, dict) else {'name': landmark}
+                record.update(neighborhood=neighborhood, category=category)
+                yield number, record
+
+
+# ===== التصدير =====
+
+def _clean(value: Optional[str]) -> Optional[str]:
+    """نفس تنظيف الاستيراد (_text): بدون مسافات زائدة، والنص الفارغ None"""
+    return value.strip() or None if isinstance(value, str) else value
+
+
+def export_records(conn: sqlite3.Connection, kind: str) -> Iterator[Dict]:
+    """السجلات بنفس أعمدة الاستيراد (تصدير ثم استيراد لا يغير شيئاً)"""
+    if kind == 'locations':
+        for name, neighborhood, category, coordinates in conn.execute(
+                "SELECT name, neighborhood, category, coordinates FROM location ORDER BY id"):
+            yield {'name': _clean(name), 'neighborhood': _clean(neighborhood), 'category': _clean(category),
+                   'coordinates': _clean(coordinates)}
+        return
+    stops = conn.execute("SELECT rs.route_id, l.name FROM route_stop rs JOIN location l ON l.id = rs.location_id "
+                         "ORDER BY rs.route_id, rs.seq")
+    pending = next(stops, None)
+    for route_id, name, fare, start_area, end_area, notes in conn.execute(
+            "SELECT id, name, fare, start_area, end_area, notes FROM route ORDER BY id"):
+        route_stops = []
+        # الاستعلامان مرتبان بنفس المعرف: دمج دون تحميل كل المحطات في الذاكرة
+        while pending is not None and pending[0] <= route_id:
+            if pending[0] == route_id:
+                route_stops.append(pending[1])
+            pending = next(stops, None)
+        yield {'name': _clean(name), 'fare': fare, 'start_area': _clean(start_area), 'end_area': _clean(end_area),
+               'notes': _clean(notes), 'stops': [_clean(stop) for stop in route_stops]}
+
+
+def write_records(records: Iterable[Dict], path: str, kind: str, fmt: Optional[str] = None) -> int:
+    fmt = fmt or detect_format(path)
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            writer = None
+            for record in records:
+                if kind == 'routes':
+                    record = dict(record, stops=STOP_SEPARATOR.join(record['stops']))
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=list(record))
+                    writer.writeheader()
+                writer.writerow(record)
+                count += 1
+        elif fmt == 'jsonl':
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                count += 1
+        elif fmt == 'geojson':
+            f.write('{"type": "FeatureCollection", "features": [\n')
+            for record in records:
+                point = parse_coordinates(record.get('coordinates')) if kind == 'locations' else None
+                properties = {key: value for key, value in record.items() if key != 'coordinates' or not point}
+                geometry = {'type': 'Point', 'coordinates': [point[1], point[0]]} if point else None
+                f.write((',\n' if count else '') + json.dumps(
+                    {'type': 'Feature', 'geometry': geometry, 'properties': properties}, ensure_ascii=False))
+                count += 1
+            f.write('\n]}\n')
+        else:
+            raise ValueError(f"صيغة غير مدعومة: {fmt}")
+    return count
+
+
+def main():
+    from database_helper import DATABASE_PATH
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('action', choices=['import', 'export'])
+    parser.add_argument('kind', choices=sorted(LOADERS))
+    parser.add_argument('path')
+    parser.add_argument('--db', default=DATABASE_PATH, help='ملف قاعدة البيانات (افتراضياً قاعدة لوحة الإدارة)')
+    parser.add_argument('--format', choices=sorted(set(FORMATS.values())), help='افتراضياً من امتداد الملف')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='سجلات كل transaction')
+    parser.add_argument('--dry-run', action='store_true', help='التحقق فقط دون الكتابة في القاعدة')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, isolation_level=None)
+    try:
+        configure_connection(conn)
+        if args.action == 'export':
+            # قاعدة لم تُرحّل بعد (بدون route_stop) تُرحّل قبل القراءة كما في الاستيراد
+            ensure_schema(conn)
+            started = time.perf_counter()
+            count = write_records(export_records(conn, args.kind), args.path, args.kind, args.format)
+            seconds = time.perf_counter() - started
+            print(f"{args.kind}: exported {count} rows to {args.path} in {seconds:.2f}s "
+                  f"({count / seconds if seconds else 0:,.0f} rows/s)")
+            return
+        stats = load(conn, args.kind, read_records(args.path, args.format), args.batch_size,
+                     args.dry_run, source=args.path)
+    finally:
+        conn.close()
+
+    for error in stats['errors']:
+        print(f"  ✗ {error}", file=sys.stderr)
+    if args.dry_run:
+        print(f"{args.kind}: {stats['rows']} rows checked, {stats['invalid']} invalid "
+              f"in {stats['seconds']:.2f}s ({stats['rows_per_sec']:,.0f} rows/s)")
+    else:
+        print(f"{args.kind}: {stats['rows']} rows ({stats['inserted']} inserted, {stats['updated']} updated, "
+              f"{stats['unchanged']} unchanged, {stats['merged']} merged, {stats['invalid']} invalid) in {stats['seconds']:.2f}s "
+              f"({stats['rows_per_sec']:,.0f} rows/s)")
+    sys.exit(1 if stats['invalid'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+تطبيق تغييرات لوحة الإدارة على بيانات البوت في الذاكرة أولاً بأول
+
+البوت يقرأ /api/export?since=<version> (سطور NDJSON من سجل التغييرات change_log)
+كل فترة، ويطبق كل upsert/delete على routes_data و neighborhood_data في نفس
+الكائنات، ثم يبلغ المستمعين (محرك المسارات، فهرس البحث، الإحداثيات) بالتغيير
+فقط، فلا يحتاج تعديل واحد إلى إعادة توليد data_dynamic.py أو إعادة بناء الفهارس.
+"""
+
+import os
+import json
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+from db_migrations import UNCLASSIFIED_NEIGHBORHOOD
+from geo_index import Point, parse_coordinates
+
+logger = logging.getLogger(__name__)
+
+# فارغ = تعطيل المتابعة (مثلاً عند تشغيل البوت بدون لوحة الإدارة)
+CHANGE_FEED_URL = os.getenv('CHANGE_FEED_URL', 'http://127.0.0.1:5000/api/export')
+CHANGE_FEED_INTERVAL_S = float(os.getenv('CHANGE_FEED_INTERVAL_S', '15'))
+CHANGE_FEED_TIMEOUT_S = 30
+
+
+class ChangeListener:
+    """واجهة المستمع: كل دالة تُستدعى بعد تعديل البيانات نفسها"""
+
+    def route_added(self, route: Dict):
+        pass
+
+    def route_removed(self, route: Dict):
+        pass
+
+    def landmark_added(self, landmark, neighborhood: str, category: str, point: Optional[Point]):
+        """landmark: اسم المعلم (نص) أو قاموس كما في data.py"""
+
+    def landmark_removed(self, landmark, neighborhood: str, category: str):
+        pass
+
+
+def landmark_name(landmark) -> Optional[str]:
+    if isinstance(landmark, dict):
+        return landmark.get('name')
+    return landmark if isinstance(landmark, str) else None
+
+
+def _position(landmarks: List, entry) -> Optional[int]:
+    """موضع المعلم في القائمة: نفس القاموس، أو أول نص مساوٍ (النصوص المتساوية قد تكون نفس الكائن)"""
+    for index, item in enumerate(landmarks):
+        if item is entry or (isinstance(entry, str) and item == entry):
+            return index
+    return None
+
+
+class ChangeFeed:
+    """مستهلك سجل التغييرات: يحفظ آخر نسخة طبقها ويطلب ما بعدها فقط"""
+
+    def __init__(self, routes: List[Dict], neighborhoods: Dict, listeners: Iterable[ChangeListener] = (),
+                 url: str = CHANGE_FEED_URL):
+        self.routes = routes
+        self.neighborhoods = neighborhoods
+        self.listeners = list(listeners)
+        self.url = url
+        self.version = 0
+        # معرف الصف في قاعدة البيانات -> الكائن في الذاكرة
+        self.route_by_id: Dict[int, Dict] = {}
+        self.landmark_by_id: Dict[int, Tuple[str, str, object]] = {}
+        self._session = requests.Session()
+
+    # ===== القراءة =====
+
+    def fetch(self) -> List[Dict]:
+        """سطور التغييرات بعد self.version (قائمة فارغة عند 304)"""
+        response = self._session.get(self.url, params={'since': self.version}, stream=True,
+                                     headers={'If-None-Match': f'"v{self.version}-since{self.version}"'},
+                                     timeout=CHANGE_FEED_TIMEOUT_S)
+        with response:
+            if response.status_code == 304:
+                return []
+            if response.status_code == 400:
+                # القاعدة أعيد إنشاؤها (نسخة أقدم مما طبقناه): مزامنة كاملة من جديد
+                logger.warning("Change feed version %d is ahead of the dashboard, resyncing", self.version)
+                self.version = 0
+                return self.fetch()
+            response.raise_for_status()
+            return [json.loads(line) for line in response.iter_lines() if line]
+
+    def poll(self) -> int:
+        return self.apply(self.fetch())
+
+    async def run(self, interval: float = CHANGE_FEED_INTERVAL_S):
+        """حلقة المتابعة في الخلفية: الطلب في thread، والتطبيق على حلقة البوت نفسها"""
+        failing = False
+        while True:
+            try:
+                lines = await asyncio.to_thread(self.fetch)
+                applied = self.apply(lines)
+                if applied:
+                    logger.info("Applied %d dashboard changes (dataset version %d)", applied, self.version)
+                failing = False
+            except (requests.RequestException, ValueError) as e:
+                if not failing:
+                    logger.warning("Change feed unavailable: %s", e)
+                failing = True
+            await asyncio.sleep(interval)
+
+    # ===== التطبيق =====
+
+    def apply(self, lines: List[Dict]) -> int:
+        """تطبيق سطور NDJSON من /api/export?since= وإرجاع عدد التغييرات"""
+        applied = 0
+        version = self.version
+        for line in lines:
+            kind, op = line.get('type'), line.get('op')
+            if kind == 'meta':
+                version = line['version']
+                continue
+            if kind == 'route':
+                if op == 'upsert':
+                    self._upsert_route(line['id'], line['data'], line.get('previous_names', []))
+                else:
+                    self._delete_route(line['id'], line.get('names', []))
+            elif kind == 'location':
+                if op == 'upsert':
+                    self._upsert_location(line['id'], line['data'], line.get('previous_names', []))
+                else:
+                    self._delete_location(line['id'], line.get('names', []))
+            else:
+                continue
+            applied += 1
+        self.version = version
+        return applied
+
+    def _notify(self, method: str, *args):
+        for listener in self.listeners:
+            getattr(listener, method)(*args)
+
+    def _find_route(self, route_id: int, names: List[str]) -> Optional[Dict]:
+        route = self.route_by_id.get(route_id)
+        if route is not None:
+            return route
+        # أول مزامنة: الخطوط المحملة من data.py لا تعرف معرفاتها في القاعدة
+        known = {id(item) for item in self.route_by_id.values()}
+        for route in self.routes:
+            if route.get('routeName') in names and id(route) not in known:
+                return route
+        return None
+
+    def _upsert_route(self, route_id: int, data: Dict, previous_names: List[str]):
+        old = self._find_route(route_id, previous_names + [data['routeName']])
+        # حقول غير موجودة في القاعدة (مثل startCoordinates) تبقى كما هي
+        route = dict(old or {}, **{key: value for key, value in data.items() if value is not None})
+        if old is None:
+            self.routes.append(route)
+        else:
+            self.routes[next(i for i, item in enumerate(self.routes) if item is old)] = route
+            self._notify('route_removed', old)
+        self.route_by_id[route_id] = route
+        self._notify('route_added', route)
+
+    def _delete_route(self, route_id: int, names: List[str]):
+        route = self._find_route(route_id, names)
+        if route is None:
+            return
+        self.route_by_id.pop(route_id, None)
+        self.routes[:] = [item for item in self.routes if item is not route]
+        self._notify('route_removed', route)
+
+    def _find_landmark(self, location_id: int, names: List[str]) -> Optional[Tuple[str, str, object]]:
+        found = self.landmark_by_id.get(location_id)
+        if found is not None:
+            return found
+        known = {(neighborhood, category, landmark_name(entry))
+                 for neighborhood, category, entry in self.landmark_by_id.values()}
+        for neighborhood, categories in self.neighborhoods.items():
+            for category, landmarks in categories.items():
+                for landmark in landmarks:
+                    name = landmark_name(landmark)
+                    if name in names and (neighborhood, category, name) not in known:
+                        return neighborhood, category, landmark
+        return None
+
+    def _remove_entry(self, neighborhood: str, category: str, entry):
+        landmarks = self.neighborhoods.get(neighborhood, {}).get(category, [])
+        index = _position(landmarks, entry)
+        if index is not None:
+            del landmarks[index]
+        # لا أحياء أو تصنيفات فارغة في لوحة المفاتيح
+        if not landmarks:
+            self.neighborhoods[neighborhood].pop(category, None)
+            if not self.neighborhoods[neighborhood]:
+                del self.neighborhoods[neighborhood]
+
+    def _upsert_location(self, location_id: int, data: Dict, previous_names: List[str]):
+        name, neighborhood, category = data['name'], data['neighborhood'], data['category']
+        if neighborhood == UNCLASSIFIED_NEIGHBORHOOD:
+            # محطات أضافتها الخطوط ولم يصنفها المشرف بعد: ليست معالم في قائمة الأحياء
+            if location_id in self.landmark_by_id:
+                self._delete_location(location_id, previous_names + [name])
+            return
+        found = self._find_landmark(location_id, previous_names + [name])
+        entry = name
+        landmarks = self.neighborhoods.setdefault(neighborhood, {}).setdefault(category, [])
+        if found is None:
+            landmarks.append(entry)
+        else:
+            old_neighborhood, old_category, old_entry = found
+            self._notify('landmark_removed', old_entry, old_neighborhood, old_category)
+            if isinstance(old_entry, dict):
+                # بيانات served_by والإحداثيات من data.py تبقى مع المعلم
+                entry = dict(old_entry, name=name)
+            if (old_neighborhood, old_category) == (neighborhood, category):
+                # نفس المكان في القائمة حتى لا يتغير ترتيب لوحة المفاتيح
+                index = _position(landmarks, old_entry)
+                if index is None:
+                    landmarks.append(entry)
+                else:
+                    landmarks[index] = entry
+            else:
+                landmarks.append(entry)
+                self._remove_entry(old_neighborhood, old_category, old_entry)
+        point = parse_coordinates(data.get('coordinates'))
+        if isinstance(entry, dict):
+            if point:
+                entry['coordinates'] = data['coordinates']
+            else:
+                point = parse_coordinates(entry.get('coordinates'))
+        self.landmark_by_id[location_id] = (neighborhood, category, entry)
+        self._notify('landmark_added', entry, neighborhood, category, point)
+
+    def _delete_location(self, location_id: int, names: List[str]):
+        found = self._find_landmark(location_id, names)
+        if found is None:
+            return
+        self.landmark_by_id.pop(location_id, None)
+        neighborhood, category, entry = found
+        self._remove_entry(neighborhood, category, entry)
+        self._notify('landmark_removed', entry, neighborhood, category)
@@ -3,38 +3,73 @@
 مساعد قاعدة البيانات لقراءة البيانات للبوت
 """
 
+import os
 import sqlite3
-import json
+import threading
+
+from db_migrations import BUSY_TIMEOUT_MS, LATEST_VERSION, schema_version
+
+# نفس الملف الذي تستخدمه لوحة الإدارة (Flask-SQLAlchemy يضع المسارات النسبية داخل instance/)
+DATABASE_PATH = os.getenv('ADMIN_DB_PATH', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'instance', 'admin_bot.db'))
+
+_local = threading.local()
+
+class SchemaOutdated(RuntimeError):
+    """القاعدة لم تُرحّل بعد (جدول route_stop غير موجود)"""
+
+def require_schema(conn: sqlite3.Connection):
+    """البوت يقرأ فقط: الترحيل مسؤولية لوحة الإدارة أو python db_migrations.py"""
+    version = schema_version(conn)
+    if version < LATEST_VERSION:
+        raise SchemaOutdated(f"نسخة مخطط القاعدة {version} أقدم من {LATEST_VERSION}؛ "
+                             f"شغّل لوحة الإدارة أو python db_migrations.py")
+
+def get_connection() -> sqlite3.Connection:
+    """اتصال قراءة مشترك لكل thread (بدلاً من فتح اتصال جديد لكل استعلام)
+
+    وضع WAL تفعله لوحة الإدارة ويبقى محفوظاً في الملف، فالقراءة هنا لا تنتظر الكتابة هناك.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(DATABASE_PATH, timeout=BUSY_TIMEOUT_MS / 1000)
+        _local.conn = conn
+    return conn
 
 def get_routes_from_db():
     """قراءة جميع الخطوط من قاعدة البيانات"""
     try:
-        conn = sqlite3.connect('admin_bot.db')
+        conn = get_connection()
+        require_schema(conn)
         cursor = conn.cursor()
         
-        cursor.execute("SELECT name, fare, start_area, end_area, key_points, notes FROM route")
+        cursor.execute("SELECT id, name, fare, start_area, end_area, notes FROM route ORDER BY id")
         routes = cursor.fetchall()
         
+        # محطات كل الخطوط في استعلام واحد بالترتيب
+        key_points = {}
+        cursor.execute("SELECT rs.route_id, l.name FROM route_stop rs JOIN location l ON l.id = rs.location_id "
+                       "ORDER BY rs.route_id, rs.seq")
+        for route_id, stop_name in cursor:
+            key_points.setdefault(route_id, []).append(stop_name)
+        
         routes_data = []
         for route in routes:
-            name, fare, start_area, end_area, key_points_json, notes = route
-            try:
-                key_points = json.loads(key_points_json) if key_points_json else []
-            except:
-                key_points = []
+            route_id, name, fare, start_area, end_area, notes = route
             
             route_data = {
                 'routeName': name,
                 'fare': f"{fare} جنيه مصري",
                 'startArea': start_area or '',
                 'endArea': end_area or '',
-                'keyPoints': key_points,
+                'keyPoints': key_points.get(route_id, []),
                 'notes': notes or ''
             }
             routes_data.append(route_data)
         
-        conn.close()
         return routes_data
+    except SchemaOutdated:
+        raise
     except Exception as e:
         print(f"خطأ في قراءة الخطوط من قاعدة البيانات: {e}")
         return []
@@ -42,8 +77,7 @@ def get_routes_from_db():
 def get_neighborhoods_from_db():
     """قراءة جميع الأحياء والأماكن من قاعدة البيانات"""
     try:
-        conn = sqlite3.connect('admin_bot.db')
-        cursor = conn.cursor()
+        cursor = get_connection().cursor()
         
         cursor.execute("SELECT neighborhood, category, name FROM location ORDER BY neighborhood, category, name")
         locations = cursor.fetchall()
@@ -60,12 +94,71 @@ def get_neighborhoods_from_db():
             
             neighborhood_data[neighborhood][category].append(name)
         
-        conn.close()
         return neighborhood_data
     except Exception as e:
         print(f"خطأ في قراءة الأماكن من قاعدة البيانات: {e}")
         return {}
 
+def get_location_coordinates_from_db():
+    """قراءة أسماء الأماكن وإحداثياتها (نص حر) من قاعدة البيانات"""
+    if not os.path.exists(DATABASE_PATH):
+        return []
+    try:
+        cursor = get_connection().cursor()
+        cursor.execute("SELECT name, coordinates FROM location WHERE coordinates IS NOT NULL AND coordinates != ''")
+        return cursor.fetchall()
+    except Exception as e:
+        print(f"خطأ في قراءة الإحداثيات من قاعدة البيانات: {e}")
+        return []
+
+def get_residential_areas_from_db():
+    """قراءة المناطق السكنية (الحي، الاسم) من قاعدة البيانات"""
+    if not os.path.exists(DATABASE_PATH):
+        return []
+    try:
+        cursor = get_connection().cursor()
+        cursor.execute("SELECT neighborhood, name FROM location WHERE category LIKE 'مناطق سكنية%'")
+        return cursor.fetchall()
+    except Exception as e:
+        print(f"خطأ في قراءة المناطق السكنية من قاعدة البيانات: {e}")
+        return []
+
+def get_routes_through_stop(stop_name: str):
+    """الخطوط التي تمر بمحطة (بالاسم): [(اسم الخط, ترتيب المحطة في الخط)] عبر فهرس route_stop"""
+    try:
+        conn = get_connection()
+        require_schema(conn)
+        cursor = conn.cursor()
+        cursor.execute("SELECT r.name, rs.seq FROM location l "
+                       "JOIN route_stop rs ON rs.location_id = l.id "
+                       "JOIN route r ON r.id = rs.route_id "
+                       "WHERE l.name = ? ORDER BY r.name, rs.seq", (stop_name,))
+        return cursor.fetchall()
+    except SchemaOutdated:
+        raise
+    except Exception as e:
+        print(f"خطأ في قراءة خطوط المحطة من قاعدة البيانات: {e}")
+        return []
+
+def get_routes_between_stops(start_name: str, end_name: str):
+    """الخطوط التي تمر بالمحطتين بالترتيب الصحيح: [(اسم الخط, ترتيب الركوب, ترتيب النزول)]"""
+    try:
+        conn = get_connection()
+        require_schema(conn)
+        cursor = conn.cursor()
+        cursor.execute("SELECT r.name, a.seq, b.seq FROM location ls "
+                       "JOIN route_stop a ON a.location_id = ls.id "
+                       "JOIN route_stop b ON b.route_id = a.route_id AND b.seq > a.seq "
+                       "JOIN location le ON le.id = b.location_id "
+                       "JOIN route r ON r.id = a.route_id "
+                       "WHERE ls.name = ? AND le.name = ? ORDER BY b.seq - a.seq, r.name", (start_name, end_name))
+        return cursor.fetchall()
+    except SchemaOutdated:
+        raise
+    except Exception as e:
+        print(f"خطأ في البحث عن الخطوط بين المحطتين: {e}")
+        return []
+
 def update_bot_data():
     """تحديث ملف البيانات للبوت"""
     try:
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+ترحيلات (migrations) قاعدة بيانات لوحة الإدارة وإعدادات اتصالات SQLite
+
+رقم نسخة المخطط محفوظ في PRAGMA user_version داخل ملف القاعدة نفسه، وكل
+ترحيل يُطبق مرة واحدة بالترتيب داخل transaction. الجداول نفسها تُنشأ من
+نماذج admin_dashboard (db.create_all)، والترحيلات تضيف ما يلزم للقواعد الموجودة.
+"""
+
+import os
+import sqlite3
+import logging
+from typing import Callable, List, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# مهلة انتظار القفل بالمللي ثانية بدلاً من "database is locked" فوراً
+BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+
+# المكان الذي تُضاف إليه محطات الخطوط غير الموجودة في جدول الأماكن
+UNCLASSIFIED_NEIGHBORHOOD = 'غير مصنف'
+STOP_CATEGORY = 'محطات'
+
+
+def _move_key_points(conn: sqlite3.Connection):
+    """نقل route.key_points (JSON) إلى route_stop ثم حذف العمود (القواعد الجديدة لا تحتويه أصلاً)"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(route)")]
+    if 'key_points' not in columns:
+        return
+    # الأسماء تُقارن بعد حذف المسافات الزائدة (" بوابة الأمن المركزي" هي "بوابة الأمن المركزي")
+    stops = ("FROM route r, json_each(r.key_points) j "
+             "WHERE json_valid(r.key_points) AND json_type(r.key_points) = 'array' AND j.type = 'text' "
+             "AND TRIM(j.value) != ''")
+    # أسماء المحطات غير الموجودة تُضاف كأماكن "غير مصنفة" ليراجعها المشرف
+    conn.execute("INSERT INTO location (name, category, neighborhood, created_at) "
+                 "SELECT TRIM(j.value), ?, ?, CURRENT_TIMESTAMP " + stops +
+                 " AND NOT EXISTS (SELECT 1 FROM location l WHERE TRIM(l.name) = TRIM(j.value)) "
+                 "GROUP BY TRIM(j.value) ORDER BY MIN(r.id), MIN(j.key)",
+                 (STOP_CATEGORY, UNCLASSIFIED_NEIGHBORHOOD))
+    # عند تكرار الاسم في أكثر من حي يُستخدم أقدم مكان؛ ترقيم المحطات متصل بعد تجاهل الأسماء الفارغة
+    conn.execute("INSERT INTO route_stop (route_id, seq, location_id) "
+                 "SELECT r.id, ROW_NUMBER() OVER (PARTITION BY r.id ORDER BY j.key) - 1, "
+                 "(SELECT MIN(l.id) FROM location l WHERE TRIM(l.name) = TRIM(j.value)) " + stops)
+    conn.execute("ALTER TABLE route DROP COLUMN key_points")
+
+
+Statement = Union[str, Callable[[sqlite3.Connection], None]]
+
+# (النسخة, الوصف, أوامر SQL أو دوال تستقبل الاتصال)
+MIGRATIONS: List[Tuple[int, str, List[Statement]]] = [
+    (1, "فهارس ترتيب وتصفية الأماكن والخطوط", [
+        "CREATE INDEX IF NOT EXISTS ix_location_neighborhood_category_name "
+        "ON location (neighborhood, category, name)",
+        "CREATE INDEX IF NOT EXISTS ix_location_category ON location (category)",
+        "CREATE INDEX IF NOT EXISTS ix_location_name ON location (name)",
+        "CREATE INDEX IF NOT EXISTS ix_route_name ON route (name)",
+        "CREATE INDEX IF NOT EXISTS ix_route_created_at ON route (created_at)",
+    ]),
+    (2, "سجل التغييرات (change_log) ونسخة البيانات للتصدير التزايدي", [
+        "CREATE TABLE IF NOT EXISTS change_log ("
+        " version INTEGER PRIMARY KEY AUTOINCREMENT,"
+        " entity VARCHAR(20) NOT NULL,"
+        " entity_id INTEGER NOT NULL,"
+        " op VARCHAR(10) NOT NULL,"
+        " old_name VARCHAR(200),"
+        " changed_at DATETIME DEFAULT CURRENT_TIMESTAMP)",
+        "CREATE INDEX IF NOT EXISTS ix_change_log_entity ON change_log (entity, entity_id)",
+        # الصفوف الموجودة قبل الترحيل تُسجل كإضافات حتى يكون since=0 مساوياً للتصدير الكامل
+        "INSERT INTO change_log (entity, entity_id, op) SELECT 'location', id, 'insert' FROM location ORDER BY id",
+        "INSERT INTO change_log (entity, entity_id, op) SELECT 'route', id, 'insert' FROM route ORDER BY id",
+    ] + [
+        statement
+        for table in ('location', 'route')
+        for statement in (
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO change_log (entity, entity_id, op) VALUES ('{table}', NEW.id, 'insert'); END",
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_update AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO change_log (entity, entity_id, op, old_name) VALUES ('{table}', NEW.id, 'update', OLD.name); END",
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_delete AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO change_log (entity, entity_id, op, old_name) VALUES ('{table}', OLD.id, 'delete', OLD.name); END",
+        )
+    ]),
+    (3, "محطات الخطوط في جدول route_stop بدلاً من عمود key_points", [
+        "CREATE TABLE IF NOT EXISTS route_stop ("
+        " route_id INTEGER NOT NULL REFERENCES route (id) ON DELETE CASCADE,"
+        " seq INTEGER NOT NULL,"
+        " location_id INTEGER NOT NULL REFERENCES location (id) ON DELETE CASCADE,"
+        " PRIMARY KEY (route_id, seq))",
+        "CREATE INDEX IF NOT EXISTS ix_route_stop_location ON route_stop (location_id)",
+        _move_key_points,
+        # تغيير المحطات أو اسم مكان يمر به الخط يغير بيانات الخط المصدرة
+        "CREATE TRIGGER IF NOT EXISTS trg_route_stop_insert AFTER INSERT ON route_stop BEGIN "
+        "INSERT INTO change_log (entity, entity_id, op) VALUES ('route', NEW.route_id, 'update'); END",
+        "CREATE TRIGGER IF NOT EXISTS trg_route_stop_update AFTER UPDATE ON route_stop BEGIN "
+        "INSERT INTO change_log (entity, entity_id, op) VALUES ('route', NEW.route_id, 'update'); END",
+        "CREATE TRIGGER IF NOT EXISTS trg_route_stop_delete AFTER DELETE ON route_stop BEGIN "
+        "INSERT INTO change_log (entity, entity_id, op) VALUES ('route', OLD.route_id, 'update'); END",
+        "CREATE TRIGGER IF NOT EXISTS trg_location_rename_routes AFTER UPDATE OF name ON location "
+        "WHEN OLD.name != NEW.name BEGIN "
+        "INSERT INTO change_log (entity, entity_id, op) "
+        "SELECT DISTINCT 'route', route_id, 'update' FROM route_stop WHERE location_id = NEW.id; END",
+        # بدون PRAGMA foreign_keys تبقى ON DELETE CASCADE غير مفعلة، فالحذف هنا صريح
+        "CREATE TRIGGER IF NOT EXISTS trg_location_delete_stops AFTER DELETE ON location BEGIN "
+        "DELETE FROM route_stop WHERE location_id = OLD.id; END",
+        "CREATE TRIGGER IF NOT EXISTS trg_route_delete_stops AFTER DELETE ON route BEGIN "
+        "DELETE FROM route_stop WHERE route_id = OLD.id; END",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def configure_connection(conn: sqlite3.Connection):
+    """WAL (القراءة من البوت لا تنتظر كتابة اللوحة) مع مهلة انتظار للأقفال"""
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    # آمن مع WAL: قد تضيع آخر transaction عند انقطاع الكهرباء فقط، دون إفساد القاعدة
+    conn.execute("PRAGMA synchronous = NORMAL")
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """تطبيق الترحيلات الناقصة وإرجاع عددها"""
+    current = schema_version(conn)
+    applied = 0
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            # PRAGMA لا تقبل معاملات (?)؛ النسخة رقم صحيح من القائمة أعلاه
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        logger.info("Applied schema migration %d: %s", version, description)
+        applied += 1
+    return applied
+
+
+# نسخة البيانات الحالية = آخر رقم في change_log (يزيد مع كل إضافة/تعديل/حذف)
+DATASET_VERSION_SQL = "SELECT COALESCE(MAX(version), 0) FROM change_log"
+
+
+def dataset_version(conn: sqlite3.Connection) -> int:
+    return conn.execute(DATASET_VERSION_SQL).fetchone()[0]
+
+
+def migrate_file(path: str) -> int:
+    """تطبيق الترحيلات على ملف قاعدة بيانات (مع تفعيل WAL)"""
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        configure_connection(conn)
+        return migrate(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    import sys
+    from database_helper import DATABASE_PATH
+
+    logging.basicConfig(level=logging.INFO)
+    target = sys.argv[1] if len(sys.argv) > 1 else DATABASE_PATH
+    print(f"{target}: applied {migrate_file(target)} migration(s), schema version {LATEST_VERSION}")
@@ -24,6 +24,8 @@ try:
     from admin_system import admin_system
     from nlp_search import initialize_nlp_system
     from maps_integration import maps_integration, website_integration
+    from response_composer import ResponseComposer, SEARCHING_TEXT
+    from send_queue import SendQueue
 except ImportError as e:
     print(f"!!! خطأ في الاستيراد: {e}")
     exit()
@@ -224,9 +226,9 @@ async def handle_nlp_search(update: Update, context: ContextTypes.DEFAULT_TYPE)
         )
         return SELECTING_START_NEIGHBORHOOD
     
-    # معالجة الاستفهام
+    # معالجة الاستفهام: النتيجة والخريطة والأزرار في تعديل واحد لرسالة الانتظار
     try:
-        await update.message.reply_text("🔍 جاري البحث...")
+        placeholder = await update.message.reply_text(SEARCHING_TEXT)
         
         search_result = nlp_system.search_route_from_text(user_text)
         
@@ -236,13 +238,11 @@ async def handle_nlp_search(update: Update, context: ContextTypes.DEFAULT_TYPE)
             end_name = search_result['end_location']['name']
             
             # البحث عن المسار
-            route_result = find_route_with_proximity(start_name, end_name, routes_data, neighborhood_data)
-            
-            # إرسال النتيجة
-            await update.message.reply_text(route_result, parse_mode=ParseMode.MARKDOWN)
+            reply = ResponseComposer().add(
+                find_route_with_proximity(start_name, end_name, routes_data, neighborhood_data))
             
             # إضافة خرائط جوجل
-            await send_google_maps_link(update.message.chat_id, context, end_name)
+            add_google_maps_link(reply, end_name)
             
         elif search_result['status'] == 'partial_match':
             # تم العثور على مكان واحد فقط
@@ -250,7 +250,7 @@ async def handle_nlp_search(update: Update, context: ContextTypes.DEFAULT_TYPE)
             if search_result['suggestions']:
                 message += "\n\nاقتراحات:\n" + "\n".join(search_result['suggestions'])
             
-            await update.message.reply_text(message)
+            reply = ResponseComposer(parse_mode=None).add(message)
             
         else:
             # لم يتم العثور على أي مكان
@@ -258,17 +258,14 @@ async def handle_nlp_search(update: Update, context: ContextTypes.DEFAULT_TYPE)
             if search_result['suggestions']:
                 message += "\n\nهل قصدت أحد هذه الأماكن؟\n" + "\n".join(search_result['suggestions'])
             
-            await update.message.reply_text(message)
+            reply = ResponseComposer(parse_mode=None).add(message)
         
         # إضافة أزرار للمتابعة
-        keyboard = [[
+        reply.add_row(
             InlineKeyboardButton("🔍 بحث جديد", callback_data="nlp_search"),
             InlineKeyboardButton("🔙 القائمة الرئيسية", callback_data="back_to_main")
-        ]]
-        await update.message.reply_text(
-            "ماذا تريد أن تفعل الآن؟",
-            reply_markup=InlineKeyboardMarkup(keyboard)
         )
+        await reply.edit(placeholder)
         
     except Exception as e:
         logger.exception(f"Error in NLP search: {e}")
@@ -278,50 +275,35 @@ async def handle_nlp_search(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     return SELECTING_START_NEIGHBORHOOD
 
-async def send_google_maps_link(chat_id: int, context: ContextTypes.DEFAULT_TYPE, location_name: str):
-    """إرسال رابط خرائط جوجل"""
+def add_google_maps_link(reply: ResponseComposer, location_name: str):
+    """إضافة رابط خرائط جوجل ومعلومات الموقع إلى الرد"""
     try:
         location_data = maps_integration.get_location_coordinates(location_name)
         
         if location_data and location_data.get('maps_url'):
-            keyboard = [[
-                InlineKeyboardButton(
-                    f"🗺️ عرض '{location_name}' على الخريطة",
-                    url=location_data['maps_url']
-                )
-            ]]
-            
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text="📍 **رابط الوجهة على الخريطة:**",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode=ParseMode.MARKDOWN
-            )
+            reply.add("📍 **رابط الوجهة على الخريطة:**")
+            reply.add_row(InlineKeyboardButton(
+                f"🗺️ عرض '{location_name}' على الخريطة",
+                url=location_data['maps_url']
+            ))
             
             # إضافة معلومات إضافية من الموقع
             website_info = website_integration.get_location_info(location_name)
             if website_info:
-                info_text = f"""
+                reply.add(f"""
 🌐 **معلومات إضافية:**
 {website_info.get('description', '')}
 
 📋 **الخدمات المتاحة:**
 {' • '.join(website_info.get('services', []))}
-                """
-                
-                keyboard = [[
-                    InlineKeyboardButton("🌐 المزيد من المعلومات", url=website_info.get('website_url', '#'))
-                ]]
+                """)
                 
-                await context.bot.send_message(
-                    chat_id=chat_id,
-                    text=info_text.strip(),
-                    reply_markup=InlineKeyboardMarkup(keyboard),
-                    parse_mode=ParseMode.MARKDOWN
-                )
+                # رابط غير صالح يجعل Telegram يرفض الرسالة كلها
+                if website_info.get('website_url'):
+                    reply.add_row(InlineKeyboardButton("🌐 المزيد من المعلومات", url=website_info['website_url']))
                 
     except Exception as e:
-        logger.error(f"Error sending Google Maps link: {e}")
+        logger.error(f"Error adding Google Maps link: {e}")
 
 async def get_latest_updates() -> str:
     """الحصول على آخر التحديثات"""
@@ -544,11 +526,11 @@ async def select_end_landmark_and_find_route(update, context):
     
     await query.edit_message_text("🔍 جاري البحث عن أفضل مسار...")
     
-    result = find_route_with_proximity(start, end, routes_data, neighborhood_data)
-    await context.bot.send_message(chat_id=update.effective_chat.id, text=result, parse_mode=ParseMode.MARKDOWN)
+    reply = ResponseComposer().add(find_route_with_proximity(start, end, routes_data, neighborhood_data))
     
     # إضافة رابط خرائط
-    await send_google_maps_link(update.effective_chat.id, context, end)
+    add_google_maps_link(reply, end)
+    await reply.edit(query.message)
     
     context.user_data.clear()
     return ConversationHandler.END
@@ -566,7 +548,7 @@ async def cancel(update, context):
 
 def main() -> None:
     """تشغيل البوت المحدث"""
-    application = Application.builder().token(BOT_TOKEN).build()
+    application = Application.builder().token(BOT_TOKEN).rate_limiter(SendQueue()).build()
 
     # إعداد معالج المحادثة الرئيسي
     conv_handler = ConversationHandler(
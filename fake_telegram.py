@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+طبقة طلبات وهمية لـ Telegram Bot API للاختبارات وقياس الأداء بدون شبكة
+
+تُمرر إلى Application.builder().request(...) بحيث يعمل البوت والـ
+ConversationHandler الحقيقيان بالكامل، بينما ترد هذه الطبقة على طلبات
+الـ API محلياً وتسجل كل استدعاء.
+"""
+
+import json
+import time
+import asyncio
+from collections import Counter, defaultdict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from telegram.request import BaseRequest, RequestData
+
+FAKE_BOT_ID = 100000001
+FAKE_BOT_INFO = {
+    'id': FAKE_BOT_ID,
+    'is_bot': True,
+    'first_name': 'FakeTransportBot',
+    'username': 'fake_transport_bot',
+    'can_join_groups': True,
+    'can_read_all_group_messages': False,
+    'supports_inline_queries': True,
+}
+
+# الطلبات التي تعيد رسالة (Message)
+_MESSAGE_ENDPOINTS = {
+    'sendMessage', 'editMessageText', 'sendPhoto', 'sendDocument',
+    'sendLocation', 'editMessageReplyMarkup', 'editMessageMedia', 'editMessageCaption',
+}
+
+
+class FakeTelegramRequest(BaseRequest):
+    """محاكاة محلية لخادم Bot API
+
+    global_limit / chat_limit: أقصى عدد رسائل في أي ثانية (عام / لكل محادثة)؛ الرسالة
+    الزائدة ترجع 429 مع retry_after كما يفعل Telegram. inject_retry_after(n) يجعل
+    أول n رسائل قادمة ترجع 429 بغض النظر عن المعدل.
+    """
+
+    def __init__(self, latency: float = 0.0, global_limit: Optional[int] = None,
+                 chat_limit: Optional[int] = None, retry_after: int = 1):
+        self.latency = latency
+        self.global_limit = global_limit
+        self.chat_limit = chat_limit
+        self.retry_after = retry_after
+        self.flood_errors: Counter = Counter()
+        self._forced_errors = 0
+        self._sent_times: deque = deque()
+        self._chat_sent_times: Dict[int, deque] = defaultdict(deque)
+        self.calls: Counter = Counter()
+        self.call_log: List[Tuple[float, str, Dict[str, Any]]] = []
+        self.record_log = True
+        # آخر لوحة مفاتيح أُرسلت لكل محادثة (لتحديد الأزرار في السيناريوهات)
+        self.last_markup: Dict[int, Optional[Dict]] = {}
+        self.last_text: Dict[int, str] = {}
+        self.last_message_id: Dict[int, int] = {}
+        self.file_counter = 0
+        self._message_ids: Dict[int, int] = defaultdict(int)
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def reset(self):
+        self.calls.clear()
+        self.call_log.clear()
+        self.flood_errors.clear()
+
+    def inject_retry_after(self, count: int = 1):
+        self._forced_errors += count
+
+    def _flooded(self, endpoint: str, params: Dict[str, Any]) -> bool:
+        """هل تتجاوز هذه الرسالة حدود الإرسال (مع تسجيلها إن لم تتجاوز)"""
+        if endpoint not in _MESSAGE_ENDPOINTS or 'chat_id' not in params:
+            return False
+        if self._forced_errors:
+            self._forced_errors -= 1
+            return True
+        if self.global_limit is None and self.chat_limit is None:
+            return False
+        now = time.monotonic()
+        chat_times = self._chat_sent_times[int(params['chat_id'])]
+        for times in (self._sent_times, chat_times):
+            while times and now - times[0] >= 1.0:
+                times.popleft()
+        if (self.global_limit is not None and len(self._sent_times) >= self.global_limit) or \
+                (self.chat_limit is not None and len(chat_times) >= self.chat_limit):
+            return True
+        self._sent_times.append(now)
+        chat_times.append(now)
+        return False
+
+    async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None,
+                         read_timeout=None, write_timeout=None, connect_timeout=None,
+                         pool_timeout=None) -> Tuple[int, bytes]:
+        endpoint = url.rsplit('/', 1)[-1]
+        params = request_data.parameters if request_data else {}
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        self.calls[endpoint] += 1
+        if self._flooded(endpoint, params):
+            # الرسالة لم تُسلم: لا تظهر في call_log
+            self.flood_errors[endpoint] += 1
+            return 429, json.dumps({
+                'ok': False, 'error_code': 429,
+                'description': f'Too Many Requests: retry after {self.retry_after}',
+                'parameters': {'retry_after': self.retry_after},
+            }).encode('utf-8')
+        if self.record_log:
+            self.call_log.append((time.monotonic(), endpoint, params))
+        result = self._build_result(endpoint, params)
+        return 200, json.dumps({'ok': True, 'result': result}).encode('utf-8')
+
+    def _build_result(self, endpoint: str, params: Dict[str, Any]) -> Any:
+        if endpoint == 'getMe':
+            return FAKE_BOT_INFO
+        if endpoint in _MESSAGE_ENDPOINTS:
+            if 'inline_message_id' in params:
+                return True
+            chat_id = int(params.get('chat_id', 0))
+            if endpoint.startswith('edit'):
+                message_id = int(params.get('message_id', 0))
+            else:
+                self._message_ids[chat_id] += 1
+                message_id = self._message_ids[chat_id]
+            text = params.get('text') or params.get('caption') or ''
+            self.last_text[chat_id] = text
+            self.last_markup[chat_id] = params.get('reply_markup')
+            self.last_message_id[chat_id] = message_id
+            message = {
+                'message_id': message_id,
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'from': {k: FAKE_BOT_INFO[k] for k in ('id', 'is_bot', 'first_name', 'username')},
+                'text': text,
+            }
+            if endpoint == 'sendPhoto':
+                self.file_counter += 1
+                file_id = f'fake-photo-{self.file_counter}'
+                message['photo'] = [{'file_id': file_id, 'file_unique_id': file_id,
+                                     'width': 640, 'height': 480}]
+            elif endpoint == 'sendDocument':
+                self.file_counter += 1
+                file_id = f'fake-document-{self.file_counter}'
+                message['document'] = {'file_id': file_id, 'file_unique_id': file_id}
+            return message
+        return True
+
+    def buttons(self, chat_id: int) -> List[str]:
+        """قائمة callback_data لآخر لوحة مفاتيح أُرسلت للمحادثة"""
+        markup = self.last_markup.get(chat_id)
+        if isinstance(markup, str):
+            markup = json.loads(markup)
+        if not markup:
+            return []
+        return [button['callback_data']
+                for row in markup.get('inline_keyboard', [])
+                for button in row if 'callback_data' in button]
+
+
+# ===== بناء التحديثات (Updates) الوهمية =====
+
+class UpdateFactory:
+    """توليد JSON لتحديثات Telegram كما يرسلها الخادم"""
+
+    def __init__(self):
+        self._update_id = 0
+        self._message_id = 0
+
+    def _next_ids(self) -> Tuple[int, int]:
+        self._update_id += 1
+        self._message_id += 1
+        return self._update_id, self._message_id
+
+    @staticmethod
+    def _user(user_id: int) -> Dict[str, Any]:
+        return {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}', 'language_code': 'ar'}
+
+    def text(self, user_id: int, text: str) -> Dict[str, Any]:
+        update_id, message_id = self._next_ids()
+        message = {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': self._user(user_id),
+            'text': text,
+        }
+        if text.startswith('/'):
+            command = text.split()[0]
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(command)}]
+        return {'update_id': update_id, 'message': message}
+
+    def location(self, user_id: int, latitude: float, longitude: float) -> Dict[str, Any]:
+        update_id, message_id = self._next_ids()
+        return {
+            'update_id': update_id,
+            'message': {
+                'message_id': message_id,
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': self._user(user_id),
+                'location': {'latitude': latitude, 'longitude': longitude},
+            },
+        }
+
+    def callback(self, user_id: int, data: str, message_id: int = 1) -> Dict[str, Any]:
+        update_id, _ = self._next_ids()
+        return {
+            'update_id': update_id,
+            'callback_query': {
+                'id': str(update_id),
+                'from': self._user(user_id),
+                'chat_instance': str(user_id),
+                'data': data,
+                'message': {
+                    'message_id': message_id,
+                    'date': int(time.time()),
+                    'chat': {'id': user_id, 'type': 'private'},
+                    'from': {k: FAKE_BOT_INFO[k] for k in ('id', 'is_bot', 'first_name', 'username')},
+                    'text': '...',
+                },
+            },
+        }
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+كاش دائم لـ file_id الخاص بتيليجرام لكل ملف يرسله البوت (خرائط، نسخ احتياطية، صور)
+
+المفتاح هو hash لمحتوى الملف (أو مفتاح مشتق من مدخلات توليده)، فإذا تغير
+المحتوى تغير المفتاح تلقائياً ويتم الرفع من جديد. ويمكن ربط المفتاح باسم ثابت
+(مثل 'admin_backup') ليتم حذف الـ file_id القديم عند تغير محتوى نفس الاسم.
+"""
+
+import os
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Union
+
+from telegram.error import BadRequest
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+FILE_ID_CACHE_FILE = os.getenv('FILE_ID_CACHE_FILE', 'file_ids.json')
+
+FILE_ID_REQUESTS = metrics.registry.counter(
+    'telegram_file_id_cache_total', 'Media sends by file_id cache result (hit/miss/stale)', ['result'])
+
+# نوع الوسائط -> (دالة الإرسال في Bot, اسم الوسيط)
+_SENDERS = {
+    'photo': ('send_photo', 'photo'),
+    'document': ('send_document', 'document'),
+}
+
+Source = Union[bytes, str, Callable[[], Union[bytes, str]]]
+
+
+def content_key(data: Union[bytes, str]) -> str:
+    """hash لمحتوى الملف (bytes) أو لنص يصف مدخلات توليده"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def _file_id_from_message(message, kind: str) -> Optional[str]:
+    if message is None:
+        return None
+    if kind == 'photo':
+        return message.photo[-1].file_id if message.photo else None
+    media = getattr(message, kind, None)
+    return media.file_id if media else None
+
+
+class FileIdCache:
+    """المفتاح -> file_id مع حفظ في ملف JSON"""
+
+    def __init__(self, cache_file: str = FILE_ID_CACHE_FILE):
+        self.cache_file = cache_file
+        self.file_ids: Dict[str, str] = {}
+        self.names: Dict[str, str] = {}
+        self._save_lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.file_ids = data.get('file_ids', {})
+            self.names = data.get('names', {})
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, AttributeError) as e:
+            logger.warning("Ignoring unreadable file_id cache %s: %s", self.cache_file, e)
+
+    def _write(self, snapshot: Dict[str, Any]):
+        with self._save_lock:
+            directory = os.path.dirname(self.cache_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.cache_file}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_file)
+
+    async def save(self):
+        # النسخة تُؤخذ في حلقة الأحداث والكتابة على القرص في thread
+        snapshot = {'file_ids': dict(self.file_ids), 'names': dict(self.names)}
+        await asyncio.to_thread(self._write, snapshot)
+
+    def get(self, key: str) -> Optional[str]:
+        return self.file_ids.get(key)
+
+    def set(self, key: str, file_id: str, name: Optional[str] = None):
+        self.file_ids[key] = file_id
+        if name:
+            previous = self.names.get(name)
+            if previous and previous != key:
+                # نفس الملف المسمى بمحتوى جديد: الـ file_id القديم لم يعد صالحاً له
+                self.file_ids.pop(previous, None)
+            self.names[name] = key
+
+    def invalidate(self, key: str):
+        self.file_ids.pop(key, None)
+
+    async def send(self, bot, chat_id: int, kind: str, source: Source, key: Optional[str] = None,
+                   name: Optional[str] = None, filename: Optional[str] = None, **kwargs):
+        """إرسال ملف مع استخدام file_id المخزن إن وجد
+
+        source: محتوى الملف (bytes) أو مساره، أو دالة تعيد أحدهما وتُستدعى فقط عند الحاجة للرفع.
+        key: مفتاح الكاش؛ إذا لم يُحدد يُحسب من محتوى الملف.
+        """
+        method_name, argument = _SENDERS[kind]
+        send = getattr(bot, method_name)
+
+        if key is None:
+            source = await asyncio.to_thread(_read_source, source)
+            key = content_key(source)
+
+        file_id = self.file_ids.get(key)
+        if file_id:
+            try:
+                message = await send(chat_id=chat_id, **{argument: file_id}, **kwargs)
+                FILE_ID_REQUESTS.inc(result='hit')
+                return message
+            except BadRequest as e:
+                # file_id غير صالح أو منتهي فقط؛ أخطاء الشبكة و 429 تُرفع كما هي ويبقى الـ file_id
+                logger.warning("Cached file_id for %s rejected, re-uploading: %s", key, e)
+                FILE_ID_REQUESTS.inc(result='stale')
+                self.invalidate(key)
+        else:
+            FILE_ID_REQUESTS.inc(result='miss')
+
+        data = await asyncio.to_thread(_read_source, source)
+        message = await send(chat_id=chat_id, **{argument: data}, filename=filename, **kwargs)
+        file_id = _file_id_from_message(message, kind)
+        if file_id:
+            self.set(key, file_id, name)
+            await self.save()
+        return message
+
+
+def _read_source(source: Source) -> bytes:
+    if callable(source):
+        source = source()
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            return f.read()
+    return source
+
+
+# مثيل عام
+file_id_cache = FileIdCache()
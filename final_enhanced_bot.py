@@ -5,6 +5,8 @@ import sys
 import os
 import logging
 import json
+import re
+import asyncio
 from enum import Enum, auto
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
@@ -12,26 +14,40 @@ from urllib.parse import quote
 import requests
 from difflib import SequenceMatcher
 
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import (
+    Update, InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle, InlineQueryResultsButton,
+    InputTextMessageContent
+)
 from telegram.ext import (
-    Application, CommandHandler, CallbackQueryHandler, ConversationHandler,
-    ContextTypes, MessageHandler, filters
+    Application, ApplicationHandlerStop, CommandHandler, CallbackQueryHandler, ConversationHandler,
+    ContextTypes, InlineQueryHandler, MessageHandler, filters
 )
 from telegram.constants import ParseMode
 
 # --- Fix for imports when running from a different directory ---
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-# --- إعدادات الـ Logging ---
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", 
-    level=logging.INFO,
-    handlers=[
-        logging.FileHandler('bot.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
-logging.getLogger("httpx").setLevel(logging.WARNING)
+import metrics
+from logging_setup import setup_logging
+from routing_engine import get_engine
+from map_renderer import route_map_service, build_coordinate_index
+from file_id_cache import file_id_cache, content_key
+from geo_index import GeoIndex, collect_points
+from database_helper import get_location_coordinates_from_db
+from transfer_graph import get_transfer_graph
+from change_feed import ChangeFeed, ChangeListener, CHANGE_FEED_URL, landmark_name
+from helpers import format_transfer_options
+from response_composer import ResponseComposer, SEARCHING_TEXT, split_text
+from send_queue import SendQueue
+from subscriptions import subscription_store, alert_fanout
+from landmark_autocomplete import LandmarkAutocomplete
+from spell_correction import LandmarkSpeller
+from landmark_search import LandmarkSearch
+from arabizi import PHONETIC_MIN_SCORE, PhoneticIndex, is_arabizi, translate_keywords
+from intent_classifier import CHITCHAT, MAP, PLACE, REPORT, IntentClassifier, keyword_spans
+
+# --- إعدادات الـ Logging (غير متزامن مع تدوير ملف bot.log بصيغة JSON Lines) ---
+setup_logging('bot.log')
 logger = logging.getLogger(__name__)
 
 # --- استيراد البيانات والتوكن ---
@@ -97,6 +113,9 @@ ADMIN_IDS_FILE = "admin_ids.json"
 REPORTS_FILE = "realtime_reports.json"
 GEOCACHE_FILE = "geocache.json"
 
+# تعطيل طلبات الجيوكود الخارجية (للتشغيل بدون شبكة مثل اختبارات الحمل في CI)
+GEOCODER_OFFLINE = os.getenv('GEOCODER_OFFLINE', '').lower() in ('1', 'true', 'yes')
+
 # --- معرفات المشرفين الأساسيين ---
 SUPER_ADMIN_IDS = [1194413075]  # ضع معرفك هنا
 
@@ -227,8 +246,12 @@ class GeocodingSystem:
         """الحصول على إحداثيات مكان معين"""
         # البحث في الكاش أولاً
         if place_name in self.cache:
+            metrics.GEOCODE_CACHE.inc(result='hit')
             cached = self.cache[place_name]
             return cached['lat'], cached['lng']
+        metrics.GEOCODE_CACHE.inc(result='miss')
+        if GEOCODER_OFFLINE:
+            return None
         
         # محاولة الجيوكود باستخدام Nominatim
         try:
@@ -241,7 +264,8 @@ class GeocodingSystem:
             }
             headers = {'User-Agent': 'PortSaid-Transport-Bot/1.0'}
             
-            response = requests.get(url, params=params, headers=headers, timeout=5)
+            with metrics.EXTERNAL_CALL_LATENCY.time(service='nominatim'):
+                response = requests.get(url, params=params, headers=headers, timeout=5)
             data = response.json()
             
             if data:
@@ -262,6 +286,14 @@ class GeocodingSystem:
         
         return None
     
+    def get_cached_coordinates(self, place_name: str) -> Optional[Tuple[float, float]]:
+        """إحداثيات مكان من بيانات المعالم أو الكاش فقط (بدون طلبات شبكة)"""
+        point = landmark_coordinates.get(place_name.strip().lower())
+        if point:
+            return point
+        cached = self.cache.get(place_name)
+        return (cached['lat'], cached['lng']) if cached else None
+    
     def get_maps_url(self, place_name: str) -> str:
         """الحصول على رابط الخريطة"""
         coordinates = self.get_coordinates(place_name)
@@ -274,9 +306,55 @@ class GeocodingSystem:
             return f"https://www.google.com/maps/search/{encoded_query}"
 
 geocoding_system = GeocodingSystem()
+landmark_coordinates = build_coordinate_index(neighborhood_data)
+
+# عدد المحطات وأقصى مسافة في الرد على مشاركة الموقع
+NEAREST_STOPS_COUNT = 5
+NEAREST_MAX_DISTANCE_M = 3000
+
+# الوضع المضمّن: عدد النتائج ومدة تخزينها عند Telegram (الثواني)؛ نتائج المسارات
+# تتضمن التقارير المباشرة فمدتها أقصر
+INLINE_RESULTS = 10
+INLINE_ROUTE_RESULTS = 3
+INLINE_CACHE_TIME = 300
+INLINE_ROUTE_CACHE_TIME = 60
+INLINE_ROUTE_PATTERN = re.compile(r'^(?:من\s+)?(.+?)\s+(?:إلى|الى|لـ)\s+(.+)$')
+
+def build_geo_index() -> GeoIndex:
+    """فهرس الأماكن ذات الإحداثيات: بيانات المعالم، بدايات الخطوط، الجيوكاش وقاعدة البيانات"""
+    extra = list(geocoding_system.cache.items()) + get_location_coordinates_from_db()
+    names, points = collect_points(neighborhood_data, routes_data, extra)
+    logger.info(f"Geo index built with {len(names)} places")
+    return GeoIndex(names, points)
+
+geo_index = build_geo_index()
+
+# مقاييس أحجام المخازن (تُحسب فقط عند قراءة المقاييس)
+metrics.registry.gauge('reports_store_size', 'Total reports kept in the reports store',
+                       func=lambda: len(reports_system.reports))
+metrics.registry.gauge('reports_active', 'Reports that have not expired yet',
+                       func=lambda: len(reports_system.get_active_reports()))
+metrics.registry.gauge('geocache_entries', 'Places stored in the geocode cache',
+                       func=lambda: len(geocoding_system.cache))
 
 # ===== نظام معالجة اللغة الطبيعية =====
 
+# أزرار "هل قصدت؟" تحت نتيجة البحث الذكي
+MAX_CORRECTIONS = 3
+
+# مجموعات intent_classifier.KEYWORDS التي تُحذف من النص قبل البحث عن اسم المكان
+MAP_WORDS = ('map', 'where', 'want')
+PLACE_WORDS = ('where', 'want', 'how')
+
+REPORT_INTENT_TEXT = "🚦 يبدو أنك تريد الإبلاغ عن حالة المرور.\n\nاختر الخط وأرسل التقرير ليصل لكل من يتابعه:"
+CHITCHAT_INTENT_TEXT = (
+    "👋 أهلاً بك! اكتب طلبك بشكل مباشر مثل:\n"
+    "• إزاي أروح من الجامعة لبنك مصر؟\n"
+    "• فين مستشفى الصدر؟\n"
+    "• خريطة صن مول\n"
+    "• زحمة عند الكوبري"
+)
+
 class NLPSearchSystem:
     def __init__(self):
         self.landmarks_index = self._build_landmarks_index()
@@ -288,25 +366,44 @@ class NLPSearchSystem:
     
     def _build_landmarks_index(self) -> Dict[str, Dict]:
         """بناء فهرس لجميع المعالم للبحث السريع"""
-        index = {}
+        self.landmarks_index = {}
+        self.autocomplete = LandmarkAutocomplete()
+        self.speller = LandmarkSpeller()
+        self.phonetic = PhoneticIndex()
+        self.search = LandmarkSearch()
         for neighborhood, categories in neighborhood_data.items():
             for category, landmarks in categories.items():
                 for landmark in landmarks:
-                    if isinstance(landmark, dict):
-                        name = landmark.get('name', '').lower()
-                        index[name] = {
-                            'neighborhood': neighborhood,
-                            'category': category,
-                            'original_name': landmark.get('name', '')
-                        }
-                    elif isinstance(landmark, str):
-                        name = landmark.lower()
-                        index[name] = {
-                            'neighborhood': neighborhood,
-                            'category': category,
-                            'original_name': landmark
-                        }
-        return index
+                    self.add_landmark(landmark, neighborhood, category)
+        return self.landmarks_index
+    
+    def add_landmark(self, landmark, neighborhood: str, category: str):
+        """إضافة معلم واحد (نص أو قاموس) إلى الفهرس"""
+        if isinstance(landmark, dict):
+            original_name = landmark.get('name', '')
+        elif isinstance(landmark, str):
+            original_name = landmark
+        else:
+            return
+        self.landmarks_index[original_name.lower()] = {
+            'neighborhood': neighborhood,
+            'category': category,
+            'original_name': original_name
+        }
+        self.autocomplete.add(landmark, neighborhood, category)
+        self.speller.add(landmark, neighborhood, category)
+        self.phonetic.add(landmark, neighborhood, category)
+        self.search.add(landmark, neighborhood, category)
+    
+    def remove_landmark(self, name: str, neighborhood: str, category: str):
+        # معلم آخر بنفس الاسم في حي آخر يبقى في الفهرس
+        info = self.landmarks_index.get(name.lower())
+        if info and (info['neighborhood'], info['category']) == (neighborhood, category):
+            del self.landmarks_index[name.lower()]
+        self.autocomplete.remove(name, neighborhood)
+        self.speller.remove(name, neighborhood)
+        self.phonetic.remove(name, neighborhood)
+        self.search.remove(name, neighborhood)
     
     def similarity_score(self, text1: str, text2: str) -> float:
         """حساب درجة التشابه بين نصين"""
@@ -314,21 +411,24 @@ class NLPSearchSystem:
     
     def find_best_match(self, query: str, min_score: float = 0.6) -> Optional[Dict]:
         """البحث عن أفضل تطابق لمعلم معين"""
-        query = query.lower().strip()
-        best_match = None
-        best_score = min_score
+        if is_arabizi(query):
+            # الفرانكو: قراءة من الفهرس الصوتي بدلاً من مقارنة الحروف
+            match = self.phonetic.best_match(query)
+            if not match or match['score'] < PHONETIC_MIN_SCORE:
+                return None
+            return {'name': match['name'], 'score': match['score'],
+                    'info': self.landmarks_index.get(match['name'].lower())}
         
-        for landmark_name, landmark_info in self.landmarks_index.items():
-            score = self.similarity_score(query, landmark_name)
-            if score > best_score:
-                best_score = score
-                best_match = {
-                    'name': landmark_info['original_name'],
-                    'score': score,
-                    'info': landmark_info
-                }
-        
-        return best_match
+        # فهرس الكلمات (BM25F)؛ min_score هنا أقل نسبة من كلمات النص موجودة في اسم المعلم
+        match = self.search.best_match(query, min_score)
+        if not match:
+            return None
+        return {
+            'name': match['name'],
+            'score': match['coverage'],
+            'info': {'neighborhood': match['neighborhood'], 'category': match['category'],
+                     'original_name': match['name']}
+        }
     
     def extract_locations_from_text(self, text: str) -> Tuple[Optional[str], Optional[str]]:
         """استخراج نقطتي البداية والوجهة من النص"""
@@ -362,6 +462,9 @@ class NLPSearchSystem:
     
     def search_route_from_text(self, text: str) -> Dict:
         """البحث عن مسار من النص المكتوب"""
+        if is_arabizi(text):
+            # "mn el gam3a lel ma7ata" -> "من el gam3a إلى ma7ata"
+            text = translate_keywords(text)
         start_text, end_text = self.extract_locations_from_text(text)
         
         result = {
@@ -369,7 +472,8 @@ class NLPSearchSystem:
             'message': 'لم أتمكن من فهم طلبك. يرجى المحاولة مرة أخرى.',
             'start_location': None,
             'end_location': None,
-            'suggestions': []
+            'suggestions': [],
+            'corrections': []
         }
         
         if start_text:
@@ -393,9 +497,82 @@ class NLPSearchSystem:
             result['status'] = 'partial_match'
             result['message'] = f"تم العثور على الوجهة: {result['end_location']['name']}. من فضلك حدد نقطة البداية."
         
+        if result['status'] != 'full_match':
+            self._add_spelling_suggestions(result, start_text, end_text)
         return result
+    
+    def _add_spelling_suggestions(self, result: Dict, start_text: Optional[str], end_text: Optional[str]):
+        """"هل قصدت؟": معالم قريبة في الكتابة لكل جزء لم يطابق، وطلبات مصححة جاهزة للبحث"""
+        options = []
+        for text, match in ((start_text, result['start_location']), (end_text, result['end_location'])):
+            if match:
+                options.append([match['name']])
+                continue
+            if not text:
+                suggestions = []
+            elif is_arabizi(text):
+                suggestions = self.phonetic.lookup(text)
+            else:
+                suggestions = self.speller.suggest(text)
+            for suggestion in suggestions:
+                line = f"{suggestion['name']} - {suggestion['neighborhood']}"
+                if line not in result['suggestions']:
+                    result['suggestions'].append(line)
+            options.append(list(dict.fromkeys(suggestion['name'] for suggestion in suggestions)))
+        starts, ends = options
+        result['corrections'] = [f"من {start} إلى {end}" for start in starts for end in ends
+                                 if start != end][:MAX_CORRECTIONS]
 
 nlp_system = NLPSearchSystem()
+intent_classifier = IntentClassifier.load()
+
+# ===== تغييرات لوحة الإدارة =====
+
+class DashboardChanges(ChangeListener):
+    """تحديث فهارس البوت بالتغيير فقط (الفهارس التي لم تُبنَ بعد ستُبنى من البيانات المحدثة)"""
+    
+    def route_added(self, route: Dict):
+        engine = get_engine(routes_data, neighborhood_data, build=False)
+        if engine:
+            engine.add_route(route)
+        graph = get_transfer_graph(routes_data, neighborhood_data, build=False)
+        if graph:
+            for stop in route.get('keyPoints') or []:
+                point = landmark_coordinates.get(stop.strip().lower()) if isinstance(stop, str) else None
+                if point:
+                    graph.add_stop(stop.strip().lower(), point)
+    
+    def route_removed(self, route: Dict):
+        # حواف المشي لمحطة لم يعد يمر بها خط لا تُستخدم، فتبقى في الرسم
+        engine = get_engine(routes_data, neighborhood_data, build=False)
+        if engine:
+            engine.remove_route(route)
+    
+    def landmark_added(self, landmark, neighborhood: str, category: str, point):
+        nlp_system.add_landmark(landmark, neighborhood, category)
+        engine = get_engine(routes_data, neighborhood_data, build=False)
+        if engine:
+            engine.add_landmark(landmark if isinstance(landmark, dict) else {'name': landmark})
+        name = landmark_name(landmark)
+        if point and name:
+            landmark_coordinates[name.strip().lower()] = point
+            geo_index.add(name, point)
+            graph = get_transfer_graph(routes_data, neighborhood_data, build=False)
+            if graph and engine and engine.is_stop(name):
+                graph.add_stop(name.strip().lower(), point)
+    
+    def landmark_removed(self, landmark, neighborhood: str, category: str):
+        name = landmark_name(landmark)
+        if not name:
+            return
+        nlp_system.remove_landmark(name, neighborhood, category)
+        engine = get_engine(routes_data, neighborhood_data, build=False)
+        if engine:
+            engine.remove_landmark(landmark if isinstance(landmark, dict) else {'name': landmark})
+        landmark_coordinates.pop(name.strip().lower(), None)
+        geo_index.discard(name)
+
+change_feed = ChangeFeed(routes_data, neighborhood_data, [DashboardChanges()])
 
 # ===== الدوال المساعدة =====
 
@@ -461,10 +638,73 @@ def build_keyboard(items: List, prefix: str, back_target: Optional[str] = None,
     keyboard.append(nav_buttons)
     return InlineKeyboardMarkup(keyboard)
 
+def format_route_reports(route_name: str) -> str:
+    """آخر تقريرين مباشرين لخط معين"""
+    route_reports = reports_system.get_reports_for_route(route_name)
+    if not route_reports:
+        return ""
+    result = "📡 **تقارير مباشرة:**\n"
+    for report in route_reports[-2:]:  # آخر تقريرين
+        emoji = "🔴" if report['report_type'] == 'congestion' else "🟡" if report['report_type'] == 'delay' else "🟢"
+        result += f"{emoji} {report['description']} ({report['timestamp'][:16]})\n"
+    return result + "\n"
+
+async def send_itinerary_map(context: ContextTypes.DEFAULT_TYPE, chat_id: int,
+                             start_landmark: str, end_landmark: str):
+    """إرسال صورة خريطة لأفضل خيار مباشر إذا توفرت إحداثيات محطاته محلياً"""
+    itineraries = get_engine(routes_data, neighborhood_data).find_direct(start_landmark, end_landmark, limit=1)
+    if not itineraries:
+        return
+    itinerary = itineraries[0]
+    spec = route_map_service.prepare_itinerary(itinerary, itinerary['keyPoints'],
+                                               geocoding_system.get_cached_coordinates)
+    if not spec:
+        return
+    try:
+        await route_map_service.send_map(
+            context.bot, chat_id, spec,
+            caption=f"🗺️ {itinerary['routeName']}: {itinerary['start_nearest_stop']} ← {itinerary['end_nearest_stop']}")
+    except Exception as e:
+        logger.warning("Failed to send route map: %s", e)
+
+def subscription_row(context: ContextTypes.DEFAULT_TYPE, start_landmark: str,
+                     end_landmark: str) -> List[InlineKeyboardButton]:
+    """زر متابعة أفضل خط مباشر للرحلة، ويُحفظ الخط لتقارير المرور التالية من نفس المحادثة"""
+    itineraries = get_engine(routes_data, neighborhood_data).find_direct(start_landmark, end_landmark, limit=1)
+    if not itineraries:
+        return []
+    route_name = itineraries[0]['routeName']
+    context.chat_data['last_route'] = route_name
+    # الزر يحمل رقم الاسم في قائمة المحادثة (تُضاف إليها الأسماء فقط، فلا يتغير الرقم عند تعديل routes_data)؛
+    # صف subscribed_route لا يُنشأ إلا عند الضغط على الزر
+    names = context.chat_data.setdefault('follow_routes', [])
+    if route_name not in names:
+        names.append(route_name)
+    return [InlineKeyboardButton(f"🔔 تنبيهات {route_name}", callback_data=f"follow:{names.index(route_name)}")]
+
 def find_route_logic(start_landmark: str, end_landmark: str, routes: List[Dict]) -> str:
     """البحث عن أفضل مسار بين معلمين - محسن"""
     
-    # البحث عن المسارات المباشرة
+    # أولاً: محرك المسارات (بيانات القرب + ترتيب المحطات) للمعالم المعروفة
+    itineraries = get_engine(routes, neighborhood_data).find_direct(start_landmark, end_landmark, limit=5)
+    if itineraries:
+        result = "🚌 **تم العثور على مسارات مباشرة:**\n\n"
+        for i, item in enumerate(itineraries, 1):
+            result += f"{i}. **{item['routeName']}**\n"
+            result += f"   🚏 اركب من: {item['start_nearest_stop']}"
+            if item['start_nearest_stop'].strip().lower() != start_landmark.strip().lower():
+                result += f" ({item['start_proximity']} من {start_landmark})"
+            result += f"\n   🏁 انزل عند: {item['end_nearest_stop']}"
+            if item['end_nearest_stop'].strip().lower() != end_landmark.strip().lower():
+                result += f" ({item['end_proximity']} من {end_landmark})"
+            result += f"\n   💰 التعريفة: {item['fare']}\n"
+            if item['notes']:
+                result += f"   📝 ملاحظات: {item['notes']}\n"
+            result += "\n"
+        result += format_route_reports(itineraries[0]['routeName'])
+        return result
+
+    # البحث عن المسارات المباشرة بمطابقة جزئية لأسماء المحطات (للنصوص غير المعروفة)
     direct_routes = []
     for route in routes:
         key_points = route.get('keyPoints', [])
@@ -491,22 +731,22 @@ def find_route_logic(start_landmark: str, end_landmark: str, routes: List[Dict])
                 result += f"   📝 ملاحظات: {route.get('notes')}\n"
             result += "\n"
         
-        # إضافة تقارير الوقت الحقيقي
-        for route in direct_routes[:1]:  # للمسار الأول فقط
-            route_reports = reports_system.get_reports_for_route(route.get('routeName', ''))
-            if route_reports:
-                result += "📡 **تقارير مباشرة:**\n"
-                for report in route_reports[-2:]:  # آخر تقريرين
-                    emoji = "🔴" if report['report_type'] == 'congestion' else "🟡" if report['report_type'] == 'delay' else "🟢"
-                    result += f"{emoji} {report['description']} ({report['timestamp'][:16]})\n"
-                result += "\n"
+        # إضافة تقارير الوقت الحقيقي للمسار الأول فقط
+        result += format_route_reports(direct_routes[0].get('routeName', ''))
         
         return result
+
+    # مسارات بتبديل (نفس المحطة أو مشياً لمحطة قريبة) عبر محرك المسارات
+    transfer_itineraries = get_engine(routes, neighborhood_data).find_with_transfer(
+        start_landmark, end_landmark, get_transfer_graph(routes, neighborhood_data), limit=3)
+    if transfer_itineraries:
+        return format_transfer_options(transfer_itineraries)
     else:
         return f"❌ **عذراً، لم أجد مساراً مباشراً بين {start_landmark} و {end_landmark}**\n\nقد تحتاج إلى:\n• استخدام أكثر من خط\n• البحث عن معالم قريبة\n• التأكد من صحة أسماء الأماكن"
 
 # ===== معالجات الأحداث =====
 
+@metrics.track_handler("start")
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> States:
     """بداية المحادثة مع القائمة الرئيسية المطورة"""
     user = update.effective_user
@@ -557,6 +797,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> States:
     
     return States.MAIN_MENU
 
+@metrics.track_handler("handle_main_menu")
 async def handle_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> States:
     """معالجة اختيارات القائمة الرئيسية"""
     query = update.callback_query
@@ -668,6 +909,92 @@ async def handle_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     elif query.data == "main_menu":
         return await start(update, context)
 
+async def send_place_map(update: Update, context: ContextTypes.DEFAULT_TYPE, place: str):
+    """رابط الخريطة والإحداثيات وصورة الخريطة لمكان واحد"""
+    maps_url = geocoding_system.get_maps_url(place)
+    coordinates = geocoding_system.get_coordinates(place)
+
+    if coordinates:
+        lat, lng = coordinates
+        coord_text = f"📍 الإحداثيات: {lat:.6f}, {lng:.6f}"
+    else:
+        coord_text = "📍 لم يتم العثور على إحداثيات دقيقة"
+
+    keyboard = [[
+        InlineKeyboardButton("🗺️ فتح الخريطة", url=maps_url),
+        InlineKeyboardButton("🔙 القائمة الرئيسية", callback_data="main_menu")
+    ]]
+
+    await update.message.reply_text(
+        f"🗺️ **خريطة {place}**\n\n{coord_text}",
+        reply_markup=InlineKeyboardMarkup(keyboard),
+        parse_mode=ParseMode.MARKDOWN
+    )
+    if not coordinates:
+        return
+    # النص أُرسل بالفعل: فشل الصورة لا يصل إلى رسالة "حدث خطأ في البحث"
+    try:
+        await route_map_service.send_map(
+            context.bot, update.effective_chat.id,
+            route_map_service.place_spec(place, coordinates),
+            caption=f"📍 {place}")
+    except Exception as e:
+        logger.warning("Failed to send place map: %s", e)
+
+def mentioned_place(user_text: str, groups) -> Optional[Dict]:
+    """المعلم المذكور في النص بعد حذف كلمات المجموعات ("خريطة بنك مصر" -> بنك مصر)"""
+    return nlp_system.find_best_match(keyword_spans(user_text, groups) or user_text)
+
+def place_reply(user_text: str) -> Optional[ResponseComposer]:
+    """رد سؤال عن مكان واحد ("فين بنك مصر")، أو None إن لم يطابق معلماً"""
+    match = mentioned_place(user_text, PLACE_WORDS)
+    if not match or not match['info']:
+        return None
+    name = match['name']
+    reply = ResponseComposer().add(landmark_message(name, match['info']['neighborhood'], match['info']['category']))
+    reply.add_row(
+        InlineKeyboardButton("🗺️ الخريطة", url=landmark_maps_url(name)),
+        InlineKeyboardButton("🔍 بحث جديد", callback_data="nlp_search"),
+        InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")
+    )
+    return reply
+
+def nlp_search_reply(context: ContextTypes.DEFAULT_TYPE, user_text: str) -> ResponseComposer:
+    """رد البحث الذكي عن مسار (النتيجة أو الرسالة والاقتراحات) مع أزراره"""
+    search_result = nlp_system.search_route_from_text(user_text)
+    
+    if search_result['status'] == 'full_match':
+        # تم العثور على المكانين
+        start_name = search_result['start_location']['name']
+        end_name = search_result['end_location']['name']
+        
+        # البحث عن المسار
+        reply = ResponseComposer().add(find_route_logic(start_name, end_name, routes_data))
+        reply.add_row(*subscription_row(context, start_name, end_name))
+        reply.add_row(
+            InlineKeyboardButton("🗺️ عرض الوجهة على الخريطة", url=geocoding_system.get_maps_url(end_name)),
+            InlineKeyboardButton("🔍 بحث جديد", callback_data="nlp_search"),
+            InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")
+        )
+        return reply
+    
+    # نتيجة جزئية أو خطأ
+    message = search_result['message']
+    if search_result['suggestions']:
+        message += "\n\n🤔 هل قصدت؟\n" + "\n".join(f"• {line}" for line in search_result['suggestions'])
+    
+    reply = ResponseComposer(parse_mode=None).add(message)
+    # الطلبات المصححة تُحفظ في user_data والزر يحمل رقمها فقط (حد 64 بايت لبيانات الزر)
+    context.user_data['corrections'] = search_result['corrections']
+    for i, correction in enumerate(search_result['corrections']):
+        reply.add_row(InlineKeyboardButton(f"🔁 {correction}", callback_data=f"did_you_mean:{i}"))
+    reply.add_row(
+        InlineKeyboardButton("🔍 بحث جديد", callback_data="nlp_search"),
+        InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")
+    )
+    return reply
+
+@metrics.track_handler("handle_nlp_search")
 async def handle_nlp_search(update: Update, context: ContextTypes.DEFAULT_TYPE) -> States:
     """معالجة البحث بالنص الطبيعي"""
     if not update.message or not update.message.text:
@@ -679,70 +1006,29 @@ async def handle_nlp_search(update: Update, context: ContextTypes.DEFAULT_TYPE)
     try:
         if mode == 'maps_request':
             # طلب خريطة لمكان معين
-            maps_url = geocoding_system.get_maps_url(user_text)
-            coordinates = geocoding_system.get_coordinates(user_text)
-            
-            if coordinates:
-                lat, lng = coordinates
-                coord_text = f"📍 الإحداثيات: {lat:.6f}, {lng:.6f}"
-            else:
-                coord_text = "📍 لم يتم العثور على إحداثيات دقيقة"
-            
-            keyboard = [[
-                InlineKeyboardButton("🗺️ فتح الخريطة", url=maps_url),
-                InlineKeyboardButton("🔙 القائمة الرئيسية", callback_data="main_menu")
-            ]]
-            
-            await update.message.reply_text(
-                f"🗺️ **خريطة {user_text}**\n\n{coord_text}",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode=ParseMode.MARKDOWN
-            )
+            await send_place_map(update, context, user_text)
         
         elif mode == 'nlp_search':
-            # البحث الذكي عن مسار
-            await update.message.reply_text("🔍 جاري البحث...")
-            
-            search_result = nlp_system.search_route_from_text(user_text)
-            
-            if search_result['status'] == 'full_match':
-                # تم العثور على المكانين
-                start_name = search_result['start_location']['name']
-                end_name = search_result['end_location']['name']
-                
-                # البحث عن المسار
-                route_result = find_route_logic(start_name, end_name, routes_data)
-                
-                # إرسال النتيجة
-                await update.message.reply_text(route_result, parse_mode=ParseMode.MARKDOWN)
-                
-                # إضافة رابط الخريطة
-                maps_url = geocoding_system.get_maps_url(end_name)
-                keyboard = [[
-                    InlineKeyboardButton("🗺️ عرض الوجهة على الخريطة", url=maps_url),
-                    InlineKeyboardButton("🔍 بحث جديد", callback_data="nlp_search"),
+            # النية أولاً: البحث عن المكانين والمسار لطلبات المسار فقط
+            intent = intent_classifier.classify(user_text).intent
+            metrics.INTENT_REQUESTS.inc(intent=intent)
+            if intent == MAP:
+                match = mentioned_place(user_text, MAP_WORDS)
+                await send_place_map(update, context, match['name'] if match else user_text)
+            elif intent == REPORT:
+                await update.message.reply_text(REPORT_INTENT_TEXT, reply_markup=InlineKeyboardMarkup([
+                    [InlineKeyboardButton("📝 أبلغ عن حالة مرور", callback_data="submit_report")],
+                    [InlineKeyboardButton("📊 التقارير المباشرة", callback_data="live_reports")]
+                ]))
+            elif intent == CHITCHAT:
+                await update.message.reply_text(CHITCHAT_INTENT_TEXT, reply_markup=InlineKeyboardMarkup([[
                     InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")
-                ]]
-                await update.message.reply_text(
-                    "🎯 **خيارات إضافية:**",
-                    reply_markup=InlineKeyboardMarkup(keyboard),
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            
+                ]]))
             else:
-                # نتيجة جزئية أو خطأ
-                message = search_result['message']
-                if search_result['suggestions']:
-                    message += "\n\nاقتراحات:\n" + "\n".join(search_result['suggestions'])
-                
-                keyboard = [[
-                    InlineKeyboardButton("🔍 بحث جديد", callback_data="nlp_search"),
-                    InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")
-                ]]
-                await update.message.reply_text(
-                    message,
-                    reply_markup=InlineKeyboardMarkup(keyboard)
-                )
+                # رسالة انتظار واحدة تُعدل بالنتيجة والأزرار معاً
+                placeholder = await update.message.reply_text(SEARCHING_TEXT)
+                reply = place_reply(user_text) if intent == PLACE else None
+                await (reply or nlp_search_reply(context, user_text)).edit(placeholder)
         
     except Exception as e:
         logger.exception(f"خطأ في معالجة البحث الذكي: {e}")
@@ -755,6 +1041,22 @@ async def handle_nlp_search(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     return States.MAIN_MENU
 
+@metrics.track_handler("handle_did_you_mean")
+async def handle_did_you_mean(update: Update, context: ContextTypes.DEFAULT_TYPE) -> States:
+    """زر "هل قصدت؟": البحث بالطلب المصحح في نفس الرسالة"""
+    query = update.callback_query
+    await query.answer()
+    corrections = context.user_data.get('corrections') or []
+    index = int(query.data.split(":", 1)[1])
+    if index >= len(corrections):
+        await query.edit_message_text("انتهت صلاحية هذا الاقتراح، اكتب طلبك مرة أخرى.",
+                                      reply_markup=InlineKeyboardMarkup([[
+                                          InlineKeyboardButton("🔍 بحث جديد", callback_data="nlp_search")]]))
+        return States.MAIN_MENU
+    await nlp_search_reply(context, corrections[index]).edit(query.message)
+    return States.MAIN_MENU
+
+@metrics.track_handler("handle_report_submission")
 async def handle_report_submission(update: Update, context: ContextTypes.DEFAULT_TYPE) -> States:
     """معالجة إرسال التقارير"""
     query = update.callback_query
@@ -797,6 +1099,7 @@ async def handle_report_submission(update: Update, context: ContextTypes.DEFAULT
     
     return States.MAIN_MENU
 
+@metrics.track_handler("handle_report_text")
 async def handle_report_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> States:
     """معالجة نص التقرير"""
     if not update.message or not update.message.text:
@@ -809,10 +1112,12 @@ async def handle_report_text(update: Update, context: ContextTypes.DEFAULT_TYPE)
     # إضافة التقرير
     report = reports_system.add_report(
         user_id=user_id,
-        route_name="خط عام",  # يمكن تحسينه لاحقاً
+        route_name=context.chat_data.get('last_route', "خط عام"),  # آخر خط ظهر للمستخدم في نتيجة بحث
         report_type=report_type,
         description=description
     )
+    # تنبيه مشتركي الخط (تقارير الازدحام وتغيير المسار فقط، مجمعة كل دقيقة)
+    alert_fanout.publish(context.bot, report)
     
     type_names = {
         'congestion': '🔴 ازدحام شديد',
@@ -825,6 +1130,7 @@ async def handle_report_text(update: Update, context: ContextTypes.DEFAULT_TYPE)
 ✅ **تم إرسال تقريرك بنجاح!**
 
 📊 نوع التقرير: {type_names[report_type]}
+🚌 الخط: {report['route_name']}
 📝 التفاصيل: {description}
 🕒 الوقت: {datetime.now().strftime("%H:%M")}
 
@@ -844,6 +1150,7 @@ async def handle_report_text(update: Update, context: ContextTypes.DEFAULT_TYPE)
     return States.MAIN_MENU
 
 # دوال البحث التقليدي (مبسطة)
+@metrics.track_handler("select_start_neighborhood")
 async def select_start_neighborhood(update: Update, context: ContextTypes.DEFAULT_TYPE) -> States:
     query = update.callback_query
     await query.answer()
@@ -861,6 +1168,7 @@ async def select_start_neighborhood(update: Update, context: ContextTypes.DEFAUL
     )
     return States.SELECTING_START_CATEGORY
 
+@metrics.track_handler("select_start_category")
 async def select_start_category(update: Update, context: ContextTypes.DEFAULT_TYPE) -> States:
     query = update.callback_query
     await query.answer()
@@ -879,6 +1187,7 @@ async def select_start_category(update: Update, context: ContextTypes.DEFAULT_TY
     )
     return States.SELECTING_START_LANDMARK
 
+@metrics.track_handler("select_start_landmark")
 async def select_start_landmark(update: Update, context: ContextTypes.DEFAULT_TYPE) -> States:
     query = update.callback_query
     await query.answer()
@@ -896,6 +1205,7 @@ async def select_start_landmark(update: Update, context: ContextTypes.DEFAULT_TY
     )
     return States.SELECTING_END_NEIGHBORHOOD
 
+@metrics.track_handler("select_end_neighborhood")
 async def select_end_neighborhood(update: Update, context: ContextTypes.DEFAULT_TYPE) -> States:
     query = update.callback_query
     await query.answer()
@@ -913,6 +1223,7 @@ async def select_end_neighborhood(update: Update, context: ContextTypes.DEFAULT_
     )
     return States.SELECTING_END_CATEGORY
 
+@metrics.track_handler("select_end_category")
 async def select_end_category(update: Update, context: ContextTypes.DEFAULT_TYPE) -> States:
     query = update.callback_query
     await query.answer()
@@ -931,6 +1242,7 @@ async def select_end_category(update: Update, context: ContextTypes.DEFAULT_TYPE
     )
     return States.SELECTING_END_LANDMARK
 
+@metrics.track_handler("select_end_landmark_and_find_route")
 async def select_end_landmark_and_find_route(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
@@ -945,23 +1257,142 @@ async def select_end_landmark_and_find_route(update: Update, context: ContextTyp
     
     # إرسال النتيجة مع الخريطة
     maps_url = geocoding_system.get_maps_url(chosen)
-    keyboard = [
+    keyboard = [row for row in [
         [InlineKeyboardButton("🗺️ عرض على الخريطة", url=maps_url)],
+        subscription_row(context, start_landmark, chosen),
         [InlineKeyboardButton("📝 أبلغ عن حالة المرور", callback_data="submit_report")],
         [InlineKeyboardButton("🔍 بحث جديد", callback_data="traditional_search")],
         [InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")]
-    ]
+    ] if row]
     
     await query.edit_message_text(
         result,
         reply_markup=InlineKeyboardMarkup(keyboard),
         parse_mode=ParseMode.MARKDOWN
     )
+    await send_itinerary_map(context, update.effective_chat.id, start_landmark, chosen)
     
     context.user_data.clear()
     return ConversationHandler.END
 
+# متابعة الخطوط
+@metrics.track_handler("toggle_subscription")
+async def toggle_subscription(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """أزرار 🔔/🔕 في نتائج البحث والتنبيهات"""
+    query = update.callback_query
+    action, value = query.data.split(":", 1)
+    chat_id = update.effective_chat.id
+    if action == "follow":
+        # زر نتيجة البحث يحمل رقم اسم الخط في follow_routes (subscription_row)
+        names = context.chat_data.get('follow_routes', [])
+        index = int(value)
+        if index >= len(names):
+            await query.answer("⚠️ انتهت صلاحية هذا الزر، ابحث عن المسار مرة أخرى")
+            return
+        route_name = names[index]
+        if not any(route['routeName'] == route_name for route in routes_data):
+            await query.answer(f"⚠️ الخط {route_name} لم يعد موجوداً")
+            return
+        route_id = subscription_store.route_id(route_name, create=True)
+        action = "subscribe"
+    else:
+        route_id = int(value)
+        route_name = subscription_store.route_name(route_id) or ""
+    
+    if action == "subscribe":
+        subscription_store.subscribe(chat_id, route_id)
+        await query.answer(f"🔔 ستصلك تنبيهات الازدحام وتغيير المسار على {route_name}")
+    else:
+        subscription_store.unsubscribe(chat_id, route_id)
+        await query.answer(f"🔕 تم إيقاف تنبيهات {route_name}")
+
+async def handle_subscription(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """أزرار المتابعة تعمل في أي حالة للمحادثة ولا تصل إلى معالج المحادثة"""
+    await toggle_subscription(update, context)
+    raise ApplicationHandlerStop
+
+@metrics.track_handler("show_subscriptions")
+async def show_subscriptions(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """الأمر /subscriptions: الخطوط التي يتابعها المستخدم"""
+    subscribed = subscription_store.subscriptions(update.effective_chat.id)
+    if not subscribed:
+        await update.message.reply_text(
+            "🔕 لا تتابع أي خط حالياً.\n\nبعد البحث عن مسار اضغط «🔔 تنبيهات» لتصلك تقارير الازدحام وتغيير المسار.")
+        return
+    
+    text = "🔔 الخطوط التي تتابعها:\n\n" + "\n".join(f"• {name}" for _, name in subscribed)
+    keyboard = [[InlineKeyboardButton(f"🔕 إيقاف {name}", callback_data=f"unsubscribe:{route_id}")]
+                for route_id, name in subscribed]
+    await update.message.reply_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
+
+# الوضع المضمّن: @bot <جزء من اسم معلم> أو @bot من <معلم> إلى <جزء من اسم الوجهة>
+def landmark_maps_url(name: str) -> str:
+    """رابط الخريطة من الإحداثيات المحلية فقط (الرد على الاستعلام المضمّن لا ينتظر الجيوكودر)"""
+    point = landmark_coordinates.get(name.strip().lower())
+    if point:
+        return f"https://www.google.com/maps/search/?api=1&query={point[0]},{point[1]}"
+    return f"https://www.google.com/maps/search/{quote(f'{name} Port Said Egypt')}"
+
+def landmark_message(name: str, neighborhood: str, category: str) -> str:
+    """بطاقة المعلم: الحي والتصنيف وأول الخطوط التي تمر به"""
+    message = f"📍 **{name}**\n🏘️ {neighborhood} • {category}"
+    routes = get_engine(routes_data, neighborhood_data).routes_for(name)
+    if routes:
+        message += f"\n🚌 {' • '.join(routes[:3])}"
+    return message
+
+def inline_landmark_results(text: str) -> List[InlineQueryResultArticle]:
+    results = []
+    for i, match in enumerate(nlp_system.autocomplete.complete(text, INLINE_RESULTS)):
+        name = match['name']
+        message = landmark_message(name, match['neighborhood'], match['category'])
+        results.append(InlineQueryResultArticle(
+            id=str(i), title=name, description=f"{match['neighborhood']} • {match['category']}",
+            input_message_content=InputTextMessageContent(message, parse_mode=ParseMode.MARKDOWN),
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🗺️ الخريطة", url=landmark_maps_url(name))]])
+        ))
+    return results
+
+def inline_route_results(start_text: str, end_text: str) -> List[InlineQueryResultArticle]:
+    """نتيجة لكل وجهة مقترحة، ونصها هو رد البحث عن المسار كاملاً"""
+    start_matches = nlp_system.autocomplete.complete(start_text, 1)
+    if start_matches:
+        start_name = start_matches[0]['name']
+    else:
+        best = nlp_system.find_best_match(start_text)
+        if not best:
+            return []
+        start_name = best['name']
+    results = []
+    for i, match in enumerate(nlp_system.autocomplete.complete(end_text, INLINE_ROUTE_RESULTS)):
+        end_name = match['name']
+        if end_name == start_name:
+            continue
+        message = split_text(f"📍 من {start_name} إلى {end_name}\n\n"
+                             + find_route_logic(start_name, end_name, routes_data))[0]
+        results.append(InlineQueryResultArticle(
+            id=str(i), title=f"🚌 {start_name} ← {end_name}", description=match['neighborhood'],
+            input_message_content=InputTextMessageContent(message, parse_mode=ParseMode.MARKDOWN)
+        ))
+    return results
+
+@metrics.track_handler("handle_inline_query")
+async def handle_inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """اقتراح المعالم أثناء كتابة @bot في أي محادثة"""
+    text = update.inline_query.query.strip()
+    route = INLINE_ROUTE_PATTERN.match(text)
+    if route:
+        results = inline_route_results(route.group(1), route.group(2))
+        cache_time = INLINE_ROUTE_CACHE_TIME
+    else:
+        results = inline_landmark_results(text) if text else []
+        cache_time = INLINE_CACHE_TIME
+    # نفس النص يعطي نفس النتائج لكل المستخدمين، فيخزنها Telegram للبادئات المتكررة
+    button = None if results else InlineQueryResultsButton("🔍 ابحث في البوت", start_parameter="inline")
+    await update.inline_query.answer(results, cache_time=cache_time, is_personal=False, button=button)
+
 # دوال الإدارة
+@metrics.track_handler("show_admin_panel")
 async def show_admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> States:
     query = update.callback_query
     
@@ -994,6 +1425,7 @@ async def show_admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     
     return States.ADMIN_MENU
 
+@metrics.track_handler("handle_admin_actions")
 async def handle_admin_actions(update: Update, context: ContextTypes.DEFAULT_TYPE) -> States:
     query = update.callback_query
     await query.answer()
@@ -1063,8 +1495,16 @@ async def handle_admin_actions(update: Update, context: ContextTypes.DEFAULT_TYP
             }
             
             backup_filename = f"backup_{timestamp}.json"
-            with open(backup_filename, 'w', encoding='utf-8') as f:
-                json.dump(backup_data, f, ensure_ascii=False, indent=2)
+            backup_bytes = json.dumps(backup_data, ensure_ascii=False, indent=2).encode('utf-8')
+            with open(backup_filename, 'wb') as f:
+                f.write(backup_bytes)
+            
+            # إرسال الملف للمشرف؛ إذا لم تتغير البيانات منذ آخر نسخة يُعاد استخدام نفس الملف بدون رفع
+            content = {k: v for k, v in backup_data.items() if k != 'timestamp'}
+            await file_id_cache.send(
+                context.bot, update.effective_chat.id, 'document', backup_bytes,
+                key=content_key(json.dumps(content, ensure_ascii=False, sort_keys=True)),
+                name='admin_backup', filename=backup_filename)
             
             await query.edit_message_text(
                 f"✅ **تم إنشاء نسخة احتياطية بنجاح!**\n\nاسم الملف: `{backup_filename}`\nالوقت: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
@@ -1133,6 +1573,31 @@ async def handle_navigation(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     return await start(update, context)
 
+@metrics.track_handler("handle_location")
+async def handle_location(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """الرد على مشاركة الموقع بأقرب المحطات والخطوط التي تخدمها"""
+    location = update.message.location
+    nearest = geo_index.nearest(location.latitude, location.longitude,
+                                k=NEAREST_STOPS_COUNT, max_distance_m=NEAREST_MAX_DISTANCE_M)
+    keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")]])
+    if not nearest:
+        await update.message.reply_text(
+            "📍 عذراً، لا توجد محطات معروفة لدينا بالقرب من موقعك حالياً.",
+            reply_markup=keyboard
+        )
+        return
+    
+    engine = get_engine(routes_data, neighborhood_data)
+    text = "📍 **أقرب الأماكن والمحطات إليك:**\n\n"
+    for i, (name, distance) in enumerate(nearest, 1):
+        distance_text = f"{distance / 1000:.1f} كم" if distance >= 1000 else f"{int(distance)} م"
+        text += f"{i}. **{name}** ({distance_text})\n"
+        routes = engine.routes_for(name)
+        if routes:
+            text += f"   🚌 {' • '.join(routes[:3])}\n"
+    
+    await update.message.reply_text(text, reply_markup=keyboard, parse_mode=ParseMode.MARKDOWN)
+
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """إلغاء المحادثة"""
     if update.callback_query:
@@ -1156,12 +1621,23 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 
 # ===== الدالة الرئيسية =====
 
-def main() -> None:
-    """تشغيل البوت النهائي المطور"""
-    logger.info("🚀 بدء تشغيل بوت مواصلات بورسعيد المطور...")
-    
-    application = Application.builder().token(BOT_TOKEN).build()
-
+async def post_init(application: Application) -> None:
+    """مهام تُشغل بعد تهيئة التطبيق"""
+    if metrics.registry.enabled:
+        application.bot_data['loop_lag_monitor'] = asyncio.create_task(metrics.monitor_event_loop_lag())
+    if CHANGE_FEED_URL:
+        application.bot_data['change_feed'] = asyncio.create_task(change_feed.run())
+
+async def post_stop(application: Application) -> None:
+    """إيقاف المهام الخلفية قبل إغلاق التطبيق"""
+    for name in ('loop_lag_monitor', 'change_feed'):
+        task = application.bot_data.pop(name, None)
+        if task:
+            task.cancel()
+    alert_fanout.shutdown()
+
+def register_handlers(application: Application) -> None:
+    """تسجيل جميع معالجات البوت على التطبيق (يُستخدم أيضاً في اختبارات الحمل)"""
     # إعداد معالج المحادثة الرئيسي
     conv_handler = ConversationHandler(
         entry_points=[CommandHandler('start', start)],
@@ -1169,6 +1645,7 @@ def main() -> None:
             States.MAIN_MENU: [
                 CallbackQueryHandler(handle_main_menu, pattern=r'^(traditional_search|nlp_search|live_reports|submit_report|maps_view|admin_panel|main_menu)$'),
                 CallbackQueryHandler(handle_report_submission, pattern=r'^report_(congestion|delay|detour|normal)$'),
+                CallbackQueryHandler(handle_did_you_mean, pattern=r'^did_you_mean:\d+$'),
                 CallbackQueryHandler(cancel, pattern=r'^cancel_action$')
             ],
             States.SELECTING_START_NEIGHBORHOOD: [
@@ -1230,7 +1707,13 @@ def main() -> None:
         per_message=False,
     )
 
+    # قبل معالج المحادثة حتى لا تلتقط حالاته أزرار المتابعة
+    application.add_handler(CallbackQueryHandler(handle_subscription, pattern=r'^(follow|subscribe|unsubscribe):\d+$'),
+                            group=-1)
     application.add_handler(conv_handler)
+    application.add_handler(MessageHandler(filters.LOCATION, handle_location))
+    application.add_handler(CommandHandler('subscriptions', show_subscriptions))
+    application.add_handler(InlineQueryHandler(handle_inline_query))
     
     # أوامر إضافية
     application.add_handler(CommandHandler('help', lambda u, c: u.message.reply_text(
@@ -1240,12 +1723,16 @@ def main() -> None:
 **الأوامر:**
 /start - بدء المحادثة
 /help - هذه المساعدة
+/subscriptions - الخطوط التي تتابعها
 /cancel - إلغاء العملية الحالية
 
 **الميزات:**
 🔍 بحث ذكي بالنص الحر
 📊 تقارير مرور مباشرة
+🔔 تنبيهات الازدحام على الخطوط التي تتابعها
 🗺️ خرائط تفاعلية
+📍 شارك موقعك لمعرفة أقرب المحطات
+💬 اكتب @اسم_البوت ثم اسم مكان في أي محادثة لاقتراح المعالم، أو "من المكان إلى ..." لإرسال المسار
 ⚙️ نظام إدارة متقدم
 
 **أمثلة للبحث الذكي:**
@@ -1255,6 +1742,16 @@ def main() -> None:
         """
     )))
 
+def main() -> None:
+    """تشغيل البوت النهائي المطور"""
+    logger.info("🚀 بدء تشغيل بوت مواصلات بورسعيد المطور...")
+    
+    metrics.start_metrics_server()
+    # كل طلبات الإرسال تمر على طابور الإرسال (حدود Telegram وإعادة المحاولة بعد 429)
+    application = (Application.builder().token(BOT_TOKEN).rate_limiter(SendQueue())
+                   .post_init(post_init).post_stop(post_stop).build())
+    register_handlers(application)
+
     logger.info("✅ تم تهيئة البوت بنجاح مع جميع الميزات المتقدمة!")
     application.run_polling(allowed_updates=Update.ALL_TYPES)
 
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+فهرس جغرافي للمعالم والمحطات للبحث عن الأقرب ("إيه اللي جنبي؟")
+
+الإحداثيات تُحوَّل مرة واحدة إلى مصفوفات NumPy وتُرتب حسب خلايا شبكة ثابتة
+(CSR: بداية ونهاية كل خلية في المصفوفة المرتبة)، فيكون البحث عن أقرب k نقاط
+فحصاً لعدد صغير من الخلايا حول الموقع بدلاً من المرور على كل النقاط.
+"""
+
+import math
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+Point = Tuple[float, float]
+
+EARTH_RADIUS_M = 6371000.0
+# حجم الخلية بالدرجات (~550 متر في بورسعيد)
+DEFAULT_CELL_DEG = 0.005
+MAX_CELLS = 4_000_000
+
+
+def parse_coordinates(value) -> Optional[Point]:
+    """تحويل الإحداثيات من "lat, lng" أو [lat, lng] أو {'lat':..,'lng':..} إلى (lat, lng)"""
+    try:
+        if isinstance(value, str):
+            lat, lng = value.split(',', 1)
+            point = float(lat), float(lng)
+        elif isinstance(value, dict):
+            point = float(value['lat']), float(value['lng'])
+        elif isinstance(value, (list, tuple)) and len(value) == 2:
+            point = float(value[0]), float(value[1])
+        else:
+            return None
+    except (ValueError, KeyError, TypeError):
+        return None
+    if -90 <= point[0] <= 90 and -180 <= point[1] <= 180:
+        return point
+    return None
+
+
+class GeoIndex:
+    """فهرس شبكي لأقرب النقاط (NumPy)"""
+
+    def __init__(self, names: Sequence[str], points: Sequence[Point], cell_deg: float = DEFAULT_CELL_DEG):
+        coords = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.size = len(coords)
+        if self.size:
+            # نقاط بعيدة جداً (بيانات خاطئة) لا يجب أن تضخم الشبكة: خلايا أكبر عند الحاجة
+            span = np.ptp(coords, axis=0)
+            cell_deg = max(cell_deg, math.sqrt(float(span[0] + cell_deg) * float(span[1] + cell_deg) / MAX_CELLS))
+        self.cell_deg = cell_deg
+
+        rows = np.floor(coords[:, 0] / cell_deg).astype(np.int64)
+        cols = np.floor(coords[:, 1] / cell_deg).astype(np.int64)
+        self.row_min = int(rows.min()) if self.size else 0
+        self.col_min = int(cols.min()) if self.size else 0
+        self.n_rows = int(rows.max()) - self.row_min + 1 if self.size else 0
+        self.n_cols = int(cols.max()) - self.col_min + 1 if self.size else 0
+
+        cell_ids = (rows - self.row_min) * self.n_cols + (cols - self.col_min)
+        order = np.argsort(cell_ids, kind='stable')
+        self.lat = coords[order, 0].copy()
+        self.lng = coords[order, 1].copy()
+        self.names: List[str] = [names[i] for i in order]
+        sorted_cells = cell_ids[order]
+        # starts[c] .. starts[c + 1] هي نقاط الخلية c
+        self.starts = np.searchsorted(sorted_cells, np.arange(self.n_rows * self.n_cols + 1))
+
+        # متر لكل درجة عرض، وأقل قيمة متر لكل درجة طول داخل نطاق البيانات
+        self._m_per_deg = math.radians(1) * EARTH_RADIUS_M
+        max_abs_lat = float(np.abs(self.lat).max()) if self.size else 0.0
+        self._cell_m = cell_deg * self._m_per_deg * math.cos(math.radians(min(max_abs_lat + cell_deg, 89.0)))
+
+        # تعديلات بعد البناء (من لوحة الإدارة): نقاط مضافة تُفحص كلها، وأسماء محذوفة تُستبعد من النتائج
+        self._added: Dict[str, Point] = {}
+        self._removed = set()
+
+    def add(self, name: str, point: Point):
+        """إضافة نقطة أو تحديث إحداثياتها دون إعادة بناء الشبكة"""
+        self._removed.add(name)
+        self._added[name] = point
+
+    def discard(self, name: str):
+        self._removed.add(name)
+        self._added.pop(name, None)
+
+    def _distances(self, lat: float, lng: float, idx: np.ndarray) -> np.ndarray:
+        """مسافة equirectangular بالمتر (دقيقة بما يكفي داخل المدينة)"""
+        dy = self.lat[idx] - lat
+        dx = (self.lng[idx] - lng) * math.cos(math.radians(lat))
+        return np.hypot(dx, dy) * self._m_per_deg
+
+    def _ring_indices(self, row: int, col: int, ring: int) -> np.ndarray:
+        """فهارس النقاط في الخلايا على حافة المربع بنصف قطر ring حول (row, col)"""
+        chunks = []
+        for r in range(row - ring, row + ring + 1):
+            if r < 0 or r >= self.n_rows:
+                continue
+            if r in (row - ring, row + ring):
+                c_from, c_to = max(col - ring, 0), min(col + ring, self.n_cols - 1)
+                if c_from <= c_to:
+                    base = r * self.n_cols
+                    chunks.append((self.starts[base + c_from], self.starts[base + c_to + 1]))
+            else:
+                for c in (col - ring, col + ring):
+                    if 0 <= c < self.n_cols:
+                        cell = r * self.n_cols + c
+                        chunks.append((self.starts[cell], self.starts[cell + 1]))
+        if not chunks:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(a, b) for a, b in chunks])
+
+    def nearest(self, lat: float, lng: float, k: int = 5,
+                max_distance_m: Optional[float] = None) -> List[Tuple[str, float]]:
+        """أقرب k نقاط: [(الاسم, المسافة بالمتر)] مرتبة تصاعدياً"""
+        if not self._added and not self._removed:
+            return self._nearest_grid(lat, lng, k, max_distance_m)
+        # نتائج إضافية من الشبكة تعوض الأسماء المحذوفة أو المنقولة
+        found = [item for item in self._nearest_grid(lat, lng, k + len(self._removed), max_distance_m)
+                 if item[0] not in self._removed]
+        cos_lat = math.cos(math.radians(lat))
+        for name, (p_lat, p_lng) in self._added.items():
+            distance = math.hypot((p_lng - lng) * cos_lat, p_lat - lat) * self._m_per_deg
+            if max_distance_m is None or distance <= max_distance_m:
+                found.append((name, distance))
+        found.sort(key=lambda item: item[1])
+        return found[:k]
+
+    def _nearest_grid(self, lat: float, lng: float, k: int,
+                      max_distance_m: Optional[float]) -> List[Tuple[str, float]]:
+        if not self.size or k <= 0:
+            return []
+        row = int(math.floor(lat / self.cell_deg)) - self.row_min
+        col = int(math.floor(lng / self.cell_deg)) - self.col_min
+
+        # أول حلقة يمكن أن تتقاطع مع الشبكة
+        ring = max(0, -row, row - (self.n_rows - 1), -col, col - (self.n_cols - 1))
+        max_ring = ring + max(self.n_rows, self.n_cols)
+        found_idx: List[np.ndarray] = []
+        found_dist: List[np.ndarray] = []
+        count = 0
+        while ring <= max_ring:
+            idx = self._ring_indices(row, col, ring)
+            if len(idx):
+                found_idx.append(idx)
+                found_dist.append(self._distances(lat, lng, idx))
+                count += len(idx)
+            # أي نقطة خارج الحلقات المفحوصة تبعد على الأقل ring * حجم الخلية
+            covered_m = ring * self._cell_m
+            if max_distance_m is not None and covered_m > max_distance_m:
+                break
+            if count >= k:
+                dist = np.concatenate(found_dist)
+                kth = np.partition(dist, k - 1)[k - 1]
+                if kth <= covered_m:
+                    break
+            ring += 1
+
+        if not count:
+            return []
+        idx = np.concatenate(found_idx)
+        dist = np.concatenate(found_dist)
+        if max_distance_m is not None:
+            keep = dist <= max_distance_m
+            idx, dist = idx[keep], dist[keep]
+        top = np.argpartition(dist, k - 1)[:k] if len(dist) > k else np.arange(len(dist))
+        top = top[np.argsort(dist[top], kind='stable')]
+        return [(self.names[i], float(d)) for i, d in zip(idx[top], dist[top])]
+
+
+def collect_points(neighborhoods: Dict, routes: List[Dict],
+                   extra: Iterable[Tuple[str, object]] = ()) -> Tuple[List[str], List[Point]]:
+    """تجميع الأسماء والإحداثيات من المعالم وبدايات الخطوط ومصادر إضافية (الكاش/قاعدة البيانات)"""
+    seen = {}
+    for categories in neighborhoods.values():
+        if not isinstance(categories, dict):
+            continue
+        for landmarks in categories.values():
+            if not isinstance(landmarks, list):
+                continue
+            for landmark in landmarks:
+                if isinstance(landmark, dict) and isinstance(landmark.get('name'), str):
+                    point = parse_coordinates(landmark.get('coordinates'))
+                    if point:
+                        seen.setdefault(landmark['name'], point)
+    for route in routes:
+        key_points = route.get('keyPoints') or []
+        point = parse_coordinates(route.get('startCoordinates'))
+        if point and key_points and isinstance(key_points[0], str):
+            seen.setdefault(key_points[0], point)
+    for name, value in extra:
+        point = parse_coordinates(value)
+        if point and isinstance(name, str):
+            seen.setdefault(name, point)
+    return list(seen.keys()), list(seen.values())
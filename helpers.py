@@ -6,6 +6,12 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from typing import List, Dict, Any, Optional
 
+from routing_engine import get_engine
+from transfer_graph import get_transfer_graph
+
+# بيانات أحياء فارغة ثابتة: كائن جديد في كل استدعاء يبني محركاً وحواف تبديل جديدة في الكاش
+NO_NEIGHBORHOODS: Dict = {}
+
 def build_keyboard(items: List, prefix: str, back_target: Optional[str] = None) -> InlineKeyboardMarkup:
     """بناء لوحة المفاتيح التفاعلية"""
     keyboard = []
@@ -49,14 +55,46 @@ def build_keyboard(items: List, prefix: str, back_target: Optional[str] = None)
     
     return InlineKeyboardMarkup(keyboard)
 
-def find_route_logic(start_landmark: str, end_landmark: str, routes_data: List[Dict]) -> str:
+def _engine_names(engine, query: str, routes_data: List[Dict], limit: int = 3) -> List[str]:
+    """الاسم كما هو إذا كان معروفاً للمحرك، وإلا أسماء المحطات التي تحتويه"""
+    if engine.knows(query):
+        return [query]
+    query_lower = query.lower()
+    names = []
+    for route in routes_data:
+        for point in route.get('keyPoints', []):
+            if isinstance(point, str) and query_lower in point.lower() and point not in names:
+                names.append(point)
+                if len(names) == limit:
+                    return names
+    return names
+
+def format_transfer_options(itineraries: List[Dict]) -> str:
+    """تنسيق رحلات التبديل الناتجة من RoutingEngine.find_with_transfer"""
+    result = "🔄 **مسارات بتبديل متاحة:**\n\n"
+    for i, item in enumerate(itineraries, 1):
+        first, second = item['legs']
+        result += f"{i}. **{first['routeName']}** ← **{second['routeName']}**\n"
+        result += f"   🚏 اركب من: {first['start_nearest_stop']}\n"
+        if item['transfer_walk_meters']:
+            result += (f"   🔄 انزل عند: {first['end_nearest_stop']} وامشِ حوالي "
+                       f"{item['transfer_walk_meters']} م إلى {second['start_nearest_stop']}\n")
+        else:
+            result += f"   🔄 بدّل عند: {first['end_nearest_stop']}\n"
+        result += f"   🏁 انزل عند: {second['end_nearest_stop']}\n"
+        result += f"   💰 التعريفة: {first['fare']} + {second['fare']}\n\n"
+    
+    result += "📝 **ملاحظة:** قد تحتاج لسؤال السائق عن أفضل نقاط التبديل."
+    return result
+
+def find_route_logic(start_landmark: str, end_landmark: str, routes_data: List[Dict],
+                     neighborhoods: Optional[Dict] = None) -> str:
     """
     البحث عن أفضل مسار بين معلمين
     """
     
     # البحث عن المسارات المباشرة
     direct_routes = []
-    transfer_routes = []
     
     for route in routes_data:
         key_points = route.get('keyPoints', [])
@@ -101,55 +139,18 @@ def find_route_logic(start_landmark: str, end_landmark: str, routes_data: List[D
         return result
     
     else:
-        # البحث عن مسارات بتبديل
-        potential_connections = []
+        # البحث عن مسارات بتبديل عبر محرك المسارات وحواف المشي بين المحطات
+        neighborhoods = neighborhoods if neighborhoods is not None else NO_NEIGHBORHOODS
+        engine = get_engine(routes_data, neighborhoods)
+        transfers = get_transfer_graph(routes_data, neighborhoods)
+        itineraries = []
+        for start_name in _engine_names(engine, start_landmark, routes_data):
+            for end_name in _engine_names(engine, end_landmark, routes_data):
+                itineraries.extend(engine.find_with_transfer(start_name, end_name, transfers, limit=3))
+        itineraries.sort(key=lambda item: item['cost'])
         
-        for route1 in routes_data:
-            for route2 in routes_data:
-                if route1 == route2:
-                    continue
-                
-                # البحث عن نقاط مشتركة للتبديل
-                route1_points = route1.get('keyPoints', [])
-                route2_points = route2.get('keyPoints', [])
-                
-                # هل يخدم route1 نقطة البداية؟
-                route1_has_start = any(start_landmark.lower() in str(point).lower() 
-                                     for point in route1_points)
-                
-                # هل يخدم route2 نقطة النهاية؟ 
-                route2_has_end = any(end_landmark.lower() in str(point).lower() 
-                                   for point in route2_points)
-                
-                if route1_has_start and route2_has_end:
-                    # البحث عن نقاط التبديل المشتركة
-                    common_points = []
-                    for p1 in route1_points:
-                        for p2 in route2_points:
-                            if isinstance(p1, str) and isinstance(p2, str):
-                                if p1.lower() == p2.lower() or \
-                                   (len(p1) > 5 and len(p2) > 5 and 
-                                    (p1.lower() in p2.lower() or p2.lower() in p1.lower())):
-                                    common_points.append(p1)
-                    
-                    if common_points:
-                        potential_connections.append({
-                            'route1': route1,
-                            'route2': route2,
-                            'transfer_points': common_points
-                        })
-        
-        if potential_connections:
-            result = "🔄 **مسارات بتبديل متاحة:**\n\n"
-            for i, conn in enumerate(potential_connections[:3], 1):  # أول 3 خيارات
-                result += f"{i}. **{conn['route1'].get('routeName')}** ← **{conn['route2'].get('routeName')}**\n"
-                result += f"   🔄 نقاط التبديل: {', '.join(conn['transfer_points'][:2])}\n"
-                fare1 = conn['route1'].get('fare', 'غير محددة')
-                fare2 = conn['route2'].get('fare', 'غير محددة') 
-                result += f"   💰 التعريفة: {fare1} + {fare2}\n\n"
-            
-            result += "📝 **ملاحظة:** قد تحتاج لسؤال السائق عن أفضل نقاط التبديل."
-            return result
+        if itineraries:
+            return format_transfer_options(itineraries[:3])
         
         else:
             return f"""
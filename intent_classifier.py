@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+"""
+تصنيف نية الرسالة الحرة قبل البحث: مسار، أو مكان واحد، أو خريطة، أو تقرير مرور، أو دردشة
+
+- KEYWORDS: عبارات كل مجموعة (من / إلى / إزاي / فين / خريطة / زحمة / شكراً ...) بالعربي
+  والفرانكو، مجمعة في automaton واحد (Aho-Corasick) يمر على النص مرة واحدة
+- الخصائص: المجموعات الموجودة وترتيب "من" و"إلى" وعدد الكلمات وكلمات القاموس
+- نموذج خطي صغير (softmax) أوزانه في intent_model.json، ويُدرب مسبقاً من
+  intent_corpus.jsonl (قوالب أسماء الأماكن فيها {a} و {b} تُملأ من data.py):
+      python intent_classifier.py --train
+
+التصنيف أجزاء من الميلي ثانية، فلا يصل إلى البحث عن المعالم والمسارات إلا طلبات المسار.
+"""
+
+import os
+import re
+import json
+import math
+import random
+import logging
+import argparse
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+import numpy as np
+
+from arabic_text import normalize
+from arabizi import arabic_to_arabizi
+
+logger = logging.getLogger(__name__)
+
+ROUTE, PLACE, MAP, REPORT, CHITCHAT = 'route', 'place', 'map', 'report', 'chitchat'
+INTENTS = (ROUTE, PLACE, MAP, REPORT, CHITCHAT)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(BASE_DIR, 'intent_model.json')
+CORPUS_PATH = os.path.join(BASE_DIR, 'intent_corpus.jsonl')
+# أقل ثقة لقبول التصنيف؛ أقل منها يُعامل النص كطلب مسار (السلوك السابق)
+MIN_CONFIDENCE = 0.5
+
+# العبارة بين مسافتين = كلمة كاملة، وبمسافة قبلها فقط = بداية كلمة ("للمحطه")
+# (بعد arabic_text.normalize: ة -> ه و ى -> ي و أ -> ا)
+KEYWORDS = {
+    'from': [' من ', ' من عند ', ' mn ', ' men ', ' min ', ' from '],
+    'to': [' الي ', ' لحد ', ' لل', ' لـ', ' le ', ' lel ', ' li ', ' to '],
+    'how': [' ازاي ', ' كيف ', ' طريقه ', ' اروح ', ' اوصل ', ' اصل ', ' اركب ', ' يوديني ', ' المواصلات ',
+            ' ezay ', ' aro7 ', ' aroo7 ', ' awsal ', ' how ', ' go '],
+    'want': [' عايز ', ' عاوز ', ' محتاج ', ' 3ayez ', ' 3awez '],
+    'line': [' خط ', ' الخط ', ' الخطوط ', ' khat ', ' el khat '],
+    'where': [' فين ', ' وين ', ' اين ', ' مكان ', ' عنوان ', ' انهي ', ' حته ', ' قريب من ايه ', ' fein ', ' feen ', ' where '],
+    'map': [' خريطه ', ' الخريطه ', ' لوكيشن ', ' موقع ', ' الموقع ', ' جوجل ماب ', ' ماب ', ' map ', ' maps ',
+            ' location ', ' gps '],
+    'report': [' زحمه ', ' زحام ', ' ازدحام ', ' متاخر ', ' تاخير ', ' عطل', ' حادثه ', ' واقف', ' مقفول ',
+               ' تحويله ', ' لجنه ', ' ابلغ ', ' مش شغال ', ' مفيش عربيات ', ' غير طريقه ', ' يلف ', ' فاضي ',
+               ' ماشي كويس ', ' za7ma ', ' wa2ef ', ' met2akhar ',
+               ' 7adsa '],
+    'greeting': [' السلام عليكم ', ' اهلا ', ' مرحبا ', ' صباح الخير ', ' مساء الخير ', ' ازيك ', ' عامل ايه ',
+                 ' hi ', ' hello ', ' salam ', ' ezayak ', ' good morning '],
+    'thanks': [' شكرا ', ' متشكر ', ' تسلم ', ' يخليك ', ' جزاك ', ' thanks ', ' shokran ', ' merci '],
+    'bot': [' انت مين ', ' بوت ', ' البوت ', ' عملك ', ' تساعدني ', ' enta meen ', ' bot '],
+    'short_reply': [' تمام ', ' ماشي ', ' اه ', ' لا ', ' ok ', ' tmam '],
+}
+
+_QUESTION = re.compile('[?؟]')
+
+
+class KeywordAutomaton:
+    """Aho-Corasick: كل العبارات في مرور واحد على النص"""
+
+    def __init__(self, phrases: Dict[str, Iterable[str]]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[Tuple[str, int]]] = [[]]
+        for group, group_phrases in phrases.items():
+            for phrase in group_phrases:
+                state = 0
+                for char in phrase:
+                    if char not in self.goto[state]:
+                        self.goto.append({})
+                        self.fail.append(0)
+                        self.output.append([])
+                        self.goto[state][char] = len(self.goto) - 1
+                    state = self.goto[state][char]
+                self.output[state].append((group, len(phrase)))
+        # روابط الفشل بالعرض: أطول لاحقة للحالة هي أيضاً بادئة عبارة
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def find(self, text: str) -> List[Tuple[str, int, int]]:
+        """(المجموعة، البداية، النهاية) لكل عبارة في النص"""
+        matches = []
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for group, length in self.output[state]:
+                matches.append((group, position + 1 - length, position + 1))
+        return matches
+
+
+def _padded(text: str) -> str:
+    # المسافات المضاعفة حتى تتطابق عبارتان متجاورتان (" من " ثم " عند ")
+    return ' ' + normalize(text).replace(' ', '  ') + ' '
+
+
+def _phrase(phrase: str) -> str:
+    """العبارة بنفس مسافات _padded (" من عند " تصبح " من  عند ")"""
+    return ' ' + phrase.strip().replace(' ', '  ') + (' ' if phrase.endswith(' ') else '')
+
+
+_AUTOMATON = KeywordAutomaton({group: [_phrase(phrase) for phrase in phrases] for group, phrases in KEYWORDS.items()})
+
+
+def _uncovered_words(padded: str, matches: List[Tuple[str, int, int]]) -> int:
+    """عدد الكلمات التي لا تغطيها أي عبارة بالكامل (غالباً اسم مكان)"""
+    covered = bytearray(len(padded))
+    for _, start, end in matches:
+        covered[start:end] = b'\x01' * (end - start)
+    return sum(1 for word in re.finditer(r'\S+', padded) if not all(covered[word.start():word.end()]))
+
+
+def features(text: str, vocabulary: Iterable[str] = ()) -> List[str]:
+    """خصائص النص للنموذج الخطي"""
+    padded = _padded(text)
+    matches = _AUTOMATON.find(padded)
+    groups = {group for group, _, _ in matches}
+    result = ['kw:' + group for group in groups]
+    if matches:
+        result.append('first:' + min(matches, key=lambda match: match[1])[0])
+    else:
+        result.append('kw:none')
+    first_from = min((start for group, start, _ in matches if group == 'from'), default=None)
+    last_to = max((start for group, start, _ in matches if group == 'to'), default=None)
+    if first_from is not None and last_to is not None and first_from < last_to:
+        result.append('from_before_to')
+    words = padded.split()
+    result.append('words:' + ('0' if not words else '1' if len(words) == 1 else '2' if len(words) == 2
+                              else '3-4' if len(words) <= 4 else '5+'))
+    uncovered = _uncovered_words(padded, matches)
+    result.append('other_words:' + ('0' if not uncovered else '1-2' if uncovered <= 2 else '3+'))
+    if _QUESTION.search(text):
+        result.append('question')
+    if re.search('[a-z]', padded):
+        result.append('latin')
+    if not words:
+        result.append('no_words')
+    result.extend('w:' + word for word in set(words) if word in vocabulary)
+    return result
+
+
+class Intent(NamedTuple):
+    intent: str
+    confidence: float
+
+
+class IntentClassifier:
+    """نموذج خطي: وزن لكل (خاصية، نية) وانحياز لكل نية"""
+
+    def __init__(self, weights: Dict[str, List[float]], bias: List[float], vocabulary: Iterable[str] = (),
+                 labels: Tuple[str, ...] = INTENTS):
+        self.weights = weights
+        self.bias = bias
+        self.vocabulary = frozenset(vocabulary)
+        self.labels = tuple(labels)
+
+    @classmethod
+    def load(cls, path: str = MODEL_PATH) -> 'IntentClassifier':
+        with open(path, encoding='utf-8') as f:
+            model = json.load(f)
+        return cls(model['weights'], model['bias'], model['vocabulary'], tuple(model['labels']))
+
+    def save(self, path: str = MODEL_PATH):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'labels': self.labels, 'bias': [round(b, 4) for b in self.bias],
+                       'vocabulary': sorted(self.vocabulary),
+                       'weights': {feature: [round(w, 4) for w in weights]
+                                   for feature, weights in sorted(self.weights.items())}},
+                      f, ensure_ascii=False, indent=1)
+
+    def scores(self, text: str) -> List[float]:
+        """احتمال كل نية (softmax)"""
+        logits = list(self.bias)
+        for feature in features(text, self.vocabulary):
+            weights = self.weights.get(feature)
+            if weights:
+                logits = [logit + weight for logit, weight in zip(logits, weights)]
+        top = max(logits)
+        exps = [math.exp(logit - top) for logit in logits]
+        total = sum(exps)
+        return [value / total for value in exps]
+
+    def classify(self, text: str) -> Intent:
+        probabilities = self.scores(text)
+        best = max(range(len(self.labels)), key=probabilities.__getitem__)
+        if probabilities[best] < MIN_CONFIDENCE:
+            return Intent(ROUTE, probabilities[best])
+        return Intent(self.labels[best], probabilities[best])
+
+
+def keyword_spans(text: str, groups: Iterable[str]) -> str:
+    """النص الموحد بعد حذف عبارات المجموعات المحددة ("خريطة بنك مصر" -> "بنك مصر")"""
+    padded = _padded(text)
+    groups = set(groups)
+    keep = [True] * len(padded)
+    for group, start, end in _AUTOMATON.find(padded):
+        if group in groups:
+            keep[start:end] = [False] * (end - start)
+    return ' '.join(''.join(char if keep[i] else ' ' for i, char in enumerate(padded)).split())
+
+
+# ===== التدريب =====
+
+def expand_corpus(templates: List[Dict], names: List[str], copies: int, rng: random.Random) -> List[Tuple[str, str]]:
+    """ملء {a} و {b} بأسماء أماكن، و {la} و {lb} بكتابتها بالفرانكو"""
+    examples = []
+    for template in templates:
+        text = template['text']
+        has_place = '{' in text
+        for _ in range(copies if has_place else 1):
+            a, b = rng.sample(names, 2)
+            examples.append((text.format(a=a, b=b, la=arabic_to_arabizi(a), lb=arabic_to_arabizi(b)),
+                             template['intent']))
+    return examples
+
+
+def template_vocabulary(templates: List[Dict], min_count: int = 2) -> List[str]:
+    """كلمات القوالب نفسها (بدون أسماء الأماكن) التي تتكرر في min_count قوالب على الأقل"""
+    counts: Dict[str, int] = {}
+    for template in templates:
+        text = re.sub(r'\{\w+\}', ' ', template['text'])
+        for word in set(_padded(text).split()):
+            counts[word] = counts.get(word, 0) + 1
+    return sorted(word for word, count in counts.items() if count >= min_count)
+
+
+def train(examples: List[Tuple[str, str]], vocabulary: Iterable[str], epochs: int = 1000,
+          learning_rate: float = 0.5, l2: float = 1e-3) -> IntentClassifier:
+    """انحدار softmax بالدفعة الكاملة"""
+    vocabulary = frozenset(vocabulary)
+    rows = [features(text, vocabulary) for text, _ in examples]
+    names = sorted({feature for row in rows for feature in row})
+    index = {feature: i for i, feature in enumerate(names)}
+    x = np.zeros((len(rows), len(names)))
+    for i, row in enumerate(rows):
+        x[i, [index[feature] for feature in row]] = 1.0
+    y = np.array([INTENTS.index(intent) for _, intent in examples])
+    targets = np.eye(len(INTENTS))[y]
+    w = np.zeros((len(names), len(INTENTS)))
+    b = np.zeros(len(INTENTS))
+    for _ in range(epochs):
+        logits = x @ w + b
+        logits -= logits.max(axis=1, keepdims=True)
+        p = np.exp(logits)
+        p /= p.sum(axis=1, keepdims=True)
+        gradient = (p - targets) / len(rows)
+        w -= learning_rate * (x.T @ gradient + l2 * w)
+        b -= learning_rate * gradient.sum(axis=0)
+    weights = {feature: w[i].tolist() for feature, i in index.items() if np.abs(w[i]).max() > 1e-3}
+    return IntentClassifier(weights, b.tolist(), vocabulary)
+
+
+def load_templates(path: str = CORPUS_PATH) -> List[Dict]:
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def landmark_names() -> List[str]:
+    from data import neighborhood_data
+    return sorted({landmark['name'] if isinstance(landmark, dict) else landmark
+                   for categories in neighborhood_data.values()
+                   for landmarks in categories.values() for landmark in landmarks})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--train', action='store_true', help='تدريب النموذج وحفظه في intent_model.json')
+    parser.add_argument('--corpus', default=CORPUS_PATH)
+    parser.add_argument('--copies', type=int, default=8, help='عدد مرات ملء كل قالب بأماكن مختلفة')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('text', nargs='*', help='نصوص للتصنيف')
+    args = parser.parse_args()
+
+    if args.train:
+        rng = random.Random(args.seed)
+        names = landmark_names()
+        rng.shuffle(names)
+        # أماكن الاختبار لا تظهر في التدريب
+        held_out = len(names) // 5
+        templates = load_templates(args.corpus)
+        train_set = expand_corpus(templates, names[held_out:], args.copies, rng)
+        test_set = expand_corpus(templates, names[:held_out], 2, rng)
+        vocabulary = template_vocabulary(templates)
+        model = train(train_set, vocabulary)
+        correct: Dict[str, List[int]] = {}
+        for text, intent in test_set:
+            counts = correct.setdefault(intent, [0, 0])
+            counts[0] += model.classify(text).intent == intent
+            counts[1] += 1
+        print(f"train={len(train_set)} test={len(test_set)} features={len(model.weights)} "
+              f"vocabulary={len(model.vocabulary)}")
+        for intent, (hits, total) in sorted(correct.items()):
+            print(f"  {intent:<9} {hits / total:.1%} ({total})")
+        print(f"  overall   {sum(c[0] for c in correct.values()) / len(test_set):.1%}")
+        model = train(train_set + test_set, vocabulary)
+        model.save()
+        print(f"saved {MODEL_PATH}")
+        return
+
+    model = IntentClassifier.load()
+    for text in args.text:
+        print(f"{model.classify(text)}  {text}")
+
+
+if __name__ == '__main__':
+    main()
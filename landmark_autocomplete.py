@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+إكمال أسماء المعالم أثناء الكتابة (الوضع المضمّن @bot وقوائم الاقتراحات)
+
+الفهرس مصفوفة مرتبة من المفاتيح: لكل معلم الاسم الموحد (arabic_text.normalize)
+من بداية كل كلمة فيه، ومن بعد "ال" أيضاً. فـ "بنك مصر" له المفتاحان
+"بنك مصر" و "مصر"، والنص "مص" يطابق الثاني. البحث bisect لأول مفتاح يبدأ بالنص
+ثم مرور على المفاتيح المتتالية التي تبدأ به فقط، بدلاً من فحص كل المعالم.
+
+الترتيب: التطابق التام، ثم الاسم الذي يبدأ بالنص، ثم الأكثر خطوطاً، ثم الأقصر.
+البادئات الشائعة (حرف أو حرفان يطابقان آلاف المفاتيح) تُرتب نتائجها مرة واحدة عند
+البناء، فلا يزيد ما يُرتب وقت البحث عن HEAVY_PREFIX_KEYS مفتاحاً. والنتائج تُحفظ
+في cache للنصوص المتكررة ويُمسح عند أي تعديل.
+"""
+
+import heapq
+import logging
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from arabic_text import normalize, strip_article
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 10
+CACHE_SIZE = 2048
+# بادئة تطابق أكثر من هذا العدد من المفاتيح تُحسب أفضل PRECOMPUTED_RESULTS نتيجة لها عند البناء
+HEAVY_PREFIX_KEYS = 256
+PRECOMPUTED_RESULTS = 20
+
+
+def landmark_keys(normalized_name: str) -> List[str]:
+    """المفاتيح المفهرسة لاسم موحد: من بداية كل كلمة، وبدون "ال" في أولها"""
+    words = normalized_name.split()
+    keys = []
+    for i, word in enumerate(words):
+        rest = words[i + 1:]
+        keys.append(' '.join([word] + rest))
+        stripped = strip_article(word)
+        if stripped != word:
+            keys.append(' '.join([stripped] + rest))
+    return keys
+
+
+class LandmarkAutocomplete:
+    """فهرس بادئات كلمات أسماء المعالم"""
+
+    def __init__(self, cache_size: int = CACHE_SIZE):
+        # المعالم بالمعرف؛ None لمعلم محذوف
+        self.entries: List[Optional[Dict]] = []
+        self.ids: Dict[Tuple[str, str], int] = {}
+        self._keys: List[str] = []
+        self._key_ids: List[int] = []
+        self._top: Dict[str, List[int]] = {}
+        self._built = False
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[Tuple[str, int], List[Dict]]' = OrderedDict()
+        self.stats = {'queries': 0, 'cache_hits': 0}
+
+    @classmethod
+    def from_neighborhoods(cls, neighborhood_data: Dict) -> 'LandmarkAutocomplete':
+        index = cls()
+        for neighborhood, categories in neighborhood_data.items():
+            for category, landmarks in categories.items():
+                for landmark in landmarks:
+                    index.add(landmark, neighborhood, category)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _build(self):
+        pairs = sorted((key, entry_id) for entry_id, entry in enumerate(self.entries) if entry
+                       for key in landmark_keys(entry['normalized']))
+        self._keys = [key for key, _ in pairs]
+        self._key_ids = [entry_id for _, entry_id in pairs]
+        self._top = {}
+
+        # ترتيب كل مفتاح كرقم واحد حتى تُرتب البادئات الثقيلة بـ NumPy:
+        # ترتيب المعلم الثابت، + n إذا لم يكن المفتاح بداية الاسم، + 2n إذا لم يكن تطابقاً تاماً
+        n = len(self.entries)
+        order = np.zeros(n, dtype=np.int64)
+        ranked_ids = sorted(self.ids.values(), key=self._static_key)
+        order[ranked_ids] = np.arange(len(ranked_ids))
+        key_ids = np.asarray(self._key_ids, dtype=np.int64)
+        full = np.fromiter((key == self.entries[entry_id]['normalized'] for key, entry_id in pairs),
+                           dtype=bool, count=len(pairs))
+        scores = order[key_ids] + np.where(full, 0, n) + 2 * n
+
+        def top(prefix, lo, hi):
+            values = scores[lo:hi].copy()
+            position = lo
+            while position < hi and self._keys[position] == prefix:
+                if full[position]:
+                    values[position - lo] -= 2 * n
+                position += 1
+            result, seen = [], set()
+            for entry_id in key_ids[lo:hi][np.argsort(values, kind='stable')].tolist():
+                if entry_id not in seen:
+                    seen.add(entry_id)
+                    result.append(entry_id)
+                    if len(result) == PRECOMPUTED_RESULTS:
+                        break
+            return result
+
+        # البادئات الثقيلة بطول 1 ثم 2 ... داخل نطاقات البادئات الثقيلة الأقصر فقط
+        ranges, length = [(0, len(self._keys))], 1
+        while ranges:
+            heavy = []
+            for lo, hi in ranges:
+                position = lo
+                while position < hi:
+                    if len(self._keys[position]) < length:
+                        position += 1
+                        continue
+                    prefix = self._keys[position][:length]
+                    end = self._prefix_end(prefix, position, hi)
+                    if end - position > HEAVY_PREFIX_KEYS:
+                        self._top[prefix] = top(prefix, position, end)
+                        heavy.append((position, end))
+                    position = end
+            ranges, length = heavy, length + 1
+        self._built = True
+        logger.info("Autocomplete index built: %d landmarks, %d keys, %d precomputed prefixes",
+                    len(self.ids), len(self._keys), len(self._top))
+
+    def _prefix_end(self, prefix: str, lo: int, hi: int) -> int:
+        """أول موضع بعد المفاتيح التي تبدأ بـ prefix (المفاتيح مرتبة)"""
+        return bisect_left(self._keys, prefix + '\uffff', lo, hi)
+
+    def _static_key(self, entry_id: int) -> Tuple:
+        """ترتيب المعالم الذي لا يعتمد على النص: الأكثر خطوطاً ثم الأقصر"""
+        entry = self.entries[entry_id]
+        return -entry['routes'], len(entry['normalized']), entry['normalized'], entry_id
+
+    def _rank(self, query: str, lo: int, hi: int, limit: int) -> List[int]:
+        entries = self.entries
+
+        def rank(entry_id):
+            normalized = entries[entry_id]['normalized']
+            return normalized != query, not normalized.startswith(query), self._static_key(entry_id)
+
+        return heapq.nsmallest(limit, set(self._key_ids[lo:hi]), key=rank)
+
+    def _update_top(self, keys: List[str]):
+        """إعادة ترتيب البادئات الثقيلة التي تغيرت نطاقاتها"""
+        for key in keys:
+            for length in range(1, len(key) + 1):
+                prefix = key[:length]
+                if prefix not in self._top:
+                    break
+                lo = bisect_left(self._keys, prefix)
+                self._top[prefix] = self._rank(prefix, lo, self._prefix_end(prefix, lo, len(self._keys)),
+                                               PRECOMPUTED_RESULTS)
+
+    # ===== التعديل =====
+
+    def add(self, landmark, neighborhood: str, category: str) -> bool:
+        """إضافة معلم (نص أو قاموس)؛ نفس الاسم في نفس الحي يُستبدل"""
+        name = landmark.get('name', '') if isinstance(landmark, dict) else landmark
+        if not isinstance(name, str) or not normalize(name):
+            return False
+        self.remove(name, neighborhood)
+        served_by = landmark.get('served_by') if isinstance(landmark, dict) else None
+        entry = {
+            'name': name.strip(),
+            'neighborhood': neighborhood,
+            'category': category,
+            'normalized': normalize(name),
+            'routes': len(served_by) if isinstance(served_by, dict) else 0,
+        }
+        entry_id = len(self.entries)
+        self.entries.append(entry)
+        self.ids[(entry['normalized'], neighborhood)] = entry_id
+        if self._built:
+            keys = landmark_keys(entry['normalized'])
+            for key in keys:
+                position = bisect_left(self._keys, key)
+                self._keys.insert(position, key)
+                self._key_ids.insert(position, entry_id)
+            self._update_top(keys)
+        self._cache.clear()
+        return True
+
+    def remove(self, name: str, neighborhood: str) -> bool:
+        entry_id = self.ids.pop((normalize(name), neighborhood), None)
+        if entry_id is None:
+            return False
+        entry = self.entries[entry_id]
+        self.entries[entry_id] = None
+        if self._built:
+            keys = landmark_keys(entry['normalized'])
+            for key in keys:
+                position = bisect_left(self._keys, key)
+                while self._keys[position] == key and self._key_ids[position] != entry_id:
+                    position += 1
+                del self._keys[position]
+                del self._key_ids[position]
+            self._update_top(keys)
+        self._cache.clear()
+        return True
+
+    # ===== البحث =====
+
+    def complete(self, text: str, limit: int = DEFAULT_LIMIT) -> List[Dict]:
+        """أفضل limit معلم تبدأ إحدى كلمات اسمه بالنص؛ كل نتيجة name و neighborhood و category"""
+        query = normalize(text)
+        if not query:
+            return []
+        self.stats['queries'] += 1
+        cache_key = (query, limit)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            self.stats['cache_hits'] += 1
+            self._cache.move_to_end(cache_key)
+            return cached
+
+        if not self._built:
+            self._build()
+        top = self._top.get(query)
+        if top is not None and limit <= PRECOMPUTED_RESULTS:
+            ranked = top[:limit]
+        else:
+            lo = bisect_left(self._keys, query)
+            ranked = self._rank(query, lo, self._prefix_end(query, lo, len(self._keys)), limit)
+        results = [{'name': self.entries[entry_id]['name'], 'neighborhood': self.entries[entry_id]['neighborhood'],
+                    'category': self.entries[entry_id]['category']}
+                   for entry_id in ranked]
+        self._cache[cache_key] = results
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return results
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+البحث في المعالم بالكلمات (BM25F) بدلاً من مقارنة النص بكل اسم
+
+لكل كلمة (بعد arabic_text.normalize وحذف "ال") قائمة بالمعالم التي تحتويها في كل
+حقل: الاسم والحي والتصنيف. القوائم array('i') لمعرفات المعالم بترتيب الإضافة ومعها
+array('H') لعدد مرات الكلمة، فوقت البحث تُقرأ قوائم كلمات النص فقط وتُجمع بـ NumPy.
+
+الدرجة BM25F: تكرار الكلمة في كل حقل مقسوماً على طول الحقل نسبة لمتوسطه ومضروباً
+في وزن الحقل (FIELD_WEIGHTS)، ثم تشبع K1 و IDF الكلمة. "بنك مصر" يطابق
+"بنك مصر (فرع سوق البازار/الصباح؟)" لأن كلمتيه فيه، والاسم الأقصر يتقدم بنفس الكلمات.
+الكلمة غير الموجودة في أي معلم تُستبدل بأقرب كلمات الفهرس (SymSpell) بوزن تشابهها.
+
+coverage نسبة كلمات النص (موزونة بـ IDF) الموجودة في المعلم، وهي ما يُقارن بـ
+min_score في best_match بدلاً من نسبة SequenceMatcher.
+"""
+
+import math
+import logging
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from arabic_text import normalize
+from spell_correction import MAX_EDIT_DISTANCE, SymSpell, allowed_distance, index_words
+
+logger = logging.getLogger(__name__)
+
+FIELD_WEIGHTS = {'name': 1.0, 'neighborhood': 0.3, 'category': 0.2}
+K1 = 1.2
+B = 0.75
+# أقصى عدد من كلمات الفهرس تُستبدل بها كلمة غير معروفة
+MAX_EXPANSIONS = 3
+# أفضل كم نتيجة تُفحص في best_match بحثاً عن coverage كافية
+BEST_MATCH_CANDIDATES = 10
+
+
+class LandmarkSearch:
+    """فهرس مقلوب لكلمات المعالم"""
+
+    def __init__(self, field_weights: Optional[Dict[str, float]] = None, k1: float = K1, b: float = B):
+        self.field_weights = dict(field_weights or FIELD_WEIGHTS)
+        self.k1 = k1
+        self.b = b
+        # المعالم بالمعرف؛ None لمعلم محذوف
+        self.entries: List[Optional[Dict]] = []
+        self.ids: Dict[Tuple[str, str], int] = {}
+        # الاسم الموحد -> المعالم بهذا الاسم (التطابق التام يسبق الدرجة: "مسجد الرحمة (2)")
+        self.by_name: Dict[str, List[int]] = {}
+        self.alive = array('b')
+        # حقل -> كلمة -> (معرفات المعالم, عدد مرات الكلمة)
+        self.postings: Dict[str, Dict[str, Tuple[array, array]]] = {field: {} for field in self.field_weights}
+        self.lengths: Dict[str, array] = {field: array('i') for field in self.field_weights}
+        self.total_lengths: Dict[str, int] = {field: 0 for field in self.field_weights}
+        # عدد المعالم الحية التي تحتوي الكلمة في أي حقل
+        self.df: Dict[str, int] = {}
+        self.vocabulary = SymSpell(MAX_EDIT_DISTANCE)
+        self.dead_postings = 0
+
+    @classmethod
+    def from_neighborhoods(cls, neighborhood_data: Dict, **kwargs) -> 'LandmarkSearch':
+        index = cls(**kwargs)
+        for neighborhood, categories in neighborhood_data.items():
+            for category, landmarks in categories.items():
+                for landmark in landmarks:
+                    index.add(landmark, neighborhood, category)
+        logger.info("Search index built: %d landmarks, %d words", len(index.ids), len(index.df))
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ===== التعديل =====
+
+    def add(self, landmark, neighborhood: str, category: str) -> bool:
+        """إضافة معلم (نص أو قاموس)؛ نفس الاسم في نفس الحي يُستبدل"""
+        name = landmark.get('name', '') if isinstance(landmark, dict) else landmark
+        if not isinstance(name, str) or not normalize(name):
+            return False
+        self.remove(name, neighborhood)
+        fields = {'name': name, 'neighborhood': neighborhood, 'category': category}
+        entry_id = len(self.entries)
+        entry = {'name': name.strip(), 'neighborhood': neighborhood, 'category': category, 'words': set()}
+        for field in self.field_weights:
+            counts = Counter(index_words(fields[field]))
+            for word, count in counts.items():
+                ids, tfs = self.postings[field].setdefault(word, (array('i'), array('H')))
+                ids.append(entry_id)
+                tfs.append(min(count, 0xffff))
+            length = sum(counts.values())
+            self.lengths[field].append(length)
+            self.total_lengths[field] += length
+            entry['words'].update(counts)
+        for word in entry['words']:
+            self.df[word] = self.df.get(word, 0) + 1
+            self.vocabulary.add_word(word)
+        self.entries.append(entry)
+        self.alive.append(1)
+        self.ids[(normalize(name), neighborhood)] = entry_id
+        self.by_name.setdefault(normalize(name), []).append(entry_id)
+        return True
+
+    def remove(self, name: str, neighborhood: str) -> bool:
+        entry_id = self.ids.pop((normalize(name), neighborhood), None)
+        if entry_id is None:
+            return False
+        entry = self.entries[entry_id]
+        self.entries[entry_id] = None
+        self.alive[entry_id] = 0
+        same_name = self.by_name[normalize(name)]
+        same_name.remove(entry_id)
+        if not same_name:
+            del self.by_name[normalize(name)]
+        for field in self.field_weights:
+            self.total_lengths[field] -= self.lengths[field][entry_id]
+        for word in entry['words']:
+            self.df[word] -= 1
+            if not self.df[word]:
+                del self.df[word]
+            self.vocabulary.remove_word(word)
+        # المعرف يبقى في القوائم حتى تكثر المحذوفات ثم تُنظف كلها مرة واحدة
+        self.dead_postings += 1
+        if self.dead_postings > len(self.ids):
+            self._compact()
+        return True
+
+    def _compact(self):
+        """حذف معرفات المعالم المحذوفة من كل القوائم"""
+        alive = np.frombuffer(self.alive, dtype=np.int8).astype(bool)
+        for postings in self.postings.values():
+            for word in list(postings):
+                ids, tfs = postings[word]
+                keep = alive[np.frombuffer(ids, dtype=np.int32)]
+                if keep.all():
+                    continue
+                if not keep.any():
+                    del postings[word]
+                    continue
+                postings[word] = (array('i', np.frombuffer(ids, dtype=np.int32)[keep].tobytes()),
+                                  array('H', np.frombuffer(tfs, dtype=np.uint16)[keep].tobytes()))
+        self.dead_postings = 0
+
+    # ===== البحث =====
+
+    def idf(self, word: str) -> float:
+        n = len(self.ids)
+        df = self.df.get(word, 0)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def _expand(self, word: str) -> List[Tuple[str, float]]:
+        """الكلمة نفسها إن كانت في الفهرس، وإلا أقرب كلماته مع تشابهها"""
+        if word in self.df:
+            return [(word, 1.0)]
+        return [(match, 1 - distance / (len(word) + 1))
+                for match, distance in self.vocabulary.lookup(word, allowed_distance(word))[:MAX_EXPANSIONS]]
+
+    def search(self, text: str, limit: int = 10) -> List[Dict]:
+        """أعلى المعالم درجة بين التي تطابق كلمة واحدة على الأقل من النص في اسمها
+
+        كل نتيجة name و neighborhood و category و score (BM25F) و coverage (0..1)"""
+        words = index_words(text)
+        if not words or not self.ids:
+            return []
+        n = len(self.entries)
+        scores = np.zeros(n)
+        covered = np.zeros(n)
+        name_hit = np.zeros(n, dtype=bool)
+        lengths = {field: np.frombuffer(self.lengths[field], dtype=np.int32) for field in self.field_weights}
+        averages = {field: max(self.total_lengths[field] / len(self.ids), 1e-9) for field in self.field_weights}
+        total_weight = 0.0
+        for word in words:
+            expansions = self._expand(word)
+            # كلمة لا تشبه أي كلمة في الفهرس تُحسب كاملة في الوزن ولا يغطيها أي معلم
+            total_weight += max((self.idf(term) for term, _ in expansions), default=self.idf(word))
+            word_cover = np.zeros(n)
+            for term, similarity in expansions:
+                idf = self.idf(term)
+                weighted_tf = np.zeros(n)
+                for field, weight in self.field_weights.items():
+                    posting = self.postings[field].get(term)
+                    if not posting:
+                        continue
+                    ids = np.frombuffer(posting[0], dtype=np.int32)
+                    tfs = np.frombuffer(posting[1], dtype=np.uint16)
+                    norm = 1 - self.b + self.b * lengths[field][ids] / averages[field]
+                    weighted_tf[ids] += weight * tfs / norm
+                    if field == 'name':
+                        name_hit[ids] = True
+                scores += similarity * idf * weighted_tf / (self.k1 + weighted_tf)
+                word_cover = np.maximum(word_cover, np.where(weighted_tf > 0, similarity * idf, 0.0))
+            covered += word_cover
+        candidates = np.flatnonzero(name_hit & np.frombuffer(self.alive, dtype=np.int8).astype(bool))
+        if not len(candidates):
+            return []
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        exact = self.by_name.get(normalize(text), [])
+        ranked = sorted(set(candidates.tolist()) | set(exact),
+                        key=lambda entry_id: (entry_id not in exact, -scores[entry_id],
+                                              len(self.entries[entry_id]['name']), self.entries[entry_id]['name']))[:limit]
+        return [{'name': self.entries[entry_id]['name'], 'neighborhood': self.entries[entry_id]['neighborhood'],
+                 'category': self.entries[entry_id]['category'], 'score': float(scores[entry_id]),
+                 'coverage': min(float(covered[entry_id]) / total_weight, 1.0) if total_weight else 0.0}
+                for entry_id in ranked]
+
+    def best_match(self, text: str, min_score: float = 0.6) -> Optional[Dict]:
+        """أعلى نتيجة تغطي min_score على الأقل من كلمات النص"""
+        for match in self.search(text, BEST_MATCH_CANDIDATES):
+            if match['coverage'] >= min_score:
+                return match
+        return None
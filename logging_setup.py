@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+إعداد نظام الـ Logging غير المتزامن للبوت
+
+- الكتابة على القرص تتم في thread منفصل عبر QueueHandler/QueueListener
+- ملف السجل بصيغة JSON Lines مع تدوير حسب الحجم (RotatingFileHandler)
+- تنسيق الرسائل يتم في thread الكتابة وليس في مسار معالجة الطلب
+- أخذ عينات من رسائل DEBUG كثيرة التكرار لتقليل الحجم
+"""
+
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
+
+CONSOLE_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+DEFAULT_LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+DEFAULT_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+DEFAULT_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+# تمرير رسالة واحدة من كل N رسالة DEBUG بنفس القالب (1 = بدون أخذ عينات)
+DEFAULT_DEBUG_SAMPLE_RATE = int(os.getenv('LOG_DEBUG_SAMPLE_RATE', '1'))
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """تنسيق كل سجل كسطر JSON مستقل"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        sampled = getattr(record, 'sampled_every', None)
+        if sampled:
+            entry['sampled_every'] = sampled
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DebugSamplingFilter(logging.Filter):
+    """أخذ عينات من رسائل DEBUG: تمرير أول رسالة ثم واحدة من كل N لكل قالب رسالة"""
+
+    def __init__(self, rate: int):
+        super().__init__()
+        self.rate = max(1, int(rate))
+        self._counts: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate == 1 or record.levelno != logging.DEBUG:
+            return True
+        # record.msg هو القالب قبل التنسيق، لذلك الرسائل المتشابهة تُجمع معاً
+        key = (record.name, record.msg if isinstance(record.msg, str) else id(record.msg))
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        if count % self.rate:
+            return False
+        record.sampled_every = self.rate
+        return True
+
+
+class _InProcessQueueHandler(QueueHandler):
+    """QueueHandler لا يقوم بتنسيق الرسالة في thread المستدعي
+
+    الطابور داخل نفس العملية فلا حاجة لتحويل السجل لصيغة قابلة للـ pickle،
+    ويتم التنسيق لاحقاً في thread الـ QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(log_file: Optional[str] = 'bot.log', level: Optional[str] = None,
+                  max_bytes: int = DEFAULT_MAX_BYTES, backup_count: int = DEFAULT_BACKUP_COUNT,
+                  debug_sample_rate: int = DEFAULT_DEBUG_SAMPLE_RATE,
+                  console: bool = True) -> QueueListener:
+    """تهيئة الـ logging الجذري (يمكن استدعاؤها أكثر من مرة بأمان)"""
+    global _listener
+
+    shutdown_logging()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel((level or DEFAULT_LOG_LEVEL).upper())
+
+    handlers = []
+    if log_file:
+        file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes,
+                                           backupCount=backup_count, encoding='utf-8')
+        file_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(file_handler)
+    if console:
+        stream_handler = logging.StreamHandler(sys.stderr)
+        stream_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        handlers.append(stream_handler)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _InProcessQueueHandler(log_queue)
+    if debug_sample_rate > 1:
+        queue_handler.addFilter(DebugSamplingFilter(debug_sample_rate))
+    root.addHandler(queue_handler)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    return _listener
+
+
+def shutdown_logging():
+    """إيقاف الـ listener وتفريغ ما تبقى في الطابور"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
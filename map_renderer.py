@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+رسم خرائط المسارات كصور PNG ثابتة بدون إنترنت
+
+- الرسم يتم محلياً من الإحداثيات المتوفرة (بدون تحميل tiles من الشبكة)
+- الصور بصيغة PNG بلوحة ألوان (8-bit palette) لتكون صغيرة الحجم
+- كاش على القرص بمفتاح مشتق من محتوى الخريطة (الخط + المحطات + الجزء المظلل)
+  مع حد أقصى للحجم وحذف الأقدم استخداماً عند تجاوزه
+- بعد أول رفع لتيليجرام يُحفظ file_id (file_id_cache) ويُعاد استخدامه بدون رفع الصورة مرة أخرى
+"""
+
+import os
+import json
+import zlib
+import struct
+import hashlib
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import metrics
+from file_id_cache import FileIdCache, file_id_cache
+from geo_index import parse_coordinates
+
+logger = logging.getLogger(__name__)
+
+MAP_CACHE_DIR = os.getenv('MAP_CACHE_DIR', 'map_cache')
+MAP_CACHE_MAX_BYTES = int(os.getenv('MAP_CACHE_MAX_BYTES', str(50 * 1024 * 1024)))
+MAP_WIDTH = 640
+MAP_HEIGHT = 480
+# يتغير عند تعديل طريقة الرسم حتى لا تُستخدم صور قديمة من الكاش
+RENDER_VERSION = 1
+
+Point = Tuple[float, float]
+
+# لوحة الألوان (الفهرس = رقم اللون في الصورة)
+BACKGROUND, GRID, ROUTE, RIDE, STOP_FILL, STOP_OUTLINE, START, END = range(8)
+PALETTE = [
+    (245, 243, 238),
+    (226, 222, 214),
+    (150, 170, 210),
+    (230, 120, 30),
+    (255, 255, 255),
+    (70, 70, 70),
+    (40, 160, 70),
+    (210, 50, 50),
+]
+
+MAP_REQUESTS = metrics.registry.counter(
+    'route_map_images_total', 'Route map images needed for upload by source (disk/render)', ['source'])
+
+
+def build_coordinate_index(neighborhoods: Dict) -> Dict[str, Point]:
+    """اسم المعلم -> إحداثياته، من حقل coordinates في بيانات الأحياء"""
+    index = {}
+    for categories in neighborhoods.values():
+        if not isinstance(categories, dict):
+            continue
+        for landmarks in categories.values():
+            if not isinstance(landmarks, list):
+                continue
+            for landmark in landmarks:
+                if isinstance(landmark, dict) and isinstance(landmark.get('name'), str):
+                    point = parse_coordinates(landmark.get('coordinates'))
+                    if point:
+                        index[landmark['name'].strip().lower()] = point
+    return index
+
+
+# ===== الرسم =====
+
+def _project(points: Sequence[Point], width: int, height: int, margin: int = 32) -> np.ndarray:
+    """تحويل (lat, lng) إلى بكسلات مع الحفاظ على نسبة الأبعاد"""
+    coords = np.asarray(points, dtype=np.float64)
+    lat0 = np.radians(coords[:, 0].mean())
+    xs = coords[:, 1] * np.cos(lat0)
+    ys = coords[:, 0]
+    span = max(xs.max() - xs.min(), ys.max() - ys.min(), 1e-4)
+    scale = min((width - 2 * margin), (height - 2 * margin)) / span
+    px = (xs - (xs.max() + xs.min()) / 2) * scale + width / 2
+    py = height / 2 - (ys - (ys.max() + ys.min()) / 2) * scale
+    return np.stack([px, py], axis=1)
+
+
+def _disk_offsets(radius: int) -> Tuple[np.ndarray, np.ndarray]:
+    r = np.arange(-radius, radius + 1)
+    dx, dy = np.meshgrid(r, r)
+    mask = dx * dx + dy * dy <= radius * radius
+    return dx[mask], dy[mask]
+
+
+def _stamp(canvas: np.ndarray, xs: np.ndarray, ys: np.ndarray, radius: int, color: int):
+    """رسم دوائر بنصف قطر radius عند كل نقطة (xs, ys)"""
+    dx, dy = _disk_offsets(radius)
+    all_x = (np.rint(xs)[:, None] + dx[None, :]).astype(np.int64).ravel()
+    all_y = (np.rint(ys)[:, None] + dy[None, :]).astype(np.int64).ravel()
+    height, width = canvas.shape
+    inside = (all_x >= 0) & (all_x < width) & (all_y >= 0) & (all_y < height)
+    canvas[all_y[inside], all_x[inside]] = color
+
+
+def _draw_polyline(canvas: np.ndarray, pixels: np.ndarray, radius: int, color: int):
+    for (x0, y0), (x1, y1) in zip(pixels[:-1], pixels[1:]):
+        steps = int(max(abs(x1 - x0), abs(y1 - y0))) + 1
+        _stamp(canvas, np.linspace(x0, x1, steps), np.linspace(y0, y1, steps), radius, color)
+
+
+def _encode_png(canvas: np.ndarray) -> bytes:
+    """ترميز مصفوفة فهارس ألوان كـ PNG بلوحة ألوان"""
+    height, width = canvas.shape
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    raw = np.zeros((height, width + 1), dtype=np.uint8)  # بايت الفلتر (0) في بداية كل سطر
+    raw[:, 1:] = canvas
+    return b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 3, 0, 0, 0)),
+        chunk(b'PLTE', bytes(c for rgb in PALETTE for c in rgb)),
+        chunk(b'IDAT', zlib.compress(raw.tobytes(), 9)),
+        chunk(b'IEND', b''),
+    ])
+
+
+def render_route_png(route_points: Sequence[Point], ride_range: Optional[Tuple[int, int]] = None,
+                     start: Optional[Point] = None, end: Optional[Point] = None,
+                     width: int = MAP_WIDTH, height: int = MAP_HEIGHT) -> bytes:
+    """رسم الخط كاملاً مع تظليل جزء الرحلة (من ride_range[0] إلى ride_range[1])"""
+    extra = [p for p in (start, end) if p]
+    pixels = _project(list(route_points) + extra, width, height)
+    route_pixels = pixels[:len(route_points)]
+
+    canvas = np.full((height, width), BACKGROUND, dtype=np.uint8)
+    canvas[::height // 8, :] = GRID
+    canvas[:, ::width // 8] = GRID
+
+    _draw_polyline(canvas, route_pixels, 2, ROUTE)
+    if ride_range:
+        first, last = ride_range
+        _draw_polyline(canvas, route_pixels[first:last + 1], 4, RIDE)
+    _stamp(canvas, route_pixels[:, 0], route_pixels[:, 1], 5, STOP_OUTLINE)
+    _stamp(canvas, route_pixels[:, 0], route_pixels[:, 1], 3, STOP_FILL)
+
+    marker_pixels = pixels[len(route_points):]
+    markers = [(point, color) for point, color in ((start, START), (end, END)) if point]
+    for (x, y), (_, color) in zip(marker_pixels, markers):
+        _stamp(canvas, np.array([x]), np.array([y]), 10, STOP_OUTLINE)
+        _stamp(canvas, np.array([x]), np.array([y]), 8, color)
+    return _encode_png(canvas)
+
+
+# ===== الكاش =====
+
+def map_cache_key(route_name: str, route_points: Sequence[Point], ride_range: Optional[Tuple[int, int]],
+                  start: Optional[Point], end: Optional[Point]) -> str:
+    """مفتاح مشتق من محتوى الخريطة: نفس الخط والمحطات = نفس الصورة"""
+    payload = json.dumps({
+        'v': RENDER_VERSION,
+        'size': [MAP_WIDTH, MAP_HEIGHT],
+        'route': route_name,
+        'points': [[round(lat, 6), round(lng, 6)] for lat, lng in route_points],
+        'ride': list(ride_range) if ride_range else None,
+        'start': [round(c, 6) for c in start] if start else None,
+        'end': [round(c, 6) for c in end] if end else None,
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+class MapImageCache:
+    """كاش صور على القرص بحد أقصى للحجم (حذف الأقدم استخداماً أولاً)"""
+
+    def __init__(self, cache_dir: str = MAP_CACHE_DIR, max_bytes: int = MAP_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self.path_for(key)
+        try:
+            os.utime(path)  # تحديث وقت آخر استخدام لترتيب الحذف
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, data: bytes) -> str:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path_for(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        with self._lock:
+            existed = os.path.exists(path)
+            old_size = os.path.getsize(path) if existed else 0
+            os.replace(tmp_path, path)
+            if self._total_bytes is not None:
+                self._total_bytes += len(data) - old_size
+            self._evict(keep=path)
+        return path
+
+    def _scan(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith('.png'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self, keep: Optional[str] = None):
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self._scan())
+        if self._total_bytes <= self.max_bytes:
+            return
+        # حذف حتى 90% من الحد لتجنب المسح عند كل إضافة
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in sorted(self._scan()):
+            if self._total_bytes <= target:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                self._total_bytes -= size
+            except FileNotFoundError:
+                pass
+        logger.info("Map cache evicted down to %d bytes", self._total_bytes)
+
+
+class RouteMapService:
+    """إنشاء وإرسال خرائط الرحلات مع إعادة استخدام الصور و file_id"""
+
+    def __init__(self, cache: Optional[MapImageCache] = None, file_ids: Optional[FileIdCache] = None):
+        self.cache = cache or MapImageCache()
+        self.file_ids = file_ids or file_id_cache
+
+    def prepare_itinerary(self, itinerary: Dict, key_points: List[str],
+                          locate: Callable[[str], Optional[Point]]) -> Optional[Dict]:
+        """تجميع إحداثيات محطات الخط؛ يعيد None إذا لم تتوفر إحداثيات كافية لجزء الرحلة"""
+        points, ride_first, ride_last = [], None, None
+        for index, name in enumerate(key_points):
+            point = locate(name)
+            if not point:
+                continue
+            if itinerary['start_index'] <= index <= itinerary['end_index']:
+                if ride_first is None:
+                    ride_first = len(points)
+                ride_last = len(points)
+            points.append(point)
+        if ride_first is None or ride_last == ride_first:
+            return None
+        start = locate(itinerary['start_landmark_name']) or points[ride_first]
+        end = locate(itinerary['end_landmark_name']) or points[ride_last]
+        return {
+            'route_name': itinerary['routeName'],
+            'route_points': points,
+            'ride_range': (ride_first, ride_last),
+            'start': start,
+            'end': end,
+        }
+
+    def get_image(self, spec: Dict) -> Tuple[str, str, bool]:
+        """(المفتاح, مسار الصورة, هل تم الرسم الآن)"""
+        key = map_cache_key(spec['route_name'], spec['route_points'], spec['ride_range'],
+                            spec['start'], spec['end'])
+        path = self.cache.get(key)
+        if path:
+            return key, path, False
+        data = render_route_png(spec['route_points'], spec['ride_range'], spec['start'], spec['end'])
+        return key, self.cache.put(key, data), True
+
+    def place_spec(self, name: str, point: Point) -> Dict:
+        """خريطة لمكان واحد (لطلبات عرض الخرائط)"""
+        return {'route_name': name, 'route_points': [point], 'ride_range': None, 'start': None, 'end': point}
+
+    async def send_map(self, bot, chat_id: int, spec: Dict, caption: Optional[str] = None):
+        """إرسال الخريطة: file_id إن وجد، وإلا الصورة من الكاش أو برسمها"""
+        key = map_cache_key(spec['route_name'], spec['route_points'], spec['ride_range'],
+                            spec['start'], spec['end'])
+
+        def load_image() -> str:
+            # تُستدعى فقط عند الحاجة للرفع، في thread لأن الرسم عملية CPU
+            _, path, rendered = self.get_image(spec)
+            MAP_REQUESTS.inc(source='render' if rendered else 'disk')
+            return path
+
+        return await self.file_ids.send(bot, chat_id, 'photo', load_image, key=key,
+                                        filename=f"{key}.png", caption=caption)
+
+
+# مثيل عام
+route_map_service = RouteMapService()
@@ -5,10 +5,11 @@
 
 import requests
 from urllib.parse import quote
-import folium
 from typing import Optional, Dict, Tuple
 import logging
 
+from map_renderer import route_map_service
+
 logger = logging.getLogger(__name__)
 
 class GoogleMapsIntegration:
@@ -62,43 +63,23 @@ class GoogleMapsIntegration:
     
     def generate_route_map(self, start_location: Dict, end_location: Dict, 
                           route_points: list = None) -> str:
-        """إنشاء خريطة تفاعلية للمسار"""
+        """إنشاء صورة PNG للمسار (تُرسم محلياً وتُحفظ في كاش الخرائط)"""
         try:
-            # إنشاء خريطة بـ Folium
-            center_lat = (start_location['lat'] + end_location['lat']) / 2
-            center_lng = (start_location['lng'] + end_location['lng']) / 2
-            
-            m = folium.Map(location=[center_lat, center_lng], zoom_start=13)
-            
-            # إضافة نقطة البداية
-            folium.Marker(
-                [start_location['lat'], start_location['lng']],
-                popup=f"البداية: {start_location['name']}",
-                icon=folium.Icon(color='green', icon='play')
-            ).add_to(m)
-            
-            # إضافة نقطة النهاية
-            folium.Marker(
-                [end_location['lat'], end_location['lng']],
-                popup=f"الوجهة: {end_location['name']}",
-                icon=folium.Icon(color='red', icon='stop')
-            ).add_to(m)
+            points = [(start_location['lat'], start_location['lng'])]
+            for point in route_points or []:
+                if isinstance(point, dict) and 'lat' in point and 'lng' in point:
+                    points.append((point['lat'], point['lng']))
+            points.append((end_location['lat'], end_location['lng']))
             
-            # إضافة نقاط المسار إذا كانت متوفرة
-            if route_points:
-                for point in route_points:
-                    if isinstance(point, dict) and 'lat' in point and 'lng' in point:
-                        folium.Marker(
-                            [point['lat'], point['lng']],
-                            popup=point.get('name', 'نقطة في المسار'),
-                            icon=folium.Icon(color='blue', icon='info-sign')
-                        ).add_to(m)
-            
-            # حفظ الخريطة
-            map_filename = f"route_map_{start_location['name']}_{end_location['name']}.html".replace(' ', '_')
-            m.save(map_filename)
-            
-            return map_filename
+            spec = {
+                'route_name': f"{start_location['name']} -> {end_location['name']}",
+                'route_points': points,
+                'ride_range': (0, len(points) - 1),
+                'start': points[0],
+                'end': points[-1],
+            }
+            _, path, _ = route_map_service.get_image(spec)
+            return path
         except Exception as e:
             logger.error(f"Error generating route map: {e}")
             return None
@@ -7,10 +7,32 @@ import re
 from typing import List, Dict, Tuple, Optional
 from difflib import SequenceMatcher
 
+from landmark_autocomplete import LandmarkAutocomplete
+from spell_correction import LandmarkSpeller
+from landmark_search import LandmarkSearch
+from arabizi import PHONETIC_MIN_SCORE, PhoneticIndex, is_arabizi, translate_keywords
+from residential_areas import ResidentialAreas
+from database_helper import get_residential_areas_from_db
+from intent_classifier import ROUTE, Intent, IntentClassifier
+
+# المسار السريع للمناطق السكنية يُجرب قبل كل بحث، فالأنماط تُجمع مرة واحدة
+_RESIDENTIAL_WORDS = re.compile(r'\b(السكنية|السكنيه|منطقة|منطقه)\b')
+_RESIDENTIAL_PATTERNS = [
+    re.compile(r'من\s+(.+?)\s+(?:لـ|ل|إلى|الى)\s+(.+)'),
+    re.compile(r'(.+?)\s+(?:للـ|لـ|ل)\s+(.+)'),
+    re.compile(r'(.+?)\s+إلى\s+(.+)'),
+]
+
 class NLPSearchSystem:
     def __init__(self, neighborhood_data: Dict):
         self.neighborhood_data = neighborhood_data
         self.landmarks_index = self._build_landmarks_index()
+        self.autocomplete = LandmarkAutocomplete.from_neighborhoods(neighborhood_data)
+        self.speller = LandmarkSpeller.from_neighborhoods(neighborhood_data)
+        self.phonetic = PhoneticIndex.from_neighborhoods(neighborhood_data)
+        self.search = LandmarkSearch.from_neighborhoods(neighborhood_data)
+        self.refresh_residential_areas()
+        self.intents = IntentClassifier.load()
         
         # كلمات ربط عربية شائعة
         self.from_keywords = ['من', 'من عند', 'بدءاً من', 'انطلاقاً من', 'ابتداءً من']
@@ -39,27 +61,34 @@ class NLPSearchSystem:
                         }
         return index
     
+    def classify_intent(self, text: str) -> Intent:
+        """نية الرسالة (مسار / مكان / خريطة / تقرير / دردشة) قبل أي بحث"""
+        return self.intents.classify(text)
+    
+    def is_natural_language_query(self, text: str) -> bool:
+        """هل النص طلب مسار يستحق البحث عن المكانين والمسار"""
+        return self.classify_intent(text).intent == ROUTE
+    
     def similarity_score(self, text1: str, text2: str) -> float:
         """حساب درجة التشابه بين نصين"""
         return SequenceMatcher(None, text1.lower(), text2.lower()).ratio()
     
     def find_best_match(self, query: str, min_score: float = 0.6) -> Optional[Dict]:
         """البحث عن أفضل تطابق لمعلم معين"""
-        query = query.lower().strip()
-        best_match = None
-        best_score = min_score
-        
-        for landmark_name, landmark_info in self.landmarks_index.items():
-            score = self.similarity_score(query, landmark_name)
-            if score > best_score:
-                best_score = score
-                best_match = {
-                    'name': landmark_name,
-                    'score': score,
-                    'info': landmark_info
-                }
-        
-        return best_match
+        if is_arabizi(query):
+            # الفرانكو: قراءة من الفهرس الصوتي بدلاً من مقارنة الحروف
+            match = self.phonetic.best_match(query)
+            if not match or match['score'] < PHONETIC_MIN_SCORE:
+                return None
+            name = match['name'].lower()
+            return {'name': name, 'score': match['score'], 'info': self.landmarks_index.get(name)}
+        
+        # فهرس الكلمات (BM25F)؛ min_score هنا أقل نسبة من كلمات النص موجودة في اسم المعلم
+        match = self.search.best_match(query, min_score)
+        if not match:
+            return None
+        name = match['name'].lower()
+        return {'name': name, 'score': match['coverage'], 'info': self.landmarks_index.get(name)}
     
     def extract_locations_from_text(self, text: str) -> Tuple[Optional[str], Optional[str]]:
         """استخراج نقطتي البداية والوجهة من النص"""
@@ -109,6 +138,8 @@ class NLPSearchSystem:
         if residential_match:
             return residential_match
         
+        if is_arabizi(text):
+            text = translate_keywords(text)
         start_text, end_text = self.extract_locations_from_text(text)
         
         result = {
@@ -140,39 +171,38 @@ class NLPSearchSystem:
             else:
                 result['message'] = f"✅ تم العثور على الوجهة: {result['end_location']['name']}. يرجى تحديد نقطة البداية."
         
+        # "هل قصدت؟": معالم قريبة في الكتابة للجزء الذي لم يطابق أي معلم
+        for text, match in ((start_text, result['start_location']), (end_text, result['end_location'])):
+            if text and not match:
+                suggestions = self.phonetic.lookup(text) if is_arabizi(text) else self.speller.suggest(text)
+                for suggestion in suggestions:
+                    line = f"{suggestion['name']} - {suggestion['neighborhood']}"
+                    if line not in result['suggestions']:
+                        result['suggestions'].append(line)
+        
         return result
 
     def get_suggestions_for_text(self, text: str, limit: int = 5) -> List[str]:
-        """الحصول على اقتراحات للنص المدخل"""
-        text = text.lower().strip()
-        suggestions = []
-        
-        for landmark_name, landmark_info in self.landmarks_index.items():
-            if text in landmark_name:
-                suggestion = f"{landmark_info['data'].get('name', landmark_name)} - {landmark_info['neighborhood']}"
-                if suggestion not in suggestions:
-                    suggestions.append(suggestion)
-            
-            if len(suggestions) >= limit:
-                break
-        
+        """الحصول على اقتراحات للنص المدخل: معالم تبدأ إحدى كلمات اسمها بالنص، ثم
+        المعالم التي تحتوي كلماته في أي ترتيب ("بنك البازار") من فهرس الكلمات"""
+        suggestions = [f"{match['name']} - {match['neighborhood']}"
+                       for match in self.autocomplete.complete(text, limit)]
+        if len(suggestions) < limit:
+            for match in self.search.search(text, limit):
+                line = f"{match['name']} - {match['neighborhood']}"
+                if line not in suggestions and len(suggestions) < limit:
+                    suggestions.append(line)
         return suggestions
 
     def parse_residential_areas(self, query: str) -> Dict:
         """تحليل المناطق السكنية المبسطة"""
         # إزالة كلمات مثل "السكنية"، "منطقة"
-        query = re.sub(r'\b(السكنية|السكنيه|منطقة|منطقه)\b', '', query)
+        query = _RESIDENTIAL_WORDS.sub('', query)
         query = query.strip()
         
         # البحث عن نمط "من X لـ Y" أو "X للـ Y" أو "X لـ Y"
-        patterns = [
-            r'من\s+(.+?)\s+(?:لـ|ل|إلى|الى)\s+(.+)',
-            r'(.+?)\s+(?:للـ|للـ|لـ|ل)\s+(.+)',
-            r'(.+?)\s+إلى\s+(.+)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, query)
+        for pattern in _RESIDENTIAL_PATTERNS:
+            match = pattern.search(query)
             if match:
                 start_area = match.group(1).strip()
                 end_area = match.group(2).strip()
@@ -193,36 +223,15 @@ class NLPSearchSystem:
         
         return None
     
-    def find_residential_area(self, area_name: str) -> str:
-        """البحث عن المنطقة السكنية الأقرب"""
-        area_name = area_name.lower().strip()
-        
-        # قائمة المناطق السكنية الشائعة
-        residential_areas = [
-            "بوروتكس", "السلام", "المناخ", "الشرق", "العرب",
-            "الزهور", "المنطقة الأولى", "المنطقة الثانية", 
-            "المنطقة الثالثة", "المنطقة الرابعة", "المنطقة الخامسة", "المنطقة السادسة",
-            "منطقة شمال الحرية", "قشلاق السواحل", "حي ناصر"
-        ]
-        
-        # البحث المباشر
-        for area in residential_areas:
-            if area_name == area.lower():
-                return area
-        
-        # البحث الجزئي
-        for area in residential_areas:
-            if area_name in area.lower() or area.lower() in area_name:
-                return area
-        
-        # البحث بالتشابه
-        best_match = None
-        best_ratio = 0.6
-        
-        for area in residential_areas:
-            ratio = SequenceMatcher(None, area_name, area.lower()).ratio()
-            if ratio > best_ratio:
-                best_ratio = ratio
-                best_match = area
-        
-        return best_match
\ No newline at end of file
+    def refresh_residential_areas(self):
+        """إعادة تجميع المناطق السكنية من neighborhood_data وجدول location (بعد إعادة تحميل البيانات)"""
+        self.residential_areas = ResidentialAreas.from_neighborhoods(self.neighborhood_data,
+                                                                     get_residential_areas_from_db())
+    
+    def find_residential_area(self, area_name: str) -> Optional[str]:
+        """البحث عن المنطقة السكنية الأقرب (مطابقة المفتاح ثم قاموس الحذوفات)"""
+        return self.residential_areas.resolve(area_name)
+
+
+def initialize_nlp_system(neighborhood_data: Dict) -> NLPSearchSystem:
+    return NLPSearchSystem(neighborhood_data)
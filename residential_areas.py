@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+المناطق السكنية للمسار السريع "من X لـ Y" في nlp_search
+
+المناطق تُقرأ من البيانات نفسها: كل معلم في تصنيف يبدأ بـ "مناطق سكنية" في
+neighborhood_data وفي جدول location بقاعدة بيانات لوحة الإدارة، ومعها أسماء الأحياء.
+لكل منطقة مفاتيح موحدة (arabic_text.normalize): الاسم كاملاً، وبدون الكلمات العامة
+(منطقة / مساكن / السكنية / حي)، ومن بداية كل كلمة بعد الأولى ("قشلاق السواحل").
+المفاتيح تُجمع مرة واحدة في قاموس، والنص الذي لا يطابق مفتاحاً تُصحح كلماته
+بقاموس حذوفات SymSpell لكلمات المفاتيح ثم يُبحث عنه مرة أخرى (التصحيح لكل كلمة لا
+للاسم كاملاً، فالأسماء التي تبدأ بنفس الكلمة لا تُقارن كلها). add/remove تعلّم الفهرس
+فيُعاد تجميعه عند أول بحث؛ بعد إعادة تحميل البيانات يُبنى من جديد (refresh_residential_areas).
+"""
+
+import logging
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from arabic_text import normalize
+from change_feed import landmark_name
+from spell_correction import SymSpell, allowed_distance
+
+logger = logging.getLogger(__name__)
+
+RESIDENTIAL_CATEGORY = 'مناطق سكنية'
+# كلمات لا تميز منطقة عن أخرى (بعد normalize)
+FILLER_WORDS = {'منطقه', 'مناطق', 'مساكن', 'السكنيه', 'سكنيه', 'حي'}
+# أقصر مفتاح يُقبل (حتى لا يصبح "ب" من "السيدة خديجة ب" مفتاحاً)
+MIN_KEY_LENGTH = 3
+
+# أولوية المفتاح عند تعارض منطقتين: الاسم كاملاً ثم بدون الكلمات العامة ثم آخر الاسم
+FULL_NAME, WITHOUT_FILLER, NAME_SUFFIX = 0, 1, 2
+
+
+def is_residential(category: str) -> bool:
+    """"مناطق سكنية" و "مناطق سكنية ومعالم تراثية أخرى\""""
+    return isinstance(category, str) and category.strip().startswith(RESIDENTIAL_CATEGORY)
+
+
+def strip_filler(normalized: str) -> str:
+    return ' '.join(word for word in normalized.split() if word not in FILLER_WORDS)
+
+
+def area_keys(name: str) -> Dict[str, int]:
+    """المفاتيح الموحدة لاسم منطقة مع أولوية كل منها"""
+    normalized = normalize(name)
+    keys = {normalized: FULL_NAME}
+    core = strip_filler(normalized)
+    keys.setdefault(core, WITHOUT_FILLER)
+    words = core.split()
+    for i in range(1, len(words)):
+        keys.setdefault(' '.join(words[i:]), NAME_SUFFIX)
+    return {key: priority for key, priority in keys.items() if len(key) >= MIN_KEY_LENGTH}
+
+
+class ResidentialAreas:
+    """فهرس أسماء المناطق السكنية"""
+
+    def __init__(self):
+        # الاسم كما يُعرض -> الأحياء التي ذُكر فيها (المنطقة تُحذف بحذف آخر ذكر لها)
+        self.areas: Dict[str, Set[str]] = {}
+        self.keys: Dict[str, str] = {}
+        self.fuzzy: Optional[SymSpell] = None
+
+    @classmethod
+    def from_neighborhoods(cls, neighborhood_data: Dict,
+                           db_rows: Iterable[Tuple[str, str]] = ()) -> 'ResidentialAreas':
+        """db_rows: (neighborhood, name) من جدول location"""
+        index = cls()
+        for neighborhood, categories in neighborhood_data.items():
+            index.add(neighborhood, neighborhood)
+            for category, landmarks in categories.items():
+                if is_residential(category):
+                    for landmark in landmarks:
+                        index.add(landmark_name(landmark), neighborhood)
+        for neighborhood, name in db_rows:
+            index.add(name, neighborhood)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.areas)
+
+    def add(self, name: Optional[str], neighborhood: str) -> bool:
+        if not isinstance(name, str) or not normalize(name):
+            return False
+        self.areas.setdefault(name.strip(), set()).add(neighborhood)
+        self.fuzzy = None
+        return True
+
+    def remove(self, name: Optional[str], neighborhood: str) -> bool:
+        if not isinstance(name, str):
+            return False
+        neighborhoods = self.areas.get(name.strip())
+        if not neighborhoods or neighborhood not in neighborhoods:
+            return False
+        neighborhoods.discard(neighborhood)
+        if not neighborhoods:
+            del self.areas[name.strip()]
+        self.fuzzy = None
+        return True
+
+    def _build(self):
+        ranked: Dict[str, Tuple[int, int, str]] = {}
+        for name in self.areas:
+            for key, priority in area_keys(name).items():
+                candidate = (priority, len(name), name)
+                if key not in ranked or candidate < ranked[key]:
+                    ranked[key] = candidate
+        self.keys = {key: name for key, (_, _, name) in ranked.items()}
+        self.fuzzy = SymSpell()
+        for key in ranked:
+            for word in key.split():
+                self.fuzzy.add_word(word)
+        logger.info("Residential areas compiled: %d areas, %d keys", len(self.areas), len(self.keys))
+
+    def resolve(self, text: str) -> Optional[str]:
+        """اسم المنطقة التي يشير إليها النص كاملاً، أو None"""
+        if self.fuzzy is None:
+            self._build()
+        normalized = normalize(text)
+        for key in (normalized, strip_filler(normalized)):
+            if key in self.keys:
+                return self.keys[key]
+        corrected = []
+        for word in strip_filler(normalized).split():
+            if word not in self.fuzzy.words:
+                matches = self.fuzzy.lookup(word, allowed_distance(word))
+                if not matches:
+                    return None
+                word = matches[0][0]
+            corrected.append(word)
+        return self.keys.get(' '.join(corrected))
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+تجميع رد البحث في رسالة واحدة
+
+بدلاً من إرسال النتيجة ورابط الخريطة ولوحة "خيارات إضافية" كرسائل منفصلة
+(طلب API لكل رسالة، وكلها محسوبة من حدود Telegram للإرسال)، تُجمع الأجزاء
+والأزرار في ResponseComposer ثم تُعدل بها رسالة "جاري البحث..." نفسها.
+"""
+
+import logging
+from typing import List, Optional
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Message
+from telegram.constants import MessageLimit, ParseMode
+from telegram.error import BadRequest
+
+logger = logging.getLogger(__name__)
+
+SEARCHING_TEXT = "🔍 جاري البحث..."
+SECTION_SEPARATOR = "\n\n"
+
+
+def split_text(text: str, limit: int = MessageLimit.MAX_TEXT_LENGTH) -> List[str]:
+    """تقسيم نص أطول من حد الرسالة عند نهايات الأسطر"""
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind('\n', 0, limit)
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip('\n')
+    chunks.append(text)
+    return chunks
+
+
+class ResponseComposer:
+    """أجزاء نص وصفوف أزرار تُرسل كرسالة واحدة (أو أقل عدد ممكن عند تجاوز الحد)"""
+
+    def __init__(self, parse_mode: Optional[str] = ParseMode.MARKDOWN):
+        self.parse_mode = parse_mode
+        self.sections: List[str] = []
+        self.rows: List[List[InlineKeyboardButton]] = []
+
+    def add(self, text: Optional[str]) -> 'ResponseComposer':
+        if text and text.strip():
+            self.sections.append(text.strip())
+        return self
+
+    def add_row(self, *buttons: InlineKeyboardButton) -> 'ResponseComposer':
+        if buttons:
+            self.rows.append(list(buttons))
+        return self
+
+    @property
+    def text(self) -> str:
+        return SECTION_SEPARATOR.join(self.sections)
+
+    @property
+    def markup(self) -> Optional[InlineKeyboardMarkup]:
+        return InlineKeyboardMarkup(self.rows) if self.rows else None
+
+    async def edit(self, placeholder: Message) -> Message:
+        """تعديل رسالة الانتظار بالرد كاملاً؛ الأجزاء الزائدة عن الحد تُرسل بعدها والأزرار مع آخرها"""
+        chunks = split_text(self.text)
+        last = len(chunks) - 1
+        try:
+            message = await placeholder.edit_text(chunks[0], parse_mode=self.parse_mode,
+                                                  reply_markup=self.markup if last == 0 else None)
+        except BadRequest as e:
+            # الرسالة حُذفت أو لم تعد قابلة للتعديل: إرسالها كرسالة جديدة
+            logger.warning("Could not edit placeholder message: %s", e)
+            message = await self._send(placeholder, chunks[0], last == 0)
+        for i, chunk in enumerate(chunks[1:], 1):
+            message = await self._send(placeholder, chunk, i == last)
+        return message
+
+    async def _send(self, placeholder: Message, text: str, with_markup: bool) -> Message:
+        return await placeholder.get_bot().send_message(
+            chat_id=placeholder.chat_id, text=text, parse_mode=self.parse_mode,
+            reply_markup=self.markup if with_markup else None)
@@ -0,0 +1,427 @@
+# -*- coding: utf-8 -*-
+"""
+محرك المسارات المعتمد على بيانات القرب (served_by) وترتيب المحطات (keyPoints)
+
+عند البناء يتم تحويل البيانات مرة واحدة إلى حواف:
+    اسم المعلم -> [(رقم اتجاه الخط, ترتيب المحطة, مستوى القرب), ...]
+بحيث يصبح التحقق من الاتجاه ومن القرب مقارنات بين أرقام صحيحة فقط، بدلاً من
+مطابقة أسماء الخطوط والمحطات بالنصوص مع كل طلب بحث.
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# مستويات القرب مرتبة من الأقرب للأبعد، مع مسافة المشي التقريبية بالمتر
+PROXIMITY_LEVELS = [
+    ("قريبة جدا", 150),
+    ("متوسطة", 450),
+    ("بعيدة", 900),
+    ("بعيدة جدا / لا يخدمها مباشرة", 1500),
+]
+PROXIMITY_RANK = {label: rank for rank, (label, _) in enumerate(PROXIMITY_LEVELS)}
+WALK_METERS = [meters for _, meters in PROXIMITY_LEVELS]
+
+# المعلم الذي هو نفسه محطة على الخط لا يحتاج مشياً
+ON_ROUTE_RANK = 0
+ON_ROUTE_WALK = 0
+
+# أقصى مستوى قرب مقبول افتراضياً (نفس شرط bot.py: "قريبة جدا" أو "متوسطة")
+DEFAULT_MAX_RANK = PROXIMITY_RANK["متوسطة"]
+
+# تكلفة كل محطة في الرحلة معبراً عنها بأمتار مشي مكافئة (لترتيب الخيارات)
+STOP_COST = 60
+# تكلفة تغيير الخط (انتظار + أجرة ثانية) بنفس الوحدة
+TRANSFER_COST = 600
+
+
+def normalize_name(name: str) -> str:
+    return name.strip().lower()
+
+
+def base_route_name(route_name: str) -> str:
+    """'خط السلام (رايح البلد)' -> 'خط السلام'"""
+    return route_name.rsplit(' (', 1)[0].strip()
+
+
+class RoutingEngine:
+    """فهرس الحواف بين المعالم واتجاهات الخطوط"""
+
+    def __init__(self, routes: List[Dict], neighborhoods: Dict):
+        self.rebuild(routes, neighborhoods)
+
+    def rebuild(self, routes: List[Dict], neighborhoods: Dict):
+        """إعادة بناء الفهرس بالكامل من البيانات"""
+        # variants[i] = None لاتجاه محذوف (أرقام الاتجاهات الأخرى لا تتغير)
+        self.variants: List[Optional[Dict]] = []
+        self.variant_ids: Dict[int, int] = {}
+        self.stop_positions: List[Dict[str, List[int]]] = []
+        self.stop_keys: List[List[Optional[str]]] = []
+        self.variants_by_base: Dict[str, List[int]] = {}
+        # أسماء served_by التي طوبقت جزئياً مع أسماء الخطوط (انظر _variants_for_base)
+        self._partial_bases = set()
+        # اسم المعلم -> [(variant_id, stop_index, proximity_rank, walk_meters)]
+        self.edges: Dict[str, List[Tuple[int, int, int, int]]] = {}
+        self.known_names = set()
+        # المعالم بالاسم (قد يتكرر الاسم في أكثر من حي)، وأسماء المعالم لكل اسم خط في served_by
+        # لإعادة حساب حوافها عند تغير الخط
+        self.landmarks_by_key: Dict[str, List[Dict]] = {}
+        self.landmarks_by_base: Dict[str, set] = {}
+        # (اسم الخط الأساسي, اسم المحطة) -> [(variant_id, stop_index)] حتى لا تتكرر المطابقة لكل معلم
+        self._stop_cache: Dict[Tuple[str, str], List[Tuple[int, int]]] = {}
+
+        for route in routes:
+            self._add_variant(route)
+
+        landmark_count = 0
+        for categories in neighborhoods.values():
+            if not isinstance(categories, dict):
+                continue
+            for landmarks in categories.values():
+                if not isinstance(landmarks, list):
+                    continue
+                for landmark in landmarks:
+                    if isinstance(landmark, dict):
+                        self.add_landmark(landmark)
+                        landmark_count += 1
+
+        logger.info("Routing engine built: %d route variants, %d landmarks, %d indexed names",
+                    len(self.variants), landmark_count, len(self.edges))
+
+    def _add_variant(self, route: Dict) -> Optional[int]:
+        route_name = route.get('routeName')
+        key_points = route.get('keyPoints')
+        if not isinstance(route_name, str) or not isinstance(key_points, list):
+            return None
+        variant_id = len(self.variants)
+        self.variants.append(route)
+        self.variant_ids[id(route)] = variant_id
+        positions: Dict[str, List[int]] = {}
+        for index, point in enumerate(key_points):
+            if isinstance(point, str):
+                positions.setdefault(normalize_name(point), []).append(index)
+        self.stop_positions.append(positions)
+        self.stop_keys.append([normalize_name(p) if isinstance(p, str) else None for p in key_points])
+        self.variants_by_base.setdefault(base_route_name(route_name), []).append(variant_id)
+
+        # كل محطة على الخط يمكن البحث بها مباشرة
+        for key, indices in positions.items():
+            self.known_names.add(key)
+            self._add_edges(key, [(variant_id, i, ON_ROUTE_RANK, ON_ROUTE_WALK) for i in indices])
+        return variant_id
+
+    def _add_edges(self, key: str, new_edges: List[Tuple[int, int, int, int]]):
+        edges = self.edges.get(key)
+        if edges is None:
+            self.edges[key] = new_edges
+            return
+        for edge in new_edges:
+            if edge not in edges:
+                edges.append(edge)
+
+    def _variants_for_base(self, base_name: str) -> List[int]:
+        variant_ids = self.variants_by_base.get(base_name)
+        if variant_ids is None:
+            # أسماء served_by القديمة قد لا تطابق الاسم الأساسي حرفياً
+            variant_ids = [i for i, route in enumerate(self.variants)
+                           if route is not None and base_name in route['routeName']]
+            self.variants_by_base[base_name] = variant_ids
+            self._partial_bases.add(base_name)
+        return variant_ids
+
+    def _stop_indices(self, variant_id: int, stop_name: str) -> List[int]:
+        positions = self.stop_positions[variant_id]
+        key = normalize_name(stop_name)
+        if key in positions:
+            return positions[key]
+        # مطابقة جزئية كما في bot.py، لكنها تتم مرة واحدة وقت البناء
+        return sorted(i for point, indices in positions.items() if key in point for i in indices)
+
+    def add_landmark(self, landmark: Dict):
+        """إضافة حواف معلم واحد من بيانات served_by الخاصة به"""
+        name = landmark.get('name')
+        if not isinstance(name, str):
+            return
+        key = normalize_name(name)
+        self.known_names.add(key)
+        landmarks = self.landmarks_by_key.setdefault(key, [])
+        if not any(item is landmark for item in landmarks):
+            landmarks.append(landmark)
+        served_by = landmark.get('served_by')
+        if not isinstance(served_by, dict):
+            return
+        for base_name, info in served_by.items():
+            if not isinstance(info, dict):
+                continue
+            rank = PROXIMITY_RANK.get(info.get('proximity'))
+            stop_name = info.get('nearest_stop')
+            if rank is None or not isinstance(stop_name, str) or not stop_name.strip():
+                continue
+            self.landmarks_by_base.setdefault(base_name, set()).add(key)
+            stops = self._stop_cache.get((base_name, stop_name))
+            if stops is None:
+                stops = [(variant_id, index)
+                         for variant_id in self._variants_for_base(base_name)
+                         for index in self._stop_indices(variant_id, stop_name)]
+                self._stop_cache[(base_name, stop_name)] = stops
+            walk = WALK_METERS[rank]
+            new_edges = [(variant_id, index, rank, walk) for variant_id, index in stops]
+            if new_edges:
+                self._add_edges(key, new_edges)
+
+    # ===== التحديث التزايدي (تغييرات لوحة الإدارة دون إعادة بناء الفهرس) =====
+
+    def _forget_name(self, key: str):
+        if not self.edges.get(key):
+            self.edges.pop(key, None)
+            if key not in self.landmarks_by_key:
+                self.known_names.discard(key)
+
+    def _clear_stop_cache(self, base_names):
+        for cache_key in [k for k in self._stop_cache if k[0] in base_names]:
+            del self._stop_cache[cache_key]
+
+    def _relink_landmarks(self, keys):
+        for key in keys:
+            for landmark in list(self.landmarks_by_key.get(key, ())):
+                self.add_landmark(landmark)
+
+    def remove_landmark(self, landmark: Dict):
+        """حذف معلم (نفس القاموس أو قاموس مساوٍ): تبقى حواف المحطة بنفس الاسم ومعالم أخرى بنفس الاسم"""
+        name = landmark.get('name')
+        if not isinstance(name, str):
+            return
+        key = normalize_name(name)
+        landmarks = self.landmarks_by_key.get(key, [])
+        for index, item in enumerate(landmarks):
+            if item is landmark or item == landmark:
+                del landmarks[index]
+                break
+        if not landmarks:
+            self.landmarks_by_key.pop(key, None)
+            for keys in self.landmarks_by_base.values():
+                keys.discard(key)
+        if key in self.edges:
+            self.edges[key] = [edge for edge in self.edges[key] if edge[3] == ON_ROUTE_WALK]
+        self._relink_landmarks([key])
+        self._forget_name(key)
+
+    def add_route(self, route: Dict):
+        """إضافة اتجاه خط وربط المعالم التي تذكر اسمه في served_by"""
+        variant_id = self._add_variant(route)
+        if variant_id is None:
+            return
+        route_name = route['routeName']
+        base = base_route_name(route_name)
+        affected = [name for name in self.landmarks_by_base if name in route_name]
+        for name in affected:
+            if name != base and name in self._partial_bases:
+                self.variants_by_base[name].append(variant_id)
+        self._clear_stop_cache(affected)
+        self._relink_landmarks({key for name in affected for key in self.landmarks_by_base[name]})
+
+    def remove_route(self, route: Dict):
+        """حذف اتجاه خط (نفس الكائن الذي أضيف) وكل الحواف إليه"""
+        variant_id = self.variant_ids.pop(id(route), None)
+        if variant_id is None:
+            return
+        affected = set()
+        for name, variant_ids in self.variants_by_base.items():
+            if variant_id in variant_ids:
+                variant_ids.remove(variant_id)
+                affected.add(name)
+        self._clear_stop_cache(affected)
+        keys = set(self.stop_positions[variant_id])
+        for name in affected:
+            keys.update(self.landmarks_by_base.get(name, ()))
+        for key in keys:
+            if key in self.edges:
+                self.edges[key] = [edge for edge in self.edges[key] if edge[0] != variant_id]
+                self._forget_name(key)
+        self.variants[variant_id] = None
+        self.stop_positions[variant_id] = {}
+        self.stop_keys[variant_id] = []
+
+    def replace_route(self, old: Dict, new: Dict):
+        self.remove_route(old)
+        self.add_route(new)
+
+    def knows(self, name: str) -> bool:
+        """هل الاسم معلم أو محطة معروفة (حتى لو لم تكن له بيانات قرب)"""
+        return normalize_name(name) in self.known_names
+
+    def is_stop(self, name: str) -> bool:
+        """هل الاسم محطة على خط (وليس معلماً قريباً فقط)"""
+        return any(edge[3] == ON_ROUTE_WALK for edge in self.edges.get(normalize_name(name), ()))
+
+    def routes_for(self, name: str, max_rank: int = DEFAULT_MAX_RANK) -> List[str]:
+        """أسماء اتجاهات الخطوط التي تخدم معلماً أو محطة بقرب مقبول"""
+        variant_ids = {variant_id for variant_id, _, rank, _ in self.edges.get(normalize_name(name), ())
+                       if rank <= max_rank}
+        return [self.variants[i]['routeName'] for i in sorted(variant_ids)]
+
+    def find_direct(self, start_name: str, end_name: str, max_rank: int = DEFAULT_MAX_RANK,
+                    limit: Optional[int] = None) -> List[Dict]:
+        """الخيارات المباشرة بين معلمين مرتبة حسب التكلفة (مشي + عدد المحطات)"""
+        start_edges = self.edges.get(normalize_name(start_name), ())
+        end_edges = self.edges.get(normalize_name(end_name), ())
+        if not start_edges or not end_edges:
+            return []
+
+        end_by_variant: Dict[int, List[Tuple[int, int, int]]] = {}
+        for variant_id, index, rank, walk in end_edges:
+            if rank <= max_rank:
+                end_by_variant.setdefault(variant_id, []).append((index, rank, walk))
+
+        # أفضل رحلة لكل اتجاه خط
+        best: Dict[int, Tuple[int, int, int, int, int, int, int]] = {}
+        for variant_id, start_index, start_rank, start_walk in start_edges:
+            if start_rank > max_rank:
+                continue
+            for end_index, end_rank, end_walk in end_by_variant.get(variant_id, ()):
+                if end_index <= start_index:
+                    continue
+                stops = end_index - start_index
+                walk = start_walk + end_walk
+                cost = walk + stops * STOP_COST
+                current = best.get(variant_id)
+                if current is None or cost < current[0]:
+                    best[variant_id] = (cost, walk, stops, start_index, end_index, start_rank, end_rank)
+
+        itineraries = []
+        for variant_id, (cost, walk, stops, start_index, end_index, start_rank, end_rank) in best.items():
+            route = self.variants[variant_id]
+            key_points = route['keyPoints']
+            itineraries.append({
+                "routeName": route['routeName'],
+                "start_landmark_name": start_name,
+                "end_landmark_name": end_name,
+                "start_proximity": PROXIMITY_LEVELS[start_rank][0],
+                "end_proximity": PROXIMITY_LEVELS[end_rank][0],
+                "start_nearest_stop": key_points[start_index],
+                "end_nearest_stop": key_points[end_index],
+                "keyPoints": key_points,
+                "start_index": start_index,
+                "end_index": end_index,
+                "stops": stops,
+                "walk_meters": walk,
+                "cost": cost,
+                "fare": route.get('fare', 'غير محددة'),
+                "notes": route.get('notes', ''),
+            })
+        itineraries.sort(key=lambda item: (item['cost'], item['routeName']))
+        return itineraries[:limit] if limit else itineraries
+
+    def find_with_transfer(self, start_name: str, end_name: str, transfers=None,
+                           max_rank: int = DEFAULT_MAX_RANK, limit: Optional[int] = 5) -> List[Dict]:
+        """رحلات بتبديل واحد: نفس المحطة أو محطتان متقاربتان (transfers: TransferGraph)"""
+        start_edges = [e for e in self.edges.get(normalize_name(start_name), ()) if e[2] <= max_rank]
+        end_edges = [e for e in self.edges.get(normalize_name(end_name), ()) if e[2] <= max_rank]
+        if not start_edges or not end_edges:
+            return []
+
+        # محطة -> [(الخط الثاني, ترتيب الركوب فيه, ترتيب النزول, مستوى القرب, المشي)]
+        arrivals: Dict[str, List[Tuple[int, int, int, int, int]]] = {}
+        for variant_id, end_index, end_rank, end_walk in end_edges:
+            for index, key in enumerate(self.stop_keys[variant_id][:end_index]):
+                if key is not None:
+                    arrivals.setdefault(key, []).append((variant_id, index, end_index, end_rank, end_walk))
+
+        best: Dict[Tuple[int, int], Tuple] = {}
+        for first, start_index, start_rank, start_walk in start_edges:
+            first_keys = self.stop_keys[first]
+            for index in range(start_index + 1, len(first_keys)):
+                key = first_keys[index]
+                if key is None:
+                    continue
+                options = [(key, 0)]
+                if transfers is not None:
+                    options.extend(transfers.walks_from(key))
+                for other_key, transfer_walk in options:
+                    for second, board_index, end_index, end_rank, end_walk in arrivals.get(other_key, ()):
+                        if second == first:
+                            continue
+                        stops = (index - start_index) + (end_index - board_index)
+                        walk = start_walk + end_walk + transfer_walk
+                        cost = walk + stops * STOP_COST + TRANSFER_COST
+                        current = best.get((first, second))
+                        if current is None or cost < current[0]:
+                            best[(first, second)] = (cost, walk, transfer_walk, stops, start_index, index,
+                                                     board_index, end_index, start_rank, end_rank)
+
+        itineraries = []
+        for (first, second), (cost, walk, transfer_walk, stops, start_index, transfer_index,
+                              board_index, end_index, start_rank, end_rank) in best.items():
+            legs = []
+            for variant_id, leg_start, leg_end in ((first, start_index, transfer_index),
+                                                   (second, board_index, end_index)):
+                route = self.variants[variant_id]
+                legs.append({
+                    "routeName": route['routeName'],
+                    "start_nearest_stop": route['keyPoints'][leg_start],
+                    "end_nearest_stop": route['keyPoints'][leg_end],
+                    "start_index": leg_start,
+                    "end_index": leg_end,
+                    "fare": route.get('fare', 'غير محددة'),
+                })
+            itineraries.append({
+                "legs": legs,
+                "start_landmark_name": start_name,
+                "end_landmark_name": end_name,
+                "start_proximity": PROXIMITY_LEVELS[start_rank][0],
+                "end_proximity": PROXIMITY_LEVELS[end_rank][0],
+                "transfer_walk_meters": transfer_walk,
+                "stops": stops,
+                "walk_meters": walk,
+                "cost": cost,
+            })
+        itineraries.sort(key=lambda item: (item['cost'], item['legs'][0]['routeName'], item['legs'][1]['routeName']))
+        return itineraries[:limit] if limit else itineraries
+
+
+# أقصى عدد من مجموعات البيانات المحفوظة في DatasetCache (الأقدم استخداماً يُحذف أولاً)
+MAX_CACHED_DATASETS = 4
+
+
+class DatasetCache:
+    """قيمة مبنية لكل مجموعة بيانات (routes, neighborhoods) بهوية الكائنات لا بمحتواها
+
+    الكائنات تُحفظ مع القيمة وتُقارن بـ is، فلا تُعاد قيمة قديمة لبيانات أخرى أخذت نفس id،
+    وعدد المجموعات محدود بـ max_size.
+    """
+
+    def __init__(self, max_size: int = MAX_CACHED_DATASETS):
+        self.max_size = max_size
+        self.entries: 'OrderedDict[Tuple[int, int], Tuple[List, Dict, object]]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, routes: List[Dict], neighborhoods: Dict):
+        key = (id(routes), id(neighborhoods))
+        entry = self.entries.get(key)
+        if entry is None or entry[0] is not routes or entry[1] is not neighborhoods:
+            return None
+        self.entries.move_to_end(key)
+        return entry[2]
+
+    def put(self, routes: List[Dict], neighborhoods: Dict, value):
+        key = (id(routes), id(neighborhoods))
+        self.entries[key] = (routes, neighborhoods, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+
+_engines = DatasetCache()
+
+
+def get_engine(routes: List[Dict], neighborhoods: Dict, build: bool = True) -> Optional[RoutingEngine]:
+    """محرك مبني مسبقاً لنفس كائنات البيانات (يُبنى مرة واحدة فقط، أو None إذا لم يُبنَ وbuild=False)"""
+    engine = _engines.get(routes, neighborhoods)
+    if engine is None and build:
+        engine = RoutingEngine(routes, neighborhoods)
+        _engines.put(routes, neighborhoods, engine)
+    return engine
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+تقييم البحث الذكي على دفعة من الطلبات بدون المرور بالبوت
+
+كل سطر في ملف JSONL طلب ومعه المعلمان المطلوبان:
+    {"query": "إزاي أروح من بنك مصر لمستشفى الصدر؟", "start": "بنك مصر", "end": "مستشفى الصدر"}
+("kind" اختياري لتقسيم النتائج). كل طلب يمر بـ search_route_from_text (تحليل النص ومطابقة
+المعلمين) ثم RoutingEngine (مباشر ثم بتبديل واحد)، في عدة عمليات (multiprocessing) تبني كل
+منها الفهارس مرة واحدة. --system يختار المحلل: bot (final_enhanced_bot.NLPSearchSystem الذي
+يخدم المستخدمين) أو nlp_search، والافتراضي الاثنان.
+
+التقرير لكل محلل: دقة المكانين معاً ولكل منهما، ونسبة الطلبات التي وُجد لها مسار، وزمن
+الطلب p50/p99 داخل العملية، والإنتاجية (طلب/ثانية) بكل العمليات. --save-baseline يحفظ
+التقارير، و --baseline يقارن بها ويخرج بكود 1 إذا نقصت الدقة. الزمن يُقارن فقط إذا حُفظ
+الـ baseline على نفس الجهاز (host)، وإلا يُطبع للعلم دون أن يُفشل الفحص:
+    python search_eval.py benchmarks/search_queries.jsonl --baseline benchmarks/search_baseline.json
+    python search_eval.py --generate 300 > benchmarks/search_queries.jsonl
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import multiprocessing
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from arabic_text import normalize
+from change_feed import landmark_name
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BASE_DIR, 'benchmarks', 'search_baseline.json')
+# حدود المقارنة بالـ baseline: أقصى نقص في الدقة (نسبة) وأقصى تضاعف في الزمن
+MAX_ACCURACY_DROP = 0.01
+MAX_SLOWDOWN = 1.3
+# المحللان: الذي يخدم المستخدمين في البوت والموجود في nlp_search
+SYSTEMS = ('bot', 'nlp_search')
+# أنواع الطلبات المولدة بـ --generate
+TEMPLATES = ('إزاي أروح من {a} لـ {b}؟', 'من {a} إلى {b}', 'عايز اروح من {a} الى {b}', 'ازاي اوصل من {a} ل{b}')
+KINDS = ('exact', 'partial', 'typo')
+LETTERS = 'ابتثجحخدذرزسشصضطظعغفقكلمنهوي'
+LATIN_LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+# حالة كل عملية (تُبنى في _init_worker)
+_nlp = None
+_engine = None
+
+
+def _bot_search_system(neighborhood_data: Dict):
+    """NLPSearchSystem الخاص بالبوت؛ يقرأ neighborhood_data من وحدة البوت فتُستبدل بالبيانات المطلوبة"""
+    if 'final_enhanced_bot' not in sys.modules:
+        os.environ.setdefault('BOT_TOKEN', '123456:SEARCH-EVAL-TOKEN')
+        os.environ.setdefault('GEOCODER_OFFLINE', '1')
+        os.environ.setdefault('LOG_LEVEL', 'WARNING')
+        # bot.log وملفات الكاش تُكتب في مجلد مؤقت بدلاً من مجلد العمل
+        os.chdir(tempfile.mkdtemp(prefix='search-eval-'))
+    import final_enhanced_bot
+    final_enhanced_bot.neighborhood_data = neighborhood_data
+    return final_enhanced_bot.NLPSearchSystem()
+
+
+def _init_worker(neighborhood_data: Dict, routes: List[Dict], system: str = 'bot'):
+    global _nlp, _engine
+    from routing_engine import RoutingEngine
+    if system == 'bot':
+        _nlp = _bot_search_system(neighborhood_data)
+    else:
+        from nlp_search import NLPSearchSystem
+        _nlp = NLPSearchSystem(neighborhood_data)
+    _engine = RoutingEngine(routes, neighborhood_data)
+
+
+def _location_name(result: Dict, side: str) -> Optional[str]:
+    """اسم المكان من نتيجة البحث العادي ({side}_location) أو مسار المناطق السكنية ({side}_area)"""
+    location = result.get(f'{side}_location')
+    if location:
+        return location['name']
+    return result.get(f'{side}_area')
+
+
+def _same(found: Optional[str], expected: Optional[str]) -> bool:
+    return bool(found) and bool(expected) and normalize(found) == normalize(expected)
+
+
+def evaluate_query(item: Dict) -> Dict:
+    """طلب واحد في العملية الحالية: الأماكن المطابقة والمسار والزمن"""
+    start = time.perf_counter()
+    result = _nlp.search_route_from_text(item['query'])
+    start_name, end_name = _location_name(result, 'start'), _location_name(result, 'end')
+    routed = False
+    if start_name and end_name:
+        routed = bool(_engine.find_direct(start_name, end_name, limit=1)
+                      or _engine.find_with_transfer(start_name, end_name, limit=1))
+    return {
+        'kind': item.get('kind', 'all'),
+        'start_ok': _same(start_name, item.get('start')),
+        'end_ok': _same(end_name, item.get('end')),
+        'routed': routed,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def summarize(records: List[Dict], wall_seconds: float) -> Dict:
+    timings = sorted(record['seconds'] for record in records)
+    total = len(records)
+
+    def rate(items, key=None):
+        items = list(items)
+        hits = sum((record['start_ok'] and record['end_ok']) if key is None else record[key] for record in items)
+        return round(hits / len(items), 4) if items else 0.0
+
+    kinds: Dict[str, List[Dict]] = {}
+    for record in records:
+        kinds.setdefault(record['kind'], []).append(record)
+    return {
+        'queries': total,
+        'accuracy': rate(records),
+        'start_accuracy': rate(records, 'start_ok'),
+        'end_accuracy': rate(records, 'end_ok'),
+        'routed': rate(records, 'routed'),
+        'by_kind': {kind: rate(items) for kind, items in sorted(kinds.items())},
+        'p50_ms': round(percentile(timings, 50) * 1e3, 3) if timings else 0.0,
+        'p99_ms': round(percentile(timings, 99) * 1e3, 3) if timings else 0.0,
+        'throughput_qps': round(total / wall_seconds, 1) if wall_seconds else 0.0,
+    }
+
+
+def evaluate(queries: List[Dict], neighborhood_data: Dict, routes: List[Dict],
+             processes: Optional[int] = None, chunksize: int = 16, system: str = 'bot') -> Dict:
+    """تقييم كل الطلبات بالمحلل system؛ processes=1 في نفس العملية (للاختبارات)"""
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        _init_worker(neighborhood_data, routes, system)
+        started = time.perf_counter()
+        records = [evaluate_query(item) for item in queries]
+        wall = time.perf_counter() - started
+    else:
+        with multiprocessing.Pool(processes, _init_worker, (neighborhood_data, routes, system)) as pool:
+            # أول طلب في كل عملية ينتظر بناء الفهارس، فالإنتاجية تُحسب من أول نتيجة
+            pool.map(_ready, range(processes), chunksize=1)
+            started = time.perf_counter()
+            records = pool.map(evaluate_query, queries, chunksize=chunksize)
+            wall = time.perf_counter() - started
+    report = summarize(records, wall)
+    report['processes'] = processes
+    report['host'] = platform.node()
+    return report
+
+
+def _ready(_) -> bool:
+    return _nlp is not None
+
+
+def compare(report: Dict, baseline: Dict, max_accuracy_drop: float = MAX_ACCURACY_DROP,
+            max_slowdown: float = MAX_SLOWDOWN) -> List[str]:
+    """أسباب الفشل مقارنة بالـ baseline (قائمة فارغة = مقبول)؛ الزمن فقط إذا كان من نفس الجهاز"""
+    failures = []
+    for key in ('accuracy', 'start_accuracy', 'end_accuracy', 'routed'):
+        if report[key] < baseline[key] - max_accuracy_drop:
+            failures.append(f"{key} {baseline[key]:.1%} -> {report[key]:.1%}")
+    if same_host(report, baseline):
+        failures.extend(slowdowns(report, baseline, max_slowdown))
+    return failures
+
+
+def same_host(report: Dict, baseline: Dict) -> bool:
+    return bool(baseline.get('host')) and baseline.get('host') == report.get('host')
+
+
+def slowdowns(report: Dict, baseline: Dict, max_slowdown: float = MAX_SLOWDOWN) -> List[str]:
+    """تراجع الزمن والإنتاجية عن الـ baseline بأكثر من max_slowdown"""
+    failures = []
+    for key in ('p50_ms', 'p99_ms'):
+        if baseline[key] and report[key] > baseline[key] * max_slowdown:
+            failures.append(f"{key} {baseline[key]:.3f} -> {report[key]:.3f}")
+    if baseline['throughput_qps'] and report['throughput_qps'] * max_slowdown < baseline['throughput_qps']:
+        failures.append(f"throughput_qps {baseline['throughput_qps']} -> {report['throughput_qps']}")
+    return failures
+
+
+# ===== توليد الطلبات =====
+
+def _vary(rng: random.Random, kind: str, name: str) -> str:
+    words = name.split()
+    if kind == 'partial' and len(words) > 2:
+        return ' '.join(words[:-1])
+    if kind == 'typo':
+        position = max(range(len(words)), key=lambda i: len(words[i]))
+        word = list(words[position])
+        # الحرف البديل من نفس الكتابة ("Golden" لا تصبح "Gشlden")
+        index = rng.randrange(1, len(word)) if len(word) > 1 else 0
+        word[index] = rng.choice(LATIN_LETTERS if word[index].isascii() else LETTERS)
+        words[position] = ''.join(word)
+        return ' '.join(words)
+    return name
+
+
+def generate_queries(neighborhood_data: Dict, count: int, rng: random.Random) -> List[Dict]:
+    """طلبات مسار بين معلمين عشوائيين بالأنواع KINDS"""
+    names = sorted({landmark_name(landmark).strip() for categories in neighborhood_data.values()
+                    for landmarks in categories.values() for landmark in landmarks
+                    if isinstance(landmark_name(landmark), str) and normalize(landmark_name(landmark))})
+    queries = []
+    for i in range(count):
+        start, end = rng.sample(names, 2)
+        kind = KINDS[i % len(KINDS)]
+        query = rng.choice(TEMPLATES).format(a=_vary(rng, kind, start), b=_vary(rng, kind, end))
+        queries.append({'query': query, 'start': start, 'end': end, 'kind': kind})
+    return queries
+
+
+def load_queries(path: str) -> List[Dict]:
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def load_city(scale: Optional[float], seed: int) -> Tuple[Dict, List[Dict]]:
+    """(neighborhood_data, routes) من data.py أو من synthetic_city بالحجم المطلوب"""
+    if scale is None:
+        from data import neighborhood_data, routes_data
+        return neighborhood_data, routes_data
+    from synthetic_city import load_or_generate
+    city = load_or_generate(scale, seed, os.path.join(BASE_DIR, 'benchmarks', '.cache'))
+    return city['neighborhood_data'], city['routes_data']
+
+
+def format_report(report: Dict) -> str:
+    by_kind = ' '.join(f"{kind}={value:.1%}" for kind, value in report['by_kind'].items())
+    return (f"queries={report['queries']} processes={report['processes']} host={report.get('host', '?')}\n"
+            f"  accuracy={report['accuracy']:.1%} start={report['start_accuracy']:.1%} "
+            f"end={report['end_accuracy']:.1%} routed={report['routed']:.1%}  [{by_kind}]\n"
+            f"  p50={report['p50_ms']:.3f}ms p99={report['p99_ms']:.3f}ms "
+            f"throughput={report['throughput_qps']} q/s")
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('queries', nargs='?', help='ملف JSONL: {"query", "start", "end", "kind"?}')
+    parser.add_argument('--generate', type=int, metavar='N', help='طباعة N طلبات مولدة من البيانات (JSONL)')
+    parser.add_argument('--scale', type=float, help='مدينة synthetic_city بهذا الحجم بدلاً من data.py')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processes', type=int, default=None, help='عدد العمليات (افتراضياً عدد المعالجات)')
+    parser.add_argument('--system', choices=SYSTEMS, action='append',
+                        help='المحلل المطلوب تقييمه (يتكرر؛ افتراضياً الاثنان)')
+    parser.add_argument('--baseline', help='مقارنة بتقرير محفوظ والخروج بكود 1 عند التراجع')
+    parser.add_argument('--save-baseline', nargs='?', const=BASELINE_PATH, help='حفظ التقرير كـ baseline')
+    parser.add_argument('--max-accuracy-drop', type=float, default=MAX_ACCURACY_DROP)
+    parser.add_argument('--max-slowdown', type=float, default=MAX_SLOWDOWN)
+    args = parser.parse_args(argv)
+
+    neighborhood_data, routes = load_city(args.scale, args.seed)
+    if args.generate:
+        for item in generate_queries(neighborhood_data, args.generate, random.Random(args.seed)):
+            print(json.dumps(item, ensure_ascii=False))
+        return 0
+    if not args.queries:
+        parser.error('ملف الطلبات مطلوب (أو --generate)')
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    # محلل البوت قد يغير مجلد العمل (_bot_search_system)
+    save_path = os.path.abspath(args.save_baseline) if args.save_baseline else None
+
+    queries = load_queries(args.queries)
+    reports, failures = {}, []
+    for system in args.system or SYSTEMS:
+        report = reports[system] = evaluate(queries, neighborhood_data, routes, args.processes, system=system)
+        print(f"[{system}] {format_report(report)}")
+        if baseline is None or system not in baseline:
+            continue
+        failures.extend(f"[{system}] {failure}" for failure in
+                        compare(report, baseline[system], args.max_accuracy_drop, args.max_slowdown))
+        if not same_host(report, baseline[system]):
+            for note in slowdowns(report, baseline[system], args.max_slowdown):
+                print(f"NOTE [{system}] {note} (baseline not recorded on this host, advisory)")
+
+    if save_path:
+        with open(save_path, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+        print(f"saved {save_path}")
+    if baseline is not None:
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        if failures:
+            return 1
+        print(f"OK compared with {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+طابور الإرسال إلى Telegram مع التحكم في معدل الرسائل (flood control)
+
+يُمرر إلى Application.builder().rate_limiter(...) فيمر عليه كل طلب من البوت
+(reply_text و edit_message_text و send_message وغيرها) بدون تعديل المعالجات:
+- token bucket عام (30 رسالة/ث) وآخر لكل محادثة (1 رسالة/ث، 20/دقيقة للمجموعات)
+- الأولوية: ردود المستخدمين (INTERACTIVE) قبل الرسائل الجماعية (BROADCAST)؛
+  تُحدد بـ rate_limit_args=BROADCAST في استدعاء دالة البوت
+- ترتيب الرسائل داخل المحادثة الواحدة محفوظ: طلب واحد فقط قيد الإرسال لكل محادثة
+- RetryAfter (خطأ 429): إيقاف المحادثة المدة المطلوبة ثم إعادة نفس الطلب
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BROADCAST = 1
+
+# bucket بمعدل rate وسعة burst يسمح بحد أقصى rate + burst رسالة في أي ثانية،
+# لذلك 25 + 5 = حد Telegram العام (30 رسالة/ث)
+GLOBAL_RATE = float(os.getenv('SEND_GLOBAL_RATE', '25'))
+GLOBAL_BURST = float(os.getenv('SEND_GLOBAL_BURST', '5'))
+CHAT_RATE = float(os.getenv('SEND_CHAT_RATE', '1'))
+# ضغطات الأزرار المتتالية (تعديل + صورة خريطة) لا تنتظر ثانية كاملة
+CHAT_BURST = float(os.getenv('SEND_CHAT_BURST', '2'))
+GROUP_RATE = 20 / 60
+MAX_RETRIES = 3
+# حذف buckets المحادثات الممتلئة عند تجاوز هذا العدد
+MAX_IDLE_CHATS = 10000
+
+SEND_QUEUE_WAIT = metrics.registry.histogram(
+    'telegram_send_queue_wait_seconds', 'Time outbound requests waited in the send queue', ['priority'])
+SEND_RETRY_AFTER = metrics.registry.counter(
+    'telegram_retry_after_total', 'RetryAfter (429) responses from the Bot API')
+
+ChatKey = Union[int, str]
+
+
+class TokenBucket:
+    """rate توكن في الثانية، وحتى capacity توكن مخزنة"""
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """الثواني حتى يتوفر توكن (صفر إن كان متوفراً)"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def drain(self, now: float):
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0)
+
+    def full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class _Pending:
+    __slots__ = ('priority', 'seq', 'future', 'enqueued')
+
+    def __init__(self, priority: int, seq: int, future: asyncio.Future, enqueued: float):
+        self.priority = priority
+        self.seq = seq
+        self.future = future
+        self.enqueued = enqueued
+
+
+def chat_key(chat_id: Any) -> ChatKey:
+    try:
+        return int(chat_id)
+    except (TypeError, ValueError):
+        return str(chat_id)
+
+
+class SendQueue(BaseRateLimiter[int]):
+    """جدولة طلبات البوت حسب الأولوية وحدود Telegram"""
+
+    def __init__(self, global_rate: float = GLOBAL_RATE, global_burst: float = GLOBAL_BURST,
+                 chat_rate: float = CHAT_RATE, chat_burst: float = CHAT_BURST, group_rate: float = GROUP_RATE,
+                 max_retries: int = MAX_RETRIES, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self.global_bucket = TokenBucket(global_rate, global_burst, clock())
+        self.chat_buckets: Dict[ChatKey, TokenBucket] = {}
+        self.paused_until: Dict[ChatKey, float] = {}
+        # الطلبات المنتظرة لكل محادثة بالترتيب، والمحادثات التي لها طلب قيد الإرسال
+        self.pending: Dict[ChatKey, Deque[_Pending]] = {}
+        self.in_flight: set = set()
+        # (priority, seq, chat) لأول طلب في كل محادثة جاهزة للجدولة
+        self._ready: List[Tuple[int, int, ChatKey]] = []
+        self._seq = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.stats = {'sent': 0, 'retry_after': 0}
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    # ===== الجدولة =====
+
+    def _chat_bucket(self, chat: ChatKey, now: float) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat)
+        if bucket is None:
+            if len(self.chat_buckets) >= MAX_IDLE_CHATS:
+                self.chat_buckets = {key: value for key, value in self.chat_buckets.items()
+                                     if key in self.pending or not value.full(now)}
+            # chat_id سالب أو @username = مجموعة أو قناة
+            is_group = isinstance(chat, str) or chat < 0
+            bucket = TokenBucket(self.group_rate, 1, now) if is_group else \
+                TokenBucket(self.chat_rate, self.chat_burst, now)
+            self.chat_buckets[chat] = bucket
+        return bucket
+
+    def _push_head(self, chat: ChatKey):
+        queue = self.pending.get(chat)
+        if queue and chat not in self.in_flight:
+            heapq.heappush(self._ready, (queue[0].priority, queue[0].seq, chat))
+
+    def _dispatch(self):
+        """السماح بإرسال كل طلب متاح الآن بالترتيب، وضبط مؤقت لأقرب طلب قادم"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        now = self.clock()
+        deferred, wait = [], None
+        while self._ready:
+            item = heapq.heappop(self._ready)
+            _, seq, chat = item
+            queue = self.pending.get(chat)
+            if not queue or queue[0].seq != seq or chat in self.in_flight or queue[0].future.done():
+                continue  # عنصر قديم (أُلغي الطلب أو أُرسل)
+            chat_wait = max(self.paused_until.get(chat, 0.0) - now, self._chat_bucket(chat, now).delay(now))
+            if chat_wait > 0:
+                deferred.append(item)
+                wait = chat_wait if wait is None else min(wait, chat_wait)
+                continue
+            global_wait = self.global_bucket.delay(now)
+            if global_wait > 0:
+                # لا يتجاوز طلب أقل أولوية الطلب الذي ينتظر التوكن العام
+                deferred.append(item)
+                wait = global_wait if wait is None else min(wait, global_wait)
+                break
+            self.global_bucket.take(now)
+            self._chat_bucket(chat, now).take(now)
+            self.paused_until.pop(chat, None)
+            self.in_flight.add(chat)
+            queue[0].future.set_result(None)
+        for item in deferred:
+            heapq.heappush(self._ready, item)
+        if wait is not None:
+            self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+
+    def _enqueue(self, chat: ChatKey, entry: _Pending):
+        queue = self.pending.setdefault(chat, deque())
+        queue.append(entry)
+        if len(queue) == 1:
+            self._push_head(chat)
+        self._dispatch()
+
+    def _release(self, chat: ChatKey, entry: _Pending):
+        queue = self.pending.get(chat)
+        if queue:
+            if queue[0] is entry:
+                queue.popleft()
+                self.in_flight.discard(chat)
+            else:
+                queue.remove(entry)
+            if not queue:
+                del self.pending[chat]
+        self._push_head(chat)
+        self._dispatch()
+
+    # ===== واجهة BaseRateLimiter =====
+
+    async def process_request(self, callback: Callable, args: Any, kwargs: Dict[str, Any], endpoint: str,
+                              data: Dict[str, Any], rate_limit_args: Optional[int]):
+        chat_id = data.get('chat_id')
+        if chat_id is None:
+            # answerCallbackQuery و getMe وغيرها لا تحسب من حدود الرسائل
+            return await callback(*args, **kwargs)
+
+        chat = chat_key(chat_id)
+        priority = INTERACTIVE if rate_limit_args is None else rate_limit_args
+        loop = asyncio.get_running_loop()
+        self._seq += 1
+        entry = _Pending(priority, self._seq, loop.create_future(), self.clock())
+        self._enqueue(chat, entry)
+        try:
+            for attempt in range(self.max_retries + 1):
+                await entry.future
+                if attempt == 0:
+                    SEND_QUEUE_WAIT.observe(self.clock() - entry.enqueued,
+                                            priority='broadcast' if priority else 'interactive')
+                try:
+                    result = await callback(*args, **kwargs)
+                    self.stats['sent'] += 1
+                    return result
+                except RetryAfter as e:
+                    self.stats['retry_after'] += 1
+                    SEND_RETRY_AFTER.inc()
+                    if attempt == self.max_retries:
+                        logger.error("Flood control: giving up on %s to %s after %d retries", endpoint, chat, attempt)
+                        raise
+                    retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, 'total_seconds') \
+                        else float(e.retry_after)
+                    logger.warning("Flood control on %s to %s, retrying in %ss", endpoint, chat, retry_after)
+                    now = self.clock()
+                    # نفس الطلب يبقى أول المحادثة؛ والتوكنات العامة تُصفر لأن 429 قد يكون من الحد العام
+                    self.paused_until[chat] = now + retry_after
+                    self.global_bucket.drain(now)
+                    entry.future = loop.create_future()
+                    self.in_flight.discard(chat)
+                    self._push_head(chat)
+                    self._dispatch()
+        finally:
+            self._release(chat, entry)
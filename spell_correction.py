@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+تصحيح الأخطاء الإملائية في أسماء المعالم ("هل قصدت؟")
+
+SymSpell: لكل كلمة في أسماء المعالم (بعد arabic_text.normalize) تُحسب مسبقاً كل
+الكلمات الناتجة عن حذف حتى MAX_EDIT_DISTANCE حروف من أول PREFIX_LENGTH حروف منها،
+وتُخزن في قاموس حذف -> كلمات. عند البحث تُولد حذوفات الكلمة المكتوبة فقط وتُقرأ
+الكلمات المرشحة من القاموس، ثم يُحسب بُعد التحرير (Damerau) للمرشحين وحدهم بدلاً
+من مقارنة النص بكل المعالم. PREFIX_LENGTH وMAX_EDIT_DISTANCE يحددان حجم القاموس.
+"""
+
+import os
+import logging
+from collections import deque
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Set, Tuple
+
+from arabic_text import ARTICLE, normalize, strip_article, tokenize
+
+logger = logging.getLogger(__name__)
+
+MAX_EDIT_DISTANCE = int(os.getenv('SPELL_MAX_EDIT_DISTANCE', '2'))
+PREFIX_LENGTH = int(os.getenv('SPELL_PREFIX_LENGTH', '7'))
+# أقل درجة (متوسط تطابق كلمات النص) لاقتراح معلم
+MIN_SUGGESTION_SCORE = 0.5
+# لا يُقترح معلم أضعف من الأفضل بأكثر من هذا الفرق
+SUGGESTION_SCORE_MARGIN = 0.25
+# المعالم المتقاربة في الدرجة تُرتب بتشابه الاسم كاملاً مع النص (SequenceMatcher على هذا العدد فقط)
+RERANK_CANDIDATES = 20
+# كلمات الربط لا تُصحح ولا تُحسب في الدرجة
+STOP_WORDS = {'من', 'الي', 'الى', 'ل', 'لل', 'عند', 'في', 'حتي'}
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """بُعد التحرير مع تبديل حرفين متجاورين؛ max_distance + 1 إذا تجاوز الحد"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1] if previous[-1] <= max_distance else max_distance + 1
+
+
+def allowed_distance(word: str, max_distance: int = MAX_EDIT_DISTANCE) -> int:
+    """الكلمات القصيرة تتحمل أخطاء أقل (حرفان مختلفان في كلمة من 3 حروف كلمة أخرى)"""
+    if len(word) <= 2:
+        return 0
+    if len(word) <= 4:
+        return min(1, max_distance)
+    return max_distance
+
+
+class SymSpell:
+    """قاموس الحذوفات للكلمات"""
+
+    def __init__(self, max_edit_distance: int = MAX_EDIT_DISTANCE, prefix_length: int = PREFIX_LENGTH):
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.words: Dict[str, int] = {}
+        self.deletes: Dict[str, List[str]] = {}
+
+    def _deletes(self, word: str) -> Set[str]:
+        """كل الحذوفات حتى max_edit_distance من بادئة الكلمة (والبادئة نفسها)"""
+        prefix = word[:self.prefix_length]
+        result = {prefix}
+        frontier = [prefix]
+        for _ in range(self.max_edit_distance):
+            next_frontier = []
+            for candidate in frontier:
+                if len(candidate) <= 1:
+                    continue
+                for i in range(len(candidate)):
+                    delete = candidate[:i] + candidate[i + 1:]
+                    if delete not in result:
+                        result.add(delete)
+                        next_frontier.append(delete)
+            frontier = next_frontier
+        return result
+
+    def add_word(self, word: str, count: int = 1):
+        if word in self.words:
+            self.words[word] += count
+            return
+        self.words[word] = count
+        for delete in self._deletes(word):
+            self.deletes.setdefault(delete, []).append(word)
+
+    def remove_word(self, word: str, count: int = 1):
+        if word not in self.words:
+            return
+        self.words[word] -= count
+        if self.words[word] > 0:
+            return
+        del self.words[word]
+        for delete in self._deletes(word):
+            words = self.deletes.get(delete)
+            if words:
+                words.remove(word)
+                if not words:
+                    del self.deletes[delete]
+
+    def lookup(self, word: str, max_distance: Optional[int] = None) -> List[Tuple[str, int]]:
+        """الكلمات المعروفة في حدود max_distance مرتبة بالبُعد ثم الأكثر تكراراً"""
+        if max_distance is None:
+            max_distance = self.max_edit_distance
+        max_distance = min(max_distance, self.max_edit_distance)
+        found: Dict[str, int] = {}
+        if word in self.words:
+            found[word] = 0
+        if max_distance > 0:
+            prefix = word[:self.prefix_length]
+            queue, seen = deque([prefix]), {prefix}
+            while queue:
+                candidate = queue.popleft()
+                for suggestion in self.deletes.get(candidate, ()):
+                    if suggestion not in found and abs(len(suggestion) - len(word)) <= max_distance:
+                        distance = edit_distance(word, suggestion, max_distance)
+                        if distance <= max_distance:
+                            found[suggestion] = distance
+                if len(prefix) - len(candidate) < max_distance and len(candidate) > 1:
+                    for i in range(len(candidate)):
+                        delete = candidate[:i] + candidate[i + 1:]
+                        if delete not in seen:
+                            seen.add(delete)
+                            queue.append(delete)
+        return sorted(found.items(), key=lambda item: (item[1], -self.words[item[0]], item[0]))
+
+
+def index_words(text: str) -> List[str]:
+    return [strip_article(word) for word in tokenize(text) if word not in STOP_WORDS]
+
+
+class LandmarkSpeller:
+    """اقتراح معالم قريبة في الكتابة من نص لم يطابق أي معلم"""
+
+    def __init__(self, max_edit_distance: int = MAX_EDIT_DISTANCE, prefix_length: int = PREFIX_LENGTH):
+        self.symspell = SymSpell(max_edit_distance, prefix_length)
+        self.landmarks: Dict[Tuple[str, str], Dict] = {}
+        # كلمة -> المعالم التي تحتويها
+        self.word_landmarks: Dict[str, Set[Tuple[str, str]]] = {}
+
+    @classmethod
+    def from_neighborhoods(cls, neighborhood_data: Dict, **kwargs) -> 'LandmarkSpeller':
+        speller = cls(**kwargs)
+        for neighborhood, categories in neighborhood_data.items():
+            for category, landmarks in categories.items():
+                for landmark in landmarks:
+                    speller.add(landmark, neighborhood, category)
+        logger.info("Spelling index built: %d words, %d deletes",
+                    len(speller.symspell.words), len(speller.symspell.deletes))
+        return speller
+
+    def add(self, landmark, neighborhood: str, category: str) -> bool:
+        name = landmark.get('name', '') if isinstance(landmark, dict) else landmark
+        if not isinstance(name, str) or not normalize(name):
+            return False
+        self.remove(name, neighborhood)
+        key = (normalize(name), neighborhood)
+        words = set(index_words(name))
+        self.landmarks[key] = {'name': name.strip(), 'neighborhood': neighborhood, 'category': category,
+                               'words': len(words)}
+        for word in words:
+            self.symspell.add_word(word)
+            self.word_landmarks.setdefault(word, set()).add(key)
+        return True
+
+    def remove(self, name: str, neighborhood: str) -> bool:
+        key = (normalize(name), neighborhood)
+        if self.landmarks.pop(key, None) is None:
+            return False
+        for word in set(index_words(name)):
+            self.symspell.remove_word(word)
+            keys = self.word_landmarks.get(word)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self.word_landmarks[word]
+        return True
+
+    def _word_matches(self, word: str) -> List[Tuple[str, float]]:
+        """الكلمات المعروفة القريبة من كلمة مكتوبة مع تشابهها (1 = مطابقة)"""
+        max_distance = self.symspell.max_edit_distance
+        matches = [(match, 1 - distance / (len(word) + 1))
+                   for match, distance in self.symspell.lookup(word, allowed_distance(word, max_distance))]
+        if matches:
+            return matches
+        # حرف زائد قبل "ال" أو داخلها: "زالجولف"
+        article = word.find(ARTICLE, 1, 4)
+        if article > 0:
+            rest = word[article + len(ARTICLE):]
+            matches = [(match, 1 - (distance + article) / (len(word) + 1))
+                       for match, distance in self.symspell.lookup(rest, allowed_distance(rest, max_distance))]
+            if matches:
+                return matches
+        # كلمتان بدون مسافة: "ساحهالمروه"
+        for split in range(3, len(word) - 2):
+            left, right = word[:split], strip_article(word[split:])
+            if left in self.symspell.words and right in self.symspell.words:
+                return [(left, 0.9), (right, 0.9)]
+        return []
+
+    def suggest(self, text: str, limit: int = 3) -> List[Dict]:
+        """أقرب المعالم للنص: لكل كلمة أقرب كلمة معروفة، والدرجة متوسط تطابق الكلمات"""
+        words = index_words(text)
+        if not words:
+            return []
+        scores: Dict[Tuple[str, str], List[float]] = {}
+        for position, word in enumerate(words):
+            for match, similarity in self._word_matches(word):
+                for key in self.word_landmarks.get(match, ()):
+                    best = scores.setdefault(key, [0.0] * len(words))
+                    best[position] = max(best[position], similarity)
+
+        ranked = []
+        for key, best in scores.items():
+            score = sum(best) / len(words)
+            if score >= MIN_SUGGESTION_SCORE:
+                ranked.append((-score, key))
+        if not ranked:
+            return []
+        ranked.sort()
+        cutoff = -ranked[0][0] - SUGGESTION_SCORE_MARGIN
+        ranked = [(-negative_score, key) for negative_score, key in ranked[:RERANK_CANDIDATES]
+                  if -negative_score >= cutoff]
+        query = ' '.join(words)
+
+        def rerank(item):
+            score, key = item
+            ratio = SequenceMatcher(None, query, ' '.join(index_words(self.landmarks[key]['name']))).ratio()
+            return -round(score, 6), -ratio, self.landmarks[key]['words'], self.landmarks[key]['name']
+
+        return [{'name': self.landmarks[key]['name'], 'neighborhood': self.landmarks[key]['neighborhood'],
+                 'category': self.landmarks[key]['category'], 'score': score}
+                for score, key in sorted(ranked, key=rerank)[:limit]]
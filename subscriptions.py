@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+متابعة الخطوط: تنبيه المشتركين عند تقارير الازدحام أو تغيير المسار
+
+- الاشتراكات في SQLite: جدول subscription مفتاحه (route_id, chat_id) فقراءة
+  مشتركي خط واحد مسح لنطاق في الفهرس، مع فهرس على chat_id لقائمة "اشتراكاتي"
+- AlertFanout: أول تقرير لخط يبدأ نافذة ALERT_DEBOUNCE_S ثانية، وكل التقارير
+  التي تصل خلالها تُجمع في تنبيه واحد
+- الإرسال على صفحات من المشتركين (keyset على chat_id) بأولوية BROADCAST في
+  send_queue، فلا تتأخر ردود المستخدمين ولا يُحمل 100 ألف مشترك في الذاكرة مرة واحدة
+"""
+
+import os
+import asyncio
+import logging
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import Forbidden, TelegramError
+
+import metrics
+from send_queue import BROADCAST
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIPTIONS_DB = os.getenv('SUBSCRIPTIONS_DB', 'subscriptions.db')
+ALERT_DEBOUNCE_S = float(os.getenv('ALERT_DEBOUNCE_S', '60'))
+ALERT_TYPES = ('congestion', 'detour')
+FANOUT_PAGE_SIZE = 1000
+MAX_DESCRIPTIONS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscribed_route (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS subscription (
+    route_id INTEGER NOT NULL REFERENCES subscribed_route (id),
+    chat_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (route_id, chat_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_subscription_chat ON subscription (chat_id);
+"""
+
+ALERTS_SENT = metrics.registry.counter(
+    'route_alert_messages_total', 'Route disruption alert messages by result (sent/failed/blocked)', ['result'])
+
+TYPE_NAMES = {
+    'congestion': '🔴 ازدحام شديد',
+    'delay': '🟡 تأخير في المواعيد',
+    'detour': '🔄 تغيير مسار',
+    'normal': '🟢 الوضع طبيعي',
+}
+
+
+class SubscriptionStore:
+    """اشتراكات المحادثات في الخطوط (الاتصال يُفتح عند أول استخدام)"""
+
+    def __init__(self, path: str = SUBSCRIPTIONS_DB):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def route_id(self, route_name: str, create: bool = False) -> Optional[int]:
+        with self._lock:
+            if create:
+                self.conn.execute("INSERT OR IGNORE INTO subscribed_route (name) VALUES (?)", (route_name,))
+            row = self.conn.execute("SELECT id FROM subscribed_route WHERE name = ?", (route_name,)).fetchone()
+        return row[0] if row else None
+
+    def route_name(self, route_id: int) -> Optional[str]:
+        row = self.conn.execute("SELECT name FROM subscribed_route WHERE id = ?", (route_id,)).fetchone()
+        return row[0] if row else None
+
+    def subscribe(self, chat_id: int, route_id: int) -> bool:
+        """True إذا كان اشتراكاً جديداً"""
+        with self._lock:
+            cursor = self.conn.execute("INSERT OR IGNORE INTO subscription (route_id, chat_id) VALUES (?, ?)",
+                                       (route_id, chat_id))
+        return cursor.rowcount > 0
+
+    def subscribe_many(self, route_id: int, chat_ids: Iterable[int]) -> int:
+        with self._lock:
+            self.conn.execute("BEGIN")
+            cursor = self.conn.executemany("INSERT OR IGNORE INTO subscription (route_id, chat_id) VALUES (?, ?)",
+                                           ((route_id, chat_id) for chat_id in chat_ids))
+            self.conn.execute("COMMIT")
+        return cursor.rowcount
+
+    def unsubscribe(self, chat_id: int, route_id: int) -> bool:
+        with self._lock:
+            cursor = self.conn.execute("DELETE FROM subscription WHERE route_id = ? AND chat_id = ?",
+                                       (route_id, chat_id))
+        return cursor.rowcount > 0
+
+    def unsubscribe_chat(self, chat_id: int) -> int:
+        """حذف كل اشتراكات محادثة (مثلاً عند حظر المستخدم للبوت)"""
+        with self._lock:
+            return self.conn.execute("DELETE FROM subscription WHERE chat_id = ?", (chat_id,)).rowcount
+
+    def is_subscribed(self, chat_id: int, route_id: int) -> bool:
+        return self.conn.execute("SELECT 1 FROM subscription WHERE route_id = ? AND chat_id = ?",
+                                 (route_id, chat_id)).fetchone() is not None
+
+    def subscriptions(self, chat_id: int) -> List[Tuple[int, str]]:
+        return self.conn.execute("SELECT r.id, r.name FROM subscription s JOIN subscribed_route r "
+                                 "ON r.id = s.route_id WHERE s.chat_id = ? ORDER BY r.name", (chat_id,)).fetchall()
+
+    def count(self, route_id: int) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM subscription WHERE route_id = ?", (route_id,)).fetchone()[0]
+
+    def subscriber_pages(self, route_id: int, page_size: int = FANOUT_PAGE_SIZE) -> Iterator[List[int]]:
+        """مشتركو الخط على صفحات مرتبة بـ chat_id (keyset: كل صفحة تبدأ بعد آخر معرف)"""
+        last = None
+        while True:
+            if last is None:
+                rows = self.conn.execute("SELECT chat_id FROM subscription WHERE route_id = ? "
+                                         "ORDER BY chat_id LIMIT ?", (route_id, page_size)).fetchall()
+            else:
+                rows = self.conn.execute("SELECT chat_id FROM subscription WHERE route_id = ? AND chat_id > ? "
+                                         "ORDER BY chat_id LIMIT ?", (route_id, last, page_size)).fetchall()
+            if not rows:
+                return
+            yield [row[0] for row in rows]
+            last = rows[-1][0]
+
+
+def format_alert(route_name: str, reports: List[Dict]) -> str:
+    """نص تنبيه واحد لكل تقارير نافذة التجميع"""
+    types = []
+    for report in reports:
+        name = TYPE_NAMES.get(report['report_type'], report['report_type'])
+        if name not in types:
+            types.append(name)
+    text = f"⚠️ تنبيه على {route_name}\n\n{' • '.join(types)}"
+    if len(reports) > 1:
+        text += f" ({len(reports)} تقارير)"
+    descriptions = [report['description'] for report in reports if report.get('description')]
+    for description in descriptions[-MAX_DESCRIPTIONS:]:
+        text += f"\n📝 {description}"
+    return text
+
+
+class AlertFanout:
+    """تجميع التقارير لكل خط ثم إرسال تنبيه واحد لكل المشتركين"""
+
+    def __init__(self, store: SubscriptionStore, debounce_s: float = ALERT_DEBOUNCE_S,
+                 alert_types: Iterable[str] = ALERT_TYPES, page_size: int = FANOUT_PAGE_SIZE):
+        self.store = store
+        self.debounce_s = debounce_s
+        self.alert_types = set(alert_types)
+        self.page_size = page_size
+        self.pending: Dict[str, List[Dict]] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.stats = {'alerts': 0, 'sent': 0, 'failed': 0, 'blocked': 0}
+
+    def publish(self, bot, report: Dict) -> bool:
+        """يُستدعى بعد إضافة تقرير؛ True إذا سيُرسل عنه تنبيه"""
+        if report.get('report_type') not in self.alert_types:
+            return False
+        route_name = report['route_name']
+        if self.store.route_id(route_name) is None:
+            return False  # لا أحد اشترك في هذا الخط من قبل
+        self.pending.setdefault(route_name, []).append(report)
+        if route_name not in self.tasks:
+            self.tasks[route_name] = asyncio.create_task(self._flush_later(bot, route_name))
+        return True
+
+    async def _flush_later(self, bot, route_name: str):
+        try:
+            await asyncio.sleep(self.debounce_s)
+        finally:
+            # التقارير بعد هذه اللحظة تبدأ نافذة جديدة
+            self.tasks.pop(route_name, None)
+            reports = self.pending.pop(route_name, [])
+        if reports:
+            await self.send_alert(bot, route_name, reports)
+
+    async def send_alert(self, bot, route_name: str, reports: List[Dict]) -> int:
+        """إرسال التنبيه لكل المشتركين ما عدا أصحاب التقارير؛ يرجع عدد الرسائل المرسلة"""
+        route_id = self.store.route_id(route_name)
+        if route_id is None:
+            return 0
+        self.stats['alerts'] += 1
+        text = format_alert(route_name, reports)
+        markup = InlineKeyboardMarkup([[InlineKeyboardButton("🔕 إيقاف تنبيهات هذا الخط",
+                                                             callback_data=f"unsubscribe:{route_id}")]])
+        reporters = {report.get('user_id') for report in reports}
+        # rate_limit_args يتطلب وجود rate limiter على البوت
+        extra = {'rate_limit_args': BROADCAST} if getattr(bot, 'rate_limiter', None) else {}
+        sent = 0
+        for page in self.store.subscriber_pages(route_id, self.page_size):
+            results = await asyncio.gather(*(self._send(bot, chat_id, text, markup, extra)
+                                             for chat_id in page if chat_id not in reporters))
+            sent += sum(results)
+        logger.info("Route alert for %s: %d reports, %d messages sent", route_name, len(reports), sent)
+        return sent
+
+    async def _send(self, bot, chat_id: int, text: str, markup, extra: Dict) -> bool:
+        try:
+            await bot.send_message(chat_id=chat_id, text=text, reply_markup=markup, **extra)
+        except Forbidden:
+            # المستخدم حظر البوت أو حذف المحادثة
+            self.store.unsubscribe_chat(chat_id)
+            self.stats['blocked'] += 1
+            ALERTS_SENT.inc(result='blocked')
+            return False
+        except TelegramError as e:
+            logger.warning("Route alert to %s failed: %s", chat_id, e)
+            self.stats['failed'] += 1
+            ALERTS_SENT.inc(result='failed')
+            return False
+        self.stats['sent'] += 1
+        ALERTS_SENT.inc(result='sent')
+        return True
+
+    def shutdown(self):
+        for task in self.tasks.values():
+            task.cancel()
+        self.tasks.clear()
+        self.pending.clear()
+
+
+# مثيلات عامة
+subscription_store = SubscriptionStore()
+alert_fanout = AlertFanout(subscription_store)
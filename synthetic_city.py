@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+مولد مدينة اصطناعية لاختبارات الأداء على نطاق واسع
+
+ينتج بيانات بنفس هيكل routes_data و neighborhood_data في data.py
+(مع بيانات القرب served_by) وبنفس جداول route و location في قاعدة بيانات
+لوحة الإدارة، بحجم قابل للتحكم (scale=1 يعادل تقريباً حجم البيانات الحالية).
+التوليد حتمي: نفس (scale, seed) يعطي نفس البيانات دائماً.
+
+الاستخدام:
+    python synthetic_city.py --scale 100 --json city_100x.json --sqlite city_100x.db
+"""
+
+import os
+import json
+import math
+import random
+import sqlite3
+import argparse
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# أحجام البيانات الحالية في data.py (scale = 1)
+BASE_ROUTES = 11
+BASE_LANDMARKS = 544
+BASE_NEIGHBORHOODS = 5
+STOPS_PER_ROUTE = (20, 45)
+
+# مركز بورسعيد التقريبي ومساحة حي واحد بالدرجات
+CITY_CENTER = (31.2565, 32.2842)
+NEIGHBORHOOD_SPAN = 0.02
+
+# مستويات القرب بنفس النصوص المستخدمة في data.py، مع أقصى مسافة بالمتر
+PROXIMITY_LEVELS = [
+    (250, "قريبة جدا"),
+    (600, "متوسطة"),
+    (1200, "بعيدة"),
+]
+
+CATEGORY_PREFIXES = {
+    "شوارع رئيسية": ["شارع", "طريق", "تقاطع شارع"],
+    "مناطق سكنية": ["منطقة", "مساكن", "عمارات", "إسكان"],
+    "معالم دينية": ["مسجد", "جامع", "كنيسة"],
+    "تعليم": ["مدرسة", "معهد", "كلية", "حضانة"],
+    "صحة": ["مستشفى", "مركز", "عيادة", "صيدلية"],
+    "أسواق وتجارة": ["سوق", "سوبر ماركت", "مول", "محل"],
+    "مطاعم ومحلات ومولات": ["مطعم", "حلواني", "كافيه", "مخبز"],
+    "خدمات حكومية وعامة": ["قسم شرطة", "مكتب بريد", "سنترال", "مجلس"],
+    "حدائق وترفيه": ["حديقة", "نادي", "مركز شباب", "ساحة"],
+}
+
+NAME_WORDS = [
+    "النور", "السلام", "الرحمة", "الهدى", "الفتح", "النصر", "الأمل", "الزهور",
+    "الشروق", "الفرما", "القناة", "البحر", "الميناء", "الجمهورية", "الحرية", "التحرير",
+    "الصفا", "المروة", "الإيمان", "التوحيد", "الرحاب", "العبور", "الشهداء", "الجولف",
+    "المناخ", "الضواحي", "العرب", "الشرق", "الكنال", "البازار", "الصباح", "الأمين",
+    "عمر بن الخطاب", "صلاح الدين", "محمد علي", "سعد زغلول", "طه حسين", "أحمد شوقي",
+    "الجديد", "القديم", "الكبير", "الشمالي", "الجنوبي", "الغربي", "الشرقي", "الأول",
+]
+
+NEIGHBORHOOD_WORDS = ["الضواحي", "العرب", "الشرق", "المناخ", "الزهور", "الجنوب", "الغرب",
+                      "الجولف", "السلام", "الفيروز", "الكنال", "الميناء"]
+
+ROUTE_WORDS = ["السلام", "الامين", "الزهور", "السيد متولي", "ال٥٠٠٠", "الجامعة", "الكورنيش",
+               "القابوطي", "المناخ", "البازار", "الجولف", "الميناء", "الشهداء", "العبور"]
+
+
+def _distance_m(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """مسافة تقريبية بالمتر (equirectangular) تكفي لمسافات داخل المدينة"""
+    lat = math.radians((a[0] + b[0]) / 2)
+    dx = math.radians(b[1] - a[1]) * math.cos(lat)
+    dy = math.radians(b[0] - a[0])
+    return 6371000.0 * math.hypot(dx, dy)
+
+
+def _proximity_for(distance_m: float) -> Optional[str]:
+    for max_distance, label in PROXIMITY_LEVELS:
+        if distance_m <= max_distance:
+            return label
+    return None
+
+
+class _Grid:
+    """شبكة بسيطة لتجميع النقاط حسب الموقع لتسريع البحث عن الجيران"""
+
+    def __init__(self, cell_deg: float):
+        self.cell = cell_deg
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+
+    def key(self, point: Tuple[float, float]) -> Tuple[int, int]:
+        return int(point[0] // self.cell), int(point[1] // self.cell)
+
+    def add(self, index: int, point: Tuple[float, float]):
+        self.cells.setdefault(self.key(point), []).append(index)
+
+    def around(self, point: Tuple[float, float], rings: int = 1):
+        cx, cy = self.key(point)
+        for dx in range(-rings, rings + 1):
+            for dy in range(-rings, rings + 1):
+                yield from self.cells.get((cx + dx, cy + dy), ())
+
+
+def _unique_name(base: str, used: Dict[str, int]) -> str:
+    count = used.get(base, 0)
+    used[base] = count + 1
+    return base if count == 0 else f"{base} ({count + 1})"
+
+
+def generate_city(scale: float = 1.0, seed: int = 0) -> Dict:
+    """توليد مدينة اصطناعية
+
+    Returns:
+        {'routes_data': [...], 'neighborhood_data': {...}}
+    """
+    rng = random.Random(f"{scale}:{seed}")
+    n_landmarks = max(20, int(round(BASE_LANDMARKS * scale)))
+    n_routes = max(2, int(round(BASE_ROUTES * scale)))
+    n_neighborhoods = max(BASE_NEIGHBORHOODS, int(round(BASE_NEIGHBORHOODS * scale)))
+
+    # الأحياء مرتبة على شبكة حول مركز المدينة حتى تبقى الكثافة ثابتة مع الحجم
+    side = math.ceil(math.sqrt(n_neighborhoods))
+    neighborhoods = []
+    used_names: Dict[str, int] = {}
+    for i in range(n_neighborhoods):
+        row, col = divmod(i, side)
+        center = (CITY_CENTER[0] + (row - side / 2) * NEIGHBORHOOD_SPAN,
+                  CITY_CENTER[1] + (col - side / 2) * NEIGHBORHOOD_SPAN)
+        name = _unique_name(f"حي {NEIGHBORHOOD_WORDS[i % len(NEIGHBORHOOD_WORDS)]}", used_names)
+        neighborhoods.append((name, center))
+
+    # المعالم
+    landmarks = []  # (name, neighborhood, category, (lat, lng))
+    used_names = {}
+    categories = list(CATEGORY_PREFIXES)
+    for i in range(n_landmarks):
+        neighborhood, center = neighborhoods[i % n_neighborhoods]
+        category = rng.choice(categories)
+        words = rng.sample(NAME_WORDS, rng.choice((1, 1, 2)))
+        base = f"{rng.choice(CATEGORY_PREFIXES[category])} {' '.join(words)}"
+        name = _unique_name(base, used_names)
+        point = (center[0] + rng.uniform(-0.5, 0.5) * NEIGHBORHOOD_SPAN,
+                 center[1] + rng.uniform(-0.5, 0.5) * NEIGHBORHOOD_SPAN)
+        landmarks.append((name, neighborhood, category, point))
+
+    grid = _Grid(cell_deg=0.004)
+    for index, (_, _, _, point) in enumerate(landmarks):
+        grid.add(index, point)
+
+    # الخطوط: مسار يتحرك بين معالم قريبة، ولكل خط اتجاهان (رايح/راجع)
+    routes_data = []
+    route_stops: Dict[str, List[int]] = {}
+    used_names = {}
+    for _ in range(math.ceil(n_routes / 2)):
+        base_name = _unique_name(f"خط {rng.choice(ROUTE_WORDS)}", used_names)
+        current = rng.randrange(n_landmarks)
+        heading = rng.uniform(0, 2 * math.pi)
+        stops = [current]
+        visited = {current}
+        for _ in range(rng.randint(*STOPS_PER_ROUTE)):
+            point = landmarks[current][3]
+            heading += rng.uniform(-0.6, 0.6)
+            target = (point[0] + 0.006 * math.sin(heading), point[1] + 0.006 * math.cos(heading))
+            candidates = [i for i in grid.around(target) if i not in visited]
+            if not candidates:
+                heading += math.pi / 2
+                continue
+            current = min(candidates, key=lambda i: _distance_m(landmarks[i][3], target))
+            stops.append(current)
+            visited.add(current)
+        route_stops[base_name] = stops
+
+        fare = rng.choice(["4.5", "5", "6", "7"])
+        start_point = landmarks[stops[0]][3]
+        for direction, ordered in (("رايح البلد", stops), ("راجع", list(reversed(stops)))):
+            if len(routes_data) >= n_routes:
+                break
+            routes_data.append({
+                "routeName": f"{base_name} ({direction})",
+                "startArea": landmarks[ordered[0]][1],
+                "startCoordinates": f"{start_point[0]:.7f}, {start_point[1]:.7f}",
+                "endArea": landmarks[ordered[-1]][1],
+                "keyPoints": [landmarks[i][0] for i in ordered],
+                "fare": f"{fare} جنيه مصري",
+                "notes": "",
+            })
+
+    # بيانات القرب: لكل معلم، الخطوط التي تمر بمحطة قريبة منه
+    served_by: List[Dict[str, Dict]] = [{} for _ in landmarks]
+    best_distance: List[Dict[str, float]] = [{} for _ in landmarks]
+    for base_name, stops in route_stops.items():
+        for stop_index in stops:
+            stop_name, _, _, stop_point = landmarks[stop_index]
+            for index in grid.around(stop_point, rings=3):
+                distance = _distance_m(landmarks[index][3], stop_point)
+                label = _proximity_for(distance)
+                if label is None or distance >= best_distance[index].get(base_name, float('inf')):
+                    continue
+                best_distance[index][base_name] = distance
+                served_by[index][base_name] = {"proximity": label, "nearest_stop": stop_name}
+
+    neighborhood_data: Dict[str, Dict[str, List[Dict]]] = {}
+    for index, (name, neighborhood, category, point) in enumerate(landmarks):
+        neighborhood_data.setdefault(neighborhood, {}).setdefault(category, []).append({
+            "name": name,
+            "coordinates": f"{point[0]:.7f}, {point[1]:.7f}",
+            "served_by": served_by[index],
+        })
+
+    return {'routes_data': routes_data, 'neighborhood_data': neighborhood_data}
+
+
+def write_sqlite(city: Dict, path: str) -> None:
+    """كتابة المدينة في قاعدة بيانات بنفس جداول لوحة الإدارة (route و location و route_stop)"""
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript("""
+            DROP TABLE IF EXISTS route_stop;
+            DROP TABLE IF EXISTS location;
+            DROP TABLE IF EXISTS route;
+            CREATE TABLE location (
+                id INTEGER PRIMARY KEY,
+                name VARCHAR(200) NOT NULL,
+                category VARCHAR(100) NOT NULL,
+                neighborhood VARCHAR(100) NOT NULL,
+                coordinates VARCHAR(50),
+                created_at DATETIME
+            );
+            CREATE TABLE route (
+                id INTEGER PRIMARY KEY,
+                name VARCHAR(200) NOT NULL,
+                fare FLOAT NOT NULL,
+                start_area VARCHAR(200),
+                end_area VARCHAR(200),
+                notes TEXT,
+                created_at DATETIME
+            );
+            CREATE TABLE route_stop (
+                route_id INTEGER NOT NULL REFERENCES route (id) ON DELETE CASCADE,
+                seq INTEGER NOT NULL,
+                location_id INTEGER NOT NULL REFERENCES location (id) ON DELETE CASCADE,
+                PRIMARY KEY (route_id, seq)
+            );
+            CREATE INDEX ix_route_stop_location ON route_stop (location_id);
+        """)
+        now = datetime.utcnow().isoformat(sep=' ')
+        locations = [(landmark['name'], category, neighborhood, landmark.get('coordinates'), now)
+                     for neighborhood, categories in city['neighborhood_data'].items()
+                     for category, landmarks in categories.items()
+                     for landmark in landmarks]
+        # المحطات غير الموجودة كمعالم تُضاف كأماكن غير مصنفة (مثل ترحيل route_stop)
+        location_ids = {}
+        for i, (name, *_rest) in enumerate(locations, 1):
+            location_ids.setdefault(name, i)
+        for route in city['routes_data']:
+            for point in route['keyPoints']:
+                if point not in location_ids:
+                    locations.append((point, 'محطات', 'غير مصنف', None, now))
+                    location_ids[point] = len(locations)
+        conn.executemany(
+            "INSERT INTO location (id, name, category, neighborhood, coordinates, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            ((i, *location) for i, location in enumerate(locations, 1)))
+        conn.executemany(
+            "INSERT INTO route (id, name, fare, start_area, end_area, notes, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((i, route['routeName'], float(route['fare'].split()[0]), route['startArea'], route['endArea'],
+              route['notes'], now)
+             for i, route in enumerate(city['routes_data'], 1)))
+        conn.executemany(
+            "INSERT INTO route_stop (route_id, seq, location_id) VALUES (?, ?, ?)",
+            ((i, seq, location_ids[point])
+             for i, route in enumerate(city['routes_data'], 1)
+             for seq, point in enumerate(route['keyPoints'])))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def load_or_generate(scale: float, seed: int = 0, cache_dir: Optional[str] = None) -> Dict:
+    """توليد المدينة مع حفظها كـ JSON في cache_dir لتجنب إعادة التوليد في كل تشغيل"""
+    if not cache_dir:
+        return generate_city(scale, seed)
+    path = os.path.join(cache_dir, f"city_{scale:g}x_seed{seed}.json")
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    city = generate_city(scale, seed)
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(city, f, ensure_ascii=False)
+    return city
+
+
+def city_stats(city: Dict) -> Dict[str, int]:
+    """إحصائيات سريعة عن المدينة المولدة"""
+    landmarks = [l for c in city['neighborhood_data'].values() for ls in c.values() for l in ls]
+    return {
+        'routes': len(city['routes_data']),
+        'neighborhoods': len(city['neighborhood_data']),
+        'landmarks': len(landmarks),
+        'key_points': sum(len(r['keyPoints']) for r in city['routes_data']),
+        'served_by_links': sum(len(l['served_by']) for l in landmarks),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1.0, help='مضاعف الحجم (1 = حجم data.py الحالي)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='حفظ routes_data و neighborhood_data في ملف JSON')
+    parser.add_argument('--sqlite', help='كتابة جداول route و location في قاعدة بيانات SQLite')
+    args = parser.parse_args()
+
+    city = generate_city(args.scale, args.seed)
+    print(city_stats(city))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(city, f, ensure_ascii=False)
+    if args.sqlite:
+        write_sqlite(city, args.sqlite)
+
+
+if __name__ == '__main__':
+    main()
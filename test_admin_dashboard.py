@@ -0,0 +1,167 @@
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import database_helper
+
+TMP_DIR = tempfile.mkdtemp()
+DB_PATH = os.path.join(TMP_DIR, 'admin.db')
+
+
+def setUpModule():
+    # قاعدة مؤقتة بدلاً من instance/admin_bot.db أياً كان ترتيب تحميل ملفات الاختبار:
+    # admin_dashboard يقرأ database_helper.DATABASE_PATH عند استيراده هنا
+    global app, db, upgrade_database, location_ids_for, stops_for, Location, Route
+    for patcher in (mock.patch.object(database_helper, 'DATABASE_PATH', DB_PATH),
+                    mock.patch.object(database_helper, '_local', threading.local())):
+        patcher.start()
+        unittest.addModuleCleanup(patcher.stop)
+    from admin_dashboard import app, db, upgrade_database, location_ids_for, stops_for, Location, Route
+    if app.config['SQLALCHEMY_DATABASE_URI'] != f'sqlite:///{DB_PATH}':
+        raise AssertionError(f"admin_dashboard was imported earlier with {app.config['SQLALCHEMY_DATABASE_URI']}")
+
+
+def tearDownModule():
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+class TestDashboardPagination(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with app.app_context():
+            upgrade_database()
+            for i in range(130):
+                db.session.add(Location(name=f"مكان {i % 40}", category=f"تصنيف {i % 3}",
+                                        neighborhood=f"حي {i % 2}"))
+            for i in range(7):
+                db.session.add(Route(name=f"خط {i}", fare=5, stops=stops_for(location_ids_for([f"مكان {i}"]))))
+            db.session.commit()
+            cls.expected = [(l.neighborhood, l.category, l.name, l.id) for l in Location.query.all()]
+        cls.expected.sort()
+
+    def setUp(self):
+        self.client = app.test_client()
+
+    def _collect(self, **params):
+        items, cursor = [], None
+        while True:
+            query = dict(params, limit=25)
+            if cursor:
+                query['cursor'] = cursor
+            data = self.client.get('/api/locations', query_string=query).get_json()
+            self.assertLessEqual(len(data['items']), 25)
+            items.extend(data['items'])
+            cursor = data['next_cursor']
+            if not cursor:
+                return items
+
+    def test_keyset_pages_cover_all_rows_in_order(self):
+        items = self._collect()
+        self.assertEqual([(i['neighborhood'], i['category'], i['name'], i['id']) for i in items], self.expected)
+
+    def test_filters(self):
+        items = self._collect(neighborhood="حي 1", q="مكان 3")
+        self.assertTrue(items)
+        self.assertTrue(all(i['neighborhood'] == "حي 1" and "مكان 3" in i['name'] for i in items))
+        self.assertEqual(self._collect(q="%"), [])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/locations?cursor=not-a-cursor').status_code, 400)
+
+    def test_pages_render_one_page(self):
+        page = self.client.get('/locations?limit=10').get_data(as_text=True)
+        self.assertEqual(page.count('class="col-md-6 col-lg-4 mb-2 location-item"'), 10)
+        self.assertIn('التالي', page)
+        routes = self.client.get('/routes?limit=5').get_data(as_text=True)
+        self.assertIn('خط 6', routes)
+        self.assertNotIn('خط 1<', routes)
+        self.assertNotIn('مكان 39', self.client.get('/routes/add').get_data(as_text=True))
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        with app.app_context():
+            upgrade_database()
+            db.session.add(Location(name="ميدان", category="ميادين", neighborhood="حي الشرق"))
+            db.session.add(Route(name="خط التصدير", fare=6, stops=stops_for(location_ids_for(["ميدان"]))))
+            db.session.commit()
+
+    def _changes(self, since):
+        response = self.client.get(f'/api/export?since={since}')
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    def test_full_export_matches_database(self):
+        response = self.client.get('/api/export')
+        data = json.loads(response.get_data(as_text=True))
+        self.assertEqual(str(data['version']), response.headers['X-Dataset-Version'])
+        with app.app_context():
+            self.assertEqual(len(data['routes_data']), Route.query.count())
+            expected = {}
+            for l in Location.query.order_by(Location.neighborhood, Location.category, Location.name, Location.id):
+                expected.setdefault(l.neighborhood, {}).setdefault(l.category, []).append(l.name)
+        self.assertEqual(data['neighborhood_data'], expected)
+        self.assertIn({'routeName': "خط التصدير", 'fare': "6.0 جنيه مصري", 'startArea': None, 'endArea': None,
+                       'keyPoints': ["ميدان"], 'notes': None}, data['routes_data'])
+
+    def test_etag_not_modified(self):
+        etag = self.client.get('/api/export').headers['ETag']
+        self.assertEqual(self.client.get('/api/export', headers={'If-None-Match': etag}).status_code, 304)
+        with app.app_context():
+            db.session.add(Location(name="جديد", category="ميادين", neighborhood="حي الشرق"))
+            db.session.commit()
+        self.assertEqual(self.client.get('/api/export', headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_since_returns_only_changes(self):
+        with app.app_context():
+            db.session.add(Location(name="كشك", category="محلات", neighborhood="حي الشرق"))
+            db.session.commit()
+        version = int(self.client.get('/api/export?since=0').headers['X-Dataset-Version'])
+        with app.app_context():
+            route = Route.query.filter_by(name="خط التصدير").first()
+            route.name = "خط التصدير 2"
+            db.session.delete(Location.query.filter_by(name="كشك").first())
+            db.session.add(Location(name="محطة", category="محطات", neighborhood="حي الشرق"))
+            db.session.commit()
+
+        lines = self._changes(version)
+        self.assertEqual(lines[0]['since'], version)
+        by_type = {(line['type'], line['op']): line for line in lines[1:]}
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(by_type[('route', 'upsert')]['previous_names'], ["خط التصدير"])
+        self.assertEqual(by_type[('location', 'delete')]['names'], ["كشك"])
+        self.assertEqual(by_type[('location', 'upsert')]['data']['name'], "محطة")
+
+        self.assertEqual(len(self._changes(lines[0]['version'])), 1)
+        with app.app_context():
+            total = Route.query.count() + Location.query.count()
+        self.assertEqual(len(self._changes(0)), total + 1)
+        self.assertEqual(self.client.get(f"/api/export?since={lines[0]['version'] + 1}").status_code, 400)
+
+    def test_route_stops(self):
+        with app.app_context():
+            route = Route.query.filter_by(name="خط التصدير").order_by(Route.id.desc()).first()
+            location_id = route.stops[0].location_id
+            route_id = route.id
+        data = self.client.get(f'/api/locations/{location_id}/routes').get_json()
+        self.assertIn({'id': route_id, 'name': "خط التصدير", 'seq': 0}, data['routes'])
+        self.assertEqual(database_helper.get_routes_between_stops("ميدان", "ميدان"), [])
+
+        # تغيير اسم مكان يغير بيانات الخطوط التي تمر به في التصدير التزايدي
+        version = int(self.client.get('/api/export?since=0').headers['X-Dataset-Version'])
+        with app.app_context():
+            db.session.get(Location, location_id).name = "ميدان الشهداء"
+            db.session.commit()
+        routes = [line for line in self._changes(version) if line.get('type') == 'route']
+        self.assertIn(route_id, [line['id'] for line in routes])
+        self.assertTrue(all(line['data']['keyPoints'] == ["ميدان الشهداء"] for line in routes))
+        self.assertIn(("خط التصدير", 0), database_helper.get_routes_through_stop("ميدان الشهداء"))
+
+
+if __name__ == "__main__":
+    unittest.main()
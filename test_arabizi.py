@@ -0,0 +1,48 @@
+import unittest
+
+from arabizi import PhoneticIndex, arabic_to_arabizi, is_arabizi, phonetic_key, translate_keywords
+
+NEIGHBORHOODS = {
+    'حي الشرق': {
+        'مستشفيات': ['مستشفى التضامن'],
+        'مواصلات': ['محطة القطار', 'ميدان المنشية'],
+        'عبادة': ['الجامع العباسي'],
+    },
+    'حي الضواحي': {
+        'تعليم': ['كلية الآداب جامعة بورسعيد', 'الجامعة'],
+        'أسواق': ['سوق البازار'],
+    },
+}
+
+
+class TestArabizi(unittest.TestCase):
+    def test_detection_and_keywords(self):
+        self.assertTrue(is_arabizi('mn el gam3a lel ma7ata'))
+        self.assertFalse(is_arabizi('من الجامعة للمحطة'))
+        self.assertFalse(is_arabizi('من صن مول إلى المحطة'))
+        self.assertEqual(translate_keywords('ezay aroo7 mn el gam3a lel ma7ata?'),
+                         'إزاي أروح من el gam3a إلى ma7ata?')
+
+    def test_same_key_for_both_scripts(self):
+        self.assertEqual(phonetic_key('el gam3a'), phonetic_key('الجامعة'))
+        self.assertEqual(phonetic_key('elgam3a'), phonetic_key('الجامعه'))
+        self.assertEqual(phonetic_key('ma7ata'), phonetic_key('المحطة'))
+        self.assertEqual(phonetic_key('mostashfa el tadamon'), phonetic_key('مستشفى التضامن'))
+        self.assertNotEqual(phonetic_key('el gam3a'), phonetic_key('الجامع'))
+        self.assertEqual(phonetic_key(arabic_to_arabizi('سوق البازار')), phonetic_key('سوق البازار'))
+
+    def test_lookup(self):
+        index = PhoneticIndex.from_neighborhoods(NEIGHBORHOODS)
+        self.assertEqual(index.best_match('el gam3a')['name'], 'الجامعة')
+        self.assertEqual(index.best_match('el game3 el 3abbasy')['name'], 'الجامع العباسي')
+        self.assertEqual(index.best_match('gam3et bor sa3id')['name'], 'كلية الآداب جامعة بورسعيد')
+        self.assertEqual(index.best_match('sou2 el bazar')['neighborhood'], 'حي الضواحي')
+        self.assertEqual(index.lookup('zzzz'), [])
+        index.remove('محطة القطار', 'حي الشرق')
+        self.assertIsNone(index.best_match('ma7atet el 2atr'))
+        index.add('محطة القطار', 'حي الشرق', 'مواصلات')
+        self.assertEqual(index.best_match('ma7atet el 2atr')['name'], 'محطة القطار')
+
+
+if __name__ == "__main__":
+    unittest.main()
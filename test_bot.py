@@ -1,5 +1,5 @@
 import unittest
-from bot import find_route_logic
+from helpers import find_route_logic
 
 class TestRouteLogic(unittest.TestCase):
     def test_direct_route(self):
@@ -22,7 +22,8 @@ class TestRouteLogic(unittest.TestCase):
             {"routeName": "Route 2", "keyPoints": ["C", "D", "E"], "fare": "7 جنيه"},
         ]
         result = find_route_logic("A", "E", routes)
-        self.assertIn("تبديل مطلوب", result)
+        self.assertIn("مسارات بتبديل متاحة", result)
+        self.assertIn("Route 2", result)
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,121 @@
+import io
+import os
+import json
+import sys
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from bulk_loader import export_records, iter_json_array, load, main, read_records, write_records
+from db_migrations import UNCLASSIFIED_NEIGHBORHOOD
+
+LOCATIONS = [
+    {'name': 'ميدان الشهداء', 'neighborhood': 'حي الشرق', 'category': 'ميادين', 'coordinates': '31.26, 32.30'},
+    {'name': 'مستشفى النصر', 'neighborhood': 'حي الشرق', 'category': 'صحة', 'lat': '31.27', 'lng': '32.31'},
+    {'name': 'مدرسة', 'neighborhood': 'حي العرب', 'category': 'تعليم', 'coordinates': None},
+]
+ROUTES = [
+    {'routeName': 'خط 1', 'fare': '5 جنيه مصري', 'keyPoints': ['ميدان الشهداء', 'مستشفى النصر', 'محطة جديدة']},
+    {'name': 'خط 2', 'fare': 6, 'stops': 'مدرسة|ميدان الشهداء', 'notes': 'كل ربع ساعة'},
+]
+
+
+class TestBulkLoader(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.conn = sqlite3.connect(os.path.join(self.tmp_dir, 'admin.db'), isolation_level=None)
+
+    def tearDown(self):
+        self.conn.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def path(self, name):
+        return os.path.join(self.tmp_dir, name)
+
+    def changes(self):
+        return self.conn.execute("SELECT COUNT(*) FROM change_log").fetchone()[0]
+
+    def test_import_upsert_and_round_trip(self):
+        stats = load(self.conn, 'locations', enumerate(LOCATIONS, 1), batch_size=2)
+        self.assertEqual((stats['inserted'], stats['updated'], stats['invalid']), (3, 0, 0))
+        stats = load(self.conn, 'routes', enumerate(ROUTES, 1))
+        self.assertEqual(stats['inserted'], 2)
+        routes = list(export_records(self.conn, 'routes'))
+        self.assertEqual(routes[0]['stops'], ['ميدان الشهداء', 'مستشفى النصر', 'محطة جديدة'])
+        self.assertEqual(routes[1]['stops'], ['مدرسة', 'ميدان الشهداء'])
+        self.assertEqual(routes[0]['fare'], 5.0)
+        placeholder = self.conn.execute("SELECT neighborhood FROM location WHERE name = 'محطة جديدة'").fetchone()
+        self.assertEqual(placeholder[0], UNCLASSIFIED_NEIGHBORHOOD)
+
+        # تصدير ثم استيراد بكل صيغة لا يغير شيئاً ولا يضيف إلى change_log
+        # (حتى النصوص الفارغة أو بمسافات زائدة كما تحفظها لوحة الإدارة)
+        self.conn.execute("UPDATE route SET notes = '', start_area = ' ' WHERE id = 1")
+        version = self.changes()
+        for kind in ('locations', 'routes'):
+            for ext in ('csv', 'jsonl', 'geojson'):
+                path = self.path(f'{kind}.{ext}')
+                write_records(export_records(self.conn, kind), path, kind)
+                stats = load(self.conn, kind, read_records(path))
+                self.assertEqual(stats['inserted'] + stats['updated'] + stats['invalid'], 0, (kind, ext))
+        self.assertEqual(self.changes(), version)
+
+        # تعديل محطات خط واحد يستبدل محطاته هو فقط
+        changed = dict(ROUTES[1], stops=['ميدان الشهداء', 'مدرسة'])
+        stats = load(self.conn, 'routes', enumerate([ROUTES[0], changed], 1))
+        self.assertEqual((stats['inserted'], stats['updated'], stats['unchanged']), (0, 1, 1))
+        changed_routes = self.conn.execute("SELECT DISTINCT entity_id FROM change_log WHERE version > ? "
+                                           "AND entity = 'route'", (version,)).fetchall()
+        self.assertEqual(changed_routes, [(2,)])
+        self.assertEqual(list(export_records(self.conn, 'routes'))[1]['stops'], ['ميدان الشهداء', 'مدرسة'])
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        path = self.path('locations.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(LOCATIONS[0], ensure_ascii=False) + '\n')
+            f.write('{not json\n\n')
+            f.write(json.dumps({'name': 'بدون حي', 'category': 'x'}, ensure_ascii=False) + '\n')
+            f.write(json.dumps(dict(LOCATIONS[2], coordinates='abc'), ensure_ascii=False) + '\n')
+        stats = load(self.conn, 'locations', read_records(path), source='locations.jsonl')
+        self.assertEqual((stats['rows'], stats['inserted'], stats['invalid']), (4, 1, 3))
+        self.assertEqual([error.split(':')[1] for error in stats['errors']], ['2', '4', '5'])
+
+        stats = load(self.conn, 'routes', enumerate([{'name': 'خط', 'stops': []}, {'name': 'خط', 'fare': 'x',
+                                                                                      'stops': ['a']}], 1))
+        self.assertEqual(stats['invalid'], 2)
+
+    def test_location_key_includes_category(self):
+        rows = [dict(LOCATIONS[0]), dict(LOCATIONS[0], category='معالم'), dict(LOCATIONS[0], coordinates='31.3, 32.3')]
+        stats = load(self.conn, 'locations', enumerate(rows, 1))
+        self.assertEqual((stats['inserted'], stats['merged']), (2, 1))
+        self.assertEqual(dict(self.conn.execute("SELECT category, coordinates FROM location")),
+                         {'ميادين': '31.3000000, 32.3000000', 'معالم': '31.2600000, 32.3000000'})
+
+    def test_export_migrates_legacy_database(self):
+        self.conn.executescript("""
+            CREATE TABLE location (id INTEGER PRIMARY KEY, name VARCHAR(200) NOT NULL, category VARCHAR(100) NOT NULL,
+                                   neighborhood VARCHAR(100) NOT NULL, coordinates VARCHAR(50), created_at DATETIME);
+            CREATE TABLE route (id INTEGER PRIMARY KEY, name VARCHAR(200) NOT NULL, fare FLOAT NOT NULL,
+                                start_area VARCHAR(200), end_area VARCHAR(200), key_points TEXT NOT NULL,
+                                notes TEXT, created_at DATETIME);
+            INSERT INTO location (name, category, neighborhood) VALUES ('ميدان', 'ميادين', 'حي الشرق');
+            INSERT INTO route (name, fare, key_points) VALUES ('خط 1', 5, '[" ميدان", "مدرسة"]');
+        """)
+        path = self.path('routes.jsonl')
+        argv = ['bulk_loader.py', 'export', 'routes', path, '--db', self.path('admin.db')]
+        with mock.patch.object(sys, 'argv', argv), mock.patch('sys.stdout', io.StringIO()):
+            main()
+        self.assertEqual([record['stops'] for _, record in read_records(path)], [['ميدان', 'مدرسة']])
+
+    def test_streaming_geojson_reader(self):
+        features = [{'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [32.3, 31.2 + i / 100]},
+                     'properties': {'name': f'مكان {i}', 'tags': {'features': [1, 2]}}} for i in range(50)]
+        text = json.dumps({'type': 'FeatureCollection', 'name': 'x', 'features': features}, ensure_ascii=False)
+        self.assertEqual(list(iter_json_array(io.StringIO(text), 'features', chunk_size=7)), features)
+        with self.assertRaises(ValueError):
+            list(iter_json_array(io.StringIO(text[:-20]), 'features', chunk_size=7))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import copy
+import unittest
+
+from change_feed import ChangeFeed, ChangeListener
+from db_migrations import STOP_CATEGORY, UNCLASSIFIED_NEIGHBORHOOD
+from geo_index import GeoIndex
+from routing_engine import RoutingEngine
+from synthetic_city import generate_city
+
+
+class EngineListener(ChangeListener):
+    def __init__(self, engine):
+        self.engine = engine
+
+    def route_added(self, route):
+        self.engine.add_route(route)
+
+    def route_removed(self, route):
+        self.engine.remove_route(route)
+
+    def landmark_added(self, landmark, neighborhood, category, point):
+        self.engine.add_landmark(landmark if isinstance(landmark, dict) else {'name': landmark})
+
+    def landmark_removed(self, landmark, neighborhood, category):
+        self.engine.remove_landmark(landmark if isinstance(landmark, dict) else {'name': landmark})
+
+
+def landmarks(neighborhoods):
+    return [landmark for categories in neighborhoods.values()
+            for items in categories.values() for landmark in items]
+
+
+class TestChangeFeed(unittest.TestCase):
+    def setUp(self):
+        city = generate_city(0.5, seed=3)
+        self.routes = city['routes_data']
+        self.neighborhoods = city['neighborhood_data']
+        self.engine = RoutingEngine(self.routes, self.neighborhoods)
+        self.feed = ChangeFeed(self.routes, self.neighborhoods, [EngineListener(self.engine)], url='')
+
+    def assert_matches_rebuild(self):
+        fresh = RoutingEngine(self.routes, self.neighborhoods)
+        names = sorted({l['name'] if isinstance(l, dict) else l for l in landmarks(self.neighborhoods)})
+        names += sorted({p for route in self.routes for p in route['keyPoints']})
+        for start in names[::7]:
+            self.assertEqual(sorted(self.engine.routes_for(start)), sorted(fresh.routes_for(start)), start)
+            self.assertEqual(self.engine.knows(start), fresh.knows(start), start)
+            for end in names[3::11]:
+                self.assertEqual(
+                    [(i['routeName'], i['cost'], i['start_index'], i['end_index'])
+                     for i in self.engine.find_direct(start, end)],
+                    [(i['routeName'], i['cost'], i['start_index'], i['end_index'])
+                     for i in fresh.find_direct(start, end)], (start, end))
+
+    def test_route_changes_match_full_rebuild(self):
+        first, second = self.routes[0], self.routes[1]
+        new_stops = list(reversed(first['keyPoints']))
+        self.feed.apply([
+            {'type': 'meta', 'version': 7, 'since': 0},
+            {'type': 'route', 'op': 'upsert', 'id': 1, 'previous_names': [],
+             'data': dict(first, keyPoints=new_stops, fare='9 جنيه مصري', startArea=None)},
+            {'type': 'route', 'op': 'delete', 'id': 2, 'names': [second['routeName']]},
+            {'type': 'route', 'op': 'upsert', 'id': 3, 'previous_names': [],
+             'data': {'routeName': 'خط جديد (رايح)', 'fare': '5 جنيه مصري', 'startArea': None, 'endArea': None,
+                      'keyPoints': second['keyPoints'][:5], 'notes': None}},
+        ])
+        self.assertEqual(self.feed.version, 7)
+        self.assertNotIn(second, self.routes)
+        updated = next(route for route in self.routes if route['routeName'] == first['routeName'])
+        self.assertEqual(updated['keyPoints'], new_stops)
+        # حقول ليست في القاعدة أو قيمتها null تبقى من البيانات الأصلية
+        self.assertEqual(updated['startCoordinates'], first['startCoordinates'])
+        self.assertEqual(updated['startArea'], first['startArea'])
+        self.assertIn('خط جديد (رايح)', [route['routeName'] for route in self.routes])
+        self.assert_matches_rebuild()
+
+        # نفس المعرف بعد تغيير الاسم يعدل نفس الخط
+        self.feed.apply([{'type': 'route', 'op': 'upsert', 'id': 3, 'previous_names': ['خط جديد (رايح)'],
+                          'data': {'routeName': 'خط جديد (راجع)', 'keyPoints': second['keyPoints'][5:9]}}])
+        self.assertEqual(sum(route['routeName'].startswith('خط جديد') for route in self.routes), 1)
+        self.assert_matches_rebuild()
+
+    def test_location_changes(self):
+        neighborhood = next(iter(self.neighborhoods))
+        category = next(iter(self.neighborhoods[neighborhood]))
+        landmark = self.neighborhoods[neighborhood][category][0]
+        name = landmark['name']
+        self.feed.apply([
+            {'type': 'location', 'op': 'upsert', 'id': 1, 'previous_names': [name],
+             'data': {'name': name + ' الجديد', 'neighborhood': neighborhood, 'category': category,
+                      'coordinates': None}},
+            {'type': 'location', 'op': 'upsert', 'id': 2, 'previous_names': [],
+             'data': {'name': 'كشك', 'neighborhood': 'حي جديد', 'category': 'محلات', 'coordinates': '31.25, 32.3'}},
+        ])
+        renamed = self.neighborhoods[neighborhood][category][0]
+        self.assertEqual(renamed['name'], name + ' الجديد')
+        self.assertEqual(renamed['served_by'], landmark['served_by'])
+        self.assertEqual(self.neighborhoods['حي جديد'], {'محلات': ['كشك']})
+        self.assertFalse(self.engine.knows(name))
+        self.assert_matches_rebuild()
+
+        self.feed.apply([
+            {'type': 'location', 'op': 'upsert', 'id': 2, 'previous_names': [],
+             'data': {'name': 'كشك', 'neighborhood': neighborhood, 'category': 'محلات', 'coordinates': None}},
+            {'type': 'location', 'op': 'delete', 'id': 1, 'names': [name + ' الجديد']},
+        ])
+        self.assertNotIn('حي جديد', self.neighborhoods)
+        self.assertEqual(self.neighborhoods[neighborhood]['محلات'], ['كشك'])
+        self.assertNotIn(renamed, landmarks(self.neighborhoods))
+        self.assert_matches_rebuild()
+
+        # المحطات غير المصنفة لا تظهر في قائمة الأحياء، ونقل مكان إليها يحذفه منها
+        self.feed.apply([
+            {'type': 'location', 'op': 'upsert', 'id': 3, 'previous_names': [],
+             'data': {'name': 'محطة', 'neighborhood': UNCLASSIFIED_NEIGHBORHOOD, 'category': STOP_CATEGORY,
+                      'coordinates': None}},
+            {'type': 'location', 'op': 'upsert', 'id': 2, 'previous_names': [],
+             'data': {'name': 'كشك', 'neighborhood': UNCLASSIFIED_NEIGHBORHOOD, 'category': STOP_CATEGORY,
+                      'coordinates': None}},
+        ])
+        self.assertNotIn(UNCLASSIFIED_NEIGHBORHOOD, self.neighborhoods)
+        self.assertNotIn('محلات', self.neighborhoods[neighborhood])
+        self.assert_matches_rebuild()
+
+    def test_full_sync_keeps_existing_objects_in_place(self):
+        lines = [{'type': 'route', 'op': 'upsert', 'id': i, 'previous_names': [], 'data': copy.deepcopy(route)}
+                 for i, route in enumerate(self.routes, 1)]
+        before = [route['routeName'] for route in self.routes]
+        self.feed.apply(lines)
+        self.assertEqual([route['routeName'] for route in self.routes], before)
+        self.assert_matches_rebuild()
+
+
+class TestGeoIndexUpdates(unittest.TestCase):
+    def test_added_and_removed_points(self):
+        index = GeoIndex(['a', 'b', 'c'], [(31.25, 32.30), (31.26, 32.30), (31.30, 32.30)])
+        index.add('d', (31.2501, 32.3001))
+        index.discard('a')
+        index.add('c', (31.251, 32.30))
+        self.assertEqual([name for name, _ in index.nearest(31.25, 32.30, k=3)], ['d', 'c', 'b'])
+        self.assertEqual(len(index.nearest(31.25, 32.30, k=5)), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from db_migrations import LATEST_VERSION, UNCLASSIFIED_NEIGHBORHOOD, migrate, migrate_file, schema_version
+import database_helper
+from synthetic_city import generate_city, write_sqlite
+
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'admin.db')
+        write_sqlite(generate_city(0.2, seed=1), self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_migrations_apply_once(self):
+        self.assertEqual(migrate_file(self.path), LATEST_VERSION)
+        self.assertEqual(migrate_file(self.path), 0)
+        conn = sqlite3.connect(self.path)
+        try:
+            self.assertEqual(schema_version(conn), LATEST_VERSION)
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+        finally:
+            conn.close()
+
+    def test_dashboard_queries_use_indexes(self):
+        migrate_file(self.path)
+        conn = sqlite3.connect(self.path)
+        try:
+            for query in ("SELECT * FROM location ORDER BY neighborhood, category, name",
+                          "SELECT DISTINCT category FROM location",
+                          "SELECT * FROM route ORDER BY created_at DESC"):
+                plan = ' '.join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}"))
+                self.assertIn('INDEX', plan, query)
+                self.assertNotIn('TEMP B-TREE', plan, query)
+        finally:
+            conn.close()
+
+    def test_failed_migration_rolls_back(self):
+        conn = sqlite3.connect(self.path, isolation_level=None)
+        try:
+            conn.execute("DROP TABLE route")
+            with self.assertRaises(sqlite3.OperationalError):
+                migrate(conn)
+            self.assertEqual(schema_version(conn), 0)
+            indexes = conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'ix_location%'").fetchall()
+            self.assertEqual(indexes, [])
+        finally:
+            conn.close()
+
+    def test_key_points_move_to_route_stop(self):
+        path = os.path.join(self.tmp_dir, 'legacy.db')
+        conn = sqlite3.connect(path)
+        conn.executescript("""
+            CREATE TABLE location (id INTEGER PRIMARY KEY, name VARCHAR(200) NOT NULL, category VARCHAR(100) NOT NULL,
+                                   neighborhood VARCHAR(100) NOT NULL, coordinates VARCHAR(50), created_at DATETIME);
+            CREATE TABLE route (id INTEGER PRIMARY KEY, name VARCHAR(200) NOT NULL, fare FLOAT NOT NULL,
+                                start_area VARCHAR(200), end_area VARCHAR(200), key_points TEXT NOT NULL,
+                                notes TEXT, created_at DATETIME);
+            INSERT INTO location (id, name, category, neighborhood) VALUES (1, 'A', 'c', 'n'), (2, 'B', 'c', 'n');
+            INSERT INTO route (id, name, fare, key_points) VALUES
+                (1, 'r1', 5, '["A", "X", " B", ""]'), (2, 'r2', 5, 'not json'), (3, 'r3', 5, '["B", " X ", "A"]');
+        """)
+        conn.close()
+        migrate_file(path)
+
+        conn = sqlite3.connect(path)
+        try:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(route)")]
+            self.assertNotIn('key_points', columns)
+            stops = conn.execute("SELECT r.name, l.name FROM route_stop rs JOIN route r ON r.id = rs.route_id "
+                                 "JOIN location l ON l.id = rs.location_id ORDER BY r.id, rs.seq").fetchall()
+            self.assertEqual(stops, [('r1', 'A'), ('r1', 'X'), ('r1', 'B'), ('r3', 'B'), ('r3', 'X'), ('r3', 'A')])
+            # المسافات الزائدة لا تنشئ مكاناً مكرراً
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM location").fetchone()[0], 3)
+            self.assertEqual(conn.execute("SELECT neighborhood FROM location WHERE name = 'X'").fetchone()[0],
+                             UNCLASSIFIED_NEIGHBORHOOD)
+            # حذف مكان يحذف محطاته ويسجل تعديل الخطوط التي كانت تمر به
+            version = conn.execute("SELECT MAX(version) FROM change_log").fetchone()[0]
+            conn.execute("DELETE FROM location WHERE name = 'A'")
+            conn.commit()
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM route_stop").fetchone()[0], 4)
+            changed = conn.execute("SELECT DISTINCT entity, entity_id FROM change_log WHERE version > ? "
+                                   "ORDER BY entity, entity_id", (version,)).fetchall()
+            self.assertEqual(changed, [('location', 1), ('route', 1), ('route', 3)])
+        finally:
+            conn.close()
+
+    def test_bot_reader_does_not_migrate(self):
+        with mock.patch.object(database_helper, 'DATABASE_PATH', self.path), \
+                mock.patch.object(database_helper, '_local', type(database_helper._local)()):
+            with self.assertRaises(database_helper.SchemaOutdated):
+                database_helper.get_routes_from_db()
+            self.assertTrue(database_helper.get_neighborhoods_from_db())
+            database_helper.get_connection().close()
+        conn = sqlite3.connect(self.path)
+        try:
+            self.assertEqual(schema_version(conn), 0)
+        finally:
+            conn.close()
+
+        migrate_file(self.path)
+        with mock.patch.object(database_helper, 'DATABASE_PATH', self.path), \
+                mock.patch.object(database_helper, '_local', type(database_helper._local)()):
+            routes = database_helper.get_routes_from_db()
+            database_helper.get_connection().close()
+        self.assertTrue(routes and all(route['keyPoints'] for route in routes))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import shutil
+import asyncio
+import tempfile
+import unittest
+
+from telegram import Bot
+from telegram.error import RetryAfter
+
+from fake_telegram import FakeTelegramRequest
+from file_id_cache import FileIdCache
+
+
+class TestFileIdCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = FileIdCache(os.path.join(self.directory, 'file_ids.json'))
+        self.fake = FakeTelegramRequest()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def send_documents(self, *contents):
+        async def run():
+            bot = Bot('123:TEST', request=self.fake, get_updates_request=FakeTelegramRequest())
+            async with bot:
+                for content in contents:
+                    await self.cache.send(bot, 1, 'document', content, name='backup', filename='backup.json')
+        asyncio.run(run())
+
+    def test_same_content_is_uploaded_once(self):
+        self.send_documents(b'{"a": 1}', b'{"a": 1}')
+        sent = [params for _, endpoint, params in self.fake.call_log if endpoint == 'sendDocument']
+        self.assertEqual(len(sent), 2)
+        self.assertEqual(sent[1]['document'], 'fake-document-1')
+
+    def test_changed_content_replaces_named_entry(self):
+        self.send_documents(b'{"a": 1}', b'{"a": 2}')
+        self.assertEqual(list(self.cache.file_ids.values()), ['fake-document-2'])
+        reloaded = FileIdCache(self.cache.cache_file)
+        self.assertEqual(reloaded.file_ids, self.cache.file_ids)
+
+    def test_transient_error_keeps_file_id(self):
+        self.send_documents(b'{"a": 1}')
+        self.fake.inject_retry_after(1)
+        with self.assertRaises(RetryAfter):
+            self.send_documents(b'{"a": 1}')
+        self.assertEqual(list(self.cache.file_ids.values()), ['fake-document-1'])
+        uploads = [params for _, endpoint, params in self.fake.call_log
+                   if endpoint == 'sendDocument' and not isinstance(params.get('document'), str)]
+        self.assertEqual(len(uploads), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import math
+import random
+import unittest
+
+from geo_index import GeoIndex, collect_points, parse_coordinates
+
+
+def brute_force(points, lat, lng, k):
+    def distance(point):
+        dx = (point[1] - lng) * math.cos(math.radians(lat))
+        return math.hypot(dx, point[0] - lat) * math.radians(1) * 6371000.0
+    return sorted(distance(p) for p in points)[:k]
+
+
+class TestGeoIndex(unittest.TestCase):
+    def test_parse_coordinates(self):
+        self.assertEqual(parse_coordinates("31.2398799, 32.2842734"), (31.2398799, 32.2842734))
+        self.assertEqual(parse_coordinates({'lat': 31.0, 'lng': 32.0, 'fetched_at': 'x'}), (31.0, 32.0))
+        self.assertIsNone(parse_coordinates("بجوار المسجد"))
+        self.assertIsNone(parse_coordinates("310, 32"))
+
+    def test_nearest_matches_brute_force(self):
+        rng = random.Random(7)
+        points = [(31.25 + rng.uniform(-0.05, 0.05), 32.28 + rng.uniform(-0.05, 0.05)) for _ in range(3000)]
+        index = GeoIndex([str(i) for i in range(len(points))], points)
+        for _ in range(50):
+            lat, lng = 31.25 + rng.uniform(-0.08, 0.08), 32.28 + rng.uniform(-0.08, 0.08)
+            result = [distance for _, distance in index.nearest(lat, lng, k=5)]
+            for got, expected in zip(result, brute_force(points, lat, lng, 5)):
+                self.assertAlmostEqual(got, expected, places=6)
+
+    def test_max_distance_and_collect_points(self):
+        neighborhoods = {"حي": {"معالم": [{"name": "مدرسة", "coordinates": "31.25, 32.28"},
+                                         {"name": "سوق", "coordinates": ""}]}}
+        routes = [{"routeName": "خط", "keyPoints": ["موقف"], "startCoordinates": "31.30, 32.30"}]
+        names, points = collect_points(neighborhoods, routes)
+        self.assertEqual(names, ["مدرسة", "موقف"])
+        index = GeoIndex(names, points)
+        self.assertEqual([name for name, _ in index.nearest(31.251, 32.281, k=5, max_distance_m=1000)], ["مدرسة"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+from intent_classifier import (CHITCHAT, MAP, PLACE, REPORT, ROUTE, IntentClassifier, KeywordAutomaton,
+                               keyword_spans)
+
+
+class TestIntentClassifier(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.classifier = IntentClassifier.load()
+
+    def test_automaton(self):
+        automaton = KeywordAutomaton({'from': [' من ', ' من  عند '], 'to': [' لل']})
+        self.assertEqual([group for group, _, _ in automaton.find(' من  عند  البنك  للمحطه ')],
+                         ['from', 'from', 'to'])
+        self.assertEqual(automaton.find(' منشيه '), [])
+
+    def test_classify(self):
+        cases = {
+            'إزاي أروح من الجامعة للمحطة؟': ROUTE,
+            'mn el gam3a lel ma7ata': ROUTE,
+            'فين مستشفى الصدر': PLACE,
+            'بنك مصر': PLACE,
+            'خريطة صن مول': MAP,
+            'زحمة فظيعة عند الكوبري': REPORT,
+            'السلام عليكم': CHITCHAT,
+            'شكرا يا باشا': CHITCHAT,
+        }
+        for text, intent in cases.items():
+            self.assertEqual(self.classifier.classify(text).intent, intent, text)
+
+    def test_keyword_spans(self):
+        self.assertEqual(keyword_spans('خريطة بنك مصر', ['map']), 'بنك مصر')
+        self.assertEqual(keyword_spans('فين مستشفى الصدر؟', ['where']), 'مستشفي الصدر')
+
+
+if __name__ == "__main__":
+    unittest.main()
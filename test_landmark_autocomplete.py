@@ -0,0 +1,82 @@
+import random
+import unittest
+from unittest import mock
+
+from arabic_text import normalize
+from landmark_autocomplete import LandmarkAutocomplete, landmark_keys
+from nlp_search import NLPSearchSystem
+
+NEIGHBORHOODS = {
+    'حي الشرق': {
+        'بنوك': ['بنك مصر', {'name': 'بنك الإسكان', 'served_by': {'خط 1': {}, 'خط 2': {}}}],
+        'مستشفيات': ['المستشفى العام', 'مستشفى التضامن'],
+    },
+    'حي العرب': {
+        'بنوك': ['بنك مصر'],
+        'مساجد': ['مسجد الرحمة', 'مصر'],
+    },
+}
+
+
+def names(matches):
+    return [(match['name'], match['neighborhood']) for match in matches]
+
+
+class TestLandmarkAutocomplete(unittest.TestCase):
+    def setUp(self):
+        self.index = LandmarkAutocomplete.from_neighborhoods(NEIGHBORHOODS)
+
+    def test_normalize_and_keys(self):
+        self.assertEqual(normalize('مُسْتَشْفَى  أبـــو-١٢؟'), 'مستشفي ابو 12')
+        self.assertEqual(landmark_keys('المستشفي العام'), ['المستشفي العام', 'مستشفي العام', 'العام', 'عام'])
+
+    def test_ranking_and_word_prefixes(self):
+        # تطابق تام، ثم اسم يبدأ بالنص، ثم كلمة داخل الاسم
+        self.assertEqual(names(self.index.complete('مصر')),
+                         [('مصر', 'حي العرب'), ('بنك مصر', 'حي الشرق'), ('بنك مصر', 'حي العرب')])
+        # الأكثر خطوطاً أولاً، ونفس الاسم في حيين نتيجتان
+        self.assertEqual(names(self.index.complete('بنك', limit=2)),
+                         [('بنك الإسكان', 'حي الشرق'), ('بنك مصر', 'حي الشرق')])
+        # بدون "ال" وبدون توحيد الكتابة
+        self.assertEqual(names(self.index.complete('مستشفي')),
+                         [('مستشفى التضامن', 'حي الشرق'), ('المستشفى العام', 'حي الشرق')])
+        self.assertEqual(names(self.index.complete('اسكان')), [('بنك الإسكان', 'حي الشرق')])
+        self.assertEqual(self.index.complete('  '), [])
+        self.assertEqual(self.index.complete('سوبر'), [])
+
+    def test_updates_and_cache(self):
+        self.index.complete('مسجد')
+        self.index.complete('مسجد')
+        self.assertEqual(self.index.stats, {'queries': 2, 'cache_hits': 1})
+        self.assertTrue(self.index.add('مسجد النور', 'حي العرب', 'مساجد'))
+        self.assertIn(('مسجد النور', 'حي العرب'), names(self.index.complete('مسجد')))
+        self.assertTrue(self.index.remove('بنك مصر', 'حي الشرق'))
+        self.assertFalse(self.index.remove('بنك مصر', 'حي الشرق'))
+        self.assertEqual(names(self.index.complete('بنك مص')), [('بنك مصر', 'حي العرب')])
+        self.assertEqual(len(self.index), 7)
+
+    def test_precomputed_prefixes_match_full_ranking(self):
+        rng = random.Random(3)
+        words = ['مسجد', 'مستشفى', 'مدرسة', 'مول', 'بنك', 'موقف', 'النصر', 'السلام', 'الشرق']
+        data = {f'حي {n}': {'عام': [{'name': f'{rng.choice(words)} {rng.choice(words)} {i}',
+                                      'served_by': {str(r): {} for r in range(rng.randrange(4))}}
+                                     for i in range(n * 100, n * 100 + 60)]}
+                for n in range(5)}
+        with mock.patch('landmark_autocomplete.HEAVY_PREFIX_KEYS', 8):
+            index = LandmarkAutocomplete.from_neighborhoods(data)
+            index.cache_size = 0
+            index.complete('م')
+            index.add('مسجد جديد', 'حي 0', 'عام')
+            index.remove(data['حي 1']['عام'][0]['name'], 'حي 1')
+            self.assertTrue(index._top)
+            for prefix in ('م', 'مس', 'مسجد', 'ال', 'سلام', 'بنك م', '1'):
+                self.assertEqual(index.complete(prefix, limit=10), index.complete(prefix, limit=30)[:10])
+
+    def test_nlp_suggestions(self):
+        nlp = NLPSearchSystem(NEIGHBORHOODS)
+        self.assertEqual(nlp.get_suggestions_for_text('مستشف'),
+                         ['مستشفى التضامن - حي الشرق', 'المستشفى العام - حي الشرق'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+from landmark_search import LandmarkSearch
+
+NEIGHBORHOODS = {
+    'حي العرب': {
+        'بنوك': ['بنك مصر (فرع سوق البازار/الصباح؟)', 'بنك الإسكان'],
+        'صحة': ['صيدلية الاسعاف'],
+    },
+    'حي الشرق': {
+        'صحة': ['مستشفى الصدر', 'صيدلية النور'],
+        'مواصلات': ['محطة القطار', 'موقف مصر'],
+    },
+}
+
+
+class TestLandmarkSearch(unittest.TestCase):
+    def setUp(self):
+        self.index = LandmarkSearch.from_neighborhoods(NEIGHBORHOODS)
+
+    def names(self, text, limit=3):
+        return [match['name'] for match in self.index.search(text, limit)]
+
+    def test_partial_query_matches_long_name(self):
+        best = self.index.best_match('بنك مصر')
+        self.assertEqual(best['name'], 'بنك مصر (فرع سوق البازار/الصباح؟)')
+        self.assertEqual(best['coverage'], 1.0)
+        self.assertEqual(self.names('البازار بنك', 1), ['بنك مصر (فرع سوق البازار/الصباح؟)'])
+        self.assertIsNone(self.index.best_match('زززز'))
+
+    def test_field_boosts_and_typos(self):
+        # الحي يرجح بين معلمين بنفس الكلمات في الاسم
+        self.assertEqual(self.names('صيدلية حي الشرق', 1), ['صيدلية النور'])
+        self.assertEqual(self.names('صيدلية حي العرب', 1), ['صيدلية الاسعاف'])
+        # الحي وحده لا يطابق معالم ليس في اسمها أي كلمة من النص
+        self.assertEqual(self.names('الشرق'), [])
+        self.assertEqual(self.index.best_match('مستشفا الصرد')['name'], 'مستشفى الصدر')
+
+    def test_add_remove_and_compaction(self):
+        self.index.remove('محطة القطار', 'حي الشرق')
+        self.assertEqual(self.names('محطة القطار'), [])
+        self.index.add({'name': 'محطة القطار', 'served_by': {}}, 'حي الشرق', 'مواصلات')
+        self.assertEqual(self.names('القطار'), ['محطة القطار'])
+        for neighborhood, categories in NEIGHBORHOODS.items():
+            for landmarks in categories.values():
+                for name in landmarks:
+                    self.index.remove(name, neighborhood)
+        self.assertEqual((len(self.index), self.index.df), (0, {}))
+        self.assertEqual(self.index.search('بنك'), [])
+        self.index.add('بنك مصر', 'حي الشرق', 'بنوك')
+        self.assertEqual(self.names('مصر'), ['بنك مصر'])
+
+
+if __name__ == "__main__":
+    unittest.main()
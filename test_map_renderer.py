@@ -0,0 +1,64 @@
+import os
+import time
+import shutil
+import struct
+import asyncio
+import tempfile
+import unittest
+
+from telegram import Bot
+
+from fake_telegram import FakeTelegramRequest
+from file_id_cache import FileIdCache
+from map_renderer import MapImageCache, RouteMapService, map_cache_key, render_route_png
+
+POINTS = [(31.25, 32.28), (31.26, 32.29), (31.27, 32.285), (31.28, 32.30)]
+
+
+class TestMapRenderer(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_png_header_and_size(self):
+        png = render_route_png(POINTS, (1, 3), POINTS[1], POINTS[3], width=320, height=240)
+        self.assertEqual(png[:8], b'\x89PNG\r\n\x1a\n')
+        self.assertEqual(struct.unpack('>II', png[16:24]), (320, 240))
+
+    def test_key_depends_on_content(self):
+        key = map_cache_key('خط', POINTS, (1, 3), None, None)
+        self.assertEqual(key, map_cache_key('خط', list(POINTS), (1, 3), None, None))
+        self.assertNotEqual(key, map_cache_key('خط', POINTS, (0, 3), None, None))
+
+    def test_eviction_keeps_cache_under_limit(self):
+        cache = MapImageCache(self.cache_dir, max_bytes=2500)
+        for i in range(5):
+            cache.put(f'k{i}', b'x' * 1000)
+            os.utime(cache.path_for(f'k{i}'), (time.time() + i, time.time() + i))
+        files = sorted(name for name in os.listdir(self.cache_dir) if name.endswith('.png'))
+        self.assertLessEqual(len(files), 2)
+        self.assertIn('k4.png', files)
+
+    def test_file_id_reused_after_first_upload(self):
+        file_ids_path = os.path.join(self.cache_dir, 'file_ids.json')
+        service = RouteMapService(MapImageCache(self.cache_dir), FileIdCache(file_ids_path))
+        spec = {'route_name': 'خط', 'route_points': POINTS, 'ride_range': (1, 3),
+                'start': POINTS[1], 'end': POINTS[3]}
+        fake = FakeTelegramRequest()
+
+        async def run():
+            bot = Bot('123:TEST', request=fake, get_updates_request=FakeTelegramRequest())
+            async with bot:
+                await service.send_map(bot, 1, spec)
+                await service.send_map(bot, 2, spec)
+
+        asyncio.run(run())
+        self.assertEqual(fake.calls['sendPhoto'], 2)
+        self.assertEqual(fake.call_log[-1][2]['photo'], 'fake-photo-1')
+        self.assertEqual(list(FileIdCache(file_ids_path).file_ids.values()), ['fake-photo-1'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import asyncio
+import unittest
+
+import metrics
+from metrics import MetricsRegistry
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_disabled_registry_records_nothing(self):
+        registry = MetricsRegistry(enabled=False)
+        counter = registry.counter('hits_total', 'hits', ['result'])
+        counter.inc(result='hit')
+        self.assertEqual(counter.get(result='hit'), 0)
+
+    def test_histogram_render(self):
+        registry = MetricsRegistry(enabled=True)
+        histogram = registry.histogram('latency_seconds', 'latency', ['handler'], buckets=(0.1, 1.0))
+        histogram.observe(0.05, handler='start')
+        histogram.observe(0.5, handler='start')
+        output = registry.render()
+        self.assertIn('latency_seconds_bucket{handler="start",le="0.1"} 1', output)
+        self.assertIn('latency_seconds_bucket{handler="start",le="+Inf"} 2', output)
+        self.assertIn('latency_seconds_count{handler="start"} 2', output)
+
+    def test_gauge_function(self):
+        registry = MetricsRegistry(enabled=True)
+        store = [1, 2, 3]
+        registry.gauge('store_size', 'size', func=lambda: len(store))
+        self.assertIn('store_size 3', registry.render())
+
+    def test_track_handler_enabled_after_decoration(self):
+        @metrics.track_handler('late_handler')
+        async def handler():
+            return 'ok'
+
+        enabled = metrics.registry.enabled
+        try:
+            metrics.registry.enabled = True
+            self.assertEqual(asyncio.run(handler()), 'ok')
+            self.assertIn('handler="late_handler"', metrics.registry.render())
+        finally:
+            metrics.registry.enabled = enabled
+
+
+if __name__ == "__main__":
+    unittest.main()
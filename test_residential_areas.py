@@ -0,0 +1,45 @@
+import unittest
+
+from residential_areas import ResidentialAreas, area_keys, is_residential
+
+NEIGHBORHOODS = {
+    'حي الضواحي': {
+        'مناطق سكنية': ['منطقة بوروتكس السكنية', 'زمزم الجديدة', {'name': 'مساكن مبارك', 'served_by': {}}],
+        'صحة': ['مستشفى الصدر'],
+    },
+    'حي المناخ': {
+        'مناطق سكنية ومعالم تراثية أخرى': ['أبراج قشلاق السواحل'],
+    },
+}
+
+
+class TestResidentialAreas(unittest.TestCase):
+    def test_keys(self):
+        self.assertTrue(is_residential('مناطق سكنية ومعالم تراثية أخرى'))
+        self.assertFalse(is_residential('صحة'))
+        self.assertEqual(area_keys('منطقة بوروتكس السكنية'), {'منطقه بوروتكس السكنيه': 0, 'بوروتكس': 1})
+        self.assertEqual(area_keys('أبراج قشلاق السواحل'),
+                         {'ابراج قشلاق السواحل': 0, 'قشلاق السواحل': 2, 'السواحل': 2})
+
+    def test_resolve(self):
+        areas = ResidentialAreas.from_neighborhoods(NEIGHBORHOODS, db_rows=[('المناخ', 'المنطقة السادسة')])
+        self.assertEqual(areas.resolve('بوروتكس'), 'منطقة بوروتكس السكنية')
+        self.assertEqual(areas.resolve('مساكن مبارك'), 'مساكن مبارك')
+        self.assertEqual(areas.resolve('قشلاق السواحل'), 'أبراج قشلاق السواحل')
+        self.assertEqual(areas.resolve('زمزم الجديده'), 'زمزم الجديدة')
+        self.assertEqual(areas.resolve('بوروتيكس'), 'منطقة بوروتكس السكنية')
+        self.assertEqual(areas.resolve('المنطقه السادسه'), 'المنطقة السادسة')
+        self.assertEqual(areas.resolve('الضواحي'), 'حي الضواحي')
+        self.assertIsNone(areas.resolve('مستشفى الصدر'))
+
+    def test_add_and_remove(self):
+        areas = ResidentialAreas.from_neighborhoods(NEIGHBORHOODS)
+        self.assertTrue(areas.add('منطقة الأمل', 'حي الزهور'))
+        self.assertEqual(areas.resolve('الامل'), 'منطقة الأمل')
+        self.assertFalse(areas.remove('منطقة الأمل', 'حي آخر'))
+        self.assertTrue(areas.remove('منطقة الأمل', 'حي الزهور'))
+        self.assertIsNone(areas.resolve('الامل'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import asyncio
+import unittest
+
+from telegram import Bot, InlineKeyboardButton
+
+from fake_telegram import FakeTelegramRequest
+from response_composer import ResponseComposer, SEARCHING_TEXT, split_text
+
+CHAT_ID = 42
+
+
+class GoneMessageRequest(FakeTelegramRequest):
+    """رسالة الانتظار حُذفت: أي تعديل يرجع 400"""
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        if url.endswith('/editMessageText'):
+            self.calls['editMessageText'] += 1
+            return 400, json.dumps({'ok': False, 'error_code': 400,
+                                    'description': 'Bad Request: message to edit not found'}).encode('utf-8')
+        return await super().do_request(url, method, request_data, **kwargs)
+
+
+def compose(*sections):
+    reply = ResponseComposer()
+    for section in sections:
+        reply.add(section)
+    reply.add_row(InlineKeyboardButton("🔍 بحث جديد", callback_data="nlp_search"))
+    return reply
+
+
+class TestResponseComposer(unittest.TestCase):
+    def run_reply(self, reply, request):
+        async def run():
+            bot = Bot('123:TEST', request=request)
+            await bot.initialize()
+            placeholder = await bot.send_message(CHAT_ID, SEARCHING_TEXT)
+            request.reset()
+            await reply.edit(placeholder)
+            await bot.shutdown()
+        asyncio.run(run())
+
+    def test_sections_and_keyboard_edit_the_placeholder_once(self):
+        request = FakeTelegramRequest()
+        self.run_reply(compose("🚌 **النتيجة**\n", None, "  ", "📍 **الخريطة**"), request)
+        self.assertEqual(dict(request.calls), {'editMessageText': 1})
+        self.assertEqual(request.last_text[CHAT_ID], "🚌 **النتيجة**\n\n📍 **الخريطة**")
+        self.assertEqual(request.last_message_id[CHAT_ID], 1)
+        self.assertEqual(request.buttons(CHAT_ID), ['nlp_search'])
+
+    def test_long_reply_is_split_with_keyboard_on_last_message(self):
+        request = FakeTelegramRequest()
+        line = "سطر طويل من نتيجة البحث " * 10
+        self.run_reply(compose(*[line] * 40), request)
+        self.assertEqual(dict(request.calls), {'editMessageText': 1, 'sendMessage': 2})
+        texts = [params['text'] for _, _, params in request.call_log]
+        self.assertTrue(all(len(text) <= 4096 for text in texts))
+        self.assertEqual(''.join(texts).count(line.strip()), 40)
+        self.assertNotIn('reply_markup', request.call_log[0][2])
+        self.assertEqual(request.buttons(CHAT_ID), ['nlp_search'])
+
+    def test_sends_new_message_when_placeholder_is_gone(self):
+        request = GoneMessageRequest()
+        self.run_reply(compose("النتيجة"), request)
+        self.assertEqual(dict(request.calls), {'editMessageText': 1, 'sendMessage': 1})
+        self.assertEqual(request.last_text[CHAT_ID], "النتيجة")
+        self.assertEqual(request.buttons(CHAT_ID), ['nlp_search'])
+
+    def test_split_text(self):
+        self.assertEqual(split_text("abc"), ["abc"])
+        self.assertEqual(split_text("aaaa\nbb\ncc", limit=5), ["aaaa", "bb\ncc"])
+        self.assertEqual(split_text("aaaaaaa", limit=3), ["aaa", "aaa", "a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+from routing_engine import DatasetCache, RoutingEngine, get_engine
+
+ROUTES = [
+    {"routeName": "خط أ (رايح)", "keyPoints": ["A", "B", "C", "D"], "fare": "5"},
+    {"routeName": "خط أ (راجع)", "keyPoints": ["D", "C", "B", "A"], "fare": "5"},
+    {"routeName": "خط ب (رايح)", "keyPoints": ["X", "B", "Y", "D"], "fare": "6"},
+]
+
+NEIGHBORHOODS = {
+    "حي": {
+        "معالم": [
+            {"name": "مدرسة", "served_by": {
+                "خط أ": {"proximity": "قريبة جدا", "nearest_stop": "B"},
+                "خط ب": {"proximity": "متوسطة", "nearest_stop": "B"}}},
+            {"name": "مستشفى", "served_by": {
+                "خط أ": {"proximity": "قريبة جدا", "nearest_stop": "D"},
+                "خط ب": {"proximity": "قريبة جدا", "nearest_stop": "D"}}},
+            {"name": "نادي", "served_by": {
+                "خط أ": {"proximity": "بعيدة", "nearest_stop": "C"}}},
+            {"name": "سوق", "served_by": {"خط أ", "خط ب"}},
+        ]
+    }
+}
+
+
+class TestRoutingEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = RoutingEngine(ROUTES, NEIGHBORHOODS)
+
+    def test_direction_is_respected(self):
+        names = [item["routeName"] for item in self.engine.find_direct("مدرسة", "مستشفى")]
+        self.assertIn("خط أ (رايح)", names)
+        self.assertNotIn("خط أ (راجع)", names)
+        reverse = [item["routeName"] for item in self.engine.find_direct("مستشفى", "مدرسة")]
+        self.assertEqual(reverse, ["خط أ (راجع)"])
+
+    def test_walking_penalty_ranks_closer_stop_first(self):
+        results = self.engine.find_direct("مدرسة", "مستشفى")
+        self.assertEqual([item["routeName"] for item in results], ["خط أ (رايح)", "خط ب (رايح)"])
+        self.assertLess(results[0]["walk_meters"], results[1]["walk_meters"])
+
+    def test_far_proximity_is_filtered(self):
+        self.assertEqual(self.engine.find_direct("مدرسة", "نادي"), [])
+        self.assertEqual(len(self.engine.find_direct("مدرسة", "نادي", max_rank=2)), 1)
+
+    def test_stop_names_and_malformed_served_by(self):
+        self.assertEqual(self.engine.find_direct("X", "Y")[0]["stops"], 2)
+        self.assertTrue(self.engine.knows("سوق"))
+        self.assertEqual(self.engine.find_direct("سوق", "مستشفى"), [])
+
+    def test_engine_cache_uses_object_identity(self):
+        routes, neighborhoods = list(ROUTES), dict(NEIGHBORHOODS)
+        engine = get_engine(routes, neighborhoods)
+        self.assertIs(get_engine(routes, neighborhoods), engine)
+        self.assertIsNot(get_engine(list(ROUTES), neighborhoods), engine)
+
+        cache = DatasetCache(max_size=2)
+        datasets = [([], {}) for _ in range(3)]
+        for i, (r, n) in enumerate(datasets):
+            cache.put(r, n, i)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(*datasets[0]))
+        self.assertEqual(cache.get(*datasets[2]), 2)
+        self.assertIsNone(cache.get([], {}))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import json
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+import database_helper
+
+import search_eval
+
+NEIGHBORHOODS = {
+    'حي الشرق': {
+        'بنوك': ['بنك مصر'],
+        'صحة': [{'name': 'مستشفى الصدر', 'served_by': {}}],
+    },
+    'حي العرب': {
+        'تعليم': ['مدرسة الفيروز لغات'],
+    },
+}
+
+
+class TestSearchEval(unittest.TestCase):
+    def test_generate_queries(self):
+        queries = search_eval.generate_queries(NEIGHBORHOODS, 6, random.Random(0))
+        self.assertEqual([item['kind'] for item in queries], list(search_eval.KINDS) * 2)
+        for item in queries:
+            self.assertNotEqual(item['start'], item['end'])
+            self.assertIn('من', item['query'])
+
+    def test_evaluate(self):
+        queries = [
+            {'query': 'من بنك مصر إلى مستشفى', 'start': 'بنك مصر', 'end': 'مستشفى الصدر', 'kind': 'partial'},
+            {'query': 'من بنك مصر إلى مدرسة الفيروز لغات', 'start': 'بنك مصر', 'end': 'مدرسة الفيروز لغات'},
+        ]
+        for processes in (1, 2):
+            report = search_eval.evaluate(queries, NEIGHBORHOODS, [], processes, system='nlp_search')
+            self.assertEqual(report['queries'], 2)
+            self.assertEqual(report['start_accuracy'], 1.0)
+            self.assertEqual(report['by_kind']['partial'], 1.0)
+            self.assertEqual(report['routed'], 0.0)
+            self.assertGreater(report['throughput_qps'], 0)
+
+    def test_evaluate_bot_parser(self):
+        # محلل البوت يُستورد في عمليات العمل فقط (تغيير مجلد العمل وبيانات البوت لا يصل لهذه العملية)
+        queries = [{'query': 'إزاي أروح من بنك مصر إلى مستشفى الصدر؟', 'start': 'بنك مصر', 'end': 'مستشفى الصدر'}]
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.object(database_helper, 'DATABASE_PATH', os.path.join(directory, 'missing.db')):
+            report = search_eval.evaluate(queries, NEIGHBORHOODS, [], processes=2, system='bot')
+        self.assertEqual((report['start_accuracy'], report['end_accuracy']), (1.0, 1.0))
+        self.assertEqual(os.getcwd(), cwd)
+
+    def test_baseline_gate(self):
+        baseline = {'queries': 2, 'accuracy': 0.8, 'start_accuracy': 0.9, 'end_accuracy': 0.85, 'routed': 0.5,
+                    'by_kind': {}, 'p50_ms': 1.0, 'p99_ms': 4.0, 'throughput_qps': 1000.0, 'host': 'ci-1'}
+        self.assertEqual(search_eval.compare(dict(baseline, p99_ms=5.0), baseline), [])
+        failures = search_eval.compare(dict(baseline, accuracy=0.7, p50_ms=2.0), baseline)
+        self.assertEqual([failure.split()[0] for failure in failures], ['accuracy', 'p50_ms'])
+        # baseline من جهاز آخر: الزمن لا يُفشل الفحص
+        failures = search_eval.compare(dict(baseline, accuracy=0.7, p50_ms=2.0, host='ci-2'), baseline)
+        self.assertEqual([failure.split()[0] for failure in failures], ['accuracy'])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'nlp_search': dict(baseline, accuracy=1.0, start_accuracy=1.0, end_accuracy=1.0,
+                                              routed=1.0)}, f)
+            queries = os.path.join(directory, 'queries.jsonl')
+            with open(queries, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'query': 'من بنك مصر إلى هناك', 'start': 'بنك مصر', 'end': 'مستشفى الصدر'}) + '\n')
+            self.assertEqual(search_eval.main([queries, '--processes', '1', '--system', 'nlp_search', '--baseline', path]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import asyncio
+import unittest
+
+from telegram.error import RetryAfter
+from telegram.ext import ExtBot
+
+from fake_telegram import FakeTelegramRequest
+from send_queue import BROADCAST, SendQueue, TokenBucket
+
+
+def delivered(request):
+    return [(int(params['chat_id']), params['text']) for _, endpoint, params in request.call_log
+            if endpoint == 'sendMessage']
+
+
+class TestSendQueue(unittest.TestCase):
+    def run_bot(self, request, queue, sends):
+        async def run():
+            bot = ExtBot('123:TEST', request=request, rate_limiter=queue)
+            await bot.initialize()
+            try:
+                return await asyncio.gather(*(bot.send_message(chat_id, text, **kwargs)
+                                              for chat_id, text, kwargs in sends), return_exceptions=True)
+            finally:
+                await bot.shutdown()
+        return asyncio.run(run())
+
+    def test_limits_respected_and_chat_order_kept(self):
+        request = FakeTelegramRequest(global_limit=12, chat_limit=5)
+        sends = [(chat_id, f'{chat_id}-{i}', {}) for i in range(4) for chat_id in (1, 2, 3)]
+        results = self.run_bot(request, SendQueue(global_rate=8, global_burst=4, chat_rate=4, chat_burst=1), sends)
+        self.assertFalse([r for r in results if isinstance(r, Exception)])
+        self.assertEqual(sum(request.flood_errors.values()), 0)
+        for chat_id in (1, 2, 3):
+            self.assertEqual([text for chat, text in delivered(request) if chat == chat_id],
+                             [f'{chat_id}-{i}' for i in range(4)])
+
+    def test_retry_after_pauses_only_that_chat_and_keeps_order(self):
+        request = FakeTelegramRequest()
+        request.inject_retry_after(1)
+        queue = SendQueue()
+        sends = [(1, 'a1', {}), (1, 'a2', {}), (2, 'b1', {}), (1, 'a3', {})]
+        results = self.run_bot(request, queue, sends)
+        self.assertFalse([r for r in results if isinstance(r, Exception)])
+        self.assertEqual(request.flood_errors['sendMessage'], 1)
+        self.assertEqual(queue.stats, {'sent': 4, 'retry_after': 1})
+        self.assertEqual(delivered(request), [(2, 'b1'), (1, 'a1'), (1, 'a2'), (1, 'a3')])
+
+    def test_gives_up_after_max_retries(self):
+        request = FakeTelegramRequest()
+        request.inject_retry_after(1)
+        results = self.run_bot(request, SendQueue(max_retries=0), [(1, 'a', {}), (1, 'b', {})])
+        self.assertIsInstance(results[0], RetryAfter)
+        self.assertEqual(delivered(request), [(1, 'b')])
+
+    def test_interactive_replies_jump_ahead_of_broadcasts(self):
+        request = FakeTelegramRequest()
+        sends = [(chat_id, 'broadcast', {'rate_limit_args': BROADCAST}) for chat_id in (1, 2, 3, 4)]
+        sends.append((5, 'reply', {}))
+        # أول رسالتين تأخذان توكنات الثانية الأولى، والرد يسبق بقية الرسائل الجماعية
+        self.run_bot(request, SendQueue(global_rate=2, global_burst=2), sends)
+        self.assertEqual([chat for chat, _ in delivered(request)], [1, 2, 5, 3, 4])
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=2, capacity=2, now=0.0)
+        bucket.take(0.0)
+        bucket.take(0.0)
+        self.assertAlmostEqual(bucket.delay(0.0), 0.5)
+        self.assertEqual(bucket.delay(0.5), 0.0)
+        bucket.drain(0.5)
+        self.assertAlmostEqual(bucket.delay(0.5), 0.5)
+        self.assertTrue(bucket.full(10.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import random
+import unittest
+
+from spell_correction import LandmarkSpeller, SymSpell, edit_distance
+
+NEIGHBORHOODS = {
+    'حي الشرق': {
+        'مستشفيات': ['مستشفى الصدر', 'مستشفى التضامن'],
+        'مولات': ['صن مول', 'ميدان المنشية'],
+    },
+    'حي الضواحي': {
+        'بنوك': ['بنك الإسكان'],
+        'تعليم': ['كلية الحقوق جامعة بورسعيد'],
+    },
+}
+
+
+def brute_force(words, word, max_distance):
+    return sorted(w for w in words if edit_distance(word, w, max_distance) <= max_distance)
+
+
+class TestSpellCorrection(unittest.TestCase):
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance('الصدر', 'الصرد', 2), 1)  # تبديل حرفين متجاورين
+        self.assertEqual(edit_distance('مستشفي', 'مستشفا', 2), 1)
+        self.assertEqual(edit_distance('kitten', 'sitting', 3), 3)
+        self.assertEqual(edit_distance('kitten', 'sitting', 2), 3)
+
+    def test_lookup_matches_brute_force(self):
+        rng = random.Random(5)
+        letters = 'ابتثجحخدذرزسشصضطظعغفقكلمنهوي'
+        words = {''.join(rng.choice(letters) for _ in range(rng.randint(3, 12))) for _ in range(400)}
+        symspell = SymSpell(max_edit_distance=2, prefix_length=7)
+        for word in words:
+            symspell.add_word(word)
+        for word in rng.sample(sorted(words), 50):
+            typo = list(word)
+            for _ in range(rng.randint(1, 2)):
+                typo[rng.randrange(len(typo))] = rng.choice(letters)
+            typo = ''.join(typo)
+            self.assertEqual(sorted(w for w, _ in symspell.lookup(typo)), brute_force(words, typo, 2))
+
+    def test_remove_word_and_bounded_distance(self):
+        symspell = SymSpell(max_edit_distance=1)
+        symspell.add_word('الاسكان')
+        symspell.add_word('الاسكان')
+        symspell.add_word('الاسكندر')
+        self.assertEqual(symspell.lookup('الاسكن'), [('الاسكان', 1)])
+        symspell.remove_word('الاسكان')
+        self.assertEqual(symspell.lookup('الاسكن'), [('الاسكان', 1)])
+        symspell.remove_word('الاسكان')
+        symspell.remove_word('الاسكندر')
+        self.assertEqual((symspell.words, symspell.deletes), ({}, {}))
+
+    def test_landmark_suggestions(self):
+        speller = LandmarkSpeller.from_neighborhoods(NEIGHBORHOODS)
+        self.assertEqual([s['name'] for s in speller.suggest('مستشفا الصرد')], ['مستشفى الصدر'])
+        self.assertEqual([s['name'] for s in speller.suggest('المنشيه')], ['ميدان المنشية'])
+        self.assertEqual(speller.suggest('جامعه بورسعيد')[0]['neighborhood'], 'حي الضواحي')
+        self.assertEqual(speller.suggest('زززز'), [])
+        speller.remove('صن مول', 'حي الشرق')
+        self.assertEqual(speller.suggest('المول'), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
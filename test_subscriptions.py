@@ -0,0 +1,96 @@
+import os
+import json
+import shutil
+import asyncio
+import tempfile
+import unittest
+
+from telegram import Bot
+
+from fake_telegram import FakeTelegramRequest
+from subscriptions import AlertFanout, SubscriptionStore, format_alert
+
+ROUTE = 'خط السلام (رايح)'
+
+
+class BlockedChatRequest(FakeTelegramRequest):
+    """المحادثات في blocked حظرت البوت: الإرسال لها يرجع 403"""
+
+    def __init__(self, blocked):
+        super().__init__()
+        self.blocked = set(blocked)
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        params = request_data.parameters if request_data else {}
+        if url.endswith('/sendMessage') and int(params['chat_id']) in self.blocked:
+            return 403, json.dumps({'ok': False, 'error_code': 403,
+                                    'description': 'Forbidden: bot was blocked by the user'}).encode('utf-8')
+        return await super().do_request(url, method, request_data, **kwargs)
+
+
+def report(user_id, report_type='congestion', description='', route_name=ROUTE):
+    return {'user_id': user_id, 'route_name': route_name, 'report_type': report_type, 'description': description}
+
+
+class TestSubscriptions(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store = SubscriptionStore(os.path.join(self.tmp_dir, 'subscriptions.db'))
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_store(self):
+        self.assertIsNone(self.store.route_id(ROUTE))
+        route_id = self.store.route_id(ROUTE, create=True)
+        self.assertEqual(self.store.route_id(ROUTE, create=True), route_id)
+        self.assertTrue(self.store.subscribe(7, route_id))
+        self.assertFalse(self.store.subscribe(7, route_id))
+        self.assertEqual(self.store.subscribe_many(route_id, range(100, 2600)), 2500)
+        self.assertEqual(self.store.count(route_id), 2501)
+        pages = list(self.store.subscriber_pages(route_id, page_size=1000))
+        self.assertEqual([len(page) for page in pages], [1000, 1000, 501])
+        self.assertEqual(sum(pages, []), [7] + list(range(100, 2600)))
+        self.assertEqual(self.store.subscriptions(7), [(route_id, ROUTE)])
+        self.assertTrue(self.store.unsubscribe(7, route_id))
+        self.assertEqual(self.store.unsubscribe_chat(100), 1)
+        self.assertFalse(self.store.is_subscribed(100, route_id))
+
+    def test_burst_of_reports_sends_one_alert(self):
+        route_id = self.store.route_id(ROUTE, create=True)
+        self.store.subscribe_many(route_id, [1, 2, 3, 4, 5])
+        request = BlockedChatRequest(blocked=[4])
+        fanout = AlertFanout(self.store, debounce_s=0.05, page_size=2)
+
+        async def run():
+            bot = Bot('123:TEST', request=request)
+            await bot.initialize()
+            self.assertFalse(fanout.publish(bot, report(1, 'delay')))
+            self.assertFalse(fanout.publish(bot, report(1, route_name='خط بدون مشتركين')))
+            for user_id, description in ((1, 'زحمة عند الموقف'), (2, ''), (9, 'كوبري مقفول')):
+                self.assertTrue(fanout.publish(bot, report(user_id, description=description)))
+            fanout.publish(bot, report(9, 'detour'))
+            await asyncio.sleep(0.2)
+            await bot.shutdown()
+        asyncio.run(run())
+
+        # أصحاب التقارير (1 و 2) لا يصلهم التنبيه، والمحادثة التي حظرت البوت تُحذف اشتراكاتها
+        sent = [(int(params['chat_id']), params['text']) for _, endpoint, params in request.call_log
+                if endpoint == 'sendMessage']
+        self.assertEqual([chat_id for chat_id, _ in sent], [3, 5])
+        self.assertIn('(4 تقارير)', sent[0][1])
+        self.assertIn('🔄 تغيير مسار', sent[0][1])
+        self.assertEqual(fanout.stats, {'alerts': 1, 'sent': 2, 'failed': 0, 'blocked': 1})
+        self.assertFalse(self.store.is_subscribed(4, route_id))
+        self.assertEqual(fanout.tasks, {})
+
+    def test_format_alert(self):
+        text = format_alert(ROUTE, [report(1, description=str(i)) for i in range(5)])
+        self.assertTrue(text.startswith(f'⚠️ تنبيه على {ROUTE}'))
+        self.assertEqual(text.count('📝'), 3)
+        self.assertNotIn('تقارير', format_alert(ROUTE, [report(1)]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from helpers import find_route_logic
+from routing_engine import RoutingEngine
+import routing_engine
+import transfer_graph
+from transfer_graph import build_transfer_graph, haversine_m, walking_pairs
+
+ROUTES = [
+    {"routeName": "خط أ", "keyPoints": ["A", "B", "C"], "fare": "5"},
+    {"routeName": "خط ب", "keyPoints": ["D", "E", "F"], "fare": "6"},
+    {"routeName": "خط ج", "keyPoints": ["G", "C", "H"], "fare": "4"},
+]
+
+COORDINATES = {
+    "A": (31.2600, 32.3000),
+    "B": (31.2650, 32.3000),
+    "C": (31.2700, 32.3000),
+    "D": (31.2710, 32.3010),  # ~150 متر من C
+    "E": (31.2800, 32.3100),
+    "F": (31.2900, 32.3200),
+    "G": (31.2500, 32.2900),
+    "H": (31.2400, 32.2800),
+}
+
+
+class TestWalkingPairs(unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        lat = np.array([31.25 + rng.random() * 0.05 for _ in range(400)])
+        lng = np.array([32.28 + rng.random() * 0.05 for _ in range(400)])
+        rad_lat, rad_lng = np.radians(lat), np.radians(lng)
+        full = haversine_m(rad_lat[:, None], rad_lng[:, None], rad_lat[None, :], rad_lng[None, :])
+        a, b = np.nonzero(np.triu(full <= 300, k=1))
+        expected = set(zip(a.tolist(), b.tolist()))
+
+        for block_cells in (1000, 2_000_000):
+            i, j, dist = walking_pairs(lat, lng, 300, block_cells=block_cells)
+            found = {(min(x, y), max(x, y)) for x, y in zip(i.tolist(), j.tolist())}
+            self.assertEqual(found, expected)
+            self.assertTrue(np.allclose(dist, full[i, j]))
+
+    def test_cache_round_trip(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            graph = build_transfer_graph(ROUTES, COORDINATES.get, radius_m=300, cache_dir=cache_dir)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            cached = build_transfer_graph(ROUTES, COORDINATES.get, radius_m=300, cache_dir=cache_dir)
+            self.assertEqual(cached.walks, graph.walks)
+            self.assertEqual([name for name, _ in graph.walks_from("c")], ["d"])
+        finally:
+            shutil.rmtree(cache_dir)
+
+
+class TestTransferRouting(unittest.TestCase):
+    def setUp(self):
+        self.engine = RoutingEngine(ROUTES, {})
+        self.graph = build_transfer_graph(ROUTES, COORDINATES.get, radius_m=300, cache_dir=None)
+
+    def test_walking_transfer_needs_graph(self):
+        self.assertEqual(self.engine.find_with_transfer("A", "F"), [])
+        result = self.engine.find_with_transfer("A", "F", self.graph)
+        self.assertEqual([leg["routeName"] for leg in result[0]["legs"]], ["خط أ", "خط ب"])
+        self.assertEqual(result[0]["legs"][0]["end_nearest_stop"], "C")
+        self.assertEqual(result[0]["legs"][1]["start_nearest_stop"], "D")
+        self.assertGreater(result[0]["transfer_walk_meters"], 0)
+
+    def test_same_stop_transfer_and_helpers_output(self):
+        result = self.engine.find_with_transfer("A", "H")
+        self.assertEqual(result[0]["transfer_walk_meters"], 0)
+        text = find_route_logic("A", "H", ROUTES)
+        self.assertIn("خط أ", text)
+        self.assertIn("خط ج", text)
+        self.assertIn("5 + 4", text)
+        # بدون neighborhoods: نفس المحرك وحواف التبديل في كل استدعاء
+        engines, graphs = len(routing_engine._engines), len(transfer_graph._graphs)
+        for _ in range(5):
+            find_route_logic("A", "H", ROUTES)
+        self.assertEqual((len(routing_engine._engines), len(transfer_graph._graphs)), (engines, graphs))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+حواف التبديل مشياً بين محطات الخطوط المختلفة
+
+لكل المحطات التي لها إحداثيات تُحسب مسافة haversine بين كل زوج بشكل
+vectorized بـ NumPy، على دفعات (blocks) لتحديد استهلاك الذاكرة، مع قصر
+المقارنة على نطاق خط العرض الممكن. الأزواج ضمن نصف قطر المشي تصبح حواف
+تبديل في محرك المسارات. النتيجة تُحفظ على القرص (npz) بمفتاح مشتق من
+المحطات وإحداثياتها ونصف القطر، فلا يُعاد الحساب إلا عند تغير البيانات.
+"""
+
+import os
+import hashlib
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from geo_index import EARTH_RADIUS_M, collect_points
+from routing_engine import DatasetCache, normalize_name
+
+logger = logging.getLogger(__name__)
+
+WALK_TRANSFER_RADIUS_M = float(os.getenv('WALK_TRANSFER_RADIUS_M', '300'))
+TRANSFER_CACHE_DIR = os.getenv('TRANSFER_CACHE_DIR', 'graph_cache')
+# أقصى عدد خلايا في مصفوفة مسافات واحدة (~16MB بـ float64)
+BLOCK_CELLS = 2_000_000
+
+Point = Tuple[float, float]
+
+
+def haversine_m(lat1: np.ndarray, lng1: np.ndarray, lat2: np.ndarray, lng2: np.ndarray) -> np.ndarray:
+    """مسافة haversine بالمتر بين مصفوفات إحداثيات بالراديان (مع broadcasting)"""
+    dlat = lat2 - lat1
+    dlng = lng2 - lng1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def walking_pairs(lat_deg: np.ndarray, lng_deg: np.ndarray, radius_m: float,
+                  block_cells: int = BLOCK_CELLS) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """كل أزواج النقاط التي تبعد عن بعضها radius_m أو أقل (كل زوج مرة واحدة)
+
+    Returns:
+        (i, j, المسافة بالمتر) كمصفوفات بنفس الطول
+    """
+    n = len(lat_deg)
+    if n < 2:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float64)
+
+    order = np.argsort(lat_deg, kind='stable')
+    lat = np.radians(np.asarray(lat_deg, dtype=np.float64)[order])
+    lng = np.radians(np.asarray(lng_deg, dtype=np.float64)[order])
+    dlat = radius_m / EARTH_RADIUS_M
+
+    rows_per_block = max(1, min(n, int(np.sqrt(block_cells))))
+    out_i, out_j, out_d = [], [], []
+    for row_start in range(0, n, rows_per_block):
+        row_end = min(n, row_start + rows_per_block)
+        # بعد الترتيب حسب خط العرض: الأعمدة الممكنة فقط (j > i وضمن فرق العرض)
+        col_end = int(np.searchsorted(lat, lat[row_end - 1] + dlat, side='right'))
+        col_chunk = max(1, block_cells // (row_end - row_start))
+        row_lat = lat[row_start:row_end, None]
+        row_lng = lng[row_start:row_end, None]
+        row_ids = np.arange(row_start, row_end)[:, None]
+        for col_start in range(row_start + 1, col_end, col_chunk):
+            col_stop = min(col_end, col_start + col_chunk)
+            dist = haversine_m(row_lat, row_lng, lat[None, col_start:col_stop], lng[None, col_start:col_stop])
+            col_ids = np.arange(col_start, col_stop)[None, :]
+            mask = (dist <= radius_m) & (col_ids > row_ids)
+            r, c = np.nonzero(mask)
+            if len(r):
+                out_i.append(r + row_start)
+                out_j.append(c + col_start)
+                out_d.append(dist[r, c])
+
+    if not out_i:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float64)
+    i = order[np.concatenate(out_i)]
+    j = order[np.concatenate(out_j)]
+    return i, j, np.concatenate(out_d)
+
+
+class TransferGraph:
+    """حواف المشي بين المحطات: اسم المحطة (مطبع) -> [(محطة أخرى, المسافة بالمتر)]"""
+
+    def __init__(self, names: List[str], i: np.ndarray, j: np.ndarray, dist: np.ndarray,
+                 coords: Optional[np.ndarray] = None, radius_m: float = WALK_TRANSFER_RADIUS_M):
+        self.names = names
+        self.radius_m = radius_m
+        self.edge_count = len(i)
+        self.walks: Dict[str, List[Tuple[str, int]]] = {}
+        for a, b, d in zip(i.tolist(), j.tolist(), np.rint(dist).astype(np.int64).tolist()):
+            self.walks.setdefault(names[a], []).append((names[b], d))
+            self.walks.setdefault(names[b], []).append((names[a], d))
+        # إحداثيات المحطات بالراديان لإضافة محطة جديدة دون إعادة حساب كل الأزواج
+        coords = np.empty((0, 2)) if coords is None else np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        self._lat = np.radians(coords[:, 0])
+        self._lng = np.radians(coords[:, 1])
+        self._index = {name: n for n, name in enumerate(names)} if len(coords) == len(names) else {}
+
+    def walks_from(self, stop_key: str) -> List[Tuple[str, int]]:
+        return self.walks.get(stop_key, [])
+
+    def add_stop(self, stop_key: str, point: Point) -> int:
+        """إضافة محطة جديدة بحواف المشي إلى المحطات الموجودة (مسافات من نقطة واحدة فقط)"""
+        if stop_key in self._index:
+            return 0
+        lat, lng = np.radians(point[0]), np.radians(point[1])
+        dist = haversine_m(lat, lng, self._lat, self._lng)
+        nearby = np.nonzero(dist <= self.radius_m)[0]
+        for n, d in zip(nearby.tolist(), np.rint(dist[nearby]).astype(np.int64).tolist()):
+            self.walks.setdefault(stop_key, []).append((self.names[n], d))
+            self.walks.setdefault(self.names[n], []).append((stop_key, d))
+        self._index[stop_key] = len(self.names)
+        self.names.append(stop_key)
+        self._lat = np.append(self._lat, lat)
+        self._lng = np.append(self._lng, lng)
+        self.edge_count += len(nearby)
+        return len(nearby)
+
+
+def _cache_path(cache_dir: str, names: List[str], coords: np.ndarray, radius_m: float) -> str:
+    digest = hashlib.sha256()
+    digest.update(repr(radius_m).encode('utf-8'))
+    digest.update('\n'.join(names).encode('utf-8'))
+    digest.update(np.round(coords, 7).tobytes())
+    return os.path.join(cache_dir, f"transfers_{digest.hexdigest()[:24]}.npz")
+
+
+def build_transfer_graph(routes: List[Dict], locate: Callable[[str], Optional[Point]],
+                         radius_m: float = WALK_TRANSFER_RADIUS_M,
+                         cache_dir: Optional[str] = TRANSFER_CACHE_DIR) -> TransferGraph:
+    """بناء حواف التبديل لمحطات كل الخطوط التي يمكن تحديد إحداثياتها"""
+    names, points = [], []
+    seen = set()
+    for route in routes:
+        for point in route.get('keyPoints') or []:
+            if not isinstance(point, str):
+                continue
+            key = normalize_name(point)
+            if key in seen:
+                continue
+            seen.add(key)
+            coordinates = locate(point)
+            if coordinates:
+                names.append(key)
+                points.append(coordinates)
+
+    coords = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    path = _cache_path(cache_dir, names, coords, radius_m) if cache_dir else None
+    if path and os.path.exists(path):
+        try:
+            with np.load(path) as cached:
+                logger.info("Loaded walking transfers from %s", path)
+                return TransferGraph(names, cached['i'], cached['j'], cached['dist'], coords, radius_m)
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning("Ignoring unreadable transfer cache %s: %s", path, e)
+
+    i, j, dist = walking_pairs(coords[:, 0], coords[:, 1], radius_m)
+    logger.info("Computed %d walking transfers between %d stops (radius %.0fm)", len(i), len(names), radius_m)
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, i=i, j=j, dist=dist)
+        os.replace(tmp_path, path)
+    return TransferGraph(names, i, j, dist, coords, radius_m)
+
+
+def coordinate_locator(neighborhoods: Dict, routes: List[Dict],
+                       extra: Optional[Dict[str, object]] = None) -> Callable[[str], Optional[Point]]:
+    """دالة اسم -> إحداثيات من بيانات المعالم وبدايات الخطوط ومصدر إضافي (مثل الجيوكاش)"""
+    names, points = collect_points(neighborhoods, routes, (extra or {}).items())
+    index = {normalize_name(name): point for name, point in zip(names, points)}
+    return lambda name: index.get(normalize_name(name))
+
+
+_graphs = DatasetCache()
+
+
+def get_transfer_graph(routes: List[Dict], neighborhoods: Dict, build: bool = True) -> Optional[TransferGraph]:
+    """حواف التبديل لنفس كائنات البيانات (تُبنى مرة واحدة فقط، أو None إذا لم تُبنَ وbuild=False)"""
+    graph = _graphs.get(routes, neighborhoods)
+    if graph is None and build:
+        graph = build_transfer_graph(routes, coordinate_locator(neighborhoods, routes))
+        _graphs.put(routes, neighborhoods, graph)
+    return graph